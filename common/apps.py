@@ -0,0 +1,20 @@
+import logging
+from django.apps import AppConfig
+
+
+logger = logging.getLogger('django')
+
+
+class CommonConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'common'
+
+    def ready(self):
+        logger.info('Initializing Common app and connecting image, follow graph and query timer signals.')
+        from django.db.backends.signals import connection_created
+        from common.follow_graph import connect_follow_graph_signals
+        from common.metrics import install_query_timer
+        from common.signals import connect_image_signals
+        connect_image_signals()
+        connect_follow_graph_signals()
+        connection_created.connect(install_query_timer, dispatch_uid='install_query_timer')
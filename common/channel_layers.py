@@ -0,0 +1,58 @@
+import hashlib
+from bisect import bisect_right
+
+from channels_redis.core import RedisChannelLayer
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping keys to node indexes.
+
+    Each node owns `replicas` points of the ring, placed by its name, so
+    adding a node moves only the keys of its new points and every process
+    agrees on the placement whatever the order of its node list.
+    """
+
+    def __init__(self, nodes, replicas=160):
+        points = sorted(
+            (self.hash(f'{node}#{replica}'), index)
+            for index, node in enumerate(nodes)
+            for replica in range(replicas)
+        )
+        self.hashes = [point for point, _ in points]
+        self.indexes = [index for _, index in points]
+
+    @staticmethod
+    def hash(value):
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], 'big')
+
+    def get(self, key):
+        position = bisect_right(self.hashes, self.hash(key)) % len(self.hashes)
+        return self.indexes[position]
+
+
+class ShardedRedisChannelLayer(RedisChannelLayer):
+    """
+    RedisChannelLayer placing groups and channels on a consistent hash ring of
+    its hosts.
+
+    channels_redis shards by crc32 modulo the number of hosts, so adding a
+    Redis instance moves almost every group, and members of a moved group
+    miss its messages until their consumers re-add it. On the ring a new
+    instance only takes over its share of the groups.
+    """
+
+    def __init__(self, hosts=None, replicas=160, **kwargs):
+        super().__init__(hosts=hosts, **kwargs)
+        self.ring = HashRing([self.host_key(host) for host in self.hosts], replicas)
+
+    @staticmethod
+    def host_key(host):
+        if 'address' in host:
+            return host['address']
+        if 'master_name' in host:
+            return f"sentinel:{host['master_name']}"
+        return f"redis://{host['host']}:{host['port']}"
+
+    def consistent_hash(self, value):
+        return self.ring.get(value)
@@ -0,0 +1,143 @@
+import asyncio
+import time
+
+from django.conf import settings
+
+from common.metrics import RequestStats, current_stats, registry
+from forum.utils.logging_utils import get_logger
+
+
+logger = get_logger('performance')
+
+WEBSOCKET_CONNECTIONS = registry.gauge(
+    'websocket_connections', 'Open websocket connections by consumer.', ('consumer',))
+WEBSOCKET_CONNECTIONS_OPENED = registry.counter(
+    'websocket_connections_opened', 'Accepted websocket connections by consumer.', ('consumer',))
+HANDLER_DURATION = registry.histogram(
+    'websocket_handler_duration_seconds', 'Wall time of consumer handlers by message type.',
+    ('consumer', 'handler'))
+HANDLER_MONGO_TIME = registry.histogram(
+    'websocket_handler_mongo_seconds', 'MongoDB command time of consumer handlers by message type.',
+    ('consumer', 'handler'))
+GROUP_SEND_DURATION = registry.histogram(
+    'websocket_group_send_duration_seconds', 'Channel layer group_send latency by consumer.', ('consumer',))
+EVENT_LOOP_LAG = registry.histogram(
+    'event_loop_lag_seconds', 'Delay of event loop callbacks past their scheduled time.',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
+
+
+class EventLoopLagMonitor:
+    """
+    Measures the lag of the event loops serving websocket connections.
+
+    A task per loop sleeps for EVENT_LOOP_LAG_INTERVAL and records how late
+    it wakes up. It runs while the loop has open connections.
+    """
+
+    def __init__(self):
+        # Monitoring task and open connections per event loop
+        self.loops = {}
+
+    def acquire(self):
+        loop = asyncio.get_running_loop()
+        task, connections = self.loops.get(loop, (None, 0))
+        if task is None:
+            task = loop.create_task(self.run())
+        self.loops[loop] = (task, connections + 1)
+
+    def release(self):
+        loop = asyncio.get_running_loop()
+        task, connections = self.loops.pop(loop, (None, 0))
+        if connections > 1:
+            self.loops[loop] = (task, connections - 1)
+        elif task is not None:
+            task.cancel()
+
+    @staticmethod
+    async def run():
+        loop = asyncio.get_running_loop()
+        interval = settings.EVENT_LOOP_LAG_INTERVAL
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            lag = max(loop.time() - start - interval, 0)
+            EVENT_LOOP_LAG.observe(lag)
+            lag_ms = round(lag * 1000, 3)
+            if lag_ms >= settings.EVENT_LOOP_LAG_WARNING_MS:
+                logger.warning("Event loop lagged %s ms", lag_ms, lag_ms=lag_ms)
+
+
+lag_monitor = EventLoopLagMonitor()
+
+
+class ConsumerMetricsMixin:
+    """
+    Mixin instrumenting an AsyncWebsocketConsumer.
+
+    Records open connections, the wall time and MongoDB command time of every
+    handler (`receive`, group message handlers, ...) by message type and the
+    latency of `group_send`, in the registry served by `MetricsView`.
+    Handlers slower than WEBSOCKET_SLOW_HANDLER_MS are logged with the
+    fields of `get_trace_fields()`. The lag of the event loop is measured
+    while connections are open.
+
+    Consumers send to groups through `self.group_send()` to have it timed.
+    """
+    metrics_connected = False
+
+    def get_trace_fields(self):
+        """Fields identifying the connection in slow handler logs."""
+        return {}
+
+    @property
+    def metrics_name(self):
+        return type(self).__name__
+
+    async def dispatch(self, message):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            await super().dispatch(message)
+        finally:
+            duration = time.perf_counter() - start
+            current_stats.reset(token)
+            self.record_handler(message['type'], duration, stats)
+
+    def record_handler(self, handler, duration, stats):
+        labels = (self.metrics_name, handler)
+        HANDLER_DURATION.observe(duration, labels)
+        if stats.mongo_commands:
+            HANDLER_MONGO_TIME.observe(stats.mongo_time, labels)
+
+        duration_ms = round(duration * 1000, 3)
+        if duration_ms >= settings.WEBSOCKET_SLOW_HANDLER_MS:
+            logger.warning("Slow %s handler %s", self.metrics_name, handler,
+                           consumer=self.metrics_name, handler=handler, duration_ms=duration_ms,
+                           mongo_commands=stats.mongo_commands,
+                           mongo_time_ms=round(stats.mongo_time * 1000, 3),
+                           **self.get_trace_fields())
+
+    async def group_send(self, group, message):
+        start = time.perf_counter()
+        try:
+            await self.channel_layer.group_send(group, message)
+        finally:
+            GROUP_SEND_DURATION.observe(time.perf_counter() - start, (self.metrics_name,))
+
+    async def accept(self, *args, **kwargs):
+        await super().accept(*args, **kwargs)
+        if not self.metrics_connected:
+            self.metrics_connected = True
+            WEBSOCKET_CONNECTIONS.inc((self.metrics_name,))
+            WEBSOCKET_CONNECTIONS_OPENED.inc((self.metrics_name,))
+            lag_monitor.acquire()
+
+    async def websocket_disconnect(self, message):
+        try:
+            await super().websocket_disconnect(message)
+        finally:
+            if self.metrics_connected:
+                self.metrics_connected = False
+                WEBSOCKET_CONNECTIONS.dec((self.metrics_name,))
+                lag_monitor.release()
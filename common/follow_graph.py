@@ -0,0 +1,275 @@
+import logging
+from functools import partial
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+
+from common.redis_clients import get_redis_client
+
+
+logger = logging.getLogger('django')
+
+FOLLOW_GRAPH_TTL = getattr(settings, 'FOLLOW_GRAPH_TTL', 60 * 60 * 24)
+
+
+class RedisSetStore:
+    """
+    Follow sets kept in Redis.
+
+    A loaded set always contains the SENTINEL member, so empty sets exist
+    and sets that were never loaded (or have expired) can be told apart.
+
+    Every change of a set increments its version. A set is loaded only if
+    its version did not change while the database was read, so a follow
+    committed meanwhile is never overwritten by an older snapshot.
+    """
+    SENTINEL = '*'
+    VERSION_KEY = '{}:version'
+
+    def __init__(self, client, ttl):
+        self.client = client
+        self.ttl = ttl
+
+    def loaded(self, keys):
+        pipeline = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.sismember(key, self.SENTINEL)
+        return [bool(loaded) for loaded in pipeline.execute()]
+
+    def load(self, key, query):
+        """
+        Add the members returned by `query` (read from the database) to the
+        set and mark it loaded, unless the set changes meanwhile.
+
+        Returns:
+            bool: whether the set was loaded
+        """
+        from redis.exceptions import WatchError
+
+        with self.client.pipeline() as pipeline:
+            try:
+                pipeline.watch(self.VERSION_KEY.format(key))
+                members = query()
+                pipeline.multi()
+                pipeline.sadd(key, self.SENTINEL, *members)
+                pipeline.expire(key, self.ttl)
+                pipeline.execute()
+            except WatchError:
+                return False
+        return True
+
+    def change(self, key, members, added):
+        # Sets which are not loaded keep the change and are completed on their next load
+        version_key = self.VERSION_KEY.format(key)
+        pipeline = self.client.pipeline()
+        if added:
+            pipeline.sadd(key, *members)
+            pipeline.expire(key, self.ttl)
+        else:
+            pipeline.srem(key, *members)
+        pipeline.incr(version_key)
+        pipeline.expire(version_key, self.ttl)
+        pipeline.execute()
+
+    def members(self, key):
+        return self.client.smembers(key) - {self.SENTINEL}
+
+    def contains(self, key, members):
+        return [bool(found) for found in self.client.smismember(key, members)]
+
+    def intersection(self, keys):
+        return self.client.sinter(keys) - {self.SENTINEL}
+
+
+class Relation:
+    """
+    One direction of a follow relation: the ids in `member_field` of the
+    rows of `model_label` with a given `owner_field`.
+    """
+
+    def __init__(self, key, model_label, owner_field, member_field, member_type):
+        self.key = key
+        self.model_label = model_label
+        self.owner_field = owner_field
+        self.member_field = member_field
+        self.member_type = member_type
+
+    def get_key(self, owner_id):
+        return self.key.format(owner_id)
+
+    def query(self, owner_id):
+        model = apps.get_model(self.model_label)
+        return {
+            str(member)
+            for member in model.objects.filter(**{self.owner_field: owner_id})
+            .values_list(self.member_field, flat=True)
+        }
+
+
+class FollowGraph:
+    """
+    Service for the follow graph between investors and startups/projects.
+
+    Follower ids per startup and project and followed ids per investor are
+    kept as sets in Redis. Sets are loaded from the database on first use
+    and expire after FOLLOW_GRAPH_TTL; saves and deletes of follows update
+    them once committed (see `connect_follow_graph_signals`).
+
+    Reads go to the database without loading sets inside a transaction,
+    since they may see uncommitted rows, when a set changes while it is
+    loaded, and when FOLLOW_GRAPH_REDIS_URL is not set (development).
+    """
+
+    STARTUP_FOLLOWERS = Relation('follow_graph:startup:{}:investors',
+                                 'investment_tracking.InvestmentTracking', 'startup_id', 'investor_id', int)
+    PROJECT_FOLLOWERS = Relation('follow_graph:project:{}:investors',
+                                 'track_projects.TrackProjects', 'project_id', 'investor_id', int)
+    FOLLOWED_STARTUPS = Relation('follow_graph:investor:{}:startups',
+                                 'investment_tracking.InvestmentTracking', 'investor_id', 'startup_id', int)
+    FOLLOWED_PROJECTS = Relation('follow_graph:investor:{}:projects',
+                                 'track_projects.TrackProjects', 'investor_id', 'project_id', str)
+
+    # (relation from the followed side, relation from the investor side) per follow model
+    MODEL_RELATIONS = {
+        'investment_tracking.InvestmentTracking': (STARTUP_FOLLOWERS, FOLLOWED_STARTUPS),
+        'track_projects.TrackProjects': (PROJECT_FOLLOWERS, FOLLOWED_PROJECTS),
+    }
+
+    _store = None
+
+    @classmethod
+    def get_store(cls):
+        """Return the Redis store of the sets, or None without FOLLOW_GRAPH_REDIS_URL."""
+        if cls._store is None and settings.FOLLOW_GRAPH_REDIS_URL:
+            cls._store = RedisSetStore(get_redis_client(settings.FOLLOW_GRAPH_REDIS_URL), FOLLOW_GRAPH_TTL)
+        return cls._store
+
+    @classmethod
+    def can_use_store(cls):
+        return cls.get_store() is not None and not connection.in_atomic_block
+
+    @classmethod
+    def ensure_loaded(cls, relation, owner_ids):
+        """
+        Load the sets of the owners which are not loaded yet.
+
+        Returns:
+            list: keys of the sets, or None if the store cannot be used or a
+            set changed while it was loaded (the database is read instead)
+        """
+        if not cls.can_use_store():
+            return None
+        store = cls.get_store()
+        keys = [relation.get_key(owner_id) for owner_id in owner_ids]
+        for owner_id, key, loaded in zip(owner_ids, keys, store.loaded(keys)):
+            if not loaded and not store.load(key, partial(relation.query, owner_id)):
+                return None
+        return keys
+
+    @classmethod
+    def get_members(cls, relation, owner_id):
+        keys = cls.ensure_loaded(relation, [owner_id])
+        if keys is None:
+            members = relation.query(owner_id)
+        else:
+            members = cls.get_store().members(keys[0])
+        return {relation.member_type(member) for member in members}
+
+    @classmethod
+    def contains(cls, relation, owner_id, member_ids):
+        """Return {member id: whether it is in the set of the owner}."""
+        member_ids = list(member_ids)
+        if not member_ids:
+            return {}
+        keys = cls.ensure_loaded(relation, [owner_id])
+        if keys is None:
+            members = relation.query(owner_id)
+            found = [str(member_id) in members for member_id in member_ids]
+        else:
+            found = cls.get_store().contains(keys[0], [str(member_id) for member_id in member_ids])
+        return dict(zip(member_ids, found))
+
+    @classmethod
+    def startup_followers(cls, startup_id):
+        """Return ids of the investors following the startup."""
+        return cls.get_members(cls.STARTUP_FOLLOWERS, startup_id)
+
+    @classmethod
+    def project_followers(cls, project_id):
+        """Return ids of the investors tracking the project."""
+        return cls.get_members(cls.PROJECT_FOLLOWERS, project_id)
+
+    @classmethod
+    def followed_startups(cls, investor_id):
+        """Return ids of the startups followed by the investor."""
+        return cls.get_members(cls.FOLLOWED_STARTUPS, investor_id)
+
+    @classmethod
+    def followed_projects(cls, investor_id):
+        """Return ids (as strings) of the projects tracked by the investor."""
+        return cls.get_members(cls.FOLLOWED_PROJECTS, investor_id)
+
+    @classmethod
+    def follows_startups(cls, investor_id, startup_ids):
+        """Return {startup id: whether the investor follows it}."""
+        return cls.contains(cls.FOLLOWED_STARTUPS, investor_id, startup_ids)
+
+    @classmethod
+    def follows_startup(cls, investor_id, startup_id):
+        return cls.follows_startups(investor_id, [startup_id])[startup_id]
+
+    @classmethod
+    def follows_projects(cls, investor_id, project_ids):
+        """Return {project id: whether the investor tracks it}."""
+        return cls.contains(cls.FOLLOWED_PROJECTS, investor_id, project_ids)
+
+    @classmethod
+    def follows_project(cls, investor_id, project_id):
+        return cls.follows_projects(investor_id, [project_id])[project_id]
+
+    @classmethod
+    def startup_and_project_followers(cls, startup_id, project_id):
+        """Return ids of the investors who follow the startup and track its project."""
+        startup_keys = cls.ensure_loaded(cls.STARTUP_FOLLOWERS, [startup_id])
+        project_keys = cls.ensure_loaded(cls.PROJECT_FOLLOWERS, [project_id])
+        if startup_keys is None or project_keys is None:
+            return cls.startup_followers(startup_id) & cls.project_followers(project_id)
+        return {int(member) for member in cls.get_store().intersection([*startup_keys, *project_keys])}
+
+    @classmethod
+    def update(cls, model_label, pairs, added):
+        """Add (or remove) follows given as (followed id, investor id) pairs to the sets."""
+        followers, followed = cls.MODEL_RELATIONS[model_label]
+        store = cls.get_store()
+        for followed_id, investor_id in pairs:
+            store.change(followers.get_key(followed_id), [str(investor_id)], added)
+            store.change(followed.get_key(investor_id), [str(followed_id)], added)
+
+    @classmethod
+    def on_commit_update(cls, model_label, pairs, added):
+        """Update the sets once the current transaction is committed."""
+        pairs = list(pairs)
+        if pairs and cls.get_store() is not None:
+            transaction.on_commit(partial(cls.update, model_label, pairs, added))
+
+
+def update_follow_graph(sender, instance, created=True, **kwargs):
+    """Keep the follow sets in sync with saved and deleted follows."""
+    model_label = sender._meta.label
+    followers = FollowGraph.MODEL_RELATIONS[model_label][0]
+    if kwargs.get('signal') is post_save and not created:
+        return
+    FollowGraph.on_commit_update(
+        model_label,
+        [(getattr(instance, followers.owner_field), instance.investor_id)],
+        added=kwargs.get('signal') is post_save,
+    )
+
+
+def connect_follow_graph_signals():
+    for model_label in FollowGraph.MODEL_RELATIONS:
+        model = apps.get_model(model_label)
+        post_save.connect(update_follow_graph, sender=model, dispatch_uid=f'{model_label}_follow_graph_add')
+        post_delete.connect(update_follow_graph, sender=model, dispatch_uid=f'{model_label}_follow_graph_remove')
@@ -0,0 +1,133 @@
+from functools import partial
+
+from django.db import connection, transaction
+
+from common.follow_graph import FollowGraph
+from common.streaming import chunked
+from forum.utils.logging_utils import get_logger
+
+
+logger = get_logger('django')
+
+
+class FollowStatus:
+    FOLLOWED = 'followed'
+    ALREADY_FOLLOWING = 'already_following'
+    UNFOLLOWED = 'unfollowed'
+    NOT_FOLLOWING = 'not_following'
+    NOT_FOUND = 'not_found'
+
+
+class BulkFollowService:
+    """
+    Base service for following and unfollowing many targets (startups or
+    projects) of one investor at once.
+
+    Follows are inserted with `INSERT ... ON CONFLICT DO NOTHING RETURNING`,
+    which sends no signals, so the follow graph, the dashboard metrics and
+    the follow notifications are updated by the service, only for the rows
+    actually inserted. Subclasses set the
+    models and implement `mark_changed` and `notify`.
+
+    Attributes:
+        model: the follow model (with an `investor` foreign key).
+        target_model: the followed model.
+        target_field (str): name of the foreign key of model to target_model.
+        startup_field (str): field of target_model holding the startup id.
+    """
+    model = None
+    target_model = None
+    target_field = None
+    startup_field = None
+    BATCH_SIZE = 500
+
+    @classmethod
+    def mark_changed(cls, investor_id, target_ids):
+        """Mark the dashboard metrics of the investor and the targets as stale."""
+        raise NotImplementedError
+
+    @classmethod
+    def notify(cls, investor_id, followed):
+        """Send the follow notifications of the {target id: startup id} follows."""
+        raise NotImplementedError
+
+    @classmethod
+    def insert_follows(cls, investor_id, target_ids):
+        """
+        Insert the follows of the targets which are not followed yet.
+
+        Returns:
+            set: ids of the targets whose follow was inserted; follows which
+            already exist, even if committed concurrently, are skipped
+        """
+        meta = cls.model._meta
+        quote_name = connection.ops.quote_name
+        target = meta.get_field(cls.target_field)
+        sql = (
+            f"INSERT INTO {quote_name(meta.db_table)} "
+            f"({quote_name(meta.get_field('investor').column)}, {quote_name(target.column)}, "
+            f"{quote_name(meta.get_field('saved_at').column)}) "
+            f"SELECT %s, target_id, NOW() FROM unnest(%s::{target.db_type(connection)}[]) AS target_id "
+            f"ON CONFLICT DO NOTHING RETURNING {quote_name(target.column)}"
+        )
+        inserted = set()
+        with connection.cursor() as cursor:
+            for batch in chunked(target_ids, cls.BATCH_SIZE):
+                cursor.execute(sql, [investor_id, list(batch)])
+                inserted.update(row[0] for row in cursor.fetchall())
+        return inserted
+
+    @classmethod
+    def follow(cls, investor_id, target_ids):
+        """
+        Follow the targets, skipping missing and already followed ones.
+
+        Returns:
+            dict: FollowStatus per target id, in the order of target_ids
+        """
+        target_ids = list(dict.fromkeys(target_ids))
+        startups = dict(
+            cls.target_model.objects.filter(pk__in=target_ids).values_list('pk', cls.startup_field))
+        followed = set()
+
+        if startups:
+            with transaction.atomic():
+                followed = cls.insert_follows(investor_id, [pk for pk in target_ids if pk in startups])
+                if followed:
+                    new_ids = [pk for pk in target_ids if pk in followed]
+                    FollowGraph.on_commit_update(
+                        cls.model._meta.label, [(pk, investor_id) for pk in new_ids], added=True)
+                    cls.mark_changed(investor_id, new_ids)
+                    transaction.on_commit(
+                        partial(cls.notify, investor_id, {pk: startups[pk] for pk in new_ids}))
+            logger.info("Investor %s followed %s of %s %s", investor_id, len(followed), len(target_ids),
+                        cls.target_model._meta.verbose_name_plural)
+
+        return {
+            pk: FollowStatus.NOT_FOUND if pk not in startups
+            else FollowStatus.FOLLOWED if pk in followed
+            else FollowStatus.ALREADY_FOLLOWING
+            for pk in target_ids
+        }
+
+    @classmethod
+    def unfollow(cls, investor_id, target_ids):
+        """
+        Unfollow the targets. Deletes send the usual signals.
+
+        Returns:
+            dict: FollowStatus per target id, in the order of target_ids
+        """
+        target_ids = list(dict.fromkeys(target_ids))
+        with transaction.atomic():
+            queryset = cls.model.objects.filter(
+                investor_id=investor_id, **{f'{cls.target_field}_id__in': target_ids})
+            following = set(queryset.values_list(f'{cls.target_field}_id', flat=True))
+            queryset.delete()
+        logger.info("Investor %s unfollowed %s of %s %s", investor_id, len(following), len(target_ids),
+                    cls.target_model._meta.verbose_name_plural)
+
+        return {
+            pk: FollowStatus.UNFOLLOWED if pk in following else FollowStatus.NOT_FOLLOWING
+            for pk in target_ids
+        }
@@ -0,0 +1,87 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from communications.domain.entities.messages import ChatRoom, Message
+from communications.domain.values.messages import Text, Title
+from forum.utils.logging_utils import get_logger
+
+
+class Command(BaseCommand):
+    help = ('Measure the cost of request path log calls with eager f-string messages '
+            'and with lazy %-style messages, at the configured log levels.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logger', default='django',
+                            help='Logger the calls are made on')
+        parser.add_argument('--calls', type=int, default=100000,
+                            help='Log calls per case')
+        parser.add_argument('--messages', type=int, default=50,
+                            help='Messages in the chat room of the chatroom case')
+
+    def get_cases(self, name, message_count):
+        """Return (name, eager call, lazy call) per hot path log call."""
+        std_logger = logging.getLogger(name)
+        logger = get_logger(name)
+        chatroom = ChatRoom(
+            title=Title('Benchmark'),
+            sender_id=1,
+            receiver_id=2,
+            messages=[Message(content=Text(f'Message {i}'), sender_id=1, receiver_id=2)
+                      for i in range(message_count)],
+        )
+        entity = chatroom.messages[0] if chatroom.messages else chatroom
+
+        def entity_eager():
+            std_logger.info(f"Created new entity: {entity.__class__.__name__} with oid {entity.oid} "
+                            f"at {entity.created_at}")
+
+        def entity_lazy():
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Created new entity: %s with oid %s at %s",
+                            entity.__class__.__name__, entity.oid, entity.created_at)
+
+        def chatroom_eager():
+            std_logger.info(f"Chatroom retrieved successfully: {chatroom}")
+
+        def chatroom_lazy():
+            logger.info("Chatroom %s retrieved successfully", chatroom.oid, messages=len(chatroom.messages))
+
+        def save_eager():
+            std_logger.info(f"Updating StartupProfile: {chatroom.title.value} (ID: {chatroom.sender_id})")
+
+        def save_lazy():
+            logger.info("Updating StartupProfile: %s (ID: %s)", chatroom.title.value, chatroom.sender_id)
+
+        return [
+            ('entity', entity_eager, entity_lazy),
+            ('chatroom', chatroom_eager, chatroom_lazy),
+            ('save', save_eager, save_lazy),
+        ]
+
+    @staticmethod
+    def measure(call, calls):
+        start = time.perf_counter()
+        for _ in range(calls):
+            call()
+        return (time.perf_counter() - start) * 1e6 / calls
+
+    def handle(self, *args, **options):
+        name = options['logger']
+        calls = options['calls']
+        level = logging.getLevelName(logging.getLogger(name).getEffectiveLevel())
+        self.stdout.write(f"Logger '{name}' at {level}, {calls} calls per case")
+
+        total_eager = total_lazy = 0
+        for case, eager, lazy in self.get_cases(name, options['messages']):
+            eager_us = self.measure(eager, calls)
+            lazy_us = self.measure(lazy, calls)
+            total_eager += eager_us
+            total_lazy += lazy_us
+            self.stdout.write(f'{case:>10}: {eager_us:8.3f} us eager, {lazy_us:8.3f} us lazy '
+                              f'({eager_us / lazy_us:5.1f}x)')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Per request path (one call of each case): {total_eager:.3f} us eager, '
+            f'{total_lazy:.3f} us lazy'))
@@ -1,13 +1,13 @@
-import logging
 import os
 
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand
 from django.db.utils import IntegrityError
+from forum.utils.logging_utils import get_logger
 
 
 User = get_user_model()
-logger = logging.getLogger('django')
+logger = get_logger('django')
 
 
 class Command(BaseCommand):
@@ -26,10 +26,10 @@ class Command(BaseCommand):
                     last_name=admin_last_name,
                     password=admin_password,
                 )
-                logger.info(f"Admin user '{admin_email}' created successfully.")
+                logger.info("Admin user '%s' created successfully.", admin_email)
             except IntegrityError as e:
-                logger.error(f"Failed to create admin user due to IntegrityError: {str(e)}")
+                logger.error("Failed to create admin user due to IntegrityError: %s", e)
             except Exception as e:
-                logger.error(f"Unexpected error while creating admin user: {str(e)}")
+                logger.error("Unexpected error while creating admin user: %s", e)
         else:
             logger.info("Admin already initialized")
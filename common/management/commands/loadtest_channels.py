@@ -0,0 +1,189 @@
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import time
+import uuid
+
+from autobahn.asyncio.websocket import WebSocketClientFactory, WebSocketClientProtocol
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from common.channel_layers import ShardedRedisChannelLayer
+from users.models import User
+
+
+class Deliveries:
+    """Notifications received by all the load test connections."""
+
+    def __init__(self):
+        self.received = 0
+        self.expected = 0
+        self.done = asyncio.Event()
+
+    def expect(self, count):
+        self.received = 0
+        self.expected = count
+        self.done.clear()
+
+    def add(self):
+        self.received += 1
+        if self.received >= self.expected:
+            self.done.set()
+
+
+class LoadTestClientProtocol(WebSocketClientProtocol):
+    def onOpen(self):
+        if not self.factory.opened.done():
+            self.factory.opened.set_result(self)
+
+    def onMessage(self, payload, is_binary):
+        self.factory.deliveries.add()
+
+    def onClose(self, was_clean, code, reason):
+        if not self.factory.opened.done():
+            self.factory.opened.set_exception(ConnectionError(f'Connection refused: {code} {reason}'))
+
+
+class Command(BaseCommand):
+    help = ('Measure notification fan-out throughput through the sharded Redis channel layer. '
+            'Starts local redis-server instances and Daphne processes, connects websocket clients '
+            'to /ws/notifications/ round-robin and sends notifications to their groups, '
+            'for each number of Daphne nodes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--redis', type=int, default=2,
+                            help='redis-server instances the channel layer is sharded across')
+        parser.add_argument('--nodes', default='1,2,4',
+                            help='Comma-separated numbers of Daphne processes to measure')
+        parser.add_argument('--users', type=int, default=100,
+                            help='Users, each with its notification group')
+        parser.add_argument('--connections-per-user', type=int, default=2,
+                            help='Websocket connections per user (members of its group)')
+        parser.add_argument('--messages', type=int, default=50,
+                            help='Notifications sent to each group')
+        parser.add_argument('--redis-port', type=int, default=6400,
+                            help='Port of the first redis-server')
+        parser.add_argument('--daphne-port', type=int, default=8100,
+                            help='Port of the first Daphne process')
+        parser.add_argument('--timeout', type=float, default=60,
+                            help='Seconds to wait for processes and deliveries')
+
+    def handle(self, *args, **options):
+        for program in ('redis-server', 'daphne'):
+            if shutil.which(program) is None:
+                raise CommandError(f'{program} was not found on PATH')
+        try:
+            node_counts = [int(count) for count in options['nodes'].split(',')]
+        except ValueError:
+            raise CommandError('--nodes must be comma-separated integers')
+
+        self.timeout = options['timeout']
+        redis_ports = [options['redis_port'] + i for i in range(options['redis'])]
+        self.redis_hosts = [f'redis://127.0.0.1:{port}' for port in redis_ports]
+        redis_processes = [
+            self.start_process(['redis-server', '--port', str(port), '--save', '', '--appendonly', 'no'], port)
+            for port in redis_ports
+        ]
+        users = self.create_users(options['users'])
+        try:
+            tokens = {user.id: str(RefreshToken.for_user(user).access_token) for user in users}
+            for count in node_counts:
+                ports = [options['daphne_port'] + i for i in range(count)]
+                env = {**os.environ, 'CHANNEL_REDIS_HOSTS': ','.join(self.redis_hosts)}
+                nodes = [
+                    self.start_process(['daphne', '-b', '127.0.0.1', '-p', str(port), 'forum.asgi:application'],
+                                       port, env=env)
+                    for port in ports
+                ]
+                try:
+                    result = asyncio.run(self.run_fanout(
+                        ports, tokens, options['connections_per_user'], options['messages']))
+                finally:
+                    self.stop_processes(nodes)
+                self.report(count, *result)
+        finally:
+            User.objects.filter(id__in=[user.id for user in users]).delete()
+            self.stop_processes(redis_processes)
+
+    def start_process(self, command, port, env=None):
+        process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'{command[0]} on port {port} exited with {process.returncode}')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return process
+            except OSError:
+                time.sleep(0.2)
+        process.kill()
+        raise CommandError(f'{command[0]} did not listen on port {port} in {self.timeout}s')
+
+    @staticmethod
+    def stop_processes(processes):
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    @staticmethod
+    def create_users(count):
+        run = uuid.uuid4().hex[:8]
+        users = [User(email=f'loadtest-{run}-{i}@example.com', first_name='Load', last_name='Test')
+                 for i in range(count)]
+        for user in users:
+            user.set_unusable_password()
+        return User.objects.bulk_create(users)
+
+    async def connect(self, port, token, deliveries):
+        loop = asyncio.get_running_loop()
+        factory = WebSocketClientFactory(f'ws://127.0.0.1:{port}/ws/notifications/?token={token}')
+        factory.protocol = LoadTestClientProtocol
+        factory.opened = loop.create_future()
+        factory.deliveries = deliveries
+        await loop.create_connection(factory, '127.0.0.1', port)
+        return await factory.opened
+
+    async def run_fanout(self, ports, tokens, connections_per_user, messages):
+        """Return (deliveries, seconds to deliver, seconds spent in group_send)."""
+        deliveries = Deliveries()
+        connections = await asyncio.wait_for(asyncio.gather(*(
+            self.connect(ports[i % len(ports)], token, deliveries)
+            for i, token in enumerate(token for token in tokens.values() for _ in range(connections_per_user))
+        )), self.timeout)
+
+        config = settings.CHANNEL_LAYERS['default'].get('CONFIG', {})
+        layer = ShardedRedisChannelLayer(**{**config, 'hosts': self.redis_hosts})
+        groups = [f'notifications_{user_id}' for user_id in tokens]
+        deliveries.expect(len(connections) * messages)
+        send_time = 0.0
+        start = time.perf_counter()
+        try:
+            for number in range(messages):
+                send_start = time.perf_counter()
+                await asyncio.gather(*(
+                    layer.group_send(group, {'type': 'send_notification', 'notification': f'Load test {number}'})
+                    for group in groups
+                ))
+                send_time += time.perf_counter() - send_start
+            await asyncio.wait_for(deliveries.done.wait(), self.timeout)
+        except asyncio.TimeoutError:
+            self.stderr.write(f'Timed out with {deliveries.received} of {deliveries.expected} deliveries')
+        elapsed = time.perf_counter() - start
+
+        for connection in connections:
+            connection.sendClose()
+        await layer.close_pools()
+        return deliveries.received, elapsed, send_time
+
+    def report(self, nodes, received, elapsed, send_time):
+        self.stdout.write(self.style.SUCCESS(
+            f'{nodes} node(s), {len(self.redis_hosts)} redis: {received} deliveries in {elapsed:.2f}s '
+            f'({received / elapsed:.0f}/s), {send_time:.2f}s in group_send'))
@@ -1,13 +1,13 @@
-import logging
 import time
 from datetime import datetime
 from django.core.management.base import BaseCommand
 from django.db import connections
 from django.db.utils import OperationalError
 from psycopg2 import OperationalError as psycopg2Error
+from forum.utils.logging_utils import get_logger
 
 
-logger = logging.getLogger('django')
+logger = get_logger('django')
 
 
 class Command(BaseCommand):
@@ -28,8 +28,8 @@ class Command(BaseCommand):
             except (OperationalError, psycopg2Error) as e:
                 now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                 self.stdout.write(f'[{now}] Database not available, waiting {wait_time} seconds...')
-                logger.warning(f'Database not available, waiting {wait_time} seconds...')
-                logger.error(f'Error accessing the database: {str(e)}')
+                logger.warning('Database not available, waiting %s seconds...', wait_time)
+                logger.error('Error accessing the database: %s', e)
                 if wait_time >= max_wait_time:
                     logger.critical('Critical error: database has been unavailable for too long!')
                 time.sleep(wait_time)
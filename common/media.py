@@ -0,0 +1,159 @@
+import mimetypes
+import re
+import time
+
+from django.conf import settings
+from django.core.signing import Signer
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date
+from forum.utils.logging_utils import get_logger
+
+
+logger = get_logger('django')
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+SIGNED_URL_SALT = 'common.media.signed-url'
+
+SIGNED_URL_TTL = getattr(settings, 'MEDIA_SIGNED_URL_TTL', 3600)
+
+
+class RangedFile:
+    """
+    File-like view over `length` bytes of `file`, starting at `start`.
+
+    `fileno` is exposed, so WSGI servers with `wsgi.file_wrapper` (gunicorn)
+    send the range with sendfile from the current file position, limited by
+    the Content-Length header.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range_header(header, size):
+    """
+    Parse a single `bytes=start-end` range.
+
+    Returns:
+        tuple: inclusive (start, end) offsets, or None if the header is not
+        a single byte range (the whole file is then served)
+
+    Raises:
+        ValueError: if the range cannot be satisfied
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+
+    if not start:
+        suffix = int(end)
+        if suffix == 0:
+            raise ValueError('Empty suffix range')
+        return max(size - suffix, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError(f'Range {header} not satisfiable for {size} bytes')
+    return start, end
+
+
+def build_file_response(request, field_file, cache_control='private, max-age=0'):
+    """
+    Serve a stored file with support for conditional and Range requests.
+
+    Handles If-None-Match/If-Modified-Since (304), Range with If-Range
+    (206 Partial Content, 416 if unsatisfiable) and falls back to the whole
+    file (200).
+    """
+    storage = field_file.storage
+    size = field_file.size
+    last_modified = int(storage.get_modified_time(field_file.name).timestamp())
+    etag = f'"{size:x}-{last_modified:x}"'
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': cache_control,
+    }
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if range_header and (not if_range or if_range in (etag, headers['Last-Modified'])):
+        try:
+            byte_range = parse_range_header(range_header, size)
+        except ValueError:
+            logger.debug("Unsatisfiable range %s for %s", range_header, field_file.name)
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    content_type = mimetypes.guess_type(field_file.name)[0] or 'application/octet-stream'
+    file = storage.open(field_file.name, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+        response['Content-Length'] = size
+    else:
+        start, end = byte_range
+        response = FileResponse(RangedFile(file, start, end - start + 1),
+                                status=206, content_type=content_type)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def sign_url(path, ttl=SIGNED_URL_TTL):
+    """
+    Return a pre-signed URL for `path` and its expiry timestamp.
+
+    The expiry is rounded up to a multiple of `ttl`, so the same URL is
+    handed out for a while and can be cached by browsers and proxies.
+    It stays valid for at least `ttl` seconds.
+    """
+    expires = (int(time.time()) // ttl + 2) * ttl
+    signature = Signer(salt=SIGNED_URL_SALT).signature(f'{path}:{expires}')
+    return f'{path}?expires={expires}&signature={signature}', expires
+
+
+def verify_signed_url(path, expires, signature):
+    """Check the signature and expiry of a pre-signed URL."""
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    if expires < time.time():
+        return False
+    expected = Signer(salt=SIGNED_URL_SALT).signature(f'{path}:{expires}')
+    return constant_time_compare(expected, signature or '')
@@ -0,0 +1,236 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from pymongo import monitoring
+
+
+class Metric:
+    """Base of the metrics of a MetricsRegistry, with values per label values."""
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def samples(self):
+        """Yield (name suffix, labels, value) per sample."""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            values = dict(self.values)
+        for labels, value in values.items():
+            yield '_total', dict(zip(self.labelnames, labels)), value
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def inc(self, labels=(), amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+    def samples(self):
+        with self.lock:
+            values = dict(self.values)
+        for labels, value in values.items():
+            yield '', dict(zip(self.labelnames, labels)), value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, labels=()):
+        with self.lock:
+            # Observations per bucket (the last one is +Inf) and their sum
+            counts, total = self.values.get(labels) or ([0] * (len(self.buckets) + 1), 0)
+            counts[bisect_left(self.buckets, value)] += 1
+            self.values[labels] = (counts, total + value)
+
+    def samples(self):
+        with self.lock:
+            values = {labels: (list(counts), total) for labels, (counts, total) in self.values.items()}
+        for labels, (counts, total) in values.items():
+            labels = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                yield '_bucket', {**labels, 'le': str(bound)}, cumulative
+            yield '_count', labels, cumulative
+            yield '_sum', labels, total
+
+
+class MetricsRegistry:
+    """
+    Metrics of this process, rendered in the Prometheus text format.
+
+    Each worker process keeps its own registry, so the endpoint is scraped
+    per process (the `instance` label of Prometheus tells them apart).
+    """
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=Histogram.BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    @staticmethod
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for suffix, labels, value in metric.samples():
+                label_text = ','.join(f'{key}="{self.escape(label)}"' for key, label in labels.items())
+                name = metric.name + suffix
+                lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+@dataclass
+class RequestStats:
+    """Database, MongoDB and cache usage of a sampled request (or consumer call)."""
+    db_queries: int = 0
+    db_time: float = 0.0
+    mongo_commands: int = 0
+    mongo_time: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+    def as_fields(self):
+        return {
+            'db_queries': self.db_queries,
+            'db_time_ms': round(self.db_time * 1000, 3),
+            'mongo_commands': self.mongo_commands,
+            'mongo_time_ms': round(self.mongo_time * 1000, 3),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+# Stats of the sampled request being handled, None outside of sampled requests
+current_stats = ContextVar('current_stats', default=None)
+
+
+class QueryTimer:
+    """
+    `connection.execute_wrapper` which times the queries of the current
+    sampled request (or consumer handler).
+
+    It is installed on every database connection (`install_query_timer`)
+    and records into `current_stats`, which is copied to the threads
+    running sync code for an ASGI server, so queries are measured in both
+    WSGI and ASGI deployments.
+    """
+
+    def __call__(self, execute, sql, params, many, context):
+        stats = current_stats.get()
+        if stats is None:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            stats.db_queries += 1
+            stats.db_time += time.perf_counter() - start
+
+
+query_timer = QueryTimer()
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """`connection_created` receiver installing the query timer once per connection."""
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """
+    pymongo command listener adding the time of MongoDB commands to the
+    stats of the current sampled request.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.record(event)
+
+    def failed(self, event):
+        self.record(event)
+
+    @staticmethod
+    def record(event):
+        stats = current_stats.get()
+        if stats is not None:
+            stats.mongo_commands += 1
+            stats.mongo_time += event.duration_micros / 1e6
+
+
+class CacheStatsMixin:
+    """Counts cache hits and misses in the stats of the current sampled request."""
+    MISSING = object()
+
+    @staticmethod
+    def record_lookups(hits, misses):
+        if (stats := current_stats.get()) is not None:
+            stats.cache_hits += hits
+            stats.cache_misses += misses
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, self.MISSING, version)
+        self.record_lookups(int(value is not self.MISSING), int(value is self.MISSING))
+        return default if value is self.MISSING else value
+
+
+class InstrumentedLocMemCache(CacheStatsMixin, LocMemCache):
+    """LocMemCache with lookup stats (`get_many` goes through `get`)."""
+
+
+class InstrumentedRedisCache(CacheStatsMixin, RedisCache):
+    """RedisCache with lookup stats."""
+
+    def get_many(self, keys, version=None):
+        values = super().get_many(keys, version)
+        self.record_lookups(len(values), len(keys) - len(values))
+        return values
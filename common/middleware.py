@@ -0,0 +1,122 @@
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from common.metrics import RequestStats, current_stats, registry
+from forum.utils.logging_utils import get_logger
+
+
+logger = get_logger('performance')
+
+# Methods counted under their name; any other token a client sends is counted
+# as 'other', so clients cannot create label series
+HTTP_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE', 'CONNECT'))
+
+REQUESTS = registry.counter(
+    'http_requests', 'HTTP requests by view, method and status code.', ('view', 'method', 'status'))
+REQUEST_DURATION = registry.histogram(
+    'http_request_duration_seconds', 'Wall time of HTTP requests by view.', ('view',))
+SAMPLED_REQUESTS = registry.counter(
+    'http_sampled_requests', 'Requests whose queries, MongoDB commands and cache lookups were measured.', ('view',))
+DB_QUERIES = registry.counter(
+    'http_db_queries', 'Database queries of sampled requests.', ('view',))
+DB_TIME = registry.counter(
+    'http_db_query_seconds', 'Database query time of sampled requests.', ('view',))
+MONGO_COMMANDS = registry.counter(
+    'http_mongo_commands', 'MongoDB commands of sampled requests.', ('view',))
+MONGO_TIME = registry.counter(
+    'http_mongo_command_seconds', 'MongoDB command time of sampled requests.', ('view',))
+CACHE_HITS = registry.counter(
+    'http_cache_hits', 'Cache hits of sampled requests.', ('view',))
+CACHE_MISSES = registry.counter(
+    'http_cache_misses', 'Cache misses of sampled requests.', ('view',))
+
+
+class PerformanceMiddleware:
+    """
+    Middleware recording the wall time of every request, by view.
+
+    A PERFORMANCE_SAMPLE_RATE fraction of the requests is also measured in
+    detail: database queries (`QueryTimer`), MongoDB commands
+    (`MongoCommandTimer`) and cache hits (`CacheStatsMixin`). Sampled
+    requests, and requests slower than PERFORMANCE_SLOW_REQUEST_MS, are
+    logged with the stats as fields.
+
+    The middleware is sync and async capable, so under ASGI it does not
+    move the request to a thread.
+
+    Metrics are served in the Prometheus text format by `MetricsView`.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def get_view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unresolved'
+        return match.view_name or match.route
+
+    @staticmethod
+    def start_sampling():
+        """Return the stats of the request and the context token, or Nones if not sampled."""
+        if random.random() < settings.PERFORMANCE_SAMPLE_RATE:
+            stats = RequestStats()
+            return stats, current_stats.set(stats)
+        return None, None
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        stats, token = self.start_sampling()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                current_stats.reset(token)
+        self.record(request, response, time.perf_counter() - start, stats)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        stats, token = self.start_sampling()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                current_stats.reset(token)
+        self.record(request, response, time.perf_counter() - start, stats)
+        return response
+
+    def record(self, request, response, duration, stats):
+        view = self.get_view_name(request)
+        labels = (view,)
+        method = request.method if request.method in HTTP_METHODS else 'other'
+        REQUESTS.inc((view, method, str(response.status_code)))
+        REQUEST_DURATION.observe(duration, labels)
+        if stats is not None:
+            SAMPLED_REQUESTS.inc(labels)
+            DB_QUERIES.inc(labels, stats.db_queries)
+            DB_TIME.inc(labels, stats.db_time)
+            MONGO_COMMANDS.inc(labels, stats.mongo_commands)
+            MONGO_TIME.inc(labels, stats.mongo_time)
+            CACHE_HITS.inc(labels, stats.cache_hits)
+            CACHE_MISSES.inc(labels, stats.cache_misses)
+
+        duration_ms = round(duration * 1000, 3)
+        fields = stats.as_fields() if stats is not None else {}
+        if duration_ms >= settings.PERFORMANCE_SLOW_REQUEST_MS:
+            logger.warning("Slow request %s %s (%s)", request.method, request.path, view,
+                           view=view, status=response.status_code, duration_ms=duration_ms, **fields)
+        elif stats is not None:
+            logger.info("Request %s %s (%s)", request.method, request.path, view,
+                        view=view, status=response.status_code, duration_ms=duration_ms, **fields)
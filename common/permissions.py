@@ -0,0 +1,16 @@
+from rest_framework import permissions
+
+from .media import verify_signed_url
+
+
+class HasValidSignature(permissions.BasePermission):
+    """
+    Allows access to requests made with a valid, unexpired pre-signed URL.
+    """
+
+    def has_permission(self, request, view):
+        return verify_signed_url(
+            request.path,
+            request.query_params.get('expires'),
+            request.query_params.get('signature'),
+        )
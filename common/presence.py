@@ -0,0 +1,354 @@
+import asyncio
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from common.redis_clients import get_redis_client
+from forum.utils.logging_utils import get_logger
+
+
+logger = get_logger('django')
+
+
+def get_user(member):
+    """Return the user id of a room member (`<user id>:<connection>`)."""
+    return int(member.split(':', 1)[0])
+
+
+# Prunes the expired connections of the room (ZREMRANGEBYSCORE), then adds
+# (ARGV[5] == '1') or removes the connection, atomically. Returns whether
+# the user was online in the room before the change, whether they are after
+# it, and the ids of the other users whose last connection had expired.
+PRESENCE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local user = string.match(ARGV[3], '^[^:]*')
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+
+local function online_users()
+    local users = {}
+    for _, member in ipairs(redis.call('ZRANGE', KEYS[1], 0, -1)) do
+        users[string.match(member, '^[^:]*')] = true
+    end
+    return users
+end
+
+local was_online = online_users()[user] and 1 or 0
+if ARGV[5] == '1' then
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[3])
+    redis.call('ZADD', KEYS[2], ARGV[2], ARGV[4])
+    redis.call('EXPIRE', KEYS[1], ARGV[6])
+    redis.call('EXPIRE', KEYS[2], ARGV[6])
+else
+    redis.call('ZREM', KEYS[1], ARGV[3])
+    redis.call('ZREM', KEYS[2], ARGV[4])
+end
+
+local online = online_users()
+local offline, seen = {}, {}
+for _, member in ipairs(expired) do
+    local expired_user = string.match(member, '^[^:]*')
+    if expired_user ~= user and not online[expired_user] and not seen[expired_user] then
+        seen[expired_user] = true
+        table.insert(offline, expired_user)
+    end
+end
+return {was_online, online[user] and 1 or 0, offline}
+"""
+
+
+class RedisPresenceStore:
+    """
+    Presence kept in Redis, as sorted sets of connections scored by the time
+    their presence expires.
+
+    Connections are added and removed by PRESENCE_SCRIPT, which prunes the
+    expired connections of the room and checks the online state in the same
+    atomic step, so concurrent connections of a user come online (and go
+    offline) once, and each expired user is reported once. Keys expire with
+    their last heartbeat.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.script = client.register_script(PRESENCE_SCRIPT)
+
+    def change(self, room_key, user_key, member, connection, ttl=None):
+        """
+        Add the connection with `ttl`, or remove it without.
+
+        Returns:
+            tuple: whether the user was online in the room, whether they are
+            now, and the ids of the users whose connections expired
+        """
+        now = time.time()
+        expires = now + (ttl or 0)
+        was_online, online, offline = self.script(
+            keys=[room_key, user_key],
+            args=[now, expires, member, connection, int(ttl is not None), max(int(ttl or 0), 1)],
+        )
+        return bool(was_online), bool(online), {int(user_id) for user_id in offline}
+
+    def members(self, keys):
+        now = time.time()
+        pipeline = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.zrangebyscore(key, f'({now}', '+inf')
+        return [set(members) for members in pipeline.execute()]
+
+
+class LocalPresenceStore:
+    """
+    Presence kept in the memory of the process, for a development server
+    without PRESENCE_REDIS_URL, whose channel layer is in memory too. Same
+    semantics as `RedisPresenceStore`, under a lock.
+    """
+
+    def __init__(self):
+        self.sets = {}
+        self.lock = threading.Lock()
+
+    def prune(self, key, now):
+        members = self.sets.get(key, {})
+        expired = {member for member, expires in members.items() if expires <= now}
+        for member in expired:
+            del members[member]
+        return expired
+
+    def room_users(self, room_key):
+        return {get_user(member) for member in self.sets.get(room_key, {})}
+
+    def change(self, room_key, user_key, member, connection, ttl=None):
+        now = time.time()
+        user_id = get_user(member)
+        with self.lock:
+            expired = self.prune(room_key, now)
+            self.prune(user_key, now)
+            was_online = user_id in self.room_users(room_key)
+            if ttl is not None:
+                self.sets.setdefault(room_key, {})[member] = now + ttl
+                self.sets.setdefault(user_key, {})[connection] = now + ttl
+            else:
+                self.sets.get(room_key, {}).pop(member, None)
+                self.sets.get(user_key, {}).pop(connection, None)
+            online = self.room_users(room_key)
+        offline = {get_user(member) for member in expired} - online - {user_id}
+        return was_online, user_id in online, offline
+
+    def members(self, keys):
+        now = time.time()
+        with self.lock:
+            return [{member for member, expires in self.sets.get(key, {}).items() if expires > now}
+                    for key in keys]
+
+    def clear(self):
+        with self.lock:
+            self.sets.clear()
+
+
+class PresenceService:
+    """
+    Service for the online state of users, per chat room and overall.
+
+    Each websocket connection is a member of the set of its room and of its
+    user, refreshed by heartbeats and expiring PRESENCE_TTL seconds after
+    the last one. A user is online in a room while one of their connections
+    to it is live.
+
+    Connections which expired without a disconnect (a crashed process) are
+    pruned on the next change in their room, and their users are returned
+    as offline so the room can be told.
+    """
+
+    ROOM_KEY = 'presence:room:{}'
+    USER_KEY = 'presence:user:{}'
+
+    _store = None
+
+    @classmethod
+    def get_store(cls):
+        if cls._store is None:
+            redis_url = settings.PRESENCE_REDIS_URL
+            cls._store = RedisPresenceStore(get_redis_client(redis_url)) if redis_url else LocalPresenceStore()
+        return cls._store
+
+    @classmethod
+    def change(cls, room_oid, user_id, connection, ttl=None):
+        return cls.get_store().change(
+            cls.ROOM_KEY.format(room_oid), cls.USER_KEY.format(user_id), f'{user_id}:{connection}', connection, ttl)
+
+    @classmethod
+    def room_users(cls, room_oid):
+        """Return ids of the users online in the room."""
+        members, = cls.get_store().members([cls.ROOM_KEY.format(room_oid)])
+        return {get_user(member) for member in members}
+
+    @classmethod
+    def online_users(cls, user_ids):
+        """Return the ids, out of `user_ids`, of the users with a live connection."""
+        user_ids = list(user_ids)
+        members = cls.get_store().members([cls.USER_KEY.format(user_id) for user_id in user_ids])
+        return {user_id for user_id, connections in zip(user_ids, members) if connections}
+
+    @classmethod
+    def connect(cls, room_oid, user_id, connection):
+        """
+        Add the connection to the room.
+
+        Returns:
+            tuple: whether the user came online in the room, and the ids of
+            the users whose connections to it expired
+        """
+        was_online, _, offline = cls.change(room_oid, user_id, connection, settings.PRESENCE_TTL)
+        return not was_online, offline
+
+    @classmethod
+    def heartbeat(cls, room_oid, user_id, connection):
+        """Refresh the connection; return the ids of the users whose connections to the room expired."""
+        _, _, offline = cls.change(room_oid, user_id, connection, settings.PRESENCE_TTL)
+        return offline
+
+    @classmethod
+    def disconnect(cls, room_oid, user_id, connection):
+        """
+        Remove the connection from the room.
+
+        Returns:
+            tuple: whether the user went offline in the room, and the ids of
+            the users whose connections to it expired
+        """
+        _, online, offline = cls.change(room_oid, user_id, connection)
+        return not online, offline
+
+
+class TypingThrottle:
+    """
+    Coalesces the typing frames of a connection: the first keystroke is
+    broadcast at once, later ones at most once per `interval`, and a stop
+    once no keystroke came for `timeout` seconds.
+    """
+
+    def __init__(self, broadcast, interval, timeout):
+        self.broadcast = broadcast
+        self.interval = interval
+        self.timeout = timeout
+        self.last_keystroke = 0.0
+        self.typing = False
+        self.task = None
+
+    def keystroke(self):
+        self.last_keystroke = time.monotonic()
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        broadcast_at = None
+        while time.monotonic() - self.last_keystroke < self.timeout:
+            if broadcast_at is None or self.last_keystroke > broadcast_at:
+                broadcast_at = time.monotonic()
+                self.typing = True
+                await self.broadcast(True)
+            await asyncio.sleep(self.interval)
+        self.typing = False
+        await self.broadcast(False)
+
+    async def stop(self):
+        """Stop at once (the message was sent or the connection closed)."""
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+            if self.typing:
+                self.typing = False
+                await self.broadcast(False)
+
+
+class PresenceConsumerMixin:
+    """
+    Mixin adding presence and typing indicators to a chat consumer.
+
+    The consumer calls `join_presence()` once accepted and `leave_presence()`
+    on disconnect, and passes received frames to `handle_presence_frame()`.
+    Clients send `{"type": "heartbeat"}` within PRESENCE_TTL and
+    `{"type": "typing"}` on keystrokes. The room group receives a broadcast
+    when a user comes online or goes offline, not on heartbeats, and typing
+    broadcasts are coalesced by `TypingThrottle`. Users whose connections
+    expired are broadcast as offline by the connection which pruned them.
+
+    Redis calls run in the thread pool, off the event loop. Used with
+    ConsumerMetricsMixin, which provides `group_send`.
+    """
+    presence_room = None
+    typing = None
+
+    async def join_presence(self, room_oid, group):
+        self.presence_room = room_oid
+        self.presence_group = group
+        self.typing = TypingThrottle(self.send_typing, settings.TYPING_BROADCAST_INTERVAL, settings.TYPING_TIMEOUT)
+        user_id = self.scope['user'].id
+
+        came_online, offline = await sync_to_async(PresenceService.connect, thread_sensitive=False)(
+            room_oid, user_id, self.channel_name)
+        online = await sync_to_async(PresenceService.room_users, thread_sensitive=False)(room_oid)
+        await self.send(text_data=json.dumps({'type': 'presence', 'online': sorted(online)}))
+        if came_online:
+            await self.send_presence(True)
+        await self.send_offline(offline)
+
+    async def leave_presence(self):
+        if self.presence_room is None:
+            return
+        await self.typing.stop()
+        went_offline, offline = await sync_to_async(PresenceService.disconnect, thread_sensitive=False)(
+            self.presence_room, self.scope['user'].id, self.channel_name)
+        if went_offline:
+            await self.send_presence(False)
+        await self.send_offline(offline)
+        self.presence_room = None
+
+    async def handle_presence_frame(self, data):
+        """Handle heartbeat and typing frames; return whether the frame was one."""
+        frame_type = data.get('type')
+        if self.presence_room is None or frame_type not in ('heartbeat', 'typing'):
+            return False
+        if frame_type == 'heartbeat':
+            offline = await sync_to_async(PresenceService.heartbeat, thread_sensitive=False)(
+                self.presence_room, self.scope['user'].id, self.channel_name)
+            await self.send_offline(offline)
+        else:
+            self.typing.keystroke()
+        return True
+
+    async def send_presence(self, online, user_id=None):
+        await self.group_send(self.presence_group, {
+            'type': 'chat_presence',
+            'user_id': self.scope['user'].id if user_id is None else user_id,
+            'online': online,
+        })
+
+    async def send_offline(self, user_ids):
+        """Tell the room that users whose connections expired are offline."""
+        for user_id in sorted(user_ids):
+            await self.send_presence(False, user_id)
+
+    async def send_typing(self, typing):
+        await self.group_send(self.presence_group, {
+            'type': 'chat_typing',
+            'user_id': self.scope['user'].id,
+            'channel': self.channel_name,
+            'typing': typing,
+        })
+
+    async def chat_presence(self, event):
+        if event['user_id'] != self.scope['user'].id:
+            await self.send(text_data=json.dumps({
+                'type': 'presence', 'user_id': event['user_id'], 'online': event['online'],
+            }))
+
+    async def chat_typing(self, event):
+        if event['channel'] != self.channel_name:
+            await self.send(text_data=json.dumps({
+                'type': 'typing', 'user_id': event['user_id'], 'typing': event['typing'],
+            }))
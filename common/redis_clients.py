@@ -0,0 +1,12 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def get_redis_client(url):
+    """
+    Return the client of the Redis at `url`, shared by the stores of the
+    process (follow graph, presence) which use the same server.
+    """
+    import redis
+
+    return redis.Redis.from_url(url, decode_responses=True)
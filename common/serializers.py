@@ -0,0 +1,48 @@
+from django.db import models
+from rest_framework import serializers
+
+from .thumbnails import get_thumbnail_urls
+
+
+class SniffedImageField(serializers.ImageField):
+    """
+    ImageField which does not decode the upload in the request.
+
+    The model's ImageValidator checks the header, and the
+    `process_uploaded_image` task decodes the image after the upload.
+    """
+
+    def to_internal_value(self, data):
+        return serializers.FileField.to_internal_value(self, data)
+
+
+class ThumbnailUrlsField(serializers.Field):
+    """
+    Read-only field with the thumbnail URLs of an image, keyed by size and format.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        urls = get_thumbnail_urls(value)
+        request = self.context.get('request')
+        if urls is None or request is None:
+            return urls
+        return {
+            size: {extension: request.build_absolute_uri(url) for extension, url in formats.items()}
+            for size, formats in urls.items()
+        }
+
+
+class ImageModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer which maps model ImageFields to SniffedImageField.
+
+    Model field validators, such as ImageValidator, are kept.
+    """
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: SniffedImageField,
+    }
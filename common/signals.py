@@ -0,0 +1,58 @@
+from functools import partial
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from forum.utils.logging_utils import get_logger
+
+from .tasks import delete_stored_images, process_uploaded_image
+from .thumbnails import delete_thumbnails
+
+
+logger = get_logger('django')
+
+IMAGE_FIELDS = {
+    'users.User': ('profile_picture',),
+    'startups.StartUpProfile': ('startup_logo',),
+    'investors.InvestorProfile': ('investor_logo',),
+}
+
+
+def collect_uploaded_images(sender, instance, **kwargs):
+    """Remember the image fields which received a new, not yet stored file, and the images they replace."""
+    instance._uploaded_image_fields = [
+        field_name
+        for field_name in IMAGE_FIELDS[sender._meta.label]
+        if getattr(instance, field_name) and not getattr(instance, field_name)._committed
+    ]
+    instance._replaced_images = []
+    if instance._uploaded_image_fields and instance.pk is not None:
+        previous = sender.objects.filter(pk=instance.pk).values_list(*instance._uploaded_image_fields).first()
+        instance._replaced_images = [name for name in previous or () if name]
+
+
+def schedule_image_processing(sender, instance, **kwargs):
+    """Process the new images, and drop the thumbnails of replaced ones, once the transaction is committed."""
+    for field_name in getattr(instance, '_uploaded_image_fields', ()):
+        logger.debug("Scheduling image processing for %s %s.%s", sender._meta.label, instance.pk, field_name)
+        transaction.on_commit(partial(
+            process_uploaded_image.delay, sender._meta.label, instance.pk, field_name
+        ))
+    if getattr(instance, '_replaced_images', None):
+        transaction.on_commit(partial(delete_stored_images.delay, instance._replaced_images, thumbnails_only=True))
+    instance._uploaded_image_fields = []
+    instance._replaced_images = []
+
+
+def delete_image_thumbnails(sender, instance, **kwargs):
+    """Delete the thumbnails of a deleted instance."""
+    for field_name in IMAGE_FIELDS[sender._meta.label]:
+        delete_thumbnails(getattr(instance, field_name))
+
+
+def connect_image_signals():
+    for model_label in IMAGE_FIELDS:
+        model = apps.get_model(model_label)
+        pre_save.connect(collect_uploaded_images, sender=model, dispatch_uid=f'{model_label}_collect_images')
+        post_save.connect(schedule_image_processing, sender=model, dispatch_uid=f'{model_label}_process_images')
+        post_delete.connect(delete_image_thumbnails, sender=model, dispatch_uid=f'{model_label}_delete_thumbnails')
@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from forum.utils.logging_utils import get_logger
+
+
+logger = get_logger('django')
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+CSV_CONTENT_TYPE = 'text/csv'
+STREAM_FORMATS = {
+    'ndjson': NDJSON_CONTENT_TYPE,
+    'csv': CSV_CONTENT_TYPE,
+}
+
+
+class Echo:
+    """File-like object that returns the written value instead of buffering it.
+
+    Used as the target of `csv.writer` so each row can be yielded straight
+    into a `StreamingHttpResponse`.
+    """
+
+    def write(self, value):
+        return value
+
+
+class IterStream(io.RawIOBase):
+    """Read-only file-like object over an iterable of bytes.
+
+    Lets storages consume generated content (request bodies, stored
+    chunks) block by block without buffering it as a whole.
+    """
+
+    def __init__(self, iterable):
+        self.iterator = iter(iterable)
+        self.leftover = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.leftover:
+            try:
+                self.leftover = next(self.iterator)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self.leftover))
+        buffer[:size] = self.leftover[:size]
+        self.leftover = self.leftover[size:]
+        return size
+
+
+def chunked(iterable, size):
+    """Yield lists of at most `size` items from `iterable`."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def iter_ndjson_rows(lines):
+    """Parse NDJSON lines lazily.
+
+    Yields (line number, row) tuples, where row is None if the line
+    does not contain a JSON object. Blank lines are skipped.
+    """
+    for number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            logger.warning("Invalid NDJSON line %s", number)
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def iter_csv_rows(lines):
+    """Parse CSV lines with a header row lazily.
+
+    Yields (record number, row) tuples. Empty values are dropped from the
+    row, so that they fall back to the field defaults.
+    """
+    decoded = (line.decode('utf-8') if isinstance(line, bytes) else line for line in lines)
+    reader = csv.DictReader(decoded)
+    for number, row in enumerate(reader, start=1):
+        yield number, {key: value for key, value in row.items() if key and value not in ('', None)}
+
+
+def stream_ndjson(rows, fields=None):
+    """Render rows as NDJSON lines.
+
+    Rows are dicts, or tuples if `fields` (the keys of each tuple) are given.
+    """
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        if fields is not None:
+            row = dict(zip(fields, row))
+        yield encoder.encode(row) + '\n'
+
+
+def stream_csv(rows, fields):
+    """Render tuples as CSV lines, preceded by a header with `fields`."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row)
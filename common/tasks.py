@@ -0,0 +1,69 @@
+from celery import shared_task
+from django.apps import apps
+from django.core.files.storage import default_storage
+from forum.utils.logging_utils import get_logger
+
+from .thumbnails import (
+    UndecodableImageError, decode_image, generate_thumbnails, get_thumbnail_names, strip_metadata,
+)
+
+
+logger = get_logger('django')
+
+
+@shared_task(bind=True, max_retries=3)
+def process_uploaded_image(self, model_label, pk, field_name):
+    """Decode an uploaded image, strip its metadata and generate its thumbnails
+
+    Images that cannot be decoded are deleted and the field is cleared,
+    unless another image was uploaded meanwhile. Other errors (storage,
+    network) are retried and never remove the image.
+
+    Parameters:
+    - model_label: e.g. 'users.User'
+    - pk: primary key of the instance
+    - field_name: name of the ImageField
+    """
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).only('pk', field_name).first()
+    if instance is None:
+        logger.warning("%s %s not found, skipping image processing", model_label, pk)
+        return
+
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return
+
+    try:
+        image, image_format = decode_image(field_file)
+        name = strip_metadata(field_file, image, image_format)
+        if name != field_file.name:
+            model.objects.filter(pk=pk, **{field_name: field_file.name}).update(**{field_name: name})
+            field_file.name = name
+        generate_thumbnails(field_file, image)
+    except UndecodableImageError as e:
+        logger.error("Failed to decode image %s of %s %s: %s", field_file.name, model_label, pk, e)
+        if model.objects.filter(pk=pk, **{field_name: field_file.name}).update(**{field_name: ''}):
+            field_file.delete(save=False)
+    except Exception as e:
+        logger.warning("Failed to process image %s of %s %s, retrying: %s", field_file.name, model_label, pk, e)
+        raise self.retry(exc=e, countdown=30)
+
+
+@shared_task
+def delete_stored_images(names, thumbnails_only=False):
+    """Delete stored images and their thumbnails
+
+    Used by bulk updates, which clear image fields without loading instances,
+    and for the thumbnails of replaced images.
+
+    Parameters:
+    - names: storage names of the images
+    - thumbnails_only: keep the images, delete their thumbnails only
+    """
+    for name in names:
+        stored_names = get_thumbnail_names(name) if thumbnails_only else (name, *get_thumbnail_names(name))
+        for stored_name in stored_names:
+            if default_storage.exists(stored_name):
+                default_storage.delete(stored_name)
+    logger.info("Deleted %s stored images", len(names))
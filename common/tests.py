@@ -0,0 +1,511 @@
+import asyncio
+import json
+import logging
+import logging.handlers
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.test import AsyncClient, SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from common.channel_layers import HashRing, ShardedRedisChannelLayer
+from common.consumers import (
+    EVENT_LOOP_LAG, GROUP_SEND_DURATION, HANDLER_DURATION, WEBSOCKET_CONNECTIONS, ConsumerMetricsMixin,
+    lag_monitor,
+)
+from common.metrics import Counter, Histogram, MetricsRegistry
+from common.presence import PresenceConsumerMixin, PresenceService, RedisPresenceStore, TypingThrottle
+from common.middleware import DB_QUERIES, REQUESTS, SAMPLED_REQUESTS, PerformanceMiddleware
+from communications.consumers import NotificationConsumer
+from forum.utils.logging_utils import DropReportingQueueListener, QueueingHandler, StructuredLogger, get_logger
+from users.models import User
+
+
+class PerformanceMetricsTest(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="metrics@gmail.com",
+            password="123456pok",
+            first_name="Metrics",
+            last_name="User",
+            user_phone="+1234567890")
+        self.client.force_authenticate(user=self.user)
+
+    @staticmethod
+    def value(metric, labels):
+        return metric.values.get(labels, 0)
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=1.0)
+    def test_sampled_request_records_queries(self):
+        labels = ('project-list', 'GET', '200')
+        requests_before = self.value(REQUESTS, labels)
+        queries_before = self.value(DB_QUERIES, ('project-list',))
+        sampled_before = self.value(SAMPLED_REQUESTS, ('project-list',))
+
+        response = self.client.get(reverse('project-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.value(REQUESTS, labels), requests_before + 1)
+        self.assertEqual(self.value(SAMPLED_REQUESTS, ('project-list',)), sampled_before + 1)
+        self.assertGreater(self.value(DB_QUERIES, ('project-list',)), queries_before)
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=0.0)
+    def test_unsampled_request_is_counted_only(self):
+        sampled_before = self.value(SAMPLED_REQUESTS, ('project-list',))
+        requests_before = self.value(REQUESTS, ('project-list', 'GET', '200'))
+
+        self.client.get(reverse('project-list'))
+
+        self.assertEqual(self.value(REQUESTS, ('project-list', 'GET', '200')), requests_before + 1)
+        self.assertEqual(self.value(SAMPLED_REQUESTS, ('project-list',)), sampled_before)
+
+    def test_unknown_method_counted_as_other(self):
+        """test that methods outside the standard ones do not create label series"""
+        labels = ('project-list', 'other', '405')
+        requests_before = self.value(REQUESTS, labels)
+
+        response = self.client.generic('FOOBAR', reverse('project-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(self.value(REQUESTS, labels), requests_before + 1)
+        self.assertNotIn('FOOBAR', {method for _, method, _ in REQUESTS.values})
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_endpoint_renders_text_format(self):
+        self.client.get(reverse('project-list'))
+
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('# TYPE http_requests counter', body)
+        self.assertIn('http_requests_total{view="project-list",method="GET",status="200"}', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="project-list",le="+Inf"}', body)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_endpoint_access(self):
+        """test the token is required by default, whatever the client address"""
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.settings(METRICS_ALLOWED_IPS=['127.0.0.1']):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_200_OK)
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=1.0)
+    async def test_async_request_records_queries(self):
+        """test the middleware runs in async mode and measures the queries of sync views run in threads"""
+        self.assertTrue(iscoroutinefunction(PerformanceMiddleware(self.async_view)))
+        labels = ('project-list', 'GET', '200')
+        requests_before = self.value(REQUESTS, labels)
+        queries_before = self.value(DB_QUERIES, ('project-list',))
+
+        token = await sync_to_async(AccessToken.for_user)(self.user)
+        response = await AsyncClient().get(reverse('project-list'), headers={'Authorization': f'Bearer {token}'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.value(REQUESTS, labels), requests_before + 1)
+        self.assertGreater(self.value(DB_QUERIES, ('project-list',)), queries_before)
+
+    @staticmethod
+    async def async_view(request):
+        return None
+
+    def test_histogram_rendering(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram('duration_seconds', 'Durations.', ('view',), buckets=(0.1, 1))
+        histogram.observe(0.05, ('a',))
+        histogram.observe(0.5, ('a',))
+        histogram.observe(5, ('a',))
+        registry.register(Counter('hits', 'Hits.')).inc()
+
+        lines = registry.render().splitlines()
+
+        self.assertIn('duration_seconds_bucket{view="a",le="0.1"} 1', lines)
+        self.assertIn('duration_seconds_bucket{view="a",le="1"} 2', lines)
+        self.assertIn('duration_seconds_bucket{view="a",le="+Inf"} 3', lines)
+        self.assertIn('duration_seconds_count{view="a"} 3', lines)
+        self.assertIn('hits_total 1', lines)
+        self.assertIsInstance(histogram, Histogram)
+
+
+class EchoConsumer(ConsumerMetricsMixin, AsyncWebsocketConsumer):
+    def get_trace_fields(self):
+        return {'room_oid': 'echo-room'}
+
+    async def connect(self):
+        await self.channel_layer.group_add('echo', self.channel_name)
+        await self.accept()
+
+    async def receive(self, text_data=None, bytes_data=None):
+        await self.group_send('echo', {'type': 'echo_message', 'text': text_data})
+
+    async def echo_message(self, event):
+        await self.send(text_data=event['text'])
+
+
+class ConsumerMetricsTest(SimpleTestCase):
+
+    @staticmethod
+    def count(histogram, labels=()):
+        counts, _ = histogram.values.get(labels, ([], 0))
+        return sum(counts)
+
+    async def test_notification_consumer_metrics(self):
+        labels = ('NotificationConsumer',)
+        connections = WEBSOCKET_CONNECTIONS.values.get(labels, 0)
+        handled = self.count(HANDLER_DURATION, ('NotificationConsumer', 'send_notification'))
+
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+        communicator.scope['user'] = SimpleNamespace(id=42)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(WEBSOCKET_CONNECTIONS.values[labels], connections + 1)
+
+        await get_channel_layer().group_send(
+            'notifications_42', {'type': 'send_notification', 'notification': {'id': 1}})
+        self.assertEqual(await communicator.receive_json_from(), {'notification': {'id': 1}})
+        self.assertEqual(
+            self.count(HANDLER_DURATION, ('NotificationConsumer', 'send_notification')), handled + 1)
+
+        await communicator.disconnect()
+        self.assertEqual(WEBSOCKET_CONNECTIONS.values[labels], connections)
+
+    @override_settings(WEBSOCKET_SLOW_HANDLER_MS=0)
+    async def test_group_send_timed_and_slow_handler_logged(self):
+        sends = self.count(GROUP_SEND_DURATION, ('EchoConsumer',))
+        communicator = WebsocketCommunicator(EchoConsumer.as_asgi(), '/ws/echo/')
+        await communicator.connect()
+
+        with self.assertLogs('performance', 'WARNING') as logs:
+            await communicator.send_to(text_data='hello')
+            self.assertEqual(await communicator.receive_from(), 'hello')
+
+        self.assertEqual(self.count(GROUP_SEND_DURATION, ('EchoConsumer',)), sends + 1)
+        record = next(record for record in logs.records if record.extra_data['handler'] == 'websocket.receive')
+        self.assertEqual(record.extra_data['room_oid'], 'echo-room')
+        self.assertEqual(record.extra_data['consumer'], 'EchoConsumer')
+        await communicator.disconnect()
+
+    @override_settings(EVENT_LOOP_LAG_INTERVAL=0.01)
+    async def test_event_loop_lag_measured_while_connected(self):
+        measured = self.count(EVENT_LOOP_LAG)
+        communicator = WebsocketCommunicator(EchoConsumer.as_asgi(), '/ws/echo/')
+        await communicator.connect()
+
+        await asyncio.sleep(0.1)
+        self.assertGreater(self.count(EVENT_LOOP_LAG), measured)
+        self.assertIn(asyncio.get_running_loop(), lag_monitor.loops)
+
+        await communicator.disconnect()
+        self.assertNotIn(asyncio.get_running_loop(), lag_monitor.loops)
+
+
+class ShardedChannelLayerTest(SimpleTestCase):
+    groups = [f'notifications_{i}' for i in range(2000)]
+
+    def test_adding_host_moves_only_its_share(self):
+        before = HashRing(['redis://a:6379', 'redis://b:6379'])
+        after = HashRing(['redis://a:6379', 'redis://b:6379', 'redis://c:6379'])
+
+        moved = [group for group in self.groups if before.get(group) != after.get(group)]
+
+        self.assertTrue(all(after.get(group) == 2 for group in moved))
+        self.assertLess(len(moved), len(self.groups) * 0.45)
+        self.assertGreater(len(moved), len(self.groups) * 0.2)
+
+    def test_placement_independent_of_host_order(self):
+        hosts = ['redis://a:6379', 'redis://b:6379', ('c', 6379)]
+        layer = ShardedRedisChannelLayer(hosts=hosts)
+        reordered = ShardedRedisChannelLayer(hosts=hosts[::-1])
+
+        for group in self.groups[:200]:
+            self.assertEqual(layer.hosts[layer.consistent_hash(group)],
+                             reordered.hosts[reordered.consistent_hash(group)])
+
+    def test_groups_spread_across_hosts(self):
+        layer = ShardedRedisChannelLayer(hosts=['redis://a:6379', 'redis://b:6379', 'redis://c:6379'])
+
+        counts = [0, 0, 0]
+        for group in self.groups:
+            counts[layer.consistent_hash(group)] += 1
+
+        self.assertTrue(all(count > len(self.groups) * 0.25 for count in counts))
+
+
+class PresenceConsumer(PresenceConsumerMixin, ConsumerMetricsMixin, AsyncWebsocketConsumer):
+    async def connect(self):
+        await self.channel_layer.group_add('chat_presence-room', self.channel_name)
+        await self.accept()
+        await self.join_presence('presence-room', 'chat_presence-room')
+
+    async def disconnect(self, close_code):
+        await self.leave_presence()
+        await self.channel_layer.group_discard('chat_presence-room', self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        await self.handle_presence_frame(json.loads(text_data))
+
+
+def clear_presence():
+    """Clear the presence store, the Redis one when PRESENCE_REDIS_URL is set."""
+    store = PresenceService.get_store()
+    if isinstance(store, RedisPresenceStore):
+        for key in store.client.scan_iter('presence:*'):
+            store.client.delete(key)
+    else:
+        store.clear()
+
+
+class PresenceTest(SimpleTestCase):
+
+    def setUp(self):
+        clear_presence()
+
+    def test_user_online_while_a_connection_is_live(self):
+        self.assertEqual(PresenceService.connect('room', 1, 'tab-1'), (True, set()))
+        self.assertEqual(PresenceService.connect('room', 1, 'tab-2'), (False, set()))
+        PresenceService.connect('other-room', 2, 'tab-3')
+
+        self.assertEqual(PresenceService.room_users('room'), {1})
+        self.assertEqual(PresenceService.online_users([1, 2, 3]), {1, 2})
+        self.assertEqual(PresenceService.disconnect('room', 1, 'tab-1'), (False, set()))
+        self.assertEqual(PresenceService.disconnect('room', 1, 'tab-2'), (True, set()))
+        self.assertEqual(PresenceService.online_users([1, 2]), {2})
+
+    def test_expired_users_reported_offline_once(self):
+        """test users whose connections expired are pruned and reported once by the next change"""
+        PresenceService.connect('room', 3, 'other-tab')
+        with self.settings(PRESENCE_TTL=-1):
+            PresenceService.connect('room', 2, 'crashed-tab')
+
+        self.assertEqual(PresenceService.connect('room', 3, 'live-tab'), (False, {2}))
+        self.assertEqual(PresenceService.heartbeat('room', 3, 'live-tab'), set())
+        self.assertEqual(PresenceService.connect('room', 1, 'tab-1'), (True, set()))
+        self.assertEqual(PresenceService.room_users('room'), {1, 3})
+
+    @override_settings(PRESENCE_TTL=-1)
+    def test_presence_expires_without_heartbeat(self):
+        PresenceService.connect('room', 1, 'tab-1')
+
+        self.assertEqual(PresenceService.room_users('room'), set())
+        self.assertEqual(PresenceService.online_users([1]), set())
+
+    async def test_typing_burst_coalesced(self):
+        broadcasts = []
+
+        async def broadcast(typing):
+            broadcasts.append(typing)
+
+        throttle = TypingThrottle(broadcast, interval=0.1, timeout=0.15)
+        for _ in range(20):
+            throttle.keystroke()
+        await asyncio.sleep(0.12)
+        throttle.keystroke()
+        await throttle.task
+
+        self.assertEqual(broadcasts, [True, True, False])
+
+    @override_settings(TYPING_BROADCAST_INTERVAL=0.05, TYPING_TIMEOUT=1)
+    async def test_presence_and_typing_broadcasts(self):
+        first = WebsocketCommunicator(PresenceConsumer.as_asgi(), '/ws/chat/presence-room/')
+        first.scope['user'] = SimpleNamespace(id=1)
+        second = WebsocketCommunicator(PresenceConsumer.as_asgi(), '/ws/chat/presence-room/')
+        second.scope['user'] = SimpleNamespace(id=2)
+
+        await first.connect()
+        self.assertEqual(await first.receive_json_from(), {'type': 'presence', 'online': [1]})
+        await second.connect()
+        self.assertEqual(await second.receive_json_from(), {'type': 'presence', 'online': [1, 2]})
+        self.assertEqual(await first.receive_json_from(), {'type': 'presence', 'user_id': 2, 'online': True})
+
+        for _ in range(5):
+            await second.send_json_to({'type': 'typing'})
+        self.assertEqual(await first.receive_json_from(), {'type': 'typing', 'user_id': 2, 'typing': True})
+        self.assertTrue(await first.receive_nothing(0.02))
+        self.assertTrue(await second.receive_nothing(0.02))
+
+        await second.disconnect()
+        self.assertEqual(await first.receive_json_from(), {'type': 'typing', 'user_id': 2, 'typing': False})
+        self.assertEqual(await first.receive_json_from(), {'type': 'presence', 'user_id': 2, 'online': False})
+        await first.disconnect()
+
+
+    async def test_expired_user_broadcast_offline(self):
+        """test the room is told a user is offline once their connection expired"""
+        with self.settings(PRESENCE_TTL=-1):
+            await sync_to_async(PresenceService.connect)('presence-room', 2, 'crashed-tab')
+        communicator = WebsocketCommunicator(PresenceConsumer.as_asgi(), '/ws/chat/presence-room/')
+        communicator.scope['user'] = SimpleNamespace(id=1)
+
+        await communicator.connect()
+        self.assertEqual(await communicator.receive_json_from(), {'type': 'presence', 'online': [1]})
+        self.assertEqual(await communicator.receive_json_from(), {'type': 'presence', 'user_id': 2, 'online': False})
+        await communicator.disconnect()
+
+
+class PresenceQueryTest(APITestCase):
+
+    def setUp(self):
+        clear_presence()
+
+    def test_presence_query(self):
+        user = User.objects.create_user(
+            email="presence@gmail.com",
+            password="123456pok",
+            first_name="Presence",
+            last_name="User",
+            user_phone="+1234567890")
+        self.client.force_authenticate(user=user)
+        PresenceService.connect('room', 5, 'tab-1')
+        PresenceService.connect('other-room', 7, 'tab-1')
+
+        # users 5 and 6 share a chat room with the user, user 7 does not
+        with patch('communications.views.ChatRoomService.counterparts', return_value={5, 6}) as counterparts:
+            response = self.client.get(reverse('chat-presence'), {'user_ids': '5,6,7'})
+
+        counterparts.assert_called_once_with(user.id, [5, 6, 7])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'online': [5]})
+        response = self.client.get(reverse('chat-presence'), {'user_ids': 'a'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class QueueingHandlerTest(SimpleTestCase):
+
+    def setUp(self):
+        self.handler = QueueingHandler(
+            {'class': 'logging.handlers.BufferingHandler', 'capacity': 1000}, maxsize=2)
+        self.addCleanup(self.handler.close)
+
+    @staticmethod
+    def make_record(number):
+        return logging.makeLogRecord({
+            'name': 'test', 'levelno': logging.INFO, 'levelname': 'INFO', 'msg': 'record %s', 'args': (number,),
+        })
+
+    def stop_listener(self):
+        self.handler.listener.stop()
+        self.handler.listener = None
+
+    def written(self):
+        return [record.getMessage() for record in self.handler.handler.buffer]
+
+    def test_full_queue_drops_and_reports(self):
+        """test records are dropped without blocking when the queue is full, and the drop is reported"""
+        self.stop_listener()
+        for number in range(5):
+            self.handler.handle(self.make_record(number))
+        self.assertEqual(self.handler.dropped, 3)
+        self.assertEqual(self.handler.queue.qsize(), 2)
+
+        listener = DropReportingQueueListener(self.handler.queue, self.handler.handler, self.handler)
+        while not self.handler.queue.empty():
+            listener.handle(self.handler.queue.get_nowait())
+
+        self.assertEqual(self.written(), ['Log queue full, dropped 3 records', 'record 0', 'record 1'])
+        report = self.handler.handler.buffer[0]
+        self.assertEqual(report.levelno, logging.WARNING)
+        self.assertEqual(report.name, 'test')
+        self.assertEqual(listener.reported, 3)
+
+        self.handler.handle(self.make_record(5))
+        listener.handle(self.handler.queue.get_nowait())
+        self.assertEqual(self.written()[-1], 'record 5')
+        self.assertEqual(len(self.written()), 4)
+
+    def test_message_merged_on_calling_thread(self):
+        """test queued records carry the merged message, not the arguments"""
+        self.stop_listener()
+        self.handler.handle(self.make_record(1))
+        record = self.handler.queue.get_nowait()
+        self.assertEqual(record.msg, 'record 1')
+        self.assertIsNone(record.args)
+
+    def test_listener_restarted_after_fork(self):
+        """test a forked process, without the listener thread, gets a new queue and listener"""
+        queue, listener = self.handler.queue, self.handler.listener
+        self.addCleanup(listener.stop)
+        self.handler.pid = -1
+
+        self.handler.handle(self.make_record(1))
+
+        self.assertEqual(self.handler.pid, os.getpid())
+        self.assertIsNot(self.handler.queue, queue)
+        self.assertIsNot(self.handler.listener, listener)
+        self.stop_listener()
+        self.assertEqual(self.written(), ['record 1'])
+
+
+class StructuredLoggerTest(SimpleTestCase):
+
+    def setUp(self):
+        self.handler = logging.handlers.BufferingHandler(1000)
+        self.base_logger = logging.getLogger('test.structured')
+        self.base_logger.addHandler(self.handler)
+        self.base_logger.propagate = False
+        self.base_logger.setLevel(logging.INFO)
+        self.addCleanup(self.base_logger.removeHandler, self.handler)
+        self.logger = get_logger('test.structured')
+
+    @property
+    def records(self):
+        return self.handler.buffer
+
+    def test_records_point_to_caller(self):
+        """test the location of records is the caller's, not the adapter's"""
+        line = sys._getframe().f_lineno + 1
+        self.logger.info("record %s", 1)
+        self.logger.log(logging.WARNING, "record %s", 2)
+
+        for record in self.records:
+            self.assertEqual(record.pathname, __file__)
+            self.assertEqual(record.funcName, 'test_records_point_to_caller')
+        self.assertEqual([record.lineno for record in self.records], [line, line + 1])
+        self.assertEqual([record.getMessage() for record in self.records], ['record 1', 'record 2'])
+
+    def test_fields_stored_in_extra_data(self):
+        """test keyword arguments are fields, except the ones of Logger.log"""
+        self.logger.info("request", view='project-list', status=200, stack_info=True, extra={'trace_id': 'abc'})
+
+        record = self.records[0]
+        self.assertEqual(record.extra_data, {'view': 'project-list', 'status': 200})
+        self.assertEqual(record.trace_id, 'abc')
+        self.assertIsNotNone(record.stack_info)
+        self.assertIsNone(record.exc_info)
+
+    def test_exception_carries_exc_info(self):
+        """test exception() logs at ERROR with the current exception"""
+        try:
+            raise ValueError('failed')
+        except ValueError:
+            self.logger.exception("failed %s", 'task', task_id=3)
+
+        record = self.records[0]
+        self.assertEqual(record.levelno, logging.ERROR)
+        self.assertIs(record.exc_info[0], ValueError)
+        self.assertEqual(record.extra_data, {'task_id': 3})
+
+    def test_disabled_level_returns_before_process(self):
+        """test a disabled level neither processes the fields nor creates a record"""
+        with patch.object(StructuredLogger, 'process', wraps=self.logger.process) as process:
+            self.logger.debug("record %s", 1, view='project-list')
+            self.logger.log(logging.DEBUG, "record %s", 2)
+            process.assert_not_called()
+
+            self.logger.info("record %s", 3)
+            process.assert_called_once()
+        self.assertEqual([record.getMessage() for record in self.records], ['record 3'])
@@ -0,0 +1,149 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+from forum.utils.logging_utils import get_logger
+
+
+logger = get_logger('django')
+
+THUMBNAIL_SIZES = getattr(settings, 'THUMBNAIL_SIZES', (64, 256))
+
+THUMBNAIL_FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+
+THUMBNAIL_QUALITY = getattr(settings, 'THUMBNAIL_QUALITY', 80)
+
+ORIGINAL_IMAGE_QUALITY = getattr(settings, 'ORIGINAL_IMAGE_QUALITY', 90)
+
+
+def get_thumbnail_name(name, size, extension):
+    """
+    Return the storage name of a thumbnail of the image stored under `name`.
+    """
+    stem = os.path.splitext(name)[0]
+    return f'thumbnails/{stem}_{size}.{extension}'
+
+
+def get_thumbnail_names(name):
+    """
+    Return the storage names of all thumbnails of the image stored under `name`.
+    """
+    return [
+        get_thumbnail_name(name, size, extension)
+        for size in THUMBNAIL_SIZES
+        for extension in THUMBNAIL_FORMATS
+    ]
+
+
+def get_thumbnail_urls(field_file):
+    """
+    Return thumbnail URLs keyed by size and format, or None if there is no image.
+
+    The URLs are derived from the image name, so no storage lookups are made.
+    """
+    if not field_file:
+        return None
+    return {
+        str(size): {
+            extension: field_file.storage.url(get_thumbnail_name(field_file.name, size, extension))
+            for extension in THUMBNAIL_FORMATS
+        }
+        for size in THUMBNAIL_SIZES
+    }
+
+
+class UndecodableImageError(Exception):
+    """The stored file is not an image which can be fully decoded."""
+
+
+def decode_image(field_file):
+    """
+    Fully decode the stored image and return a copy without metadata, and
+    the format of the stored image.
+
+    The EXIF orientation is applied before the metadata is dropped.
+
+    Raises:
+        UndecodableImageError: if the file cannot be decoded. Errors reading
+        it from the storage are raised as they are.
+    """
+    with field_file.open('rb'):
+        data = field_file.read()
+    try:
+        with Image.open(BytesIO(data)) as image:
+            image_format = image.format
+            image.load()
+            image = ImageOps.exif_transpose(image)
+            clean = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise UndecodableImageError(str(e)) from e
+    clean.info = {}
+    return clean, image_format
+
+
+def strip_metadata(field_file, image, image_format):
+    """
+    Replace the stored image with `image`, decoded without metadata, encoded
+    in the same format, so the original keeps no EXIF (e.g. GPS position).
+
+    Returns:
+        str: storage name of the image, which differs from the field's if
+        the storage had to pick another one
+    """
+    buffer = BytesIO()
+    if image_format == 'JPEG':
+        image.convert('RGB').save(buffer, 'JPEG', quality=ORIGINAL_IMAGE_QUALITY, optimize=True)
+    else:
+        image.save(buffer, image_format, optimize=True)
+
+    storage = field_file.storage
+    storage.delete(field_file.name)
+    return storage.save(field_file.name, ContentFile(buffer.getvalue()))
+
+
+def generate_thumbnails(field_file, image=None):
+    """
+    Write the WebP and JPEG thumbnails of the stored image, decoding it
+    unless given.
+
+    Returns:
+        list: storage names of the written thumbnails
+    """
+    if image is None:
+        image, _ = decode_image(field_file)
+    storage = field_file.storage
+    names = []
+
+    for size in THUMBNAIL_SIZES:
+        thumbnail = image.copy()
+        thumbnail.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+        for extension, image_format in THUMBNAIL_FORMATS.items():
+            frame = thumbnail.convert('RGB') if image_format == 'JPEG' else thumbnail
+            buffer = BytesIO()
+            frame.save(buffer, image_format, quality=THUMBNAIL_QUALITY, optimize=True)
+
+            name = get_thumbnail_name(field_file.name, size, extension)
+            if storage.exists(name):
+                storage.delete(name)
+            names.append(storage.save(name, ContentFile(buffer.getvalue())))
+
+    logger.info("Generated %s thumbnails for %s", len(names), field_file.name)
+    return names
+
+
+def delete_thumbnails(field_file):
+    """
+    Delete all thumbnails of the stored image, if any.
+    """
+    if not field_file:
+        return
+    storage = field_file.storage
+    for name in get_thumbnail_names(field_file.name):
+        if storage.exists(name):
+            storage.delete(name)
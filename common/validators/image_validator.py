@@ -1,12 +1,29 @@
-import logging
 from collections.abc import Mapping
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.utils.deconstruct import deconstructible
 from PIL import Image
+from forum.utils.logging_utils import get_logger
 
 
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
+
+HEADER_SIZE = 32
+
+IMAGE_SIGNATURES = {
+    b'\x89PNG\r\n\x1a\n': 'png',
+    b'\xff\xd8\xff': 'jpeg',
+}
+
+
+def sniff_image_format(header):
+    """
+    Return the image format matching the magic bytes of the header, or None.
+    """
+    for signature, image_format in IMAGE_SIGNATURES.items():
+        if header.startswith(signature):
+            return image_format
+    return None
 
 
 @deconstructible
@@ -41,33 +58,41 @@ class ImageValidator:
     def __call__(self, value):
         """
         Validate the uploaded image file by checking its format, dimensions, and size.
+
+        Only the file header is read here; the image is fully decoded later by
+        the `process_uploaded_image` task, off the request cycle.
         """
-        logger.debug(f"Validating image: {value.name}")
+        logger.debug("Validating image: %s", value.name)
         try:
-            image = Image.open(value)
-            image.verify()
-            logger.info(f"Image {value.name} opened successfully. Format: {image.format}")
-
-            if image.format.lower() not in ('jpeg', 'png'):
-                logger.error(f"Invalid image format: {image.format} for file {value.name}")
+            value.seek(0)
+            image_format = sniff_image_format(value.read(HEADER_SIZE))
+            if image_format is None:
+                logger.error("Invalid image signature for file %s", value.name)
                 raise ValidationError(
                     self.messages['invalid_image'],
                     code='invalid_image_format'
                 )
 
-            width, height = image.size
-            logger.debug(f"Image dimensions for {value.name}: {width}x{height}")
+            value.seek(0)
+            # Image.open is lazy and only parses the header
+            with Image.open(value) as image:
+                if image.format.lower() != image_format:
+                    raise ValueError(f"Format {image.format} does not match signature {image_format}")
+                width, height = image.size
+            logger.debug("Image dimensions for %s: %sx%s", value.name, width, height)
 
         except Exception as e:
-            logger.error(f"Failed to process image {value.name}: {str(e)}")
+            logger.error("Failed to process image %s: %s", value.name, e)
             raise ValidationError(
                 self.messages['invalid_image'],
                 code='invalid_image'
             )
+        finally:
+            value.seek(0)
 
         # Validate file size
         if self.max_size is not None and value.size > self.max_size:
-            logger.warning(f"Image {value.name} exceeds the size limit: {value.size} bytes")
+            logger.warning("Image %s exceeds the size limit: %s bytes", value.name, value.size)
             raise ValidationError(
                 self.messages['size'],
                 code='invalid_size',
@@ -82,18 +107,18 @@ class ImageValidator:
         Validate the dimensions of the image.
         """
         if self.max_width is not None and width > self.max_width:
-            logger.warning(f"Image width {width} exceeds the max allowed width {self.max_width}")
+            logger.warning("Image width %s exceeds the max allowed width %s", width, self.max_width)
             self._raise_dimension_error()
 
         if self.max_height is not None and height > self.max_height:
-            logger.warning(f"Image height {height} exceeds the max allowed height {self.max_height}")
+            logger.warning("Image height %s exceeds the max allowed height %s", height, self.max_height)
             self._raise_dimension_error()
 
     def _raise_dimension_error(self):
         """
         Raise a ValidationError if the image dimensions exceed the allowed limits.
         """
-        logger.error(f"Image dimensions exceed the allowed limits")
+        logger.error("Image dimensions exceed the allowed limits")
         raise ValidationError(
             self.messages['dimensions'],
             code='invalid_dimensions',
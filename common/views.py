@@ -0,0 +1,125 @@
+import hmac
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from django.views import View
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from common.metrics import registry
+from common.streaming import STREAM_FORMATS, stream_csv, stream_ndjson
+from forum.utils.logging_utils import get_logger
+
+
+logger = get_logger('django')
+
+
+class StreamingExportView(APIView):
+    """
+    Base API view to export a queryset as a streamed NDJSON or CSV file.
+
+    Rows are read as `values_list()` tuples through a server-side cursor
+    (`QuerySet.iterator(chunk_size=...)`), so memory stays flat for any size.
+
+    Subclasses define:
+        - export_fields: fields (and column names) of the exported rows
+        - since_field: timestamp field used for incremental exports and ordering
+        - filename: base name of the attachment
+        - get_queryset(): queryset of the rows visible to the user
+
+    Query parameters:
+        - file_format: ndjson (default) or csv
+        - since: ISO 8601 datetime, only rows with since_field at or after it are exported
+        - since_id: pk of the last row exported at `since`; only rows after
+          it in (since_field, pk) order are exported
+
+    Returns:
+        - 200 OK: The streamed file.
+        - 400 Bad Request: If a query parameter is invalid.
+    """
+    permission_classes = [IsAuthenticated]
+    export_fields = ()
+    since_field = 'created_at'
+    filename = 'export'
+    chunk_size = 2000
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        file_format = request.query_params.get('file_format', 'ndjson')
+        if file_format not in STREAM_FORMATS:
+            return Response(
+                {"error": f"Invalid file format. Valid options: {', '.join(STREAM_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        queryset = self.get_queryset()
+        since = request.query_params.get('since')
+        if since is not None:
+            try:
+                since_value = parse_datetime(since)
+            except ValueError:
+                since_value = None
+            if since_value is None:
+                return Response(
+                    {"error": "Invalid since value. Use an ISO 8601 datetime."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            since_id = request.query_params.get('since_id')
+            if since_id is None:
+                queryset = queryset.filter(**{f'{self.since_field}__gte': since_value})
+            else:
+                try:
+                    since_id = queryset.model._meta.pk.to_python(since_id)
+                except DjangoValidationError:
+                    return Response({"error": "Invalid since_id value."}, status=status.HTTP_400_BAD_REQUEST)
+                # Keyset on (since_field, pk): rows sharing the timestamp of the last row are not skipped
+                queryset = queryset.filter(
+                    Q(**{f'{self.since_field}__gt': since_value})
+                    | Q(**{self.since_field: since_value, 'pk__gt': since_id})
+                )
+
+        logger.info("User %s exporting %s as %s", request.user.id, self.filename, file_format)
+        rows = queryset.order_by(self.since_field, 'pk').values_list(
+            *self.export_fields).iterator(chunk_size=self.chunk_size)
+        if file_format == 'csv':
+            content = stream_csv(rows, self.export_fields)
+        else:
+            content = stream_ndjson(rows, self.export_fields)
+
+        response = StreamingHttpResponse(content, content_type=STREAM_FORMATS[file_format])
+        response['Content-Disposition'] = f'attachment; filename="{self.filename}.{file_format}"'
+        return response
+
+
+class MetricsView(View):
+    """
+    Internal endpoint serving the request metrics of this process in the
+    Prometheus text format.
+
+    Allowed with `Authorization: Bearer <METRICS_TOKEN>`, and for the
+    addresses in METRICS_ALLOWED_IPS (none by default).
+
+    Returns:
+        - 200 OK: the metrics.
+        - 403 Forbidden: for other clients.
+    """
+
+    def has_access(self, request):
+        if request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS:
+            return True
+        token = settings.METRICS_TOKEN
+        authorization = request.META.get('HTTP_AUTHORIZATION', '')
+        return bool(token) and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode())
+
+    def get(self, request):
+        if not self.has_access(request):
+            return HttpResponseForbidden()
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,33 +1,40 @@
 import json
-import logging
 
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from cryptography.fernet import Fernet, InvalidToken
 from django.conf import settings
 
+from common.consumers import ConsumerMetricsMixin
+from common.presence import PresenceConsumerMixin
 from communications.di_container import init_container
 from communications.domain.entities.messages import Message
 from communications.domain.exceptions.base import ApplicationException
 from communications.domain.values.messages import Text
-from communications.services.commands.messages import CreateMessageCommand
+from communications.services.commands.messages import CreateMessageCommand, MarkReadCommand
 from communications.services.queries.messages import ChatRoomQuery
+from forum.utils.logging_utils import get_logger
 
 
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
 container = init_container()
 create_message_command: CreateMessageCommand = container.resolve(CreateMessageCommand)
+mark_read_command: MarkReadCommand = container.resolve(MarkReadCommand)
 get_chat_room_query: ChatRoomQuery = container.resolve(ChatRoomQuery)
 
 cipher_suite = Fernet(settings.ENCRYPTION_KEY)
 
 
-class ChatConsumer(AsyncWebsocketConsumer):
+class ChatConsumer(PresenceConsumerMixin, ConsumerMetricsMixin, AsyncWebsocketConsumer):
+    def get_trace_fields(self):
+        return {'room_oid': getattr(self, 'room_oid', None), 'user_id': getattr(self, 'user_id', None)}
+
     async def connect(self):
         self.room_oid = self.scope['url_route']['kwargs']['room_oid']
         self.user_id = self.scope['user'].id
         self.room_group_name = f"chat_{self.room_oid}"
-        logger.info(f"Attempting to connect to room: {self.room_oid}")
+        logger.info("Attempting to connect to room: %s", self.room_oid)
 
         chatroom = get_chat_room_query.handle(self.room_oid)
         if not chatroom or self.user_id not in [chatroom.sender_id, chatroom.receiver_id]:
@@ -40,22 +47,29 @@ class ChatConsumer(AsyncWebsocketConsumer):
         )
 
         await self.accept()
-        logger.info(f"Connection accepted for room: {self.room_oid}")
+        logger.info("Connection accepted for room: %s", self.room_oid)
+        await self.join_presence(self.room_oid, self.room_group_name)
 
     async def disconnect(self, close_code):
-        logger.info(f"Disconnecting from room: {self.room_oid} with code: {close_code}")
+        logger.info("Disconnecting from room: %s with code: %s", self.room_oid, close_code)
+        await self.leave_presence()
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
 
     async def receive(self, text_data=None, bytes_data=None):
-        logger.debug(f"Received message data: {text_data}")
+        logger.debug("Received message data: %s", text_data)
         try:
             text_data_json = json.loads(text_data)
+            if await self.handle_presence_frame(text_data_json):
+                return
+            if text_data_json.get('type') == 'read':
+                await self.mark_read(text_data_json.get('message_oid'))
+                return
             message = text_data_json['message']
 
-            logger.info(f"Message in room: {self.room_oid}")
+            logger.info("Message in room: %s", self.room_oid)
 
             message_entity = await create_message_command.handle(
                 message_data=message,
@@ -63,7 +77,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 user_id=self.user_id
             )
 
-            await self.channel_layer.group_send(
+            await self.group_send(
                 self.room_group_name,
                 {
                     'type': 'chat_message',
@@ -74,8 +88,33 @@ class ChatConsumer(AsyncWebsocketConsumer):
                     'created_at': message_entity.created_at,
                 }
             )
+            await self.typing.stop()
         except ApplicationException as e:
-            logger.error(f"Error processing received message: {e}", exc_info=True)
+            logger.error("Error processing received message: %s", e, exc_info=True)
+
+    async def mark_read(self, message_oid):
+        """Move the read cursor of the user, reply with their unread count and send a read receipt."""
+        unread = await sync_to_async(mark_read_command.handle, thread_sensitive=False)(
+            user_id=self.user_id, room_oid=self.room_oid, message_oid=message_oid)
+        if unread is None:
+            await self.send(text_data=json.dumps({'error': 'Message not found.', 'oid': message_oid}))
+            return
+
+        await self.send(text_data=json.dumps({'type': 'unread', 'room_oid': self.room_oid, 'unread': unread}))
+        await self.group_send(self.room_group_name, {
+            'type': 'chat_read',
+            'user_id': self.user_id,
+            'message_oid': message_oid,
+            'channel': self.channel_name,
+        })
+
+    async def chat_read(self, event):
+        if event['channel'] != self.channel_name:
+            await self.send(text_data=json.dumps({
+                'type': 'read',
+                'user_id': event['user_id'],
+                'message_oid': event['message_oid'],
+            }))
 
     async def chat_message(self, event):
         oid = event['oid']
@@ -83,7 +122,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         try:
             message = cipher_suite.decrypt(event['message']).decode()
         except (InvalidToken, ValueError) as e:
-            logger.error(f"Decryption failed for message oid {oid}: {e}", exc_info=True)
+            logger.error("Decryption failed for message oid %s: %s", oid, e, exc_info=True)
             await self.send(text_data=json.dumps({
                 'error': 'Failed to decrypt message. Invalid or corrupted data.',
                 'oid': oid
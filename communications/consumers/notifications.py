@@ -1,8 +1,13 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from common.consumers import ConsumerMetricsMixin
+
+
+class NotificationConsumer(ConsumerMetricsMixin, AsyncWebsocketConsumer):
+    def get_trace_fields(self):
+        return {'group': getattr(self, 'room_group_name', None)}
 
-class NotificationConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.room_group_name = f'notifications_{self.scope["user"].id}'
 
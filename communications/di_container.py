@@ -1,17 +1,23 @@
-import logging
 from functools import lru_cache
 from django.conf import settings
 from punq import Container, Scope
 from pymongo import MongoClient
 
+from common.metrics import MongoCommandTimer
 from communications.events.base import BaseEvent
 from communications.events.messages import MessageNotificationEvent
-from communications.repositories.base import BaseMessagesRepository, BaseChatsRepository
-from communications.repositories.mongo import MongoDBChatsRepositories, MongoDBMessagesRepositories
-from communications.services.commands.messages import CreateChatCommand, CreateMessageCommand
-from communications.services.queries.messages import ChatRoomQuery, MessageQuery
+from communications.repositories.base import (
+    BaseMessagesRepository, BaseChatsRepository, BaseReadCursorsRepository, BaseMessageSearchRepository,
+)
+from communications.repositories.mongo import (
+    MongoDBChatsRepositories, MongoDBMessagesRepositories, MongoDBReadCursorsRepositories,
+    MongoDBMessageSearchRepositories,
+)
+from communications.services.commands.messages import CreateChatCommand, CreateMessageCommand, MarkReadCommand
+from communications.services.queries.messages import ChatRoomQuery, MessageQuery, UnreadCountsQuery
+from forum.utils.logging_utils import get_logger
 
-logger = logging.getLogger('django')
+logger = get_logger('django')
 
 
 @lru_cache(1)
@@ -21,11 +27,11 @@ def init_container() -> Container:
     # Initialize MongoDB client
     def init_mongo_client() -> MongoClient:
         try:
-            client = MongoClient(settings.MONGO_URI)
-            logger.info(f"Successfully connected to MongoDB at {settings.MONGO_URI}")
+            client = MongoClient(settings.MONGO_URI, event_listeners=[MongoCommandTimer()])
+            logger.info("Successfully connected to MongoDB at %s", settings.MONGO_URI)
             return client
         except Exception as e:
-            logger.error(f"Failed to connect to MongoDB: {e}")
+            logger.error("Failed to connect to MongoDB: %s", e)
             raise
 
     container.register(MongoClient, factory=init_mongo_client, scope=Scope.singleton)
@@ -35,18 +41,37 @@ def init_container() -> Container:
         return MongoDBChatsRepositories(
             mongo_db_client=container.resolve(MongoClient),
             mongo_db_db_name=settings.MONGO_DB_NAME,
-            mongo_db_collection_name=settings.MONGO_COLLECTION_NAME
+            mongo_db_collection_name=settings.MONGO_COLLECTION_NAME,
+            search_repo=container.resolve(BaseMessageSearchRepository),
         )
 
     def init_mongo_messages_repository() -> MongoDBMessagesRepositories:
         return MongoDBMessagesRepositories(
+            mongo_db_client=container.resolve(MongoClient),
+            mongo_db_db_name=settings.MONGO_DB_NAME,
+            mongo_db_collection_name=settings.MONGO_COLLECTION_NAME,
+            search_repo=container.resolve(BaseMessageSearchRepository),
+        )
+
+    def init_mongo_read_cursors_repository() -> MongoDBReadCursorsRepositories:
+        return MongoDBReadCursorsRepositories(
             mongo_db_client=container.resolve(MongoClient),
             mongo_db_db_name=settings.MONGO_DB_NAME,
             mongo_db_collection_name=settings.MONGO_COLLECTION_NAME
         )
 
+    def init_mongo_message_search_repository() -> MongoDBMessageSearchRepositories:
+        return MongoDBMessageSearchRepositories(
+            mongo_db_client=container.resolve(MongoClient),
+            mongo_db_db_name=settings.MONGO_DB_NAME,
+            mongo_db_collection_name=settings.MONGO_SEARCH_COLLECTION_NAME
+        )
+
     container.register(BaseChatsRepository, factory=init_mongo_chats_repository, scope=Scope.singleton)
     container.register(BaseMessagesRepository, factory=init_mongo_messages_repository, scope=Scope.singleton)
+    container.register(BaseReadCursorsRepository, factory=init_mongo_read_cursors_repository, scope=Scope.singleton)
+    container.register(BaseMessageSearchRepository, factory=init_mongo_message_search_repository,
+                       scope=Scope.singleton)
 
     # Register events
     container.register(BaseEvent, MessageNotificationEvent)
@@ -62,8 +87,12 @@ def init_container() -> Container:
             chat_query=container.resolve(ChatRoomQuery),
         )
 
+    def init_mark_read_command() -> MarkReadCommand:
+        return MarkReadCommand(mongo_repo=container.resolve(BaseReadCursorsRepository))
+
     container.register(CreateChatCommand, factory=init_create_chat_command)
     container.register(CreateMessageCommand, factory=init_send_message_command)
+    container.register(MarkReadCommand, factory=init_mark_read_command)
 
     # Register queries
     def init_get_chat_room_query() -> ChatRoomQuery:
@@ -72,7 +101,11 @@ def init_container() -> Container:
     def init_get_message_query() -> MessageQuery:
         return MessageQuery(mongo_repo=container.resolve(BaseMessagesRepository))
 
+    def init_unread_counts_query() -> UnreadCountsQuery:
+        return UnreadCountsQuery(mongo_repo=container.resolve(BaseReadCursorsRepository))
+
     container.register(ChatRoomQuery, factory=init_get_chat_room_query)
     container.register(MessageQuery, factory=init_get_message_query)
+    container.register(UnreadCountsQuery, factory=init_unread_counts_query)
 
     return container
@@ -1,11 +1,12 @@
-import logging
 from abc import ABC
 from dataclasses import dataclass, field
 from datetime import datetime
 from uuid import uuid4
 
+from forum.utils.logging_utils import get_logger
 
-logger = logging.getLogger('django')
+
+logger = get_logger('django')
 
 
 @dataclass
@@ -20,4 +21,4 @@ class BaseEntity(ABC):
     )
 
     def __post_init__(self):
-        logger.info(f"Created new entity: {self.__class__.__name__} with oid {self.oid} at {self.created_at}")
+        logger.info("Created new entity: %s with oid %s at %s", self.__class__.__name__, self.oid, self.created_at)
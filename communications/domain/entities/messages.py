@@ -1,12 +1,12 @@
-import logging
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import List, Optional
 
 from communications.domain.entities.base import BaseEntity
 from communications.domain.values.messages import Title, Text
+from forum.utils.logging_utils import get_logger
 
-logger = logging.getLogger('django')
+logger = get_logger('django')
 
 
 @dataclass
@@ -19,7 +19,15 @@ class Message(BaseEntity):
     def mark_as_read(self):
         """Mark the message as read by setting the read_at timestamp."""
         self.read_at = datetime.now()
-        logger.info(f"Message {self.oid} marked as read at {self.read_at}")
+        logger.info("Message %s marked as read at %s", self.oid, self.read_at)
+
+
+@dataclass(frozen=True)
+class ReadCursor:
+    """Last message (created_at, oid) a user has read in a chat room, and when."""
+    message_oid: str
+    created_at: datetime
+    read_at: datetime
 
 
 @dataclass
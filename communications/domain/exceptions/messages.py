@@ -17,4 +17,10 @@ class EmptyTextException(ApplicationException):
     @property
     def message(self):
         return 'Text is empty'
-    
\ No newline at end of file
+
+
+@dataclass(eq=False)
+class ChatRoomNotCreatedException(ApplicationException):
+    @property
+    def message(self):
+        return 'Chat room could not be created'
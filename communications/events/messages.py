@@ -1,4 +1,3 @@
-import logging
 from dataclasses import dataclass
 
 from channels.db import database_sync_to_async
@@ -8,8 +7,9 @@ from django.conf import settings
 
 from communications.domain.entities.messages import Message, ChatRoom
 from communications.events.base import BaseEvent
+from forum.utils.logging_utils import get_logger
 
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 cipher_suite = Fernet(settings.ENCRYPTION_KEY)
 
 
@@ -25,7 +25,7 @@ class MessageNotificationEvent(BaseEvent):
                 message_id=message.oid
             )
 
-            logger.info(f"Notification object created for message from sender {chat.receiver_id}")
+            logger.info("Notification object created for message from sender %s", chat.receiver_id)
 
             channel_layer = get_channel_layer()
             await channel_layer.group_send(
@@ -37,5 +37,5 @@ class MessageNotificationEvent(BaseEvent):
                 }
             )
         except Exception as e:
-            logger.error(f"Failed to create Notification: {e}", exc_info=True)
+            logger.error("Failed to create Notification: %s", e, exc_info=True)
         return
@@ -1,17 +1,25 @@
-import logging
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from dataclasses import asdict
+from datetime import datetime
+
+from django.db.models import Exists
 
 from investors.models import InvestorProfile
 from startups.models import StartUpProfile
-from .serializers import MessageSerializer, ChatRoomSerializer
-from communications.repositories.base import BaseChatsRepository, BaseMessagesRepository
+from .serializers import MessageSerializer, ChatRoomSerializer, ReadCursorSerializer, MessageSearchSerializer
+from communications.repositories.base import (
+    BaseChatsRepository, BaseMessagesRepository, BaseReadCursorsRepository, BaseMessageSearchRepository,
+)
 from communications.di_container import init_container
+from forum.utils.logging_utils import get_logger
 
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
 container = init_container()
 mongo_chats_repo: BaseChatsRepository = container.resolve(BaseChatsRepository)
 mongo_messages_repo: BaseMessagesRepository = container.resolve(BaseMessagesRepository)
+mongo_read_cursors_repo: BaseReadCursorsRepository = container.resolve(BaseReadCursorsRepository)
+mongo_message_search_repo: BaseMessageSearchRepository = container.resolve(BaseMessageSearchRepository)
 
 
 class ChatRoomService:
@@ -19,24 +27,40 @@ class ChatRoomService:
 
     @staticmethod
     def create_chat_room(data):
+        """
+        Get or create the chat room of the startup and investor with the title.
+        Return the room oid and whether the room was created.
+        """
         serializer = ChatRoomSerializer(data=data, context={'mongo_chats_repo': mongo_chats_repo})
 
         if not serializer.is_valid():
-            logger.warning(f"Invalid data for creating chat room: {serializer.errors}")
+            logger.warning("Invalid data for creating chat room: %s", serializer.errors)
             raise ValueError(serializer.errors)
 
         sender_id = serializer.validated_data['sender_id']
         receiver_id = serializer.validated_data['receiver_id']
 
-        if not StartUpProfile.objects.filter(id=sender_id).exists():
+        # Both profiles checked in one query: None when the startup is missing
+        investor_exists = StartUpProfile.objects.filter(id=sender_id).annotate(
+            investor_exists=Exists(InvestorProfile.objects.filter(id=receiver_id))
+        ).values_list('investor_exists', flat=True).first()
+
+        if investor_exists is None:
             raise ValueError({'error': 'Startup not found.'})
 
-        if not InvestorProfile.objects.filter(id=receiver_id).exists():
+        if not investor_exists:
             raise ValueError({'error': 'Investor not found.'})
 
-        chat_room = serializer.save()
-        logger.info(f"Chat room created with ID: {chat_room.oid}")
-        return chat_room
+        room_oid, created = serializer.save()
+        if created:
+            logger.info("Chat room created with ID: %s", room_oid)
+        return room_oid, created
+
+
+    @staticmethod
+    def counterparts(user_id, user_ids):
+        """Return the ids, out of `user_ids`, of the users sharing a chat room with the user."""
+        return mongo_chats_repo.get_counterparts(user_id, list(user_ids))
 
 
 class MessageService:
@@ -50,11 +74,11 @@ class MessageService:
         )
 
         if not serializer.is_valid():
-            logger.warning(f"Invalid data for sending message: {serializer.errors}")
+            logger.warning("Invalid data for sending message: %s", serializer.errors)
             raise ValueError(serializer.errors)
 
         message = serializer.save()
-        logger.info(f"Message sent with ID: {message.oid} in room: {room_oid}")
+        logger.info("Message sent with ID: %s in room: %s", message.oid, room_oid)
         return message
 
 
@@ -67,9 +91,121 @@ class ListMessagesService:
         if not chat_room:
             raise ValueError({'error': 'Chat room not found.'})
 
+        # A message is read once the read cursor of its receiver is past it
+        cursors = mongo_read_cursors_repo.get_read_cursors(room_oid)
         message_list = sorted(
             (asdict(msg) for msg in chat_room.messages),
-            key=lambda msg: msg.get('created_at')
+            key=lambda msg: (msg['created_at'], msg['oid'])
         )
-        logger.info(f"Retrieved {len(message_list)} messages for room_oid: {room_oid}")
+        for msg in message_list:
+            cursor = cursors.get(msg['receiver_id'])
+            if cursor is not None and (msg['created_at'], msg['oid']) <= (cursor.created_at, cursor.message_oid):
+                msg['read_at'] = cursor.read_at
+        logger.info("Retrieved %s messages for room_oid: %s", len(message_list), room_oid)
         return message_list
+
+
+class ReadCursorService:
+    """Service for read cursors and unread counts of chat rooms."""
+
+    @staticmethod
+    def mark_read(data, room_oid, user_id):
+        serializer = ReadCursorSerializer(data=data)
+        if not serializer.is_valid():
+            raise ValueError(serializer.errors)
+
+        unread = mongo_read_cursors_repo.mark_read(room_oid, user_id, serializer.validated_data['message_oid'])
+        if unread is None:
+            raise LookupError({'error': 'Message not found in chat room.'})
+        return unread
+
+    @staticmethod
+    def unread_counts(user_id):
+        rooms = mongo_read_cursors_repo.get_unread_counts(user_id)
+        return {'rooms': rooms, 'total': sum(rooms.values())}
+
+
+class InboxService:
+    """Service for listing the chat rooms of a user."""
+
+    @staticmethod
+    def encode_cursor(room):
+        value = f"{room['last_activity'].isoformat()}|{room['oid']}"
+        return urlsafe_b64encode(value.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Return (last_activity, oid) encoded in the cursor.
+
+        Raises:
+            ValueError: If the cursor is invalid.
+        """
+        try:
+            last_activity, oid = urlsafe_b64decode(cursor.encode()).decode().split('|')
+            return datetime.fromisoformat(last_activity), oid
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError({'error': 'Invalid cursor.'})
+
+    @classmethod
+    def list_rooms(cls, user_id, cursor=None, page_size=20):
+        """Return a page of the rooms of the user, most recently active first.
+
+        Pages are keyset-paginated on (last_activity, oid): `cursor` points to
+        the last room of the previous page.
+
+        Returns:
+            tuple: list of rooms, cursor of the next page or None
+        """
+        before = cls.decode_cursor(cursor) if cursor is not None else None
+        rooms = mongo_chats_repo.list_chatrooms(user_id, before, page_size + 1)
+        next_cursor = None
+        if len(rooms) > page_size and rooms[page_size - 1]['last_activity'] is not None:
+            next_cursor = cls.encode_cursor(rooms[page_size - 1])
+        return rooms[:page_size], next_cursor
+
+
+class MessageSearchService:
+    """Service for searching the messages of the chats of a user."""
+
+    @staticmethod
+    def encode_cursor(result):
+        value = f"{result['created_at'].isoformat()}|{result['message_oid']}"
+        return urlsafe_b64encode(value.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Return (created_at, message_oid) encoded in the cursor.
+
+        Raises:
+            ValueError: If the cursor is invalid.
+        """
+        try:
+            created_at, message_oid = urlsafe_b64decode(cursor.encode()).decode().split('|')
+            return datetime.fromisoformat(created_at), message_oid
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError({'error': 'Invalid cursor.'})
+
+    @classmethod
+    def search(cls, user_id, params):
+        """Return a page of the messages of the user containing every word of `q`, newest first.
+
+        Results are message and room oids, for retrieving the messages; pages
+        are keyset-paginated on (created_at, message_oid).
+
+        Returns:
+            tuple: list of results, cursor of the next page or None
+
+        Raises:
+            ValueError: If the parameters or the cursor are invalid.
+        """
+        serializer = MessageSearchSerializer(data=params)
+        if not serializer.is_valid():
+            raise ValueError(serializer.errors)
+
+        data = serializer.validated_data
+        before = cls.decode_cursor(data['cursor']) if 'cursor' in data else None
+        page_size = data['page_size']
+        results = mongo_message_search_repo.search(
+            user_id, data['q'], data.get('room_oid'), before, page_size + 1)
+        next_cursor = cls.encode_cursor(results[page_size - 1]) if len(results) > page_size else None
+        return results[:page_size], next_cursor
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from communications.di_container import init_container
+from communications.repositories.base import BaseChatsRepository
+
+
+class Command(BaseCommand):
+    help = ('Set the last activity and last message snippet, shown in the inbox, '
+            'on chat rooms created before they were maintained on write.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Rooms updated per bulk write')
+
+    def handle(self, *args, **options):
+        chats_repo = init_container().resolve(BaseChatsRepository)
+        updated = chats_repo.backfill_inbox(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {updated} chat rooms.'))
@@ -0,0 +1,95 @@
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from pymongo import MongoClient
+
+from communications.repositories.mongo import MongoDBMessageSearchRepositories
+
+
+class Command(BaseCommand):
+    help = ('Measure message search latency at scale. Fills a scratch search collection with '
+            'synthetic messages (words drawn from a Zipf-like vocabulary) between random users, '
+            'then times searches for words of messages of the searching user and for random words.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=1_000_000,
+                            help='Synthetic messages indexed')
+        parser.add_argument('--users', type=int, default=10_000,
+                            help='Users the messages are sent between')
+        parser.add_argument('--vocabulary', type=int, default=20_000,
+                            help='Distinct words of the messages')
+        parser.add_argument('--queries', type=int, default=500,
+                            help='Searches timed for each kind of query')
+        parser.add_argument('--batch-size', type=int, default=10_000,
+                            help='Index documents inserted per bulk write')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the scratch collection instead of dropping it')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        search_repo = MongoDBMessageSearchRepositories(
+            mongo_db_client=MongoClient(settings.MONGO_URI),
+            mongo_db_db_name=settings.MONGO_DB_NAME,
+            mongo_db_collection_name=f'{settings.MONGO_SEARCH_COLLECTION_NAME}_benchmark',
+        )
+        collection = search_repo._collection
+        collection.drop()
+        search_repo.ensure_indexes()
+
+        vocabulary = [f'word{rank}' for rank in range(options['vocabulary'])]
+        cum_weights = []
+        total = 0.0
+        for rank in range(1, len(vocabulary) + 1):
+            total += 1 / rank
+            cum_weights.append(total)
+
+        samples = []
+        sample_every = max(options['messages'] // options['queries'], 1)
+        started, batch = time.perf_counter(), []
+        created_at = datetime.now() - timedelta(days=365)
+        for index in range(options['messages']):
+            sender_id, receiver_id = rng.sample(range(1, options['users'] + 1), 2)
+            words = rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(3, 30))
+            created_at += timedelta(seconds=rng.randint(1, 60))
+            batch.append(search_repo.search_document(
+                f'room-{min(sender_id, receiver_id)}-{max(sender_id, receiver_id)}', str(uuid.uuid4()),
+                sender_id, receiver_id, created_at, ' '.join(words)))
+            if index % sample_every == 0:
+                samples.append((sender_id, words))
+            if len(batch) >= options['batch_size']:
+                collection.insert_many(batch, ordered=False)
+                batch = []
+        if batch:
+            collection.insert_many(batch, ordered=False)
+        self.stdout.write(f'Indexed {options["messages"]} messages in {time.perf_counter() - started:.1f}s')
+
+        stats = collection.database.command('collStats', collection.name)
+        self.stdout.write(f'Collection {stats["size"] / 2 ** 20:.1f} MiB, '
+                          f'indexes {stats["totalIndexSize"] / 2 ** 20:.1f} MiB')
+
+        queries = {
+            'one word of own message': [(user_id, rng.choice(words)) for user_id, words in samples],
+            'two words of own message': [(user_id, ' '.join(rng.sample(words, 2))) for user_id, words in samples],
+            'random word': [(rng.randint(1, options['users']), rng.choice(vocabulary)) for _ in samples],
+        }
+        for name, searches in queries.items():
+            durations, hits = [], 0
+            for user_id, text in searches:
+                query_started = time.perf_counter()
+                hits += bool(search_repo.search(user_id, text, limit=20))
+                durations.append((time.perf_counter() - query_started) * 1000)
+            durations.sort()
+            self.stdout.write(
+                f'{name}: p50 {statistics.median(durations):.2f} ms, '
+                f'p95 {durations[int(len(durations) * 0.95) - 1]:.2f} ms, '
+                f'p99 {durations[int(len(durations) * 0.99) - 1]:.2f} ms, '
+                f'max {durations[-1]:.2f} ms, {hits}/{len(searches)} with results')
+
+        if not options['keep']:
+            collection.drop()
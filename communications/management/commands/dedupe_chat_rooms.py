@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from communications.di_container import init_container
+from communications.repositories.base import BaseChatsRepository
+
+
+class Command(BaseCommand):
+    help = ('Merge chat rooms with the same participants and title into the oldest one, '
+            'then create the unique index which prevents new duplicates.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Rooms updated per bulk write and merged per update')
+
+    def handle(self, *args, **options):
+        chats_repo = init_container().resolve(BaseChatsRepository)
+        keyed, removed = chats_repo.dedupe_chatrooms(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Keyed {keyed} chat rooms, removed {removed} duplicates.'))
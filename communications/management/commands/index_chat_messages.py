@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from communications.di_container import init_container
+from communications.repositories.base import BaseMessageSearchRepository
+
+
+class Command(BaseCommand):
+    help = ('Add the messages of every chat room to the message search index, for messages '
+            'sent before it was maintained on write or after MESSAGE_SEARCH_KEY changed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Messages indexed per bulk write')
+
+    def handle(self, *args, **options):
+        search_repo = init_container().resolve(BaseMessageSearchRepository)
+        indexed = search_repo.reindex(settings.MONGO_COLLECTION_NAME, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} messages.'))
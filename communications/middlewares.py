@@ -1,10 +1,10 @@
 from urllib.parse import parse_qs
 from channels.auth import AuthMiddlewareStack
 from channels.db import database_sync_to_async
-from django.conf import settings
-from django.db import close_old_connections
-from jwt import InvalidSignatureError, ExpiredSignatureError, DecodeError
-from jwt import decode as jwt_decode
+from django.core.cache import cache
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
 
 
 class JWTAuthMiddleware:
@@ -15,33 +15,44 @@ class JWTAuthMiddleware:
         self.app = app
 
     async def __call__(self, scope, receive, send):
-        """Authenticate the user based on jwt."""
-        close_old_connections()
+        """Authenticate the user based on jwt.
+
+        Revoked tokens are rejected. The user is built from the token claims
+        when they are current, so most connections do not query the database.
+        Database access, when needed, goes through `database_sync_to_async`,
+        which also closes stale connections.
+        """
+        from django.contrib.auth.models import AnonymousUser  # Moved here
         try:
             # Decode the query string and get token parameter from it.
             token = parse_qs(scope["query_string"].decode("utf8")).get('token', [None])[0]
 
-            # Decode the token to get the user id from it.
-            data = jwt_decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+            # Validate the token (signature, expiry, token type).
+            payload = AccessToken(token).payload
 
-            # Get the user from database based on user id and add it to the scope.
-            scope['user'] = await self.get_user(data['user_id'])
-        except (TypeError, KeyError, InvalidSignatureError, ExpiredSignatureError, DecodeError):
+            scope['user'] = await self.get_user(payload)
+        except (TypeError, KeyError, TokenError):
             # Set the user to Anonymous if token is not valid or expired.
-            from django.contrib.auth.models import AnonymousUser  # Moved here
             scope['user'] = AnonymousUser()
         return await self.app(scope, receive, send)
 
-    @database_sync_to_async
-    def get_user(self, user_id):
-        """Return the user based on user id."""
-        from django.contrib.auth import get_user_model  # Moved here
-        User = get_user_model()
-        try:
-            return User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            from django.contrib.auth.models import AnonymousUser  # Moved here
+    async def get_user(self, payload):
+        """Return the user for the token payload."""
+        from django.contrib.auth.models import AnonymousUser  # Moved here
+        from users.authentication import get_claims_user, get_state_keys, load_user
+        from users.revocation import revocation_store
+
+        user_id = payload[api_settings.USER_ID_CLAIM]
+        state = await cache.aget_many(get_state_keys(payload))
+        if await revocation_store.ais_revoked(payload, state):
+            return AnonymousUser()
+
+        user = get_claims_user(payload, state)
+        if user is None:
+            user = await database_sync_to_async(load_user)(user_id)
+        if user is None or not user.is_active:
             return AnonymousUser()
+        return user
 
 
 def JWTAuthMiddlewareStack(app):
@@ -1,18 +1,19 @@
-import logging
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Optional, Mapping, Any, List
+from datetime import datetime
+from typing import Optional, Mapping, Any, List, Dict, Set, Tuple
 
 from cryptography.fernet import Fernet
 from django.conf import settings
 from pymongo import MongoClient
 from pymongo.synchronous.collection import Collection
 
-from communications.domain.entities.messages import ChatRoom, Message
+from communications.domain.entities.messages import ChatRoom, Message, ReadCursor
 from communications.domain.values.messages import Text
 from communications.repositories.filters import GetMessagesFilters
+from forum.utils.logging_utils import get_logger
 
-logger = logging.getLogger('django')
+logger = get_logger('django')
 
 cipher_suite = Fernet(settings.ENCRYPTION_KEY)
 
@@ -36,14 +37,17 @@ class BaseRepository(ABC):
             decrypted_message = Message(**message_data)
             return decrypted_message
         except Exception as e:
-            logger.error(f"Failed to decrypt message: {e}", exc_info=True)
+            logger.error("Failed to decrypt message: %s", e, exc_info=True)
             return None
 
 
 class BaseChatsRepository(BaseRepository):
     @abstractmethod
-    def create_chatroom(self, chatroom: ChatRoom) -> None:
-        """Create a new chatroom in the repository."""
+    def create_chatroom(self, chatroom: ChatRoom) -> Tuple[str, bool]:
+        """
+        Get or create the chatroom of the participants and title of `chatroom`.
+        Return the oid of the stored room and whether it was created.
+        """
         pass
 
     @abstractmethod
@@ -51,6 +55,20 @@ class BaseChatsRepository(BaseRepository):
         """Retrieve a chatroom by its room_oid. Return None if not found."""
         pass
 
+    @abstractmethod
+    def list_chatrooms(self, user_id: int, before: Optional[Tuple[datetime, str]] = None,
+                       limit: int = 20) -> List[dict]:
+        """
+        Retrieve the chatrooms of a user, most recently active first, with
+        their last message and the unread count of the user.
+        """
+        pass
+
+    @abstractmethod
+    def get_counterparts(self, user_id: int, user_ids: List[int]) -> Set[int]:
+        """Retrieve the ids, out of `user_ids`, of the users sharing a chatroom with the user."""
+        pass
+
 
 class BaseMessagesRepository(BaseRepository):
     @abstractmethod
@@ -66,3 +84,44 @@ class BaseMessagesRepository(BaseRepository):
     @abstractmethod
     def get_message_by_id(self, message_oid: str) -> Optional[Message]:
         pass
+
+
+class BaseReadCursorsRepository(BaseRepository):
+    @abstractmethod
+    def mark_read(self, room_oid: str, user_id: int, message_oid: str) -> Optional[int]:
+        """
+        Move the read cursor of a participant forward to a message and return
+        their unread count. Return None if the room or message is not found.
+        """
+        pass
+
+    @abstractmethod
+    def get_read_cursors(self, room_oid: str) -> Dict[int, ReadCursor]:
+        """Retrieve the read cursors of a chatroom by user id."""
+        pass
+
+    @abstractmethod
+    def get_unread_counts(self, user_id: int) -> Dict[str, int]:
+        """Retrieve the unread count of every chatroom of a user, by room oid."""
+        pass
+
+
+class BaseMessageSearchRepository(BaseRepository):
+    @abstractmethod
+    def index_message(self, room_oid: str, message: Message, text: str) -> None:
+        """Add the plain `text` of a message to the search index of its participants."""
+        pass
+
+    @abstractmethod
+    def search(self, user_id: int, text: str, room_oid: Optional[str] = None,
+               before: Optional[Tuple[datetime, str]] = None, limit: int = 20) -> List[dict]:
+        """
+        Retrieve the messages of a user's chats containing every word of
+        `text`, newest first, as {message_oid, room_oid, created_at}.
+        """
+        pass
+
+    @abstractmethod
+    def move_messages(self, message_oids: List[str], room_oid: str) -> None:
+        """Point the index entries of messages moved to another chatroom to that room."""
+        pass
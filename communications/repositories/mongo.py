@@ -1,29 +1,140 @@
-import logging
+import hashlib
+import hmac
+import re
 from dataclasses import dataclass
-from typing import Optional
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
 
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, InvalidToken
 from django.conf import settings
-from pymongo.errors import PyMongoError
+from pymongo import ASCENDING, DESCENDING, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure, PyMongoError
 
-from communications.domain.entities.messages import ChatRoom, Message
-from .base import BaseMessagesRepository, BaseChatsRepository
+from communications.domain.entities.messages import ChatRoom, Message, ReadCursor
+from communications.domain.exceptions.messages import ChatRoomNotCreatedException
+from forum.utils.logging_utils import get_logger
+from .base import (
+    BaseMessagesRepository, BaseChatsRepository, BaseReadCursorsRepository, BaseMessageSearchRepository,
+)
 from .filters import GetMessagesFilters
 
-logger = logging.getLogger('django')
+logger = get_logger('django')
 
 cipher_suite = Fernet(settings.ENCRYPTION_KEY)
 
+# Key of the blind index of message words, derived from the encryption key unless set
+search_key = (settings.MESSAGE_SEARCH_KEY or hmac.new(
+    str(settings.ENCRYPTION_KEY).encode(), b'message-search', hashlib.sha256).hexdigest()).encode()
+
+# Participant-first indexes serving the inbox (newest activity first) and unread counts
+CHAT_INDEXES = (
+    [("sender_id", ASCENDING), ("last_activity", DESCENDING), ("oid", DESCENDING)],
+    [("receiver_id", ASCENDING), ("last_activity", DESCENDING), ("oid", DESCENDING)],
+)
+# One room per normalized participant pair and title. Partial, so rooms
+# stored before these keys existed do not collide (see dedupe_chat_rooms)
+UNIQUE_ROOM_INDEX = [("participant_pair", ASCENDING), ("title_key", ASCENDING)]
+_indexed_collections = set()
+
+
+def ensure_chat_indexes(collection):
+    """Create the chatroom indexes once per process (create_index is idempotent)."""
+    if collection.full_name not in _indexed_collections:
+        for keys in CHAT_INDEXES:
+            collection.create_index(keys)
+        create_unique_room_index(collection)
+        _indexed_collections.add(collection.full_name)
+
+
+def create_unique_room_index(collection) -> bool:
+    try:
+        collection.create_index(UNIQUE_ROOM_INDEX, name='unique_room', unique=True,
+                                partialFilterExpression={"participant_pair": {"$exists": True}})
+        return True
+    except OperationFailure as e:
+        logger.error("Unique chatroom index not created, duplicates must be removed with "
+                     "dedupe_chat_rooms: %s", e)
+        return False
+
+
+def room_key(sender_id: int, receiver_id: int, title) -> dict:
+    """Normalized participant pair (either order) and title (case and spacing) of a room."""
+    low, high = sorted((sender_id, receiver_id))
+    return {
+        "participant_pair": f"{low}:{high}",
+        "title_key": " ".join(str(getattr(title, 'value', title)).split()).casefold(),
+    }
+
+
+def after_read_cursor(created_at, message_oid) -> dict:
+    """
+    Condition of a $filter over the messages ($$message): the message comes
+    after the read cursor at (created_at, message_oid), the order of the
+    messages shared by the cursors and the unread counts.
+    """
+    return {"$or": [
+        {"$gt": ["$$message.created_at", created_at]},
+        {"$and": [{"$eq": ["$$message.created_at", created_at]}, {"$gt": ["$$message.oid", message_oid]}]},
+    ]}
+
+
+def unread_count(user_id: int) -> dict:
+    """
+    Expression of the number of messages of a room sent to the user after
+    their read cursor (all of them without a cursor).
+    """
+    cursor = f"$read_cursors.{user_id}"
+    return {"$size": {"$filter": {
+        "input": "$messages",
+        "as": "message",
+        "cond": {"$and": [
+            after_read_cursor({"$ifNull": [f"{cursor}.created_at", datetime.min]},
+                              {"$ifNull": [f"{cursor}.message_oid", ""]}),
+            {"$ne": ["$$message.sender_id", user_id]},
+        ]},
+    }}}
+
+
+def participant_filter(user_id: int, **conditions) -> dict:
+    """Filter on the chatrooms of a user; each branch of the $or uses one of CHAT_INDEXES."""
+    return {"$or": [{"sender_id": user_id, **conditions}, {"receiver_id": user_id, **conditions}]}
+
 
 @dataclass
 class MongoDBChatsRepositories(BaseChatsRepository):
+    search_repo: Optional[BaseMessageSearchRepository] = None
 
-    def create_chatroom(self, chatroom: ChatRoom):
+    def create_chatroom(self, chatroom: ChatRoom) -> Tuple[str, bool]:
+        """
+        Upsert on the unique room key, so concurrent and repeated requests
+        for the same participants and title get the same room.
+        """
+        key = room_key(chatroom.sender_id, chatroom.receiver_id, chatroom.title)
+        document = {**chatroom.__dict__, "last_activity": chatroom.created_at}
         try:
-            self._collection.insert_one(chatroom.__dict__)
-            logger.info(f"Chatroom created successfully with ID: {chatroom.oid}")
+            ensure_chat_indexes(self._collection)
+            try:
+                room = self._upsert_chatroom(key, document)
+            except DuplicateKeyError:
+                # A concurrent upsert inserted the room between our match and insert
+                room = self._upsert_chatroom(key, document)
         except PyMongoError as e:
-            logger.error(f"Error creating chatroom: {e}", exc_info=True)
+            logger.error("Error creating chatroom: %s", e, exc_info=True)
+            raise ChatRoomNotCreatedException() from e
+
+        created = room['oid'] == chatroom.oid
+        if created:
+            logger.info("Chatroom created successfully with ID: %s", chatroom.oid)
+        return room['oid'], created
+
+    def _upsert_chatroom(self, key: dict, document: dict) -> dict:
+        return self._collection.find_one_and_update(
+            key,
+            {"$setOnInsert": document},
+            projection={"_id": 0, "oid": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
 
     def get_chatroom(self, room_oid: str) -> Optional[ChatRoom]:
         try:
@@ -37,21 +148,203 @@ class MongoDBChatsRepositories(BaseChatsRepository):
                     receiver_id=data.get('receiver_id'),
                     messages=messages
                 )
-                logger.info(f"Chatroom retrieved successfully: {chatroom}")
+                logger.info("Chatroom %s retrieved successfully", room_oid, messages=len(messages))
                 return chatroom
 
-            logger.warning(f"Chatroom with ID: {room_oid} not found.")
+            logger.warning("Chatroom with ID: %s not found.", room_oid)
             return None
         except PyMongoError as e:
-            logger.error(f"Error retrieving chatroom: {e}", exc_info=True)
+            logger.error("Error retrieving chatroom: %s", e, exc_info=True)
             return None
 
+    def list_chatrooms(self, user_id: int, before: Optional[Tuple[datetime, str]] = None,
+                       limit: int = 20) -> List[dict]:
+        """
+        Rooms are read from the participant indexes in (last_activity, oid)
+        order, without their messages; `before` is the keyset of the last
+        room of the previous page.
+        """
+        conditions = {}
+        if before is not None:
+            last_activity, oid = before
+            conditions = {"$or": [{"last_activity": {"$lt": last_activity}},
+                                  {"last_activity": last_activity, "oid": {"$lt": oid}}]}
+        try:
+            ensure_chat_indexes(self._collection)
+            rooms = self._collection.find(
+                participant_filter(user_id, **conditions),
+                {"_id": 0, "oid": 1, "title": 1, "sender_id": 1, "receiver_id": 1,
+                 "last_activity": 1, "last_message": 1, f"unread.{user_id}": 1},
+            ).sort([("last_activity", DESCENDING), ("oid", DESCENDING)]).limit(limit)
+            return [self._inbox_entry(room, user_id) for room in rooms]
+        except PyMongoError as e:
+            logger.error("Error listing chatrooms of user %s: %s", user_id, e, exc_info=True)
+            return []
+
+    def get_counterparts(self, user_id: int, user_ids: List[int]) -> Set[int]:
+        """Each branch of the filter is served by one of CHAT_INDEXES."""
+        try:
+            ensure_chat_indexes(self._collection)
+            rooms = self._collection.find(
+                {"$or": [{"sender_id": user_id, "receiver_id": {"$in": user_ids}},
+                         {"receiver_id": user_id, "sender_id": {"$in": user_ids}}]},
+                {"_id": 0, "sender_id": 1, "receiver_id": 1},
+            )
+            return {room['receiver_id'] if room['sender_id'] == user_id else room['sender_id'] for room in rooms}
+        except PyMongoError as e:
+            logger.error("Error retrieving the chat counterparts of user %s: %s", user_id, e, exc_info=True)
+            return set()
+
+    def backfill_inbox(self, batch_size: int = 500) -> int:
+        """Set last_activity and last_message on rooms created before they were maintained."""
+        updated = 0
+        requests = []
+        rooms = self._collection.find(
+            {"last_activity": {"$exists": False}},
+            {"_id": 0, "oid": 1, "created_at": 1, "messages": {"$slice": -1}},
+        )
+        for room in rooms:
+            fields = {"last_activity": room.get('created_at')}
+            if room.get('messages'):
+                message = room['messages'][-1]
+                snippet = cipher_suite.decrypt(message['content']).decode()[:settings.INBOX_SNIPPET_LENGTH]
+                fields['last_activity'] = message['created_at']
+                fields['last_message'] = {
+                    "oid": message['oid'],
+                    "sender_id": message['sender_id'],
+                    "snippet": cipher_suite.encrypt(snippet.encode()),
+                    "created_at": message['created_at'],
+                }
+            # Skips rooms which got a message since they were read
+            requests.append(UpdateOne({"oid": room['oid'], "last_activity": {"$exists": False}}, {"$set": fields}))
+            if len(requests) >= batch_size:
+                updated += self._collection.bulk_write(requests, ordered=False).modified_count
+                requests = []
+        if requests:
+            updated += self._collection.bulk_write(requests, ordered=False).modified_count
+        return updated
+
+    def dedupe_chatrooms(self, batch_size: int = 500) -> Tuple[int, int]:
+        """
+        Store the room key on rooms created before it was, merge the rooms
+        sharing a key into the oldest one and create the unique room index.
+        Return the number of rooms keyed and of duplicates removed.
+        """
+        keyed = 0
+        requests = []
+        rooms = self._collection.find(
+            {"participant_pair": {"$exists": False}},
+            {"_id": 0, "oid": 1, "sender_id": 1, "receiver_id": 1, "title": 1},
+        )
+        for room in rooms:
+            requests.append(UpdateOne(
+                {"oid": room['oid']}, {"$set": room_key(room['sender_id'], room['receiver_id'], room['title'])}))
+            if len(requests) >= batch_size:
+                keyed += self._collection.bulk_write(requests, ordered=False).modified_count
+                requests = []
+        if requests:
+            keyed += self._collection.bulk_write(requests, ordered=False).modified_count
+
+        removed = 0
+        groups = self._collection.aggregate([
+            {"$match": {"participant_pair": {"$exists": True}}},
+            {"$group": {"_id": {"pair": "$participant_pair", "title": "$title_key"},
+                        "rooms": {"$push": {"oid": "$oid", "created_at": "$created_at"}}}},
+            {"$match": {"rooms.1": {"$exists": True}}},
+        ], allowDiskUse=True)
+        for group in groups:
+            kept, *duplicates = sorted(group['rooms'], key=lambda room: (room['created_at'], room['oid']))
+            removed += self._merge_chatrooms(kept['oid'], [room['oid'] for room in duplicates], batch_size)
+
+        create_unique_room_index(self._collection)
+        return keyed, removed
+
+    def _merge_chatrooms(self, kept_oid: str, duplicate_oids: List[str], batch_size: int) -> int:
+        """
+        Move the messages of the duplicates into the kept room, in batches of
+        rooms, then delete them. Each user keeps their latest read cursor, in
+        (created_at, message_oid) order, of the merged rooms, and unread counts
+        are recomputed from the merged messages and cursors rather than summed,
+        which would count again the messages read in another of the rooms.
+        Search index entries of the moved messages are pointed to the kept room.
+        """
+        removed = 0
+        for start in range(0, len(duplicate_oids), batch_size):
+            oids = duplicate_oids[start:start + batch_size]
+            kept = self._collection.find_one(
+                {"oid": kept_oid}, {"_id": 0, "sender_id": 1, "receiver_id": 1, "read_cursors": 1, "unread": 1})
+            cursors = dict(kept.get('read_cursors', {}))
+            users = {str(kept['sender_id']), str(kept['receiver_id']), *kept.get('unread', {})}
+            messages, moved_cursors, last_activity, last_message = [], {}, None, None
+            for room in self._collection.find({"oid": {"$in": oids}}, {"_id": 0}):
+                messages.extend(room.get('messages', []))
+                users.update(room.get('unread', {}))
+                for user_id, cursor in room.get('read_cursors', {}).items():
+                    current = cursors.get(user_id)
+                    if current is None or ((cursor['created_at'], cursor['message_oid'])
+                                           > (current['created_at'], current['message_oid'])):
+                        cursors[user_id] = moved_cursors[user_id] = cursor
+                if room.get('last_activity') and (last_activity is None or room['last_activity'] > last_activity):
+                    last_activity, last_message = room['last_activity'], room.get('last_message')
+            users.update(cursors)
+
+            update = {"$push": {"messages": {"$each": messages, "$sort": {"created_at": ASCENDING, "oid": ASCENDING}}}}
+            if moved_cursors:
+                update["$set"] = {f"read_cursors.{user_id}": cursor for user_id, cursor in moved_cursors.items()}
+            if last_activity is not None:
+                update["$max"] = {"last_activity": last_activity}
+            self._collection.update_one({"oid": kept_oid}, update)
+            self._collection.update_one(
+                {"oid": kept_oid},
+                [{"$set": {f"unread.{user_id}": unread_count(int(user_id)) for user_id in users}}],
+            )
+            if self.search_repo is not None and messages:
+                self.search_repo.move_messages([message['oid'] for message in messages], kept_oid)
+            if last_message is not None:
+                self._collection.update_one(
+                    {"oid": kept_oid, "$or": [{"last_message": {"$exists": False}},
+                                              {"last_message.created_at": {"$lt": last_message['created_at']}}]},
+                    {"$set": {"last_message": last_message}},
+                )
+            removed += self._collection.delete_many({"oid": {"$in": oids}}).deleted_count
+            logger.info("Merged %s duplicate chatrooms into %s", len(oids), kept_oid)
+        return removed
+
+    @staticmethod
+    def _inbox_entry(room: dict, user_id: int) -> dict:
+        last_message = room.get('last_message')
+        if last_message is not None:
+            try:
+                snippet = cipher_suite.decrypt(last_message['snippet']).decode()
+            except InvalidToken:
+                logger.error("Failed to decrypt last message snippet of chatroom %s", room['oid'])
+                snippet = None
+            last_message = {**last_message, 'snippet': snippet}
+        return {
+            'oid': room['oid'],
+            'title': room.get('title'),
+            'sender_id': room.get('sender_id'),
+            'receiver_id': room.get('receiver_id'),
+            'last_activity': room.get('last_activity'),
+            'last_message': last_message,
+            'unread': room.get('unread', {}).get(str(user_id), 0),
+        }
+
 
 @dataclass
 class MongoDBMessagesRepositories(BaseMessagesRepository):
+    search_repo: Optional[BaseMessageSearchRepository] = None
+
     def create_message(self, room_oid: str, message: Message):
+        """
+        Push the message to the chatroom, count it as unread for the receiver,
+        move the read cursor of the sender to it and make it the last message
+        shown in the inbox, in one update. Then add it to the search index.
+        """
+        text = message.content.as_generic_type()
+        snippet = text[:settings.INBOX_SNIPPET_LENGTH]
         message_dict = message.__dict__
-        logger.info(f"Adding message to chatroom ID: {room_oid} - Message: {message.oid}")
+        logger.info("Adding message to chatroom ID: %s - Message: %s", room_oid, message.oid)
         message_dict['content'] = cipher_suite.encrypt(
             message.content.as_generic_type().encode()
         )
@@ -59,15 +352,35 @@ class MongoDBMessagesRepositories(BaseMessagesRepository):
         try:
             result = self._collection.update_one(
                 {"oid": room_oid},
-                {"$push": {"messages": message_dict}}
+                {
+                    "$push": {"messages": message_dict},
+                    "$inc": {f"unread.{message.receiver_id}": 1},
+                    "$set": {
+                        f"read_cursors.{message.sender_id}": {
+                            "message_oid": message.oid,
+                            "created_at": message.created_at,
+                            "read_at": datetime.now(),
+                        },
+                        f"unread.{message.sender_id}": 0,
+                        "last_activity": message.created_at,
+                        "last_message": {
+                            "oid": message.oid,
+                            "sender_id": message.sender_id,
+                            "snippet": cipher_suite.encrypt(snippet.encode()),
+                            "created_at": message.created_at,
+                        },
+                    },
+                }
             )
 
             if result.modified_count > 0:
                 logger.info("Message added successfully.")
+                if self.search_repo is not None:
+                    self.search_repo.index_message(room_oid, message, text)
             else:
-                logger.warning(f"Failed to add message to chatroom ID: {room_oid}. Room may not exist.")
+                logger.warning("Failed to add message to chatroom ID: %s. Room may not exist.", room_oid)
         except PyMongoError as e:
-            logger.error(f"Error adding message to chatroom ID {room_oid}: {e}", exc_info=True)
+            logger.error("Error adding message to chatroom ID %s: %s", room_oid, e, exc_info=True)
 
     def get_messages(self, room_oid: str, filters: GetMessagesFilters) -> list[Message]:
         """Retrieve messages for a specific chat room with pagination using filters."""
@@ -79,7 +392,7 @@ class MongoDBMessagesRepositories(BaseMessagesRepository):
             messages = [Message(**message) for message in cursor]
             return messages
         except PyMongoError as e:
-            logger.error(f"Failed to retrieve messages for chat room with ID {room_oid}: {e}", exc_info=True)
+            logger.error("Failed to retrieve messages for chat room with ID %s: %s", room_oid, e, exc_info=True)
             return []
 
     def get_message_by_id(self, message_id: str) -> Optional[Message]:
@@ -98,12 +411,180 @@ class MongoDBMessagesRepositories(BaseMessagesRepository):
             if message_data:
                 message_data['content'] = cipher_suite.decrypt(message_data['content']).decode()
                 message = Message(**message_data)
-                logger.info(f"Message with ID {message_id} retrieved successfully.")
+                logger.info("Message with ID %s retrieved successfully.", message_id)
                 return message
 
-            logger.warning(f"Message with ID {message_id} not found.")
+            logger.warning("Message with ID %s not found.", message_id)
+            return None
+
+        except PyMongoError as e:
+            logger.error("Error retrieving message with ID %s: %s", message_id, e, exc_info=True)
             return None
 
+
+@dataclass
+class MongoDBReadCursorsRepositories(BaseReadCursorsRepository):
+    """
+    Read cursors are kept in the chatroom document as
+    `read_cursors.<user id>` = {message_oid, created_at, read_at}, next to
+    `unread.<user id>` counters which `create_message` increments. Reading
+    never rewrites the messages array, and unread counts of all the rooms of
+    a user come from a projection of the counters.
+    """
+
+    def mark_read(self, room_oid: str, user_id: int, message_oid: str) -> Optional[int]:
+        cursor, unread = f"read_cursors.{user_id}", f"unread.{user_id}"
+        try:
+            room = self._collection.find_one(
+                {"oid": room_oid, "messages.oid": message_oid, **participant_filter(user_id)},
+                {"_id": 0, "messages.$": 1},
+            )
+            if not room:
+                logger.warning("Message %s not found in chatroom %s for user %s.", message_oid, room_oid, user_id)
+                return None
+            created_at = room['messages'][0]['created_at']
+
+            # Only moves forward in (created_at, oid) order, so messages sent
+            # at the same time are read in turn; the unread count is recomputed
+            # on the server from the messages after the cursor, without sending them back
+            result = self._collection.find_one_and_update(
+                {"oid": room_oid, "$or": [{cursor: {"$exists": False}},
+                                          {f"{cursor}.created_at": {"$lt": created_at}},
+                                          {f"{cursor}.created_at": created_at,
+                                           f"{cursor}.message_oid": {"$lt": message_oid}}]},
+                [{"$set": {
+                    cursor: {
+                        "message_oid": {"$literal": message_oid},
+                        "created_at": created_at,
+                        "read_at": "$$NOW",
+                    },
+                    unread: {"$size": {"$filter": {
+                        "input": "$messages",
+                        "as": "message",
+                        "cond": {"$and": [
+                            after_read_cursor(created_at, {"$literal": message_oid}),
+                            {"$ne": ["$$message.sender_id", user_id]},
+                        ]},
+                    }}},
+                }}],
+                projection={"_id": 0, unread: 1},
+                return_document=ReturnDocument.AFTER,
+            )
+            if result is None:
+                result = self._collection.find_one({"oid": room_oid}, {"_id": 0, unread: 1})
+            logger.info("Read cursor of user %s in chatroom %s moved to %s.", user_id, room_oid, message_oid)
+            return result.get('unread', {}).get(str(user_id), 0)
         except PyMongoError as e:
-            logger.error(f"Error retrieving message with ID {message_id}: {e}", exc_info=True)
+            logger.error("Error marking chatroom %s read for user %s: %s", room_oid, user_id, e, exc_info=True)
             return None
+
+    def get_read_cursors(self, room_oid: str) -> Dict[int, ReadCursor]:
+        try:
+            data = self._collection.find_one({"oid": room_oid}, {"_id": 0, "read_cursors": 1}) or {}
+        except PyMongoError as e:
+            logger.error("Error retrieving read cursors of chatroom %s: %s", room_oid, e, exc_info=True)
+            return {}
+        return {int(user_id): ReadCursor(**cursor) for user_id, cursor in data.get('read_cursors', {}).items()}
+
+    def get_unread_counts(self, user_id: int) -> Dict[str, int]:
+        try:
+            ensure_chat_indexes(self._collection)
+            rooms = self._collection.find(participant_filter(user_id), {"_id": 0, "oid": 1, f"unread.{user_id}": 1})
+            return {room['oid']: room.get('unread', {}).get(str(user_id), 0) for room in rooms}
+        except PyMongoError as e:
+            logger.error("Error retrieving unread counts of user %s: %s", user_id, e, exc_info=True)
+            return {}
+
+
+def search_tokens(user_id: int, text: str) -> List[bytes]:
+    """
+    Blind index tokens of the words of `text` for one user: truncated HMACs
+    of the user id and the casefolded word, so the index holds no plaintext
+    and the tokens of a word differ between users.
+    """
+    words = dict.fromkeys(re.findall(r'\w{%d,}' % settings.MESSAGE_SEARCH_MIN_WORD_LENGTH, text.casefold()))
+    return [hmac.new(search_key, f"{user_id}:{word}".encode(), hashlib.sha256).digest()[:16] for word in words]
+
+
+@dataclass
+class MongoDBMessageSearchRepositories(BaseMessageSearchRepository):
+    """
+    Search index of the messages, in its own collection: one document per
+    message holding the blind index tokens of its words for each participant,
+    with a multikey index on the tokens followed by the (created_at, oid)
+    keyset. A search is exact-word and matches all the words of the query.
+    """
+
+    @staticmethod
+    def search_document(room_oid: str, message_oid: str, sender_id: int, receiver_id: int,
+                        created_at: datetime, text: str) -> dict:
+        tokens = search_tokens(sender_id, text)
+        if receiver_id != sender_id:
+            tokens += search_tokens(receiver_id, text)
+        return {"oid": message_oid, "room_oid": room_oid, "created_at": created_at, "tokens": tokens}
+
+    def ensure_indexes(self):
+        if self._collection.full_name not in _indexed_collections:
+            self._collection.create_index([("tokens", ASCENDING), ("created_at", DESCENDING), ("oid", DESCENDING)])
+            self._collection.create_index("oid", unique=True)
+            _indexed_collections.add(self._collection.full_name)
+
+    def index_message(self, room_oid: str, message: Message, text: str) -> None:
+        document = self.search_document(
+            room_oid, message.oid, message.sender_id, message.receiver_id, message.created_at, text)
+        try:
+            self.ensure_indexes()
+            self._collection.replace_one({"oid": message.oid}, document, upsert=True)
+        except PyMongoError as e:
+            # The message is stored; it is indexed again by index_chat_messages
+            logger.error("Error indexing message %s for search: %s", message.oid, e, exc_info=True)
+
+    def search(self, user_id: int, text: str, room_oid: Optional[str] = None,
+               before: Optional[Tuple[datetime, str]] = None, limit: int = 20) -> List[dict]:
+        tokens = search_tokens(user_id, text)
+        if not tokens:
+            return []
+        query = {"tokens": {"$all": tokens}}
+        if room_oid is not None:
+            query["room_oid"] = room_oid
+        if before is not None:
+            created_at, oid = before
+            query["$or"] = [{"created_at": {"$lt": created_at}}, {"created_at": created_at, "oid": {"$lt": oid}}]
+        try:
+            self.ensure_indexes()
+            documents = self._collection.find(
+                query, {"_id": 0, "oid": 1, "room_oid": 1, "created_at": 1},
+            ).sort([("created_at", DESCENDING), ("oid", DESCENDING)]).limit(limit)
+            return [{"message_oid": document['oid'], "room_oid": document['room_oid'],
+                     "created_at": document['created_at']} for document in documents]
+        except PyMongoError as e:
+            logger.error("Error searching messages of user %s: %s", user_id, e, exc_info=True)
+            return []
+
+    def move_messages(self, message_oids: List[str], room_oid: str) -> None:
+        self._collection.update_many({"oid": {"$in": message_oids}}, {"$set": {"room_oid": room_oid}})
+
+    def reindex(self, chats_collection_name: str, batch_size: int = 500) -> int:
+        """Index the messages of every chatroom (of `chats_collection_name`); return their number."""
+        self.ensure_indexes()
+        chats = self.mongo_db_client[self.mongo_db_db_name][chats_collection_name]
+        indexed = 0
+        requests = []
+        for room in chats.find({}, {"_id": 0, "oid": 1, "messages": 1}):
+            for message in room.get('messages', []):
+                try:
+                    text = cipher_suite.decrypt(message['content']).decode()
+                except InvalidToken:
+                    logger.error("Failed to decrypt message %s of chatroom %s", message['oid'], room['oid'])
+                    continue
+                document = self.search_document(room['oid'], message['oid'], message['sender_id'],
+                                                message['receiver_id'], message['created_at'], text)
+                requests.append(ReplaceOne({"oid": message['oid']}, document, upsert=True))
+                if len(requests) >= batch_size:
+                    self._collection.bulk_write(requests, ordered=False)
+                    indexed += len(requests)
+                    requests = []
+        if requests:
+            self._collection.bulk_write(requests, ordered=False)
+            indexed += len(requests)
+        return indexed
@@ -1,4 +1,5 @@
 import bleach
+from django.conf import settings
 from rest_framework import serializers
 from communications.domain.entities.messages import Message, ChatRoom
 from communications.domain.values.messages import Text
@@ -45,12 +46,35 @@ class ChatRoomSerializer(serializers.Serializer):
     receiver_id = serializers.IntegerField()
 
     def create(self, validated_data):
-        """Create a new ChatRoom instance and save it to MongoDB"""
+        """
+        Get or create the ChatRoom in MongoDB; return the oid of the stored
+        room and whether it was created.
+        """
         mongo_chats_repo = self.context.get('mongo_chats_repo')
         if mongo_chats_repo is None:
             raise serializers.ValidationError("Database repository not provided in serializer context.")
 
         chat_room = ChatRoom(**validated_data)
-        mongo_chats_repo.create_chatroom(chat_room)
+        return mongo_chats_repo.create_chatroom(chat_room)
 
-        return chat_room
+
+class ReadCursorSerializer(serializers.Serializer):
+    """Serializer for the message a user has read up to in a chat room"""
+    message_oid = serializers.CharField(max_length=64)
+
+
+class MessageSearchSerializer(serializers.Serializer):
+    """Serializer for a search of the messages of the user's chats, optionally in one room"""
+    q = serializers.CharField(max_length=200)
+    room_oid = serializers.CharField(max_length=64, required=False)
+    cursor = serializers.CharField(required=False)
+    page_size = serializers.IntegerField(min_value=1, max_value=50, default=20)
+
+
+class PresenceQuerySerializer(serializers.Serializer):
+    """Serializer for the users of a presence query (e.g. the counterparts of a chat list)"""
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=settings.PRESENCE_QUERY_MAX_USERS,
+    )
@@ -1,9 +1,10 @@
 from dataclasses import dataclass
+from typing import Optional
 
 from communications.domain.values.messages import Text
 from communications.events.base import BaseEvent
 from communications.domain.entities.messages import ChatRoom, Message
-from communications.repositories.base import BaseChatsRepository, BaseMessagesRepository
+from communications.repositories.base import BaseChatsRepository, BaseMessagesRepository, BaseReadCursorsRepository
 from communications.services.commands.base import BaseCommand
 from communications.services.queries.messages import ChatRoomQuery
 
@@ -13,7 +14,7 @@ class CreateChatCommand(BaseCommand):
     mongo_repo: BaseChatsRepository
 
     async def handle(self, chat_room: ChatRoom):
-        self.mongo_repo.create_chatroom(chat_room)
+        return self.mongo_repo.create_chatroom(chat_room)
 
 
 @dataclass(frozen=True)
@@ -39,3 +40,11 @@ class CreateMessageCommand(BaseCommand):
 
         return message
 
+
+@dataclass(frozen=True)
+class MarkReadCommand(BaseCommand):
+    mongo_repo: BaseReadCursorsRepository
+
+    def handle(self, user_id: int, room_oid: str, message_oid: str) -> Optional[int]:
+        """Move the read cursor of the user to the message; return their unread count."""
+        return self.mongo_repo.mark_read(room_oid, user_id, message_oid)
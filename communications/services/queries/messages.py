@@ -1,9 +1,9 @@
 import logging
 from dataclasses import dataclass
-from typing import Optional
+from typing import Dict, Optional
 
 from communications.domain.entities.messages import ChatRoom, Message
-from communications.repositories.base import BaseChatsRepository, BaseMessagesRepository
+from communications.repositories.base import BaseChatsRepository, BaseMessagesRepository, BaseReadCursorsRepository
 from communications.repositories.filters import GetMessagesFilters
 from communications.services.queries.base import BaseQuery
 
@@ -28,3 +28,12 @@ class MessageQuery(BaseQuery):
         """Retrieve all messages for a specific chat room."""
         messages = self.mongo_repo.get_messages(room_oid, filters)
         return messages
+
+
+@dataclass
+class UnreadCountsQuery(BaseQuery):
+    mongo_repo: BaseReadCursorsRepository
+
+    def handle(self, user_id: int) -> Dict[str, int]:
+        """Retrieve the unread count of every chat room of a user."""
+        return self.mongo_repo.get_unread_counts(user_id)
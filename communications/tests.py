@@ -1,7 +1,14 @@
+from base64 import urlsafe_b64encode
+from datetime import datetime, timedelta
+from unittest import skipUnless
+from unittest.mock import ANY
+
 from channels.db import database_sync_to_async
 from channels.testing import WebsocketCommunicator
-from django.test import TransactionTestCase
-from django.contrib.auth.models import AnonymousUser
+from django.conf import settings
+from django.test import SimpleTestCase, TransactionTestCase
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
 from investors.models import InvestorProfile
 from startups.models import StartUpProfile
 from users.models import User
@@ -10,139 +17,157 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from common.presence import PresenceService
 from .di_container import init_container
+from .logic import InboxService
 from .domain.entities.messages import ChatRoom, Message
+from .domain.values.messages import Text
+from .repositories.base import (
+    BaseChatsRepository, BaseMessagesRepository, BaseReadCursorsRepository, BaseMessageSearchRepository,
+)
+from .repositories.mongo import search_tokens
+
+
+def mongo_available():
+    try:
+        MongoClient(settings.MONGO_URI, serverSelectionTimeoutMS=500).admin.command('ping')
+        return True
+    except PyMongoError:
+        return False
+
 
+requires_mongo = skipUnless(mongo_available(), f'MongoDB is not reachable at {settings.MONGO_URI}')
+
+
+class MongoTestMixin:
+    """
+    Repositories of the container. Rooms passed to `remove_after_test` are
+    deleted, with their search index entries, when the test ends.
+    """
+    container = init_container()
+    chats_repo = container.resolve(BaseChatsRepository)
+    messages_repo = container.resolve(BaseMessagesRepository)
+    read_cursors_repo = container.resolve(BaseReadCursorsRepository)
+    search_repo = container.resolve(BaseMessageSearchRepository)
 
-class ChatConsumerTest(TransactionTestCase):
+    def remove_after_test(self, room_oid):
+        self.addCleanup(self.search_repo._collection.delete_many, {"room_oid": room_oid})
+        self.addCleanup(self.chats_repo._collection.delete_one, {"oid": room_oid})
 
-    async def asyncSetUp(self):
 
-        self.user1 = await database_sync_to_async(User.objects.create_user)(
+@requires_mongo
+class ChatConsumerTest(MongoTestMixin, TransactionTestCase):
+
+    def setUp(self):
+        self.user1 = User.objects.create_user(
             email="johnson@gmail.com",
             password="123456pok&*gebBCBDHD_t4ng",
             first_name="John",
             last_name="Doe",
             user_phone="+1234567890"
         )
-        await database_sync_to_async(self.user1.add_role)('Investor')
-
-        self.user2 = await database_sync_to_async(User.objects.create_user)(
+        self.user2 = User.objects.create_user(
             email="linel@gmail.com",
             password="12345qfenjoubfjkUHEFWHF9_6pok",
             first_name="Lim",
             last_name="Non",
             user_phone="+1234567890"
         )
-        await database_sync_to_async(self.user2.add_role)('Startup')
-
-        await database_sync_to_async(InvestorProfile.objects.create)(user=self.user1)
-
-        self.chat_name = 'test_chat_room'
+        self.outsider = User.objects.create_user(
+            email="outsider@gmail.com",
+            password="12345qfenjoubfjkUHEFWHF9_6pok",
+            first_name="Out",
+            last_name="Sider",
+            user_phone="+1234567890"
+        )
+        self.chat_room = ChatRoom(title='Consumer chat', sender_id=self.user1.id, receiver_id=self.user2.id)
+        self.chats_repo.create_chatroom(self.chat_room)
+        self.remove_after_test(self.chat_room.oid)
 
-    async def get_communicator(self, user):
-        communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), f"/ws/chat/{self.chat_name}/")
+    def get_communicator(self, user):
+        communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), f"/ws/chat/{self.chat_room.oid}/")
         communicator.scope['user'] = user
-        communicator.scope['url_route'] = {'kwargs': {'room_name': self.chat_name}}
+        communicator.scope['url_route'] = {'kwargs': {'room_oid': self.chat_room.oid}}
         return communicator
 
-    async def test_create_chat_room(self):
-        await self.asyncSetUp()
-
-        chat_room = ChatRoom(room_id=self.chat_name, startup_id=self.user1.id, investor_id=self.user2.id)
-        await database_sync_to_async(mongo_container.create_chatroom)(chat_room)
-
-        created_chat_room = await database_sync_to_async(mongo_container.get_chatroom)(self.chat_name)
-        self.assertIsNotNone(created_chat_room, "Chat room was not created successfully.")
-
     async def test_connect_to_chat(self):
-        await self.asyncSetUp()
-
-        communicator = await self.get_communicator(self.user1)
+        communicator = self.get_communicator(self.user1)
         connected, _ = await communicator.connect()
-        assert connected, "Failed to connect to the chat."
+        self.assertTrue(connected, "Failed to connect to the chat.")
 
-    async def test_connect_unauthenticated_user(self):
-        await self.asyncSetUp()
+        await communicator.disconnect()
 
-        communicator = await self.get_communicator(AnonymousUser())
+    async def test_connect_not_participant(self):
+        communicator = self.get_communicator(self.outsider)
         connected, _ = await communicator.connect()
-        self.assertFalse(connected, "Unauthenticated user was able to connect to the chat.")
-
-        await communicator.disconnect()
+        self.assertFalse(connected, "A user outside the chat room was able to connect to the chat.")
 
     async def test_receive_message(self):
-        await self.asyncSetUp()
-
-        communicator1 = await self.get_communicator(self.user1)
-        communicator2 = await self.get_communicator(self.user2)
+        communicator1 = self.get_communicator(self.user1)
+        communicator2 = self.get_communicator(self.user2)
         connected1, _ = await communicator1.connect()
         self.assertTrue(connected1, "Failed to connect user1 to the chat.")
         connected2, _ = await communicator2.connect()
         self.assertTrue(connected2, "Failed to connect user2 to the chat.")
 
-        investor_profile, created = await database_sync_to_async(InvestorProfile.objects.get_or_create)(user=self.user1)
-        startup_profile, created = await database_sync_to_async(StartUpProfile.objects.get_or_create)(user_id=self.user2)
-
-        messages = [
-            {'message': 'Hello!', 'sender_id': investor_profile.id, 'receiver_id': startup_profile.id},
-            {'message': 'How are You?', 'sender_id': investor_profile.id, 'receiver_id': startup_profile.id},
-            ]
-
+        messages = ['Hello!', 'How are You?']
         for message in messages:
-            await communicator1.send_json_to(message)
+            await communicator1.send_json_to({'message': message})
 
         for message in messages:
             response = await communicator2.receive_json_from()
-            self.assertEqual(response['message'], message['message'], "Message received does not match sent message.")
-            self.assertEqual(response['sender_id'], message['sender_id'], "Sender ID does not match.")
-            self.assertEqual(response['receiver_id'], message['receiver_id'], "Receiver ID does not match.")
+            while 'message' not in response:
+                response = await communicator2.receive_json_from()
+            self.assertEqual(response['message'], message, "Message received does not match sent message.")
+            self.assertEqual(response['sender_id'], self.user1.id, "Sender ID does not match.")
+            self.assertEqual(response['receiver_id'], self.user2.id, "Receiver ID does not match.")
 
         await communicator1.disconnect()
         await communicator2.disconnect()
 
     async def test_send_empty_message(self):
-        await self.asyncSetUp()
-
-        communicator1 = await self.get_communicator(self.user1)
-        communicator2 = await self.get_communicator(self.user2)
+        communicator1 = self.get_communicator(self.user1)
         connected1, _ = await communicator1.connect()
         self.assertTrue(connected1, "Failed to connect user1 to the chat.")
-        connected2, _ = await communicator2.connect()
-        self.assertTrue(connected2, "Failed to connect user2 to the chat.")
-
-        investor_profile, created = await database_sync_to_async(InvestorProfile.objects.get_or_create)(user=self.user1)
-        startup_profile, created = await database_sync_to_async(StartUpProfile.objects.get_or_create)(user_id=self.user2)
-
-        message = {
-            'message': '',
-            'sender_id': investor_profile.id,
-            'receiver_id': startup_profile.id,
-        }
 
-        await communicator1.send_json_to(message)
+        await communicator1.send_json_to({'message': ''})
+        self.assertTrue(await communicator1.receive_nothing())
 
-        response = await communicator1.receive_json_from()
-        self.assertEqual(response['error'], 'Message cannot be empty.', "Error message was not received for empty message.")
+        chat_room = await database_sync_to_async(self.chats_repo.get_chatroom)(self.chat_room.oid)
+        self.assertEqual(chat_room.messages, [], "Empty message was stored.")
 
         await communicator1.disconnect()
-        await communicator2.disconnect()
 
 
-class ChatRoomTests(APITestCase):
-    container = init_container()
-    mongo_repo = container.resolve(MongoDBRepository)
+@requires_mongo
+class ChatRoomTests(MongoTestMixin, APITestCase):
+
+    def setUp(self):
+        startup_user = User.objects.create_user(
+            email="chat.startup@gmail.com", password="123456pok", first_name="Chat",
+            last_name="Startup", user_phone="+1234567890")
+        investor_user = User.objects.create_user(
+            email="chat.investor@gmail.com", password="123456pok", first_name="Chat",
+            last_name="Investor", user_phone="+1234567890")
+        self.startup = StartUpProfile.objects.create(user_id=startup_user, name='Chat Startup', description='...')
+        self.investor = InvestorProfile.objects.create(user=investor_user)
+        self.client.force_authenticate(user=startup_user)
 
     def test_create_chat_room(self):
         url = reverse('create-chatroom')
         data = {
-            'room_id': 'valid_room_id',
-            'startup_id': 1,
-            'investor_id': 2,
+            'title': 'Seed round',
+            'sender_id': self.startup.id,
+            'receiver_id': self.investor.id,
         }
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        self.assertIn('room_id', response.data)
+        self.assertIn('room_oid', response.data)
+        self.remove_after_test(response.data['room_oid'])
+
+        response_again = self.client.post(url, data)
+        self.assertEqual(response_again.status_code, status.HTTP_200_OK)
+        self.assertEqual(response_again.data['room_oid'], response.data['room_oid'])
 
     def test_create_chat_room_invalid_data(self):
         url = reverse('create-chatroom')
@@ -150,46 +175,326 @@ class ChatRoomTests(APITestCase):
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_chat_room_unknown_investor(self):
+        url = reverse('create-chatroom')
+        data = {'title': 'Seed round', 'sender_id': self.startup.id, 'receiver_id': self.investor.id + 1}
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
-class MessageTests(APITestCase):
-    container = init_container()
-    mongo_repo = container.resolve(MongoDBRepository)
+
+@requires_mongo
+class ChatRoomGetOrCreateTests(MongoTestMixin, APITestCase):
+
+    def test_same_participants_and_title_get_same_room(self):
+        first = ChatRoom(title='Seed round', sender_id=2001, receiver_id=3001)
+        second = ChatRoom(title='  seed   ROUND ', sender_id=3001, receiver_id=2001)
+
+        room_oid, created = self.chats_repo.create_chatroom(first)
+        self.remove_after_test(room_oid)
+        same_oid, created_again = self.chats_repo.create_chatroom(second)
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(room_oid, first.oid)
+        self.assertEqual(same_oid, first.oid)
+
+    def test_other_title_gets_new_room(self):
+        room_oid, _ = self.chats_repo.create_chatroom(ChatRoom(title='Seed', sender_id=2002, receiver_id=3002))
+        other_oid, created = self.chats_repo.create_chatroom(ChatRoom(title='Series A', sender_id=2002, receiver_id=3002))
+        self.remove_after_test(room_oid)
+        self.remove_after_test(other_oid)
+
+        self.assertTrue(created)
+        self.assertNotEqual(room_oid, other_oid)
+
+    def test_dedupe_keeps_latest_read_cursors_and_recounts_unread(self):
+        # Rooms stored before the room key, which the unique index does not cover
+        older = ChatRoom(title='Merge', sender_id=2003, receiver_id=3003)
+        newer = ChatRoom(title=' merge', sender_id=3003, receiver_id=2003,
+                         created_at=older.created_at + timedelta(seconds=1))
+        for room in (older, newer):
+            self.chats_repo._collection.insert_one({**room.__dict__, 'last_activity': room.created_at})
+            self.remove_after_test(room.oid)
+        messages = [
+            (older, Message(content=Text('First'), sender_id=2003, receiver_id=3003,
+                            created_at=newer.created_at + timedelta(seconds=1))),
+            (newer, Message(content=Text('Second'), sender_id=2003, receiver_id=3003,
+                            created_at=newer.created_at + timedelta(seconds=2))),
+            (newer, Message(content=Text('Third'), sender_id=2003, receiver_id=3003,
+                            created_at=newer.created_at + timedelta(seconds=3))),
+        ]
+        for room, message in messages:
+            self.messages_repo.create_message(room.oid, message)
+        self.read_cursors_repo.mark_read(newer.oid, 3003, messages[1][1].oid)
+
+        _, removed = self.chats_repo.dedupe_chatrooms()
+
+        self.assertGreaterEqual(removed, 1)
+        self.assertIsNone(self.chats_repo.get_chatroom(newer.oid))
+        cursors = self.read_cursors_repo.get_read_cursors(older.oid)
+        self.assertEqual(cursors[3003].message_oid, messages[1][1].oid)
+        self.assertEqual(cursors[2003].message_oid, messages[2][1].oid)
+        self.assertEqual(self.read_cursors_repo.get_unread_counts(3003)[older.oid], 1)
+        self.assertEqual(self.read_cursors_repo.get_unread_counts(2003)[older.oid], 0)
+
+
+@requires_mongo
+class MessageTests(MongoTestMixin, APITestCase):
 
     def setUp(self):
-        self.chat_room = ChatRoom(room_id='valid_room_id', startup_id=1, investor_id=2, messages=[])
-        self.mongo_repo.create_chatroom(self.chat_room)
+        self.user = User.objects.create_user(
+            email="message.user@gmail.com", password="123456pok", first_name="Message",
+            last_name="User", user_phone="+1234567890")
+        self.chat_room = ChatRoom(title='Messages', sender_id=self.user.id, receiver_id=5001)
+        self.chats_repo.create_chatroom(self.chat_room)
+        self.remove_after_test(self.chat_room.oid)
+        self.client.force_authenticate(user=self.user)
 
     def test_send_message(self):
-        url = reverse('send-message', args=[self.chat_room.room_id])
+        url = reverse('send-message', args=[self.chat_room.oid])
         data = {
-            'sender_id': 1,
-            'receiver_id': 2,
+            'sender_id': self.user.id,
+            'receiver_id': 5001,
             'content': 'Hello!',
         }
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertIn('message_id', response.data)
 
-    def test_send_message_invalid_chat_room(self):
-        url = reverse('send-message', args=['invalid_room_id'])
-        data = {
-            'sender_id': 1,
-            'receiver_id': 2,
-            'content': 'Hello!',
-        }
-        response = self.client.post(url, data)
-        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    def test_send_message_invalid_data(self):
+        url = reverse('send-message', args=[self.chat_room.oid])
+        response = self.client.post(url, {'content': 'Hello!'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_list_messages(self):
-        message = Message(sender_id=1, receiver_id=2, content='Hello!')
-        self.mongo_repo.add_message(self.chat_room.room_id, message)
+        message = Message(content=Text('Hello!'), sender_id=self.user.id, receiver_id=5001)
+        self.messages_repo.create_message(self.chat_room.oid, message)
 
-        url = reverse('list-messages', args=[self.chat_room.room_id])
+        url = reverse('list-messages', args=[self.chat_room.oid])
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreater(len(response.data), 0)
+        self.assertEqual([msg['oid'] for msg in response.data], [message.oid])
+        self.assertEqual(response.data[0]['content'], 'Hello!')
 
     def test_list_messages_invalid_chat_room(self):
-        url = reverse('list-messages', args=['invalid_room_id'])
+        url = reverse('list-messages', args=['invalid_room_oid'])
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@requires_mongo
+class ReadCursorTests(MongoTestMixin, APITestCase):
+
+    def setUp(self):
+        self.startup_user = User.objects.create_user(
+            email="reader.startup@gmail.com", password="123456pok", first_name="Read",
+            last_name="Startup", user_phone="+1234567890")
+        self.investor_user = User.objects.create_user(
+            email="reader.investor@gmail.com", password="123456pok", first_name="Read",
+            last_name="Investor", user_phone="+1234567890")
+        self.chat_room = ChatRoom(title='Read cursors', sender_id=self.startup_user.id,
+                                  receiver_id=self.investor_user.id)
+        self.chats_repo.create_chatroom(self.chat_room)
+        self.remove_after_test(self.chat_room.oid)
+        self.messages = [
+            Message(content=Text(f'Message {i}'), sender_id=self.startup_user.id,
+                    receiver_id=self.investor_user.id)
+            for i in range(3)
+        ]
+        for message in self.messages:
+            self.messages_repo.create_message(self.chat_room.oid, message)
+        self.client.force_authenticate(user=self.investor_user)
+
+    def test_unread_counts_maintained_on_send(self):
+        response = self.client.get(reverse('unread-counts'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['rooms'][self.chat_room.oid], 3)
+        counts = self.read_cursors_repo.get_unread_counts(self.startup_user.id)
+        self.assertEqual(counts[self.chat_room.oid], 0)
+
+    def test_mark_read_moves_cursor_forward_only(self):
+        url = reverse('mark-read', args=[self.chat_room.oid])
+
+        response = self.client.post(url, {'message_oid': self.messages[1].oid}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['unread'], 1)
+
+        response = self.client.post(url, {'message_oid': self.messages[0].oid}, format='json')
+        self.assertEqual(response.data['unread'], 1)
+        cursor = self.read_cursors_repo.get_read_cursors(self.chat_room.oid)[self.investor_user.id]
+        self.assertEqual(cursor.message_oid, self.messages[1].oid)
+
+    def test_mark_read_orders_messages_of_same_time_by_oid(self):
+        created_at = (self.messages[-1].created_at + timedelta(seconds=1)).replace(microsecond=0)
+        tied = sorted(
+            (Message(content=Text(f'Tied {i}'), sender_id=self.startup_user.id,
+                     receiver_id=self.investor_user.id, created_at=created_at) for i in range(2)),
+            key=lambda message: message.oid,
+        )
+        for message in tied:
+            self.messages_repo.create_message(self.chat_room.oid, message)
+        url = reverse('mark-read', args=[self.chat_room.oid])
+
+        response = self.client.post(url, {'message_oid': tied[0].oid}, format='json')
+        self.assertEqual(response.data['unread'], 1)
+        response = self.client.post(url, {'message_oid': tied[1].oid}, format='json')
+        self.assertEqual(response.data['unread'], 0)
+        cursor = self.read_cursors_repo.get_read_cursors(self.chat_room.oid)[self.investor_user.id]
+        self.assertEqual(cursor.message_oid, tied[1].oid)
+
+    def test_mark_read_unknown_message(self):
+        url = reverse('mark-read', args=[self.chat_room.oid])
+
+        response = self.client.post(url, {'message_oid': 'unknown'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post(url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class InboxCursorTests(SimpleTestCase):
+
+    def test_cursor_round_trip(self):
+        room = {'last_activity': datetime(2024, 5, 1, 12, 30, 15, 250000), 'oid': 'room-oid'}
+        cursor = InboxService.encode_cursor(room)
+        self.assertEqual(InboxService.decode_cursor(cursor), (room['last_activity'], room['oid']))
+
+    def test_invalid_cursor(self):
+        for cursor in ['invalid', urlsafe_b64encode(b'not a date|oid').decode()]:
+            with self.assertRaises(ValueError):
+                InboxService.decode_cursor(cursor)
+
+
+@requires_mongo
+class InboxTests(MongoTestMixin, APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="inbox.user@gmail.com", password="123456pok", first_name="Inbox",
+            last_name="User", user_phone="+1234567890")
+        self.rooms = []
+        for i in range(3):
+            room = ChatRoom(title=f'Room {i}', sender_id=self.user.id, receiver_id=1000 + i)
+            self.chats_repo.create_chatroom(room)
+            self.remove_after_test(room.oid)
+            self.rooms.append(room)
+        self.messages_repo.create_message(
+            self.rooms[0].oid, Message(content=Text('Latest news ' * 20), sender_id=1000, receiver_id=self.user.id))
+        self.client.force_authenticate(user=self.user)
+
+    def test_rooms_sorted_by_last_activity(self):
+        response = self.client.get(reverse('chat-inbox'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([room['oid'] for room in results],
+                         [self.rooms[0].oid, self.rooms[2].oid, self.rooms[1].oid])
+        self.assertEqual(results[0]['unread'], 1)
+        self.assertEqual(results[0]['last_message']['snippet'], ('Latest news ' * 20)[:100])
+        self.assertIsNone(results[1]['last_message'])
+
+    def test_keyset_pagination(self):
+        first = self.client.get(reverse('chat-inbox'), {'page_size': 2})
+        second = self.client.get(reverse('chat-inbox'), {'page_size': 2, 'cursor': first.data['next']})
+
+        self.assertEqual(len(first.data['results']), 2)
+        self.assertEqual([room['oid'] for room in second.data['results']], [self.rooms[1].oid])
+        self.assertIsNone(second.data['next'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('chat-inbox'), {'cursor': 'invalid'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@requires_mongo
+class PresenceCounterpartsTests(MongoTestMixin, APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="presence.user@gmail.com", password="123456pok", first_name="Presence",
+            last_name="User", user_phone="+1234567890")
+        for title, sender_id, receiver_id in [('Intro', self.user.id, 6001), ('Pitch', 6002, self.user.id),
+                                              ('Other users', 6001, 6003)]:
+            room = ChatRoom(title=title, sender_id=sender_id, receiver_id=receiver_id)
+            self.chats_repo.create_chatroom(room)
+            self.remove_after_test(room.oid)
+        self.client.force_authenticate(user=self.user)
+
+    def test_only_counterparts_reported(self):
+        for user_id in (6001, 6002, 6003):
+            PresenceService.connect('room', user_id, 'tab-1')
+            self.addCleanup(PresenceService.disconnect, 'room', user_id, 'tab-1')
+
+        response = self.client.get(reverse('chat-presence'), {'user_ids': '6001,6002,6003'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'online': [6001, 6002]})
+
+
+class SearchTokensTests(SimpleTestCase):
+
+    def test_tokens_keyed_per_user(self):
+        self.assertNotEqual(search_tokens(1, 'sheet'), search_tokens(2, 'sheet'))
+        self.assertEqual(search_tokens(1, 'Sheet sheet'), search_tokens(1, 'sheet'))
+
+
+@requires_mongo
+class MessageSearchTests(MongoTestMixin, APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="search.user@gmail.com", password="123456pok", first_name="Search",
+            last_name="User", user_phone="+1234567890")
+        self.room = ChatRoom(title='Term sheet', sender_id=self.user.id, receiver_id=4001)
+        self.chats_repo.create_chatroom(self.room)
+        self.remove_after_test(self.room.oid)
+        self.messages = []
+        for sender_id, receiver_id, text in [
+            (self.user.id, 4001, 'Term sheet attached'),
+            (4001, self.user.id, 'Let us discuss the term sheet tomorrow'),
+            (4001, self.user.id, 'Unrelated'),
+        ]:
+            message = Message(content=Text(text), sender_id=sender_id, receiver_id=receiver_id)
+            self.messages_repo.create_message(self.room.oid, message)
+            self.messages.append(message)
+        self.client.force_authenticate(user=self.user)
+
+    def test_search_matches_all_words_newest_first(self):
+        response = self.client.get(reverse('message-search'), {'q': 'SHEET term'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['message_oid'] for result in response.data['results']],
+                         [self.messages[1].oid, self.messages[0].oid])
+        self.assertEqual(response.data['results'][0]['room_oid'], self.room.oid)
+
+    def test_search_pagination(self):
+        first = self.client.get(reverse('message-search'), {'q': 'sheet', 'page_size': 1})
+        second = self.client.get(reverse('message-search'), {'q': 'sheet', 'page_size': 1, 'cursor': first.data['next']})
+
+        self.assertEqual([result['message_oid'] for result in second.data['results']], [self.messages[0].oid])
+        self.assertIsNone(second.data['next'])
+
+    def test_search_scoped_to_participants(self):
+        self.assertEqual(self.search_repo.search(4002, 'sheet'), [])
+        self.assertEqual(len(self.search_repo.search(4001, 'sheet')), 2)
+
+    def test_search_entries_follow_merged_messages(self):
+        # Rooms stored before the room key, which the unique index does not cover
+        older = ChatRoom(title='Due diligence', sender_id=4003, receiver_id=4004)
+        newer = ChatRoom(title='due diligence', sender_id=4004, receiver_id=4003,
+                         created_at=older.created_at + timedelta(seconds=1))
+        for room in (older, newer):
+            self.chats_repo._collection.insert_one({**room.__dict__, 'last_activity': room.created_at})
+            self.remove_after_test(room.oid)
+        message = Message(content=Text('Audited accounts'), sender_id=4004, receiver_id=4003)
+        self.messages_repo.create_message(newer.oid, message)
+
+        self.chats_repo.dedupe_chatrooms()
+
+        self.assertEqual(self.search_repo.search(4003, 'audited'),
+                         [{'message_oid': message.oid, 'room_oid': older.oid, 'created_at': ANY}])
+        self.assertEqual(len(self.search_repo.search(4003, 'audited', room_oid=older.oid)), 1)
+
+    def test_search_without_query(self):
+        response = self.client.get(reverse('message-search'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
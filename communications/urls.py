@@ -1,9 +1,17 @@
 from django.urls import path
 
-from .views import CreateChatRoomView, SendMessageView, ListMessagesView
+from .views import (
+    CreateChatRoomView, SendMessageView, ListMessagesView, InboxView, MarkReadView, UnreadCountsView,
+    PresenceView, MessageSearchView,
+)
 
 urlpatterns = [
     path('chatrooms/', CreateChatRoomView.as_view(), name='create-chatroom'),
     path('messages/<str:room_oid>/', SendMessageView.as_view(), name='send-message'),
     path('chatrooms/<str:room_oid>/messages/', ListMessagesView.as_view(), name='list-messages'),
+    path('inbox/', InboxView.as_view(), name='chat-inbox'),
+    path('search/', MessageSearchView.as_view(), name='message-search'),
+    path('chatrooms/<str:room_oid>/read/', MarkReadView.as_view(), name='mark-read'),
+    path('unread/', UnreadCountsView.as_view(), name='unread-counts'),
+    path('presence/', PresenceView.as_view(), name='chat-presence'),
 ]
@@ -1,30 +1,43 @@
-import logging
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from common.presence import PresenceService
+from forum.utils.logging_utils import get_logger
 from .domain.exceptions.base import ApplicationException
 from .permissions import IsOwnerOrRecipient
-from .logic import ChatRoomService, MessageService, ListMessagesService
+from .logic import (
+    ChatRoomService, MessageService, ListMessagesService, ReadCursorService, InboxService, MessageSearchService,
+)
+from .serializers import PresenceQuerySerializer
 
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
 
 class CreateChatRoomView(APIView):
     """
     View for creating a new chat room between a startup and an investor.
+
+    Methods:
+        POST: Get or create the room of the participants and title.
+
+    Returns:
+        201 with the room oid when created, 200 with the oid of the existing room otherwise.
     """
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
         try:
-            chat_room = ChatRoomService.create_chat_room(request.data)
-            return Response({'room_oid': str(chat_room.oid)}, status=status.HTTP_201_CREATED)
+            room_oid, created = ChatRoomService.create_chat_room(request.data)
+            return Response(
+                {'room_oid': str(room_oid)},
+                status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+            )
         except ValueError as e:
             return Response(e.args[0], status=status.HTTP_400_BAD_REQUEST)
         except ApplicationException as e:
-            logger.error(f"Failed to create chat room: {e}", exc_info=True)
+            logger.error("Failed to create chat room: %s", e, exc_info=True)
             return Response(
                 {'error': 'Failed to create chat room due to server error.'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -44,7 +57,7 @@ class SendMessageView(APIView):
         except ValueError as e:
             return Response(data=e.args[0], status=status.HTTP_400_BAD_REQUEST)
         except ApplicationException as e:
-            logger.error(f"Failed to send message in room {room_oid}: {e}", exc_info=True)
+            logger.error("Failed to send message in room %s: %s", room_oid, e, exc_info=True)
             return Response(
                 data={'error': 'Failed to send message due to server error.'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -64,8 +77,132 @@ class ListMessagesView(APIView):
         except ValueError as e:
             return Response(data=e.args[0], status=status.HTTP_404_NOT_FOUND)
         except ApplicationException as e:
-            logger.error(f"Failed to list messages for room {room_oid}: {e}", exc_info=True)
+            logger.error("Failed to list messages for room %s: %s", room_oid, e, exc_info=True)
             return Response(
                 data={'error': 'Failed to retrieve messages due to server error.'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class InboxView(APIView):
+    """
+    View for the chat rooms of the user, most recently active first.
+
+    Each room carries its last message snippet and the unread count of the
+    user, read from the rooms without their messages. Keyset-paginated.
+
+    Query parameters:
+        - cursor: `next` cursor returned by the previous page
+        - page_size: number of rooms per page (default 20, max 50)
+
+    Returns:
+        - 200 OK: A page of rooms and the `next` cursor.
+        - 400 Bad Request: If the cursor or page size is invalid.
+    """
+    permission_classes = [IsAuthenticated]
+    default_page_size = 20
+    max_page_size = 50
+
+    def get(self, request):
+        try:
+            page_size = int(request.query_params.get('page_size', self.default_page_size))
+        except (TypeError, ValueError):
+            page_size = 0
+        if page_size < 1:
+            return Response({'error': 'Invalid page size.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            rooms, next_cursor = InboxService.list_rooms(
+                request.user.id, request.query_params.get('cursor'), min(page_size, self.max_page_size))
+        except ValueError as e:
+            return Response(e.args[0], status=status.HTTP_400_BAD_REQUEST)
+        return Response({'next': next_cursor, 'results': rooms}, status=status.HTTP_200_OK)
+
+
+class MessageSearchView(APIView):
+    """
+    View for searching the messages of the user's chats.
+
+    Message content is stored encrypted, so words are matched through a blind
+    index of keyed hashes: whole words, all of them, case-insensitive.
+
+    Query parameters:
+        - q: words to search for
+        - room_oid: restrict the search to one chat room
+        - cursor: `next` cursor returned by the previous page
+        - page_size: number of results per page (default 20, max 50)
+
+    Returns:
+        - 200 OK: A page of {message_oid, room_oid, created_at}, newest first, and the `next` cursor.
+        - 400 Bad Request: If a parameter or the cursor is invalid.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            results, next_cursor = MessageSearchService.search(request.user.id, request.query_params)
+        except ValueError as e:
+            return Response(e.args[0], status=status.HTTP_400_BAD_REQUEST)
+        return Response({'next': next_cursor, 'results': results}, status=status.HTTP_200_OK)
+
+
+class MarkReadView(APIView):
+    """
+    View for moving the read cursor of the user in a chat room.
+
+    Methods:
+        POST: {'message_oid': ...} - marks the room read up to the message.
+
+    Returns:
+        - 200 OK: {'room_oid', 'unread'} with the unread count of the user.
+        - 400 Bad Request: if message_oid is missing.
+        - 404 Not Found: if the user is not in the room or the message is not in it.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, room_oid):
+        try:
+            unread = ReadCursorService.mark_read(request.data, room_oid, request.user.id)
+        except ValueError as e:
+            return Response(data=e.args[0], status=status.HTTP_400_BAD_REQUEST)
+        except LookupError as e:
+            return Response(data=e.args[0], status=status.HTTP_404_NOT_FOUND)
+        return Response({'room_oid': room_oid, 'unread': unread}, status=status.HTTP_200_OK)
+
+
+class UnreadCountsView(APIView):
+    """
+    View for the unread counts of all the chat rooms of the user.
+
+    Methods:
+        GET: returns {'rooms': {room_oid: unread}, 'total': unread}.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(ReadCursorService.unread_counts(request.user.id), status=status.HTTP_200_OK)
+
+
+class PresenceView(APIView):
+    """
+    View for the online state of users, for chat lists.
+
+    Methods:
+        GET: `?user_ids=1,2,3` - returns the ids of the users, out of
+        user_ids, sharing a chat room with the user and with a live chat
+        connection. Other users are never reported.
+
+    Returns:
+        - 200 OK: {'online': [ids]}
+        - 400 Bad Request: if user_ids is missing, invalid or too long.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user_ids = [user_id for user_id in request.query_params.get('user_ids', '').split(',') if user_id]
+        serializer = PresenceQuerySerializer(data={'user_ids': user_ids})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        counterparts = ChatRoomService.counterparts(request.user.id, serializer.validated_data['user_ids'])
+        online = PresenceService.online_users(counterparts)
+        return Response({'online': sorted(online)}, status=status.HTTP_200_OK)
@@ -0,0 +1,19 @@
+from django.apps import AppConfig
+from forum.utils.logging_utils import get_logger
+
+
+logger = get_logger('django')
+
+
+class DashboardConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'dashboard'
+
+    def ready(self):
+        logger.info('Initializing Dashboard app and importing signals.')
+        try:
+            import dashboard.signals  # noqa
+            logger.info('Successfully imported signals for Dashboard app.')
+        except Exception as e:
+            logger.error('Failed to import signals for Dashboard app. Error: %s', e)
+            raise
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('investors', '0002_alter_investorprofile_investor_logo'),
+        ('startups', '0002_alter_startupprofile_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvestorMetrics',
+            fields=[
+                ('notifications_total', models.PositiveIntegerField(default=0)),
+                ('notifications_sent', models.PositiveIntegerField(default=0)),
+                ('notifications_failed', models.PositiveIntegerField(default=0)),
+                ('delivery_rate', models.FloatField(blank=True, null=True)),
+                ('messages_count', models.PositiveIntegerField(default=0)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+                ('investor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='metrics', serialize=False, to='investors.investorprofile')),
+                ('followed_startups_count', models.PositiveIntegerField(default=0)),
+                ('tracked_projects_count', models.PositiveIntegerField(default=0)),
+                ('subscriptions_count', models.PositiveIntegerField(default=0)),
+                ('invested_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='investor_metrics', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Investor Metrics',
+                'verbose_name_plural': 'Investor Metrics',
+            },
+        ),
+        migrations.CreateModel(
+            name='StartupMetrics',
+            fields=[
+                ('notifications_total', models.PositiveIntegerField(default=0)),
+                ('notifications_sent', models.PositiveIntegerField(default=0)),
+                ('notifications_failed', models.PositiveIntegerField(default=0)),
+                ('delivery_rate', models.FloatField(blank=True, null=True)),
+                ('messages_count', models.PositiveIntegerField(default=0)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+                ('startup', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='metrics', serialize=False, to='startups.startupprofile')),
+                ('followers_count', models.PositiveIntegerField(default=0)),
+                ('projects_count', models.PositiveIntegerField(default=0)),
+                ('project_trackers_count', models.PositiveIntegerField(default=0)),
+                ('funding_goal', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('funded_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('funding_progress', models.FloatField(default=0)),
+                ('projects', models.JSONField(default=list)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='startup_metrics', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Startup Metrics',
+                'verbose_name_plural': 'Startup Metrics',
+            },
+        ),
+    ]
@@ -1,3 +1,94 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+from investors.models import InvestorProfile
+from startups.models import StartUpProfile
+
+
+class DashboardMetrics(models.Model):
+    """
+    Base of the precomputed dashboard summary tables.
+
+    Attributes:
+        changed_at (DateTimeField): last change of the source rows, set by signals.
+        refreshed_at (DateTimeField): start of the last refresh of the row.
+
+    Rows with changed_at >= refreshed_at are stale and are recomputed by the
+    next refresh (see `DashboardMetricsService`).
+    """
+    notifications_total = models.PositiveIntegerField(default=0)
+    notifications_sent = models.PositiveIntegerField(default=0)
+    notifications_failed = models.PositiveIntegerField(default=0)
+    delivery_rate = models.FloatField(null=True, blank=True)
+    messages_count = models.PositiveIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        abstract = True
+
+
+class StartupMetrics(DashboardMetrics):
+    """
+    Precomputed dashboard metrics of a startup.
+
+    Attributes:
+        startup (OneToOneField): the startup.
+        owner (ForeignKey): the user owning the startup, for reads by user.
+        followers_count (PositiveIntegerField): investors following the startup.
+        projects_count (PositiveIntegerField): projects of the startup.
+        project_trackers_count (PositiveIntegerField): trackers of all its projects.
+        funding_goal (DecimalField): total amount of its projects.
+        funded_amount (DecimalField): amount funded by subscriptions.
+        funding_progress (FloatField): funded_amount / funding_goal.
+        projects (JSONField): per project id, title, amount, trackers_count,
+            funded_share and funded_amount.
+    """
+    startup = models.OneToOneField(
+        StartUpProfile, primary_key=True, on_delete=models.CASCADE, related_name='metrics')
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='startup_metrics')
+    followers_count = models.PositiveIntegerField(default=0)
+    projects_count = models.PositiveIntegerField(default=0)
+    project_trackers_count = models.PositiveIntegerField(default=0)
+    funding_goal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    funded_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    funding_progress = models.FloatField(default=0)
+    projects = models.JSONField(default=list)
+
+    class Meta:
+        verbose_name = 'Startup Metrics'
+        verbose_name_plural = 'Startup Metrics'
+
+    def __str__(self):
+        return f"Metrics of startup {self.startup_id}, refreshed at {self.refreshed_at}"
+
+
+class InvestorMetrics(DashboardMetrics):
+    """
+    Precomputed dashboard metrics of an investor.
+
+    Attributes:
+        investor (OneToOneField): the investor.
+        owner (ForeignKey): the user of the investor profile, for reads by user.
+        followed_startups_count (PositiveIntegerField): startups followed.
+        tracked_projects_count (PositiveIntegerField): projects tracked.
+        subscriptions_count (PositiveIntegerField): project subscriptions.
+        invested_amount (DecimalField): amount funded by the subscriptions.
+    """
+    investor = models.OneToOneField(
+        InvestorProfile, primary_key=True, on_delete=models.CASCADE, related_name='metrics')
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='investor_metrics')
+    followed_startups_count = models.PositiveIntegerField(default=0)
+    tracked_projects_count = models.PositiveIntegerField(default=0)
+    subscriptions_count = models.PositiveIntegerField(default=0)
+    invested_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Investor Metrics'
+        verbose_name_plural = 'Investor Metrics'
+
+    def __str__(self):
+        return f"Metrics of investor {self.investor_id}, refreshed at {self.refreshed_at}"
@@ -0,0 +1,28 @@
+from rest_framework import serializers
+
+from .models import InvestorMetrics, StartupMetrics
+
+
+class StartupMetricsSerializer(serializers.ModelSerializer):
+    startup_name = serializers.CharField(source='startup.name', read_only=True)
+
+    class Meta:
+        model = StartupMetrics
+        fields = [
+            'startup', 'startup_name', 'followers_count', 'projects_count', 'project_trackers_count',
+            'funding_goal', 'funded_amount', 'funding_progress', 'projects',
+            'notifications_total', 'notifications_sent', 'notifications_failed',
+            'delivery_rate', 'messages_count', 'refreshed_at',
+        ]
+
+
+class InvestorMetricsSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = InvestorMetrics
+        fields = [
+            'investor', 'followed_startups_count', 'tracked_projects_count',
+            'subscriptions_count', 'invested_amount',
+            'notifications_total', 'notifications_sent', 'notifications_failed',
+            'delivery_rate', 'messages_count', 'refreshed_at',
+        ]
@@ -0,0 +1,215 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from common.streaming import chunked
+from investment_tracking.models import InvestmentTracking
+from investors.models import InvestorProfile
+from notifications.models import Notification, NotificationDeliveryStatus, NotificationType
+from projects.models import Project, Subscription
+from startups.models import StartUpProfile
+from track_projects.models import TrackProjects
+from forum.utils.logging_utils import get_logger
+from .models import InvestorMetrics, StartupMetrics
+
+logger = get_logger('django')
+
+CENTS = Decimal('0.01')
+
+
+class DashboardMetricsService:
+    """Service for refreshing the dashboard summary tables.
+
+    Signals set `changed_at` on the metrics rows whose source rows change.
+    A refresh recomputes only the stale rows and the profiles without a row,
+    with a few grouped queries per batch, and upserts them. A full refresh
+    recomputes every row.
+
+    Refreshes run in the Celery worker and drop the cached dashboards of the
+    refreshed owners from the default cache, which the web processes share
+    through Redis (see CACHES).
+    """
+
+    STARTUP_CACHE_KEY = 'dashboard:startup:{}'
+    INVESTOR_CACHE_KEY = 'dashboard:investor:{}'
+    BATCH_SIZE = 500
+
+    METRICS_FIELDS = ('notifications_total', 'notifications_sent', 'notifications_failed',
+                      'delivery_rate', 'messages_count', 'refreshed_at', 'owner')
+    STARTUP_FIELDS = ('followers_count', 'projects_count', 'project_trackers_count',
+                      'funding_goal', 'funded_amount', 'funding_progress', 'projects')
+    INVESTOR_FIELDS = ('followed_startups_count', 'tracked_projects_count',
+                       'subscriptions_count', 'invested_amount')
+
+    FUNDED_AMOUNT = Sum(
+        F('project__amount') * Cast('share', DecimalField(max_digits=7, decimal_places=6)),
+        output_field=DecimalField(max_digits=20, decimal_places=8),
+    )
+
+    @staticmethod
+    def count_by(queryset, field):
+        """Return {value of field: number of rows}."""
+        return dict(queryset.values(field).annotate(count=Count('pk')).values_list(field, 'count'))
+
+    @staticmethod
+    def get_notification_counts(queryset, field):
+        """Return delivery and message counts of the notifications, by field."""
+        rows = queryset.values(field).annotate(
+            notifications_total=Count('pk'),
+            notifications_sent=Count('pk', filter=Q(delivery_status=NotificationDeliveryStatus.SENT)),
+            notifications_failed=Count('pk', filter=Q(delivery_status=NotificationDeliveryStatus.FAILED)),
+            messages_count=Count('pk', filter=Q(notification_type=NotificationType.MESSAGE)),
+        )
+        return {row.pop(field): row for row in rows}
+
+    @staticmethod
+    def get_notification_metrics(counts):
+        counts = counts or {'notifications_total': 0, 'notifications_sent': 0,
+                            'notifications_failed': 0, 'messages_count': 0}
+        delivered = counts['notifications_sent'] + counts['notifications_failed']
+        return {
+            **counts,
+            'delivery_rate': counts['notifications_sent'] / delivered if delivered else None,
+        }
+
+    @staticmethod
+    def to_amount(value):
+        return Decimal(value or 0).quantize(CENTS)
+
+    @staticmethod
+    def get_stale_ids(profile_model, full=False):
+        """Return ids of the profiles whose metrics are missing or stale."""
+        queryset = profile_model.objects.all()
+        if not full:
+            queryset = queryset.filter(
+                Q(metrics__isnull=True) |
+                Q(metrics__refreshed_at__isnull=True) |
+                Q(metrics__changed_at__gt=F('metrics__refreshed_at'))
+            )
+        return list(queryset.order_by('pk').values_list('pk', flat=True))
+
+    @classmethod
+    def build_startup_metrics(cls, startup_ids, refreshed_at):
+        owners = dict(StartUpProfile.objects.filter(pk__in=startup_ids).values_list('pk', 'user_id'))
+        followers = cls.count_by(InvestmentTracking.objects.filter(startup_id__in=owners), 'startup_id')
+        trackers = cls.count_by(TrackProjects.objects.filter(project__startup_id__in=owners), 'project_id')
+        funding = {
+            row.pop('project_id'): row
+            for row in Subscription.objects.filter(project__startup_id__in=owners)
+            .values('project_id')
+            .annotate(funded_share=Sum('share'), funded_amount=cls.FUNDED_AMOUNT)
+        }
+        notifications = cls.get_notification_counts(
+            Notification.objects.filter(startup_id__in=owners), 'startup_id')
+
+        projects = {startup_id: [] for startup_id in owners}
+        for project in (Project.objects.filter(startup_id__in=owners)
+                        .order_by('created_at').values('project_id', 'startup_id', 'title', 'amount')):
+            project_funding = funding.get(project['project_id'], {})
+            projects[project['startup_id']].append({
+                'project_id': str(project['project_id']),
+                'title': project['title'],
+                'amount': str(project['amount']),
+                'trackers_count': trackers.get(project['project_id'], 0),
+                'funded_share': project_funding.get('funded_share') or 0.0,
+                'funded_amount': str(cls.to_amount(project_funding.get('funded_amount'))),
+            })
+
+        metrics = []
+        for startup_id, owner_id in owners.items():
+            startup_projects = projects[startup_id]
+            funding_goal = sum((Decimal(project['amount']) for project in startup_projects), Decimal(0))
+            funded_amount = sum((Decimal(project['funded_amount']) for project in startup_projects), Decimal(0))
+            metrics.append(StartupMetrics(
+                startup_id=startup_id,
+                owner_id=owner_id,
+                followers_count=followers.get(startup_id, 0),
+                projects_count=len(startup_projects),
+                project_trackers_count=sum(project['trackers_count'] for project in startup_projects),
+                funding_goal=funding_goal,
+                funded_amount=funded_amount,
+                funding_progress=float(funded_amount / funding_goal) if funding_goal else 0.0,
+                projects=startup_projects,
+                changed_at=refreshed_at,
+                refreshed_at=refreshed_at,
+                **cls.get_notification_metrics(notifications.get(startup_id)),
+            ))
+        return metrics
+
+    @classmethod
+    def build_investor_metrics(cls, investor_ids, refreshed_at):
+        owners = dict(InvestorProfile.objects.filter(pk__in=investor_ids).values_list('pk', 'user_id'))
+        followed = cls.count_by(InvestmentTracking.objects.filter(investor_id__in=owners), 'investor_id')
+        tracked = cls.count_by(TrackProjects.objects.filter(investor_id__in=owners), 'investor_id')
+        subscriptions = {
+            row.pop('investor_id'): row
+            for row in Subscription.objects.filter(investor_id__in=owners)
+            .values('investor_id')
+            .annotate(subscriptions_count=Count('pk'), invested_amount=cls.FUNDED_AMOUNT)
+        }
+        notifications = cls.get_notification_counts(
+            Notification.objects.filter(investor_id__in=owners), 'investor_id')
+
+        metrics = []
+        for investor_id, owner_id in owners.items():
+            investor_subscriptions = subscriptions.get(investor_id, {})
+            metrics.append(InvestorMetrics(
+                investor_id=investor_id,
+                owner_id=owner_id,
+                followed_startups_count=followed.get(investor_id, 0),
+                tracked_projects_count=tracked.get(investor_id, 0),
+                subscriptions_count=investor_subscriptions.get('subscriptions_count', 0),
+                invested_amount=cls.to_amount(investor_subscriptions.get('invested_amount')),
+                changed_at=refreshed_at,
+                refreshed_at=refreshed_at,
+                **cls.get_notification_metrics(notifications.get(investor_id)),
+            ))
+        return metrics
+
+    @classmethod
+    def refresh(cls, full=False, batch_size=BATCH_SIZE):
+        """Recompute stale (or, if full, all) metrics rows.
+
+        Returns:
+            tuple: number of startup and investor rows refreshed
+        """
+        refreshed = []
+        for profile_model, metrics_model, build, cache_key, fields in (
+            (StartUpProfile, StartupMetrics, cls.build_startup_metrics,
+             cls.STARTUP_CACHE_KEY, cls.STARTUP_FIELDS),
+            (InvestorProfile, InvestorMetrics, cls.build_investor_metrics,
+             cls.INVESTOR_CACHE_KEY, cls.INVESTOR_FIELDS),
+        ):
+            count = 0
+            for batch in chunked(cls.get_stale_ids(profile_model, full), batch_size):
+                metrics = build(batch, refreshed_at=timezone.now())
+                metrics_model.objects.bulk_create(
+                    metrics,
+                    update_conflicts=True,
+                    unique_fields=[metrics_model._meta.pk.name],
+                    update_fields=[*cls.METRICS_FIELDS, *fields],
+                )
+                cache.delete_many({cache_key.format(row.owner_id) for row in metrics})
+                count += len(metrics)
+            refreshed.append(count)
+
+        logger.info("Refreshed dashboard metrics of %s startups and %s investors (full: %s)",
+                    refreshed[0], refreshed[1], full)
+        return tuple(refreshed)
+
+    @staticmethod
+    def mark_changed(startup_ids=(), investor_ids=(), project_ids=()):
+        """Mark the metrics of the startups, investors and project owners as stale."""
+        now = timezone.now()
+        startup_ids = [pk for pk in startup_ids if pk is not None]
+        investor_ids = [pk for pk in investor_ids if pk is not None]
+        project_ids = [pk for pk in project_ids if pk is not None]
+        if startup_ids:
+            StartupMetrics.objects.filter(pk__in=startup_ids).update(changed_at=now)
+        if project_ids:
+            StartupMetrics.objects.filter(startup__projects__project_id__in=project_ids).update(changed_at=now)
+        if investor_ids:
+            InvestorMetrics.objects.filter(pk__in=investor_ids).update(changed_at=now)
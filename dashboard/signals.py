@@ -0,0 +1,42 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from investment_tracking.models import InvestmentTracking
+from notifications.models import Notification
+from projects.models import Project, Subscription
+from track_projects.models import TrackProjects
+from .services import DashboardMetricsService
+
+
+@receiver([post_save, post_delete], sender=InvestmentTracking)
+def mark_metrics_on_investment_tracking(sender, instance, **kwargs):
+    """Mark the metrics of the startup and the investor as stale on follow/unfollow."""
+    DashboardMetricsService.mark_changed(
+        startup_ids=[instance.startup_id], investor_ids=[instance.investor_id])
+
+
+@receiver([post_save, post_delete], sender=TrackProjects)
+def mark_metrics_on_track_project(sender, instance, **kwargs):
+    """Mark the metrics of the project owner and the investor as stale on track/untrack."""
+    DashboardMetricsService.mark_changed(
+        project_ids=[instance.project_id], investor_ids=[instance.investor_id])
+
+
+@receiver([post_save, post_delete], sender=Subscription)
+def mark_metrics_on_subscription(sender, instance, **kwargs):
+    """Mark the metrics of the project owner and the investor as stale on subscription changes."""
+    DashboardMetricsService.mark_changed(
+        project_ids=[instance.project_id], investor_ids=[instance.investor_id])
+
+
+@receiver([post_save, post_delete], sender=Project)
+def mark_metrics_on_project(sender, instance, **kwargs):
+    """Mark the metrics of the startup as stale when its projects change."""
+    DashboardMetricsService.mark_changed(startup_ids=[instance.startup_id])
+
+
+@receiver([post_save, post_delete], sender=Notification)
+def mark_metrics_on_notification(sender, instance, **kwargs):
+    """Mark the metrics of the startup and the investor as stale on notification delivery."""
+    DashboardMetricsService.mark_changed(
+        startup_ids=[instance.startup_id], investor_ids=[instance.investor_id])
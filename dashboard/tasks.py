@@ -0,0 +1,18 @@
+import logging
+
+from celery import shared_task
+
+from .services import DashboardMetricsService
+
+
+logger = logging.getLogger('django')
+
+
+@shared_task
+def refresh_dashboard_metrics(full=False):
+    """Recompute the stale dashboard metrics (all of them if full)
+
+    Scheduled by Celery beat, see CELERY_BEAT_SCHEDULE.
+    """
+    startups, investors = DashboardMetricsService.refresh(full=full)
+    return {'startups': startups, 'investors': investors}
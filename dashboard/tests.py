@@ -0,0 +1,120 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from investment_tracking.models import InvestmentTracking
+from investors.models import InvestorProfile
+from notifications.models import Notification, NotificationDeliveryStatus, NotificationType
+from projects.models import Project, Subscription
+from startups.models import StartUpProfile
+from track_projects.models import TrackProjects
+from users.models import User
+from .models import InvestorMetrics, StartupMetrics
+from .services import DashboardMetricsService
+from .tasks import refresh_dashboard_metrics
+
+
+class DashboardMetricsTest(APITestCase):
+    """Test suite for the precomputed dashboard metrics"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.startup_user = User.objects.create_user(
+            email='startup@dashboard.com', password='StrongPass123!',
+            first_name='Startup', last_name='Owner', user_phone='+11234567890')
+        cls.startup_user.add_role('Startup')
+        cls.startup_user.set_active_role('Startup')
+        cls.investor_user = User.objects.create_user(
+            email='investor@dashboard.com', password='StrongPass123!',
+            first_name='Investor', last_name='User', user_phone='+11234567890')
+        cls.investor_user.add_role('Investor')
+        cls.investor_user.set_active_role('Investor')
+
+        cls.startup = StartUpProfile.objects.create(
+            user_id=cls.startup_user, name='Dashboard Startup', description='...')
+        cls.investor = InvestorProfile.objects.create(user=cls.investor_user)
+        cls.project = Project.objects.create(
+            startup=cls.startup, title='Prj1', risk=0.5, description='...',
+            business_plan='https://google.com', amount=10000, status=1)
+        Project.objects.create(
+            startup=cls.startup, title='Prj2', risk=0.5, description='...',
+            business_plan='https://google.com', amount=30000, status=1)
+
+    def setUp(self):
+        cache.clear()
+        InvestmentTracking.objects.create(investor=self.investor, startup=self.startup)
+        TrackProjects.objects.create(investor=self.investor, project=self.project)
+        Subscription.objects.create(
+            investor=self.investor, project=self.project, share=0.25, contract_url='https://contract.com')
+        Notification.objects.filter(startup=self.startup).update(delivery_status=NotificationDeliveryStatus.SENT)
+        # Message notifications are created without signals, which would load the message from MongoDB
+        Notification.objects.bulk_create([Notification(
+            notification_type=NotificationType.MESSAGE, investor=self.investor, startup=self.startup,
+            delivery_status=NotificationDeliveryStatus.FAILED)])
+
+    def test_refresh_computes_metrics(self):
+        """test that a refresh computes the startup and investor metrics"""
+        self.assertEqual(refresh_dashboard_metrics.delay().get(), {'startups': 1, 'investors': 1})
+
+        metrics = StartupMetrics.objects.get(startup=self.startup)
+        self.assertEqual(metrics.owner_id, self.startup_user.pk)
+        self.assertEqual(metrics.followers_count, 1)
+        self.assertEqual(metrics.projects_count, 2)
+        self.assertEqual(metrics.project_trackers_count, 1)
+        self.assertEqual(metrics.funding_goal, Decimal('40000.00'))
+        self.assertEqual(metrics.funded_amount, Decimal('2500.00'))
+        self.assertAlmostEqual(metrics.funding_progress, 0.0625)
+        self.assertEqual(metrics.projects[0]['trackers_count'], 1)
+        self.assertEqual(metrics.messages_count, 1)
+        self.assertEqual(metrics.notifications_failed, 1)
+        self.assertAlmostEqual(
+            metrics.delivery_rate, metrics.notifications_sent / (metrics.notifications_sent + 1))
+
+        investor_metrics = InvestorMetrics.objects.get(investor=self.investor)
+        self.assertEqual(investor_metrics.followed_startups_count, 1)
+        self.assertEqual(investor_metrics.tracked_projects_count, 1)
+        self.assertEqual(investor_metrics.subscriptions_count, 1)
+        self.assertEqual(investor_metrics.invested_amount, Decimal('2500.00'))
+
+    def test_refresh_is_incremental(self):
+        """test that only metrics marked as changed are recomputed"""
+        DashboardMetricsService.refresh()
+        self.assertEqual(DashboardMetricsService.refresh(), (0, 0))
+
+        InvestmentTracking.objects.filter(investor=self.investor).delete()
+        self.assertEqual(DashboardMetricsService.refresh(), (1, 1))
+        self.assertEqual(StartupMetrics.objects.get(startup=self.startup).followers_count, 0)
+        self.assertEqual(DashboardMetricsService.refresh(full=True), (1, 1))
+
+    def test_dashboard_single_read_and_cache(self):
+        """test that dashboards are read with one query, cached and invalidated by refreshes"""
+        DashboardMetricsService.refresh()
+        self.client.force_authenticate(user=self.startup_user)
+        url = reverse('dashboard-startup')
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['startups'][0]['followers_count'], 1)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        InvestmentTracking.objects.filter(investor=self.investor).delete()
+        DashboardMetricsService.refresh()
+        response = self.client.get(url)
+        self.assertEqual(response.data['startups'][0]['followers_count'], 0)
+
+    def test_dashboard_requires_active_role(self):
+        """test that each dashboard is served to its active role only"""
+        DashboardMetricsService.refresh()
+        self.client.force_authenticate(user=self.investor_user)
+
+        response = self.client.get(reverse('dashboard-startup'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.client.get(reverse('dashboard-investor'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['investor']['subscriptions_count'], 1)
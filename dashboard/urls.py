@@ -1,6 +1,8 @@
-from django.contrib import admin
 from django.urls import path
 
-urlpatterns = [
+from .views import InvestorDashboardView, StartupDashboardView
 
+urlpatterns = [
+    path('startup/', StartupDashboardView.as_view(), name='dashboard-startup'),
+    path('investor/', InvestorDashboardView.as_view(), name='dashboard-investor'),
 ]
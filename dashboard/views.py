@@ -1,3 +1,85 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from forum.utils.logging_utils import get_logger
+from .models import InvestorMetrics, StartupMetrics
+from .serializers import InvestorMetricsSerializer, StartupMetricsSerializer
+from .services import DashboardMetricsService
+
+logger = get_logger('django')
+
+
+class BaseDashboardView(APIView):
+    """
+    Base view serving the precomputed dashboard of the user's active role.
+
+    The metrics are read with one indexed query on the owner and cached per
+    user in the shared cache until the next refresh of their rows (or
+    DASHBOARD_CACHE_TTL).
+    """
+    permission_classes = [IsAuthenticated]
+    role = None
+    cache_key = None
+
+    def get_data(self, user):
+        raise NotImplementedError
+
+    def get(self, request):
+        active_role = request.user.active_role
+        if active_role is None or active_role.name != self.role:
+            logger.warning("User %s requested the %s dashboard without the role", request.user.pk, self.role)
+            return Response(
+                {"error": f"The {self.role} role must be active to view this dashboard."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        cache_key = self.cache_key.format(request.user.pk)
+        data = cache.get(cache_key)
+        if data is None:
+            data = self.get_data(request.user)
+            cache.set(cache_key, data, settings.DASHBOARD_CACHE_TTL)
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class StartupDashboardView(BaseDashboardView):
+    """
+    API view to get the dashboard of the startups of the user.
+
+    Methods:
+        - GET: Followers, project trackers, funding progress, notification
+          delivery rates and message volume of each startup of the user.
+
+    Returns:
+        - 200 OK: With the metrics of the user's startups.
+        - 403 Forbidden: If the Startup role is not active.
+    """
+    role = 'Startup'
+    cache_key = DashboardMetricsService.STARTUP_CACHE_KEY
+
+    def get_data(self, user):
+        metrics = StartupMetrics.objects.filter(owner_id=user.pk).select_related('startup').order_by('startup_id')
+        return {'startups': StartupMetricsSerializer(metrics, many=True).data}
+
+
+class InvestorDashboardView(BaseDashboardView):
+    """
+    API view to get the dashboard of the investor profile of the user.
+
+    Methods:
+        - GET: Followed startups, tracked projects, subscriptions, notification
+          delivery rates and message volume of the investor.
+
+    Returns:
+        - 200 OK: With the investor metrics, null until the first refresh.
+        - 403 Forbidden: If the Investor role is not active.
+    """
+    role = 'Investor'
+    cache_key = DashboardMetricsService.INVESTOR_CACHE_KEY
+
+    def get_data(self, user):
+        metrics = InvestorMetrics.objects.filter(owner_id=user.pk).first()
+        return {'investor': InvestorMetricsSerializer(metrics).data if metrics else None}
@@ -12,8 +12,9 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 import os
 from pathlib import Path
 from datetime import timedelta
+from celery.schedules import crontab
 from dotenv import load_dotenv
-from .utils.logging_utils import JsonFormatter
+from .utils.logging_utils import JsonFormatter, QueueingHandler
 
 load_dotenv()
 
@@ -70,6 +71,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'common.middleware.PerformanceMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -107,6 +109,7 @@ ASGI_APPLICATION = 'forum.asgi.application'
 MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017')
 MONGO_DB_NAME = os.getenv('MONGO_DB_NAME', 'db_name')
 MONGO_COLLECTION_NAME = os.getenv('MONGO_COLLECTION_NAME', 'collection_name')
+MONGO_SEARCH_COLLECTION_NAME = os.getenv('MONGO_SEARCH_COLLECTION_NAME', 'message_search')
 
 DATABASES = {
     'default': {
@@ -123,7 +126,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_THROTTLE_CLASSES': [
         'rest_framework.throttling.UserRateThrottle'
@@ -142,6 +145,15 @@ REST_FRAMEWORK = {
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
+PASSWORD_HASHERS = [
+    'users.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+# PBKDF2 work factor; measure candidates with `manage.py benchmark_password_hasher`
+PASSWORD_HASH_ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', 1_000_000))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -177,12 +189,91 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 
+# Bounding boxes (px) of the thumbnails generated for uploaded logos and profile pictures
+THUMBNAIL_SIZES = (64, 256)
+
+THUMBNAIL_QUALITY = 80
+
+# JPEG quality of uploaded images, re-encoded once to drop their metadata (EXIF, GPS)
+ORIGINAL_IMAGE_QUALITY = 90
+
+# Lifetime (s) of pre-signed media URLs; URLs are stable within a period for caching
+MEDIA_SIGNED_URL_TTL = 3600
+
+# Redis holding the follower/followed id sets (common.follow_graph;
+# REDIS_HOST:REDIS_PORT db 2 when unset). Only a development server may run
+# without it, reading the follows from the database.
+FOLLOW_GRAPH_REDIS_URL = os.getenv('FOLLOW_GRAPH_REDIS_URL')
+
+if os.getenv('DJANGO_ENV').lower() != 'development' and not FOLLOW_GRAPH_REDIS_URL:
+    FOLLOW_GRAPH_REDIS_URL = f"redis://{os.getenv('REDIS_HOST', 'redis_channels')}:{os.getenv('REDIS_PORT', 6379)}/2"
+
+# Lifetime (s) of follow sets, after which they are reloaded from the database
+FOLLOW_GRAPH_TTL = 60 * 60 * 24
+
+# Redis holding the online chat connections (common.presence;
+# REDIS_HOST:REDIS_PORT db 3 when unset). Only a development server, whose
+# channel layer is in memory too, may keep presence in its own memory.
+PRESENCE_REDIS_URL = os.getenv('PRESENCE_REDIS_URL')
+
+if os.getenv('DJANGO_ENV').lower() != 'development' and not PRESENCE_REDIS_URL:
+    PRESENCE_REDIS_URL = f"redis://{os.getenv('REDIS_HOST', 'redis_channels')}:{os.getenv('REDIS_PORT', 6379)}/3"
+
+# Seconds a chat connection stays online after its last heartbeat
+PRESENCE_TTL = 60
+
+# Maximum number of users in one presence query
+PRESENCE_QUERY_MAX_USERS = 500
+
+# Seconds between typing broadcasts of a connection, and seconds without
+# keystrokes after which it stops typing
+TYPING_BROADCAST_INTERVAL = 2.0
+TYPING_TIMEOUT = 5.0
+
+# Characters of the last message kept (encrypted) on chat rooms for the inbox
+INBOX_SNIPPET_LENGTH = 100
+
+# HMAC key of the blind index of chat message words; derived from
+# ENCRYPTION_KEY when not set. Changing it requires index_chat_messages
+MESSAGE_SEARCH_KEY = os.getenv('MESSAGE_SEARCH_KEY')
+
+# Shortest word indexed and searched in chat messages
+MESSAGE_SEARCH_MIN_WORD_LENGTH = 2
+
+# Maximum number of startups or projects in one bulk follow/unfollow request
+BULK_FOLLOW_MAX_ITEMS = 500
+
+# Fraction of requests whose queries, MongoDB commands and cache lookups are
+# measured and logged (common.middleware.PerformanceMiddleware)
+PERFORMANCE_SAMPLE_RATE = float(os.getenv('PERFORMANCE_SAMPLE_RATE', 0.1))
+
+# Requests slower than this (ms) are logged whether sampled or not
+PERFORMANCE_SLOW_REQUEST_MS = int(os.getenv('PERFORMANCE_SLOW_REQUEST_MS', 1000))
+
+# Websocket consumer handlers slower than this (ms) are logged
+WEBSOCKET_SLOW_HANDLER_MS = int(os.getenv('WEBSOCKET_SLOW_HANDLER_MS', 250))
+
+# Seconds between event loop lag measurements, and lag (ms) logged as a warning
+EVENT_LOOP_LAG_INTERVAL = float(os.getenv('EVENT_LOOP_LAG_INTERVAL', 1.0))
+EVENT_LOOP_LAG_WARNING_MS = int(os.getenv('EVENT_LOOP_LAG_WARNING_MS', 100))
+
+# Clients allowed to read /metrics/: requests with "Authorization: Bearer
+# <METRICS_TOKEN>", and these addresses (none by default: REMOTE_ADDR is the
+# proxy's address behind a reverse proxy)
+METRICS_ALLOWED_IPS = [ip for ip in os.getenv('METRICS_ALLOWED_IPS', '').split(',') if ip]
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-if os.getenv('DJANGO_ENV').lower() == 'development':
+# Redis instances the channel layer is sharded across, as comma-separated
+# redis:// URLs (REDIS_HOST:REDIS_PORT when unset). Every Daphne process must
+# list the same instances, in any order.
+CHANNEL_REDIS_HOSTS = [url for url in os.getenv('CHANNEL_REDIS_HOSTS', '').split(',') if url]
+
+if os.getenv('DJANGO_ENV').lower() == 'development' and not CHANNEL_REDIS_HOSTS:
     CHANNEL_LAYERS = {
         'default': {
             'BACKEND': 'channels.layers.InMemoryChannelLayer',
@@ -191,18 +282,30 @@ if os.getenv('DJANGO_ENV').lower() == 'development':
 else:
     CHANNEL_LAYERS = {
         'default': {
-            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'BACKEND': 'common.channel_layers.ShardedRedisChannelLayer',
             'CONFIG': {
-                "hosts": [
-                    os.getenv('REDIS_HOST', 'redis_channels'),
-                    int(os.getenv('REDIS_PORT', 6379))
+                "hosts": CHANNEL_REDIS_HOSTS or [
+                    (os.getenv('REDIS_HOST', 'redis_channels'), int(os.getenv('REDIS_PORT', 6379))),
                 ],
+                # Seconds an undelivered message is kept; older chat frames are stale
+                "expiry": int(os.getenv('CHANNEL_LAYER_EXPIRY', 30)),
+                # Seconds a channel stays in a group; longer than a websocket connection lives
+                "group_expiry": int(os.getenv('CHANNEL_LAYER_GROUP_EXPIRY', 86400)),
+                # Messages queued per channel before further sends to it are dropped
+                "capacity": int(os.getenv('CHANNEL_LAYER_CAPACITY', 100)),
+                "channel_capacity": {
+                    # Consumer channels receive the room and notification group fan-out
+                    "specific.*": int(os.getenv('CHANNEL_LAYER_CONSUMER_CAPACITY', 500)),
+                },
             },
         },
     }
 
 # LOGGING_CONFIG = None
 
+# Records buffered per log handler before new ones are dropped
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -214,16 +317,27 @@ LOGGING = {
             'format': '%(levelname)s %(message)s'
         },
     },
+    # Handlers write from a listener thread through a bounded queue, so logging
+    # never blocks requests or the event loop; records are dropped (and counted)
+    # when the queue is full
     'handlers': {
         'console': {
-            'class': 'logging.StreamHandler',
+            '()': QueueingHandler,
+            'handler': {
+                'class': 'logging.StreamHandler',
+            },
+            'maxsize': LOG_QUEUE_SIZE,
             'formatter': 'simple'
         },
         'file': {
-            'class': 'logging.handlers.TimedRotatingFileHandler',
-            'filename': os.path.join(BASE_DIR, 'logs/debug.log'),
-            'when': 'midnight',
-            'backupCount': 7,
+            '()': QueueingHandler,
+            'handler': {
+                'class': 'logging.handlers.TimedRotatingFileHandler',
+                'filename': os.path.join(BASE_DIR, 'logs/debug.log'),
+                'when': 'midnight',
+                'backupCount': 7,
+            },
+            'maxsize': LOG_QUEUE_SIZE,
             'formatter': 'json'
         },
     },
@@ -238,6 +352,12 @@ LOGGING = {
             'level': 'WARNING',
             'propagate': True,
         },
+        # Sampled and slow requests, with their stats as JSON fields
+        'performance': {
+            'handlers': ['file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
@@ -248,11 +368,43 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 EMAIL_PORT = os.getenv('EMAIL_PORT')
 
-CACHES = {
-    'default': {
-        'BACKEND': "django.core.cache.backends.locmem.LocMemCache",
+# Redis of the caches shared by all processes (revoked tokens, login rate
+# limits, cached users and dashboards; REDIS_HOST:REDIS_PORT db 1 when unset).
+# Only a development server, a single process, may run on local memory.
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL')
+
+if os.getenv('DJANGO_ENV').lower() == 'development' and not CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            # LocMemCache counting hits and misses for the request metrics
+            'BACKEND': "common.metrics.InstrumentedLocMemCache",
+        },
+        'ratelimit': {
+            'BACKEND': "django.core.cache.backends.locmem.LocMemCache",
+            'LOCATION': "ratelimit",
+        },
     }
-}
+else:
+    CACHES = {
+        'default': {
+            # RedisCache counting hits and misses for the request metrics
+            'BACKEND': "common.metrics.InstrumentedRedisCache",
+            'LOCATION': CACHE_REDIS_URL or (
+                f"redis://{os.getenv('REDIS_HOST', 'redis_channels')}:{os.getenv('REDIS_PORT', 6379)}/1"
+            ),
+        },
+        'ratelimit': {
+            # Same Redis, kept out of the cache hit/miss metrics
+            'BACKEND': "django.core.cache.backends.redis.RedisCache",
+            'LOCATION': CACHE_REDIS_URL or (
+                f"redis://{os.getenv('REDIS_HOST', 'redis_channels')}:{os.getenv('REDIS_PORT', 6379)}/1"
+            ),
+            'KEY_PREFIX': "ratelimit",
+        },
+    }
+
+# Cache counting the login attempts, shared by all workers so the limit is global
+RATELIMIT_USE_CACHE = 'ratelimit'
 
 SIMPLE_JWT = {
     'USER_ID_FIELD': 'id',
@@ -266,8 +418,30 @@ SIMPLE_JWT = {
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.RevocationAwareTokenRefreshSerializer',
 }
 
+# Build request.user from the token claims (id, flags, roles) instead of loading it per request
+JWT_CLAIMS_USER = True
+
+# Lifetime (s) of cached users for tokens without current claims
+JWT_USER_CACHE_TTL = 60
+
+# Reverse proxies in front of the app (1 behind the nginx ingress): the client
+# address is the one the outermost proxy added to X-Forwarded-For
+TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', 0))
+RATELIMIT_IP_META_KEY = 'users.views.client_ip'
+
+# Failed login attempts allowed per account, and per client address when set
+# (e.g. 50/5m; only once TRUSTED_PROXY_COUNT gives the address of each client)
+LOGIN_RATE_LIMIT = os.getenv('LOGIN_RATE_LIMIT', '5/5m')
+LOGIN_IP_RATE_LIMIT = os.getenv('LOGIN_IP_RATE_LIMIT')
+
+# Local Bloom filter in front of the revoked tokens store (bits, hash functions);
+# 2**20 bits keep false positives under 1% for ~100k revocations per day
+JWT_REVOCATION_BLOOM_SIZE = 2 ** 20
+JWT_REVOCATION_BLOOM_HASHES = 7
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'USER_CREATE_PASSWORD_RETYPE': False,
@@ -314,6 +488,23 @@ CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:63
 CELERY_RESULT_SERIALIZER = os.getenv('CELERY_RESULT_SERIALIZER', 'json')
 CELERY_TASK_ALWAYS_EAGER = True
 CELERY_TASK_EAGER_PROPAGATES = True
+CELERY_BEAT_SCHEDULE = {
+    # Recompute the stale dashboard metrics rows
+    'refresh-dashboard-metrics': {
+        'task': 'dashboard.tasks.refresh_dashboard_metrics',
+        'schedule': timedelta(seconds=int(os.getenv('DASHBOARD_REFRESH_INTERVAL', 60))),
+    },
+    # Recompute all rows, in case a change was not marked
+    'refresh-all-dashboard-metrics': {
+        'task': 'dashboard.tasks.refresh_dashboard_metrics',
+        'schedule': crontab(hour=3, minute=0),
+        'kwargs': {'full': True},
+    },
+}
+
+# Lifetime (s) of cached dashboards; refreshes in the Celery worker drop them
+# earlier through the shared cache (local memory only bounds them by this TTL)
+DASHBOARD_CACHE_TTL = 300
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.getenv('EMAIL_HOST')
@@ -23,6 +23,8 @@ from rest_framework.permissions import AllowAny
 from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 
+from common.views import MetricsView
+
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -47,5 +49,6 @@ urlpatterns = [
     path('investment_tracking/', include('investment_tracking.urls')),
     path('auth/', include('djoser.urls')),
     path('auth/', include('djoser.urls.jwt')),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('swagger/schema/', schema_view.with_ui('swagger', cache_timeout=0), name='swagger-schema'),
 ]
@@ -1,13 +1,38 @@
 import json
 import logging
-import datetime
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
 
+from django.utils.module_loading import import_string
 
 
 class JsonFormatter(logging.Formatter):
+    """
+    Formatter of log records as JSON lines.
+
+    The formatted timestamp is cached per second and the encoder is built
+    once; values which are not JSON serializable are written as strings.
+    """
+    encoder = json.JSONEncoder(ensure_ascii=False, default=str)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._timestamp = (None, None)
+
+    def format_timestamp(self, created):
+        second = int(created)
+        cached_second, timestamp = self._timestamp
+        if cached_second != second:
+            timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(second))
+            self._timestamp = (second, timestamp)
+        return timestamp
+
     def format(self, record):
         log_entry = {
-            'timestamp': datetime.datetime.fromtimestamp(record.created).strftime('%Y-%m-%d %H:%M:%S'),
+            'timestamp': self.format_timestamp(record.created),
             'level': record.levelname,
             'message': record.getMessage(),
             'module': record.module,
@@ -16,12 +41,168 @@ class JsonFormatter(logging.Formatter):
             'lineno': record.lineno,
         }
 
-        if record.exc_info:
-            log_entry['exc_info'] = self.formatException(record.exc_info)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            log_entry['exc_info'] = record.exc_text
 
         if hasattr(record, 'extra_data'):
             log_entry.update(record.extra_data)
 
-        return json.dumps(log_entry, ensure_ascii=False)
+        return self.encoder.encode(log_entry)
+
+
+class DropReportingQueueListener(QueueListener):
+    """QueueListener which logs how many records its handler dropped since the last report."""
+
+    def __init__(self, queue_, handler, queue_handler):
+        super().__init__(queue_, handler, respect_handler_level=True)
+        self.queue_handler = queue_handler
+        self.reported = 0
+
+    def handle(self, record):
+        dropped = self.queue_handler.dropped
+        if dropped > self.reported:
+            super().handle(logging.makeLogRecord({
+                'name': record.name,
+                'levelno': logging.WARNING,
+                'levelname': logging.getLevelName(logging.WARNING),
+                'msg': 'Log queue full, dropped %s records',
+                'args': (dropped - self.reported,),
+            }))
+            self.reported = dropped
+        super().handle(record)
+
+
+class QueueingHandler(QueueHandler):
+    """
+    Handler which puts records on a bounded queue, written by another
+    handler in a QueueListener thread.
+
+    Callers (request threads, the event loop) never wait: when the queue
+    is full the record is dropped and counted in `dropped`, and the count
+    is logged with the next written record. The record message is merged
+    with its arguments on the calling thread, everything else (formatting,
+    I/O) runs on the listener thread.
+
+    Configured in LOGGING with the wrapped handler as a dict:
+
+        'file': {
+            '()': 'forum.utils.logging_utils.QueueingHandler',
+            'handler': {'class': 'logging.FileHandler', 'filename': 'debug.log'},
+            'formatter': 'json',
+            'maxsize': 10000,
+        }
+
+    The formatter is set on the wrapped handler.
+    """
+
+    def __init__(self, handler, maxsize=10000):
+        handler = dict(handler)
+        handler_class = import_string(handler.pop('class'))
+        self.handler = handler_class(**handler)
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.lock_dropped = threading.Lock()
+        super().__init__(queue.Queue(maxsize))
+        self.start()
+
+    def start(self):
+        self.pid = os.getpid()
+        self.listener = DropReportingQueueListener(self.queue, self.handler, self)
+        self.listener.start()
+
+    def setFormatter(self, fmt):
+        self.handler.setFormatter(fmt)
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        if self.pid != os.getpid():
+            # The listener thread does not survive a fork (Celery, Gunicorn workers)
+            self.queue = queue.Queue(self.maxsize)
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self.lock_dropped:
+                self.dropped += 1
+
+    def close(self):
+        if self.listener is not None and self.pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+        self.handler.close()
+        super().close()
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """
+    Logger adapter for lazy %-style messages with structured fields.
+
+    Keyword arguments other than the ones of `Logger.log` are fields, stored
+    in the `extra_data` of the record and added to the entry by JsonFormatter.
+    Disabled levels return after a single `isEnabledFor` check, before the
+    message is formatted or the fields are collected:
+
+        logger = get_logger('django')
+        logger.info("Chatroom %s retrieved", room_oid, messages=len(messages))
+
+    Arguments are still evaluated by the caller, so expensive ones (reprs of
+    large objects, related model instances) should be guarded with
+    `logger.isEnabledFor(level)` or replaced by ids.
+    """
+    LOG_KWARGS = frozenset(('exc_info', 'stack_info', 'stacklevel', 'extra'))
+
+    def __init__(self, logger):
+        super().__init__(logger, {})
+
+    def process(self, msg, kwargs):
+        fields = {key: kwargs.pop(key) for key in list(kwargs) if key not in self.LOG_KWARGS}
+        if fields:
+            kwargs['extra'] = {**kwargs.get('extra', {}), 'extra_data': fields}
+        return msg, kwargs
+
+    def _emit(self, level, msg, args, kwargs):
+        msg, kwargs = self.process(msg, kwargs)
+        # Skip this frame and the level method, so records point to the caller
+        kwargs['stacklevel'] = kwargs.get('stacklevel', 1) + 2
+        self.logger._log(level, msg, args, **kwargs)
+
+    def log(self, level, msg, *args, **kwargs):
+        if self.logger.isEnabledFor(level):
+            self._emit(level, msg, args, kwargs)
+
+    def debug(self, msg, *args, **kwargs):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self._emit(logging.DEBUG, msg, args, kwargs)
+
+    def info(self, msg, *args, **kwargs):
+        if self.logger.isEnabledFor(logging.INFO):
+            self._emit(logging.INFO, msg, args, kwargs)
+
+    def warning(self, msg, *args, **kwargs):
+        if self.logger.isEnabledFor(logging.WARNING):
+            self._emit(logging.WARNING, msg, args, kwargs)
+
+    def error(self, msg, *args, **kwargs):
+        if self.logger.isEnabledFor(logging.ERROR):
+            self._emit(logging.ERROR, msg, args, kwargs)
+
+    def exception(self, msg, *args, exc_info=True, **kwargs):
+        if self.logger.isEnabledFor(logging.ERROR):
+            self._emit(logging.ERROR, msg, args, {**kwargs, 'exc_info': exc_info})
+
+    def critical(self, msg, *args, **kwargs):
+        if self.logger.isEnabledFor(logging.CRITICAL):
+            self._emit(logging.CRITICAL, msg, args, kwargs)
 
 
+def get_logger(name):
+    """Return a StructuredLogger of the named logger."""
+    return StructuredLogger(logging.getLogger(name))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investment_tracking', '0003_investmenttracking_unique_investor_startup'),
+        ('investors', '0002_alter_investorprofile_investor_logo'),
+        ('startups', '0002_alter_startupprofile_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='investmenttracking',
+            index=models.Index(fields=['saved_at'], name='investment_tracking_saved_idx'),
+        ),
+    ]
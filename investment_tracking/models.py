@@ -1,9 +1,9 @@
-import logging
 from django.db import models
 from startups.models import StartUpProfile
 from investors.models import InvestorProfile
+from forum.utils.logging_utils import get_logger
 
-logger = logging.getLogger('django')
+logger = get_logger('django')
 
 
 class InvestmentTracking(models.Model):
@@ -30,6 +30,9 @@ class InvestmentTracking(models.Model):
         verbose_name = 'Investment Tracking'
         verbose_name_plural = 'Investment Tracking'
         ordering = ['-saved_at']
+        indexes = [
+            models.Index(fields=['saved_at'], name='investment_tracking_saved_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=["investor", "startup"],
@@ -44,26 +47,26 @@ class InvestmentTracking(models.Model):
         """
         Override the save method to add logging when an investment is saved.
         """
-        logger.info(f"Saving investment tracking for Investor: {self.investor}, StartUp: {self.startup}.")
+        logger.info("Saving investment tracking for Investor: %s, StartUp: %s.", self.investor_id, self.startup_id)
         try:
             super().save(*args, **kwargs)
-            logger.info(
-                f"Investment tracking saved successfully for Investor: {self.investor}, StartUp: {self.startup}.")
+            logger.info("Investment tracking saved successfully for Investor: %s, StartUp: %s.",
+                        self.investor_id, self.startup_id)
         except Exception as e:
-            logger.error(
-                f"Failed to save investment tracking for Investor: {self.investor}, StartUp: {self.startup}. Error: {e}")
+            logger.error("Failed to save investment tracking for Investor: %s, StartUp: %s. Error: %s",
+                         self.investor_id, self.startup_id, e)
             raise
 
     def delete(self, *args, **kwargs):
         """
         Override the delete method to add logging when an investment is deleted.
         """
-        logger.info(f"Deleting investment tracking for Investor: {self.investor}, StartUp: {self.startup}.")
+        logger.info("Deleting investment tracking for Investor: %s, StartUp: %s.", self.investor_id, self.startup_id)
         try:
             super().delete(*args, **kwargs)
-            logger.info(
-                f"Investment tracking deleted successfully for Investor: {self.investor}, StartUp: {self.startup}.")
+            logger.info("Investment tracking deleted successfully for Investor: %s, StartUp: %s.",
+                        self.investor_id, self.startup_id)
         except Exception as e:
-            logger.error(
-                f"Failed to delete investment tracking for Investor: {self.investor}, StartUp: {self.startup}. Error: {e}")
+            logger.error("Failed to delete investment tracking for Investor: %s, StartUp: %s. Error: %s",
+                         self.investor_id, self.startup_id, e)
             raise
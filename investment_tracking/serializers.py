@@ -1,9 +1,10 @@
-import logging
+from django.conf import settings
 from rest_framework import serializers
+from forum.utils.logging_utils import get_logger
 from .models import InvestmentTracking
 
 
-logger = logging.getLogger('django')
+logger = get_logger('django')
 
 
 class InvestmentTrackingSerializerCreate(serializers.ModelSerializer):
@@ -13,9 +14,9 @@ class InvestmentTrackingSerializerCreate(serializers.ModelSerializer):
         fields = ['investor', 'startup']
 
     def create(self, validated_data):
-        logger.info(f"Creating InvestmentTracking with data: {validated_data}")
+        logger.info("Creating InvestmentTracking with data: %s", validated_data)
         investment_tracking = super().create(validated_data)
-        logger.info(f"InvestmentTracking created successfully: {investment_tracking}")
+        logger.info("InvestmentTracking created successfully: %s", investment_tracking)
         return investment_tracking
 
 
@@ -25,3 +26,11 @@ class ListInvestmentTrackingSerializer(serializers.ModelSerializer):
     class Meta:
         model = InvestmentTracking
         fields = ['startup', 'startup_name', 'saved_at']
+
+
+class BulkInvestmentTrackingSerializer(serializers.Serializer):
+    startup_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_FOLLOW_MAX_ITEMS
+    )
@@ -0,0 +1,24 @@
+from common.follows import BulkFollowService
+from dashboard.services import DashboardMetricsService
+from notifications.tasks import create_follow_notifications
+from startups.models import StartUpProfile
+from .models import InvestmentTracking
+
+
+class StartupFollowService(BulkFollowService):
+    """Service for saving (following) and unsaving startups in bulk."""
+    model = InvestmentTracking
+    target_model = StartUpProfile
+    target_field = 'startup'
+    startup_field = 'pk'
+
+    @classmethod
+    def mark_changed(cls, investor_id, target_ids):
+        DashboardMetricsService.mark_changed(startup_ids=target_ids, investor_ids=[investor_id])
+
+    @classmethod
+    def notify(cls, investor_id, followed):
+        create_follow_notifications.delay(
+            investor_id=investor_id,
+            follows=[[startup_id, None] for startup_id in followed.values()]
+        )
@@ -1,9 +1,21 @@
+import json
+from unittest import skipUnless
+from unittest.mock import patch
+
 from rest_framework_simplejwt.tokens import RefreshToken
 from users.models import User
 from investors.models import InvestorProfile
 from startups.models import StartUpProfile
+from notifications.models import Notification, NotificationType
+from projects.models import Project
+from track_projects.models import TrackProjects
 from .models import InvestmentTracking
+from .services import StartupFollowService
+from common.follow_graph import FollowGraph
+from django.conf import settings
+from django.db import transaction
 from django.db.utils import IntegrityError
+from django.test import TransactionTestCase
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -159,3 +171,193 @@ class InvestmentTrackingTests(APITestCase):
             print('IntegrityError caught')
         else:
             print('No IntegrityError raised')
+
+    def test_export_investment_tracking(self):
+        first = InvestmentTracking.objects.create(
+            investor=self.investor,
+            startup=self.startup1)
+
+        InvestmentTracking.objects.create(
+            investor=self.investor,
+            startup=self.startup2)
+
+        response = self.client.get(reverse('export-saved-startups'),
+                                   {'since': first.saved_at.isoformat(), 'since_id': first.id})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['startup'] for row in rows], [self.startup2.id])
+
+
+    def test_bulk_save_startups(self):
+        InvestmentTracking.objects.create(investor=self.investor, startup=self.startup2)
+        missing_id = self.startup3.id + 1000
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('bulk-save-followed-startups'), {
+                'startup_ids': [self.startup1.id, self.startup2.id, missing_id, self.startup3.id, self.startup1.id],
+            }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [
+            {'startup_id': self.startup1.id, 'status': 'followed'},
+            {'startup_id': self.startup2.id, 'status': 'already_following'},
+            {'startup_id': missing_id, 'status': 'not_found'},
+            {'startup_id': self.startup3.id, 'status': 'followed'},
+        ])
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(InvestmentTracking.objects.filter(investor=self.investor).count(), 3)
+        # startup2 got its notification when it was saved before
+        self.assertEqual(
+            sorted(Notification.objects.filter(investor=self.investor, notification_type=NotificationType.FOLLOW)
+                   .values_list('startup_id', flat=True)),
+            sorted([self.startup1.id, self.startup2.id, self.startup3.id]))
+
+    def test_bulk_save_concurrently_followed_startup(self):
+        """test a follow committed after the targets are read is reported and notified once"""
+        insert_follows = StartupFollowService.insert_follows
+
+        def follow_first(investor_id, target_ids):
+            InvestmentTracking.objects.create(investor=self.investor, startup=self.startup1)
+            return insert_follows(investor_id, target_ids)
+
+        with patch.object(StartupFollowService, 'insert_follows', side_effect=follow_first), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('bulk-save-followed-startups'), {
+                'startup_ids': [self.startup1.id, self.startup2.id],
+            }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['status'] for row in response.data['results']], ['already_following', 'followed'])
+        self.assertEqual(
+            sorted(Notification.objects.filter(investor=self.investor, notification_type=NotificationType.FOLLOW)
+                   .values_list('startup_id', flat=True)),
+            sorted([self.startup1.id, self.startup2.id]))
+
+    def test_bulk_unsave_startups(self):
+        InvestmentTracking.objects.create(investor=self.investor, startup=self.startup1)
+
+        response = self.client.post(reverse('bulk-unsave-followed-startups'), {
+            'startup_ids': [self.startup1.id, self.startup2.id],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['status'] for row in response.data['results']], ['unfollowed', 'not_following'])
+        self.assertFalse(InvestmentTracking.objects.filter(investor=self.investor).exists())
+
+    def test_bulk_save_too_many_startups(self):
+        response = self.client.post(reverse('bulk-save-followed-startups'), {
+            'startup_ids': list(range(1, settings.BULK_FOLLOW_MAX_ITEMS + 2)),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class FollowGraphTest(TransactionTestCase):
+    """
+    Test the follower sets of the follow graph, which are used outside of transactions.
+
+    Without FOLLOW_GRAPH_REDIS_URL the same answers are read from the database.
+    """
+
+    def setUp(self):
+        store = FollowGraph.get_store()
+        if store is not None:
+            for key in store.client.scan_iter('follow_graph:*'):
+                store.client.delete(key)
+        owner = User.objects.create_user(
+            email="owner@gmail.com",
+            password="123456pok",
+            first_name="Owner",
+            last_name="Doe",
+            user_phone="+1234567890")
+        owner.add_role("Startup")
+        self.startups = [
+            StartUpProfile.objects.create(user_id=owner, name=f'Startup {i}', description='Test')
+            for i in range(2)
+        ]
+        self.investors = []
+        for i in range(3):
+            user = User.objects.create_user(
+                email=f"investor{i}@gmail.com",
+                password="123456pok",
+                first_name="Investor",
+                last_name=str(i),
+                user_phone="+1234567890")
+            user.add_role("Investor")
+            self.investors.append(InvestorProfile.objects.create(user=user))
+
+    @skipUnless(settings.FOLLOW_GRAPH_REDIS_URL, 'FOLLOW_GRAPH_REDIS_URL is not set')
+    def test_sets_follow_saves_and_deletes(self):
+        """test the loaded sets are updated by created and deleted follows"""
+        startup = self.startups[0]
+        InvestmentTracking.objects.create(investor=self.investors[0], startup=startup)
+        self.assertEqual(FollowGraph.startup_followers(startup.id), {self.investors[0].id})
+
+        tracking = InvestmentTracking.objects.create(investor=self.investors[1], startup=startup)
+        with self.assertNumQueries(0):
+            self.assertEqual(FollowGraph.startup_followers(startup.id),
+                             {self.investors[0].id, self.investors[1].id})
+
+        tracking.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(FollowGraph.startup_followers(startup.id), {self.investors[0].id})
+
+    def test_rolled_back_follow_is_not_added(self):
+        """test a follow is added to the sets only once committed"""
+        startup = self.startups[0]
+        self.assertEqual(FollowGraph.startup_followers(startup.id), set())
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            InvestmentTracking.objects.create(investor=self.investors[0], startup=startup)
+            InvestmentTracking.objects.create(investor=self.investors[0], startup=startup)
+        self.assertEqual(FollowGraph.startup_followers(startup.id), set())
+
+    def test_bulk_membership(self):
+        """test checking several startups for an investor at once"""
+        investor = self.investors[0]
+        InvestmentTracking.objects.create(investor=investor, startup=self.startups[1])
+        follows = FollowGraph.follows_startups(investor.id, [startup.id for startup in self.startups])
+        self.assertEqual(follows, {self.startups[0].id: False, self.startups[1].id: True})
+        self.assertEqual(FollowGraph.followed_startups(investor.id), {self.startups[1].id})
+
+    def test_followers_intersection(self):
+        """test the investors following both a startup and its project"""
+        startup = self.startups[0]
+        project = Project.objects.create(
+            startup=startup, title='Prj1', risk=0.5, description='...',
+            business_plan='https://google.com', amount=10000, status=1)
+        for investor in self.investors[:2]:
+            InvestmentTracking.objects.create(investor=investor, startup=startup)
+        for investor in self.investors[1:]:
+            TrackProjects.objects.create(investor=investor, project=project)
+
+        self.assertEqual(FollowGraph.project_followers(project.project_id),
+                         {self.investors[1].id, self.investors[2].id})
+        self.assertEqual(FollowGraph.startup_and_project_followers(startup.id, project.project_id),
+                         {self.investors[1].id})
+        self.assertTrue(FollowGraph.follows_project(self.investors[2].id, project.project_id))
+
+    @skipUnless(settings.FOLLOW_GRAPH_REDIS_URL, 'FOLLOW_GRAPH_REDIS_URL is not set')
+    def test_set_changed_while_loading_is_not_loaded(self):
+        """test a follow committed while a set is read from the database is not overwritten"""
+        startup = self.startups[0]
+        store = FollowGraph.get_store()
+        key = FollowGraph.STARTUP_FOLLOWERS.get_key(startup.id)
+
+        def query():
+            members = FollowGraph.STARTUP_FOLLOWERS.query(startup.id)
+            InvestmentTracking.objects.create(investor=self.investors[0], startup=startup)
+            return members
+
+        self.assertFalse(store.load(key, query))
+        self.assertEqual(store.loaded([key]), [False])
+        self.assertEqual(FollowGraph.startup_followers(startup.id), {self.investors[0].id})
+        self.assertEqual(store.loaded([key]), [True])
+
+    def test_database_without_store(self):
+        """test the follows are read from the database without FOLLOW_GRAPH_REDIS_URL"""
+        startup = self.startups[0]
+        InvestmentTracking.objects.create(investor=self.investors[0], startup=startup)
+        with self.settings(FOLLOW_GRAPH_REDIS_URL=None), patch.object(FollowGraph, '_store', None):
+            self.assertIsNone(FollowGraph.get_store())
+            with self.assertNumQueries(1):
+                self.assertEqual(FollowGraph.startup_followers(startup.id), {self.investors[0].id})
@@ -1,8 +1,18 @@
 from django.urls import path
-from .views import InvestmentTrackingSaveView, InvestmentTrackingListView, InvestmentTrackingUnsaveView
+from .views import (
+    InvestmentTrackingSaveView,
+    InvestmentTrackingBulkSaveView,
+    InvestmentTrackingBulkUnsaveView,
+    InvestmentTrackingListView,
+    InvestmentTrackingUnsaveView,
+    InvestmentTrackingExportView,
+)
 
 urlpatterns = [
     path("startup/<int:startup_id>/save/", InvestmentTrackingSaveView.as_view(), name="save-followed-startups"),
+    path("startups/bulk-save/", InvestmentTrackingBulkSaveView.as_view(), name="bulk-save-followed-startups"),
+    path("startups/bulk-unsave/", InvestmentTrackingBulkUnsaveView.as_view(), name="bulk-unsave-followed-startups"),
     path("investor/saved-startups/", InvestmentTrackingListView.as_view(), name="list-saved-startups"),
     path("startup/<int:startup_id>/unsave/", InvestmentTrackingUnsaveView.as_view(), name="unsave-followed-startups"),
+    path("export/", InvestmentTrackingExportView.as_view(), name="export-saved-startups"),
 ]
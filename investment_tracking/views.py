@@ -1,23 +1,30 @@
-import logging
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status, generics
+from common.views import StreamingExportView
 from .models import InvestmentTracking
 from startups.models import StartUpProfile
 from django.db.utils import IntegrityError
 from rest_framework.views import APIView
 from investors.models import InvestorProfile
-from .serializers import InvestmentTrackingSerializerCreate, ListInvestmentTrackingSerializer
+from common.follows import FollowStatus
+from forum.utils.logging_utils import get_logger
+from .serializers import (
+    BulkInvestmentTrackingSerializer,
+    InvestmentTrackingSerializerCreate,
+    ListInvestmentTrackingSerializer,
+)
+from .services import StartupFollowService
 
 
 def get_investor_profile(request):
     return get_object_or_404(InvestorProfile, user=request.user)
 
 
-logger = logging.getLogger('django')
+logger = get_logger('django')
 
 
 class InvestmentTrackingSaveView(APIView):
@@ -27,13 +34,13 @@ class InvestmentTrackingSaveView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, startup_id):
-        logger.debug(f"Received POST request to save Startup with ID: {startup_id} for user: {request.user}")
+        logger.debug("Received POST request to save Startup with ID: %s for user: %s", startup_id, request.user)
 
         investor_profile = get_investor_profile(request)
-        logger.debug(f"Investor profile found: {investor_profile}")
+        logger.debug("Investor profile found: %s", investor_profile)
 
         startup = get_object_or_404(StartUpProfile, id=startup_id)
-        logger.debug(f"Startup profile found: {startup}")
+        logger.debug("Startup profile found: %s", startup)
 
         serializer = InvestmentTrackingSerializerCreate(data={'investor': investor_profile.id, 'startup': startup.id})
 
@@ -41,17 +48,69 @@ class InvestmentTrackingSaveView(APIView):
             try:
                 investment_tracking = InvestmentTracking(investor=investor_profile, startup=startup)
                 investment_tracking.save()
-                logger.debug(f"InvestmentTracking object created: {investment_tracking}")
+                logger.debug("InvestmentTracking object created: %s", investment_tracking)
                 return Response({"message": "StartUp has been successfully saved."}, status=status.HTTP_201_CREATED)
             except IntegrityError:
-                logger.warning(
-                    f"Attempt to save Startup that is already saved for Investor: {investor_profile}, Startup: {startup}")
+                logger.warning("Attempt to save Startup that is already saved for Investor: %s, Startup: %s",
+                               investor_profile, startup)
                 return Response({"message": "Startup is already saved."}, status=status.HTTP_409_CONFLICT)
         else:
-            logger.error(f"Serializer validation failed: {serializer.errors}")
+            logger.error("Serializer validation failed: %s", serializer.errors)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class InvestmentTrackingBulkSaveView(APIView):
+    """
+    API view to save many StartUps of interest at once, e.g. when importing a watchlist.
+
+    Methods:
+        - POST: saves the startups in `startup_ids`.
+
+    Returns:
+        - 200 OK: with the status of each startup (followed, already_following or not_found).
+        - 400 Bad Request: if `startup_ids` is invalid.
+    """
+    permission_classes = [IsAuthenticated]
+    action = 'save'
+
+    def apply(self, investor_id, startup_ids):
+        return StartupFollowService.follow(investor_id, startup_ids)
+
+    def post(self, request):
+        serializer = BulkInvestmentTrackingSerializer(data=request.data)
+        if not serializer.is_valid():
+            logger.error("Serializer validation failed: %s", serializer.errors)
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        investor_profile = get_investor_profile(request)
+        statuses = self.apply(investor_profile.id, serializer.validated_data['startup_ids'])
+        logger.debug("Bulk %s of startups for Investor: %s: %s", self.action, investor_profile, statuses)
+        return Response({
+            'results': [
+                {'startup_id': startup_id, 'status': status_} for startup_id, status_ in statuses.items()
+            ],
+            'updated': sum(status_ in (FollowStatus.FOLLOWED, FollowStatus.UNFOLLOWED)
+                           for status_ in statuses.values()),
+        }, status=status.HTTP_200_OK)
+
+
+class InvestmentTrackingBulkUnsaveView(InvestmentTrackingBulkSaveView):
+    """
+    API view to unsave many saved startups at once.
+
+    Methods:
+        - POST: unsaves the startups in `startup_ids`.
+
+    Returns:
+        - 200 OK: with the status of each startup (unfollowed or not_following).
+        - 400 Bad Request: if `startup_ids` is invalid.
+    """
+    action = 'unsave'
+
+    def apply(self, investor_id, startup_ids):
+        return StartupFollowService.unfollow(investor_id, startup_ids)
+
+
 class InvestmentTrackingListView(generics.ListAPIView):
     """
     API view to get list all startups saved by the investor.
@@ -65,7 +124,7 @@ class InvestmentTrackingListView(generics.ListAPIView):
 
     def get_queryset(self):
         investor_profile = get_investor_profile(self.request)
-        logger.debug(f"Investor profile found: {investor_profile}")
+        logger.debug("Investor profile found: %s", investor_profile)
         return InvestmentTracking.objects.filter(investor=investor_profile)
 
 
@@ -76,14 +135,32 @@ class InvestmentTrackingUnsaveView(APIView):
     permission_classes = [IsAuthenticated]
 
     def delete(self, request, startup_id):
-        logger.debug(f"Request to unsave Startup with ID: {startup_id}, user: {request.user}")
+        logger.debug("Request to unsave Startup with ID: %s, user: %s", startup_id, request.user)
 
         investor_profile = get_investor_profile(request)
-        logger.debug(f"Investor profile found: {investor_profile}")
+        logger.debug("Investor profile found: %s", investor_profile)
         startup = get_object_or_404(StartUpProfile, id=startup_id)
-        logger.debug(f"Startup profile found: {startup}")
+        logger.debug("Startup profile found: %s", startup)
 
         investment_tracking = get_object_or_404(InvestmentTracking, investor=investor_profile, startup=startup)
         investment_tracking.delete()
-        logger.debug(f"Successfully unsaved Startup: {startup} for Investor: {investor_profile}")
+        logger.debug("Successfully unsaved Startup: %s for Investor: %s", startup, investor_profile)
         return Response({"message": "StartUp has been successfully unsaved."}, status=status.HTTP_204_NO_CONTENT)
+
+
+class InvestmentTrackingExportView(StreamingExportView):
+    """
+    API view to export saved startups as a streamed NDJSON or CSV file.
+
+    Staff export all records, investors their own saved startups.
+    Supports the `file_format` and incremental `since` (saved_at) and `since_id` query parameters.
+    """
+    export_fields = ('id', 'investor', 'startup', 'saved_at')
+    since_field = 'saved_at'
+    filename = 'investment_tracking'
+
+    def get_queryset(self):
+        queryset = InvestmentTracking.objects.all()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(investor__user_id=self.request.user.id)
+        return queryset
@@ -1,8 +1,8 @@
-import logging
 from django.apps import AppConfig
+from forum.utils.logging_utils import get_logger
 
 
-logger = logging.getLogger('django')
+logger = get_logger('django')
 
 
 class InvestorsConfig(AppConfig):
@@ -15,5 +15,5 @@ class InvestorsConfig(AppConfig):
             import investors.signals  # noqa
             logger.info('Successfully imported signals for Investors app.')
         except Exception as e:
-            logger.error(f'Failed to import signals for Investors app. Error: {e}')
+            logger.error('Failed to import signals for Investors app. Error: %s', e)
             raise
@@ -1,11 +1,11 @@
-import logging
 from django.contrib.auth import get_user_model
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from common.validators.image_validator import ImageValidator
+from forum.utils.logging_utils import get_logger
 
 User = get_user_model()
-logger = logging.getLogger('django')
+logger = get_logger('django')
 
 class PreferredStageChoices(models.IntegerChoices):
     SEED = 1, _('Seed')
@@ -34,13 +34,13 @@ class InvestorProfile(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.pk:
-            logger.info(f"Creating a new InvestorProfile for user {self.user.email}")
+            logger.info("Creating a new InvestorProfile for user %s", self.user_id)
         else:
-            logger.info(f"Updating InvestorProfile for user {self.user.email}")
+            logger.info("Updating InvestorProfile for user %s", self.user_id)
         try:
             super().save(*args, **kwargs)
         except Exception as e:
-            logger.error(f"Failed to save InvestorProfile for user {self.user.email}. Error: {e}")
+            logger.error("Failed to save InvestorProfile for user %s. Error: %s", self.user_id, e)
             raise
 
     class Meta:
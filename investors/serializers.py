@@ -1,14 +1,15 @@
-from rest_framework import serializers
-
 from django.contrib.auth import get_user_model
 
+from common.serializers import ImageModelSerializer, ThumbnailUrlsField
 from .models import InvestorProfile
 
 
 User = get_user_model()
 
-class InvestorSerializer(serializers.ModelSerializer):
-    """Investor Serializer"""    
+class InvestorSerializer(ImageModelSerializer):
+    """Investor Serializer"""
+    investor_logo_thumbnails = ThumbnailUrlsField(source='investor_logo')
+
     class Meta:
         model = InvestorProfile
         fields = '__all__'
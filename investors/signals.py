@@ -1,10 +1,10 @@
-import logging
 from django.db.models.signals import post_delete
 from django.dispatch import receiver
+from forum.utils.logging_utils import get_logger
 from .models import InvestorProfile
 
 
-logger = logging.getLogger('django')
+logger = get_logger('django')
 
 @receiver(post_delete, sender=InvestorProfile)
 def auto_delete_file_on_delete(sender, instance, **kwargs):
@@ -12,4 +12,4 @@ def auto_delete_file_on_delete(sender, instance, **kwargs):
     if instance.investor_logo:
         file_path = instance.investor_logo.path
         instance.investor_logo.delete(save=False)
-        logger.info(f"Deleted investor logo at {file_path} for investor {instance.user.email}")
+        logger.info("Deleted investor logo at %s for user %s", file_path, instance.user_id)
@@ -0,0 +1,14 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_alter_notification_read_at'),
+        ('notifications', '0004_merge_20241107_1941'),
+    ]
+
+    operations = [
+    ]
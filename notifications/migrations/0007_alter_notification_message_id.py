@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0006_alter_notification_created_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='message_id',
+            field=models.CharField(blank=True, max_length=24, null=True),
+        ),
+    ]
@@ -1,5 +1,3 @@
-import logging
-
 from django.contrib.auth import get_user_model
 from django.db import models
 from django.urls import reverse
@@ -11,9 +9,10 @@ from startups.models import StartUpProfile
 from investors.models import InvestorProfile
 from users.models import Role
 from projects.models import Project
+from forum.utils.logging_utils import get_logger
 
 User = get_user_model()
-logger = logging.getLogger('django')
+logger = get_logger('django')
 
 
 class NotificationType(models.IntegerChoices):
@@ -75,7 +74,7 @@ class Notification(models.Model):
     
     delivery_status = models.IntegerField(
         choices=NotificationDeliveryStatus, blank=True, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     sent_at = models.DateTimeField(blank=True, null=True)
     read_at = models.DateTimeField(blank=True, null=True, default=None)
 
@@ -171,10 +170,9 @@ class Notification(models.Model):
                 )
         except (Notification.DoesNotExist, RolesNotifications.DoesNotExist,
                 Role.DoesNotExist, NotificationPreferences.DoesNotExist) as e:
-            logger.error(
-                f'Notification or Role Notification or Role or Preferences object not found\n{e}')
+            logger.error('Notification or Role Notification or Role or Preferences object not found\n%s', e)
         except AttributeError as e:
-            logger.error(f'Invalid role {e}')
+            logger.error('Invalid role %s', e)
 
         if preferences:
             notification_preferences['email'] = preferences.email
@@ -204,7 +202,7 @@ class Notification(models.Model):
                             notification_type=self.notification_type
                         )
             except User.DoesNotExist:
-                logger.error(f'User with id {receiver_user_id} not found')
+                logger.error('User with id %s not found', receiver_user_id)
 
         return preferences
 
@@ -1,6 +1,8 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from common.follow_graph import FollowGraph
+
 from investment_tracking.models import InvestmentTracking
 from investors.models import InvestorProfile
 from startups.models import StartUpProfile
@@ -48,18 +50,6 @@ def send_notification(sender, instance, created, **kwargs):
             send_notification_email.delay(notification_id=instance.id)
 
 
-@receiver(post_save, sender=StartUpProfile)
-def create_notification_on_startup_update(sender, instance, **kwargs):
-    """Create notifications for investor when startyp was updated"""
-
-    tracking = InvestmentTracking.objects.filter(startup=instance)
-    for track in tracking:
-        create_notification.delay(
-            investor_id=track.investor.id,
-            startup_id=instance.id,
-            type_=NotificationType.UPDATE
-        )
-
 @receiver(post_save, sender=InvestorProfile)
 @receiver(post_save, sender=StartUpProfile)
 def setup_notification_settings(sender, instance, created, **kwargs):
@@ -76,10 +66,9 @@ def setup_notification_settings(sender, instance, created, **kwargs):
 @receiver(post_save, sender=StartUpProfile)
 def create_notification_on_startup_update(sender, instance, **kwargs):
     """Create notifications for investor when startup is updated"""
-    tracking = InvestmentTracking.objects.filter(startup=instance)
-    for track in tracking:
+    for investor_id in FollowGraph.startup_followers(instance.id):
         create_notification.delay(
-            investor_id=track.investor.id,
+            investor_id=investor_id,
             startup_id=instance.id,
             type_=NotificationType.UPDATE
         )
@@ -87,11 +76,10 @@ def create_notification_on_startup_update(sender, instance, **kwargs):
 @receiver(post_save, sender=Project)
 def create_notification_on_project_update(sender, instance, **kwargs):
     """Create notifications for investor when project is updated"""
-    tracking = TrackProjects.objects.filter(project=instance)
-    for track in tracking:
+    for investor_id in FollowGraph.project_followers(instance.project_id):
         create_notification.delay(
-            investor_id=track.investor.id,
-            startup_id=instance.startup.id,
+            investor_id=investor_id,
+            startup_id=instance.startup_id,
             project_id=instance.project_id,
             type_=NotificationType.UPDATE
         )
\ No newline at end of file
@@ -1,5 +1,3 @@
-import logging
-
 from celery import shared_task
 from django.contrib.auth import get_user_model
 from django.core.mail import send_mail
@@ -11,14 +9,16 @@ from .models import Notification, NotificationType
 
 from communications.di_container import init_container
 from communications.repositories.base import BaseMessagesRepository
+from dashboard.services import DashboardMetricsService
 from forum.settings import DEFAULT_FROM_EMAIL
 from investors.models import InvestorProfile
 from startups.models import StartUpProfile
 from users.models import Role
+from forum.utils.logging_utils import get_logger
 from .models import Notification, NotificationType, NotificationPreferences, RolesNotifications
 
 User = get_user_model()
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
 container = init_container()
 mongo_repo: BaseMessagesRepository = container.resolve(BaseMessagesRepository)
@@ -38,6 +38,32 @@ def create_notification(investor_id, startup_id, type_, message_id=None, project
         print(e)
 
 
+@shared_task
+def create_follow_notifications(investor_id, follows):
+    """Create the follow notifications of a bulk follow at once
+
+    Parameters:
+    - investor_id
+    - follows: list of [startup_id, project_id or None]
+    """
+    notifications = Notification.objects.bulk_create([
+        Notification(
+            notification_type=NotificationType.FOLLOW,
+            investor_id=investor_id,
+            startup_id=startup_id,
+            project_id=project_id
+        )
+        for startup_id, project_id in follows
+    ])
+    # bulk_create sends no post_save, so emails and dashboard updates are done here
+    for notification in notifications:
+        if notification.get_notification_preferences().get('email'):
+            send_notification_email.delay(notification_id=notification.id)
+    DashboardMetricsService.mark_changed(
+        startup_ids={startup_id for startup_id, _ in follows}, investor_ids=[investor_id])
+    logger.info('Created %s follow notifications of investor %s', len(notifications), investor_id)
+
+
 @shared_task(bind=True, max_retries=3)
 def send_notification_email(self, notification_id):
     """Send notification via email
@@ -159,7 +185,7 @@ def set_initial_notification_settings(instance_id, role_name):
         elif role_name == 'Investor':
             instance = InvestorProfile.objects.get(id=instance_id)
     except (Role.DoesNotExist, InvestorProfile.DoesNotExist, StartUpProfile.DoesNotExist) as e:
-        logger.error(f'{e} Created {role_name} instance not found: {instance_id}')
+        logger.error('%s Created %s instance not found: %s', e, role_name, instance_id)
 
     allowed_notifications = RolesNotifications.objects.filter(role=role)
 
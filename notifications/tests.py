@@ -1,4 +1,9 @@
+import json
+
 from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
 from django.contrib.auth import get_user_model
 from django.core import mail
 
@@ -182,3 +187,56 @@ class NotificationTest(TestCase):
                        NotificationDeliveryStatus.FAILED))
         if notification.delivery_status == NotificationDeliveryStatus.SENT:
             self.assertIsNotNone(notification.sent_at)
+
+
+class NotificationExportTest(APITestCase):
+    """Test suite for the notification streaming export"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user_st = User.objects.create_user(
+            email='startup@gmail.com', password='StrongPass123!',
+            first_name='Startup', last_name='L', user_phone='+999999999')
+        user_st.add_role('Startup')
+        cls.user_inv = User.objects.create_user(
+            email='investor@gmail.com', password='StrongPass123!',
+            first_name='Investor', last_name='L', user_phone='+999999999')
+        cls.user_inv.add_role('Investor')
+        other_inv = User.objects.create_user(
+            email='investor2@gmail.com', password='StrongPass123!',
+            first_name='Investor', last_name='L', user_phone='+999999999')
+        other_inv.add_role('Investor')
+
+        cls.investor_ = InvestorProfile.objects.create(user=cls.user_inv)
+        other_investor = InvestorProfile.objects.create(user=other_inv)
+        cls.startup_ = StartUpProfile.objects.create(
+            user_id=user_st, name='Startup Company', description='')
+        cls.notification = Notification.objects.create(
+            notification_type=NotificationType.FOLLOW,
+            investor=cls.investor_, startup=cls.startup_)
+        Notification.objects.create(
+            notification_type=NotificationType.FOLLOW,
+            investor=other_investor, startup=cls.startup_)
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user_inv)
+
+    def test_export_notifications(self):
+        """test that users export only their own notifications"""
+        response = self.client.get(reverse('notification_export'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.notification.id])
+        self.assertEqual(rows[0]['investor'], self.investor_.id)
+
+    def test_export_notifications_since(self):
+        """test incremental export with the since parameter"""
+        response = self.client.get(
+            reverse('notification_export'),
+            {'since': self.notification.created_at.isoformat(), 'since_id': self.notification.id,
+             'file_format': 'csv'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertTrue(lines[0].startswith('id,notification_type,status'))
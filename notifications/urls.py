@@ -1,12 +1,13 @@
 from django.urls import path
 from .views import InvestorsNotificationsListView
 
-from .views import NotificationListView, NotificiationByIDView
+from .views import NotificationListView, NotificiationByIDView, NotificationExportView
 
 
 urlpatterns = [
     path('investor/', InvestorsNotificationsListView.as_view(), name='notifications-investor'),
     path('list/', NotificationListView.as_view(), name='notification_list'),
     path('notification/<int:pk>/', NotificiationByIDView.as_view(), name='notification_by_id'),
+    path('export/', NotificationExportView.as_view(), name='notification_export'),
 ]
 
@@ -2,6 +2,7 @@ import logging
 from django.forms import ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth import get_user_model
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
 
 from rest_framework import generics, filters, status
@@ -18,9 +19,11 @@ from rest_framework.exceptions import NotFound
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
+from common.views import StreamingExportView
 from investors.models import InvestorProfile
 from startups.models import StartUpProfile
 from users.models import Role
+from forum.utils.logging_utils import get_logger
 from .models import (
     Notification,
     NotificationStatus,
@@ -38,7 +41,7 @@ from .filters import NotificationFilter
 
 
 User = get_user_model()
-logger = logging.getLogger('django')
+logger = get_logger('django')
 
 
 class InvestorsNotificationsListView(generics.ListAPIView):
@@ -215,7 +218,7 @@ class RoleMixin:
 
         except (Role.DoesNotExist, StartUpProfile.DoesNotExist, 
                 InvestorProfile.DoesNotExist) as e:
-            logger.error(f'Role, Startup or Investor not found: {e}')
+            logger.error("Role, Startup or Investor not found: %s", e)
 
         return {
             'user': user,
@@ -283,7 +286,7 @@ class ProfileNotificationSettingsByIDView(RoleMixin, generics.RetrieveUpdateAPIV
                     notification_type=self.kwargs.get('notification_type')
                 )
             except NotificationPreferences.DoesNotExist as e:
-                logger.error(f'NotificationPreferences not found for User {user}, {role}, {e}')
+                logger.error("NotificationPreferences not found for User %s, %s, %s", user, role, e)
                 raise NotFound('NotificationPreferences object not found')
             return notification_preference
         raise PermissionDenied('No permission to access the user\'s notification preferences')
@@ -411,3 +414,28 @@ class ProfileNotificationsListView(RoleMixin, generics.ListAPIView):
                 {'message': f'Invalid user id: {e}'},
                 status=status.HTTP_403_FORBIDDEN
             )
+
+
+class NotificationExportView(StreamingExportView):
+    """API view to export notifications as a streamed NDJSON or CSV file
+
+    Staff export all notifications, other users the notifications
+    of their investor and startup profiles.
+
+    Query parameters:
+    - file_format: ndjson (default) or csv
+    - since: ISO 8601 datetime, only notifications created at or after it are exported
+    - since_id: id of the last notification exported at `since`, to resume after it
+    """
+    export_fields = ('id', 'notification_type', 'status', 'investor', 'startup', 'project',
+                     'message_id', 'delivery_status', 'created_at', 'sent_at', 'read_at')
+    since_field = 'created_at'
+    filename = 'notifications'
+
+    def get_queryset(self):
+        queryset = Notification.objects.all()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(
+                Q(investor__user_id=self.request.user.id) | Q(startup__user_id=self.request.user.id)
+            )
+        return queryset
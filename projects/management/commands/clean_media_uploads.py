@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from projects.models import MediaUpload
+from projects.services import MediaUploadService
+from forum.utils.logging_utils import get_logger
+
+
+logger = get_logger('django')
+
+
+class Command(BaseCommand):
+    help = 'Delete media uploads which were not completed and received no chunk for a while.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24,
+                            help='Delete uploads idle for longer than this number of hours')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        uploads = MediaUpload.objects.filter(
+            media_file__isnull=True, updated_at__lt=cutoff).iterator()
+
+        deleted = 0
+        for upload in uploads:
+            MediaUploadService.delete_upload(upload)
+            deleted += 1
+
+        logger.info("Deleted %s stale media uploads", deleted)
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} stale media uploads.'))
@@ -0,0 +1,50 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from common.streaming import iter_csv_rows, iter_ndjson_rows
+from projects.services import ProjectImportService
+from forum.utils.logging_utils import get_logger
+
+
+User = get_user_model()
+logger = get_logger('django')
+
+
+class Command(BaseCommand):
+    help = 'Import projects in bulk from an NDJSON or CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the .ndjson/.jsonl or .csv file')
+        parser.add_argument('--format', choices=['ndjson', 'csv'], dest='file_format',
+                            help='File format (detected from the extension by default)')
+        parser.add_argument('--chunk-size', type=int, default=ProjectImportService.DEFAULT_CHUNK_SIZE,
+                            help='Number of rows validated and inserted at once')
+        parser.add_argument('--user', help='Email of the user importing the projects. '
+                                           'Only their startups are allowed if set.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['file_format'] or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(email=options['user'].lower().strip())
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} not found")
+
+        logger.info("Importing projects from %s (%s)", path, file_format)
+        service = ProjectImportService(user=user, chunk_size=options['chunk_size'])
+        try:
+            with open(path, encoding='utf-8', newline='') as file:
+                rows = iter_csv_rows(file) if file_format == 'csv' else iter_ndjson_rows(file)
+                report = service.import_rows(rows)
+        except OSError as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']}: {json.dumps(error['errors'])}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['created']} projects, {len(report['errors'])} rows rejected."))
@@ -0,0 +1,29 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from projects.services import ProjectHistoryService
+
+
+logger = logging.getLogger('django')
+
+
+class Command(BaseCommand):
+    help = 'Delete project history records which do not change any tracked field.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', help='Prune the history of this project id only')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of records deleted at once')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count redundant records')
+
+    def handle(self, *args, **options):
+        logger.debug('Starting project history pruning')
+        pruned = ProjectHistoryService.prune_redundant_history(
+            project_id=options['project'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        action = 'Found' if options['dry_run'] else 'Pruned'
+        self.stdout.write(self.style.SUCCESS(f'{action} {pruned} redundant project history records.'))
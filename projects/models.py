@@ -1,7 +1,7 @@
-import logging
 from datetime import timedelta
 from uuid import uuid4
 
+from django.contrib.auth import get_user_model
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
@@ -11,9 +11,16 @@ from simple_history.models import HistoricalRecords
 
 from startups.models import StartUpProfile
 from investors.models import InvestorProfile
+from forum.utils.logging_utils import get_logger
 
 
-logger = logging.getLogger('django')
+User = get_user_model()
+logger = get_logger('django')
+
+MEDIA_VIDEO_EXTENSIONS = ('.mp4',)
+MEDIA_IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+MAX_MEDIA_VIDEO_SIZE = 1024 * 1024 * 1024
+MAX_MEDIA_IMAGE_SIZE = 15 * 1024 * 1024
 
 
 class Project(models.Model):
@@ -80,9 +87,9 @@ class Project(models.Model):
         - IN_PROGRESS, FINAL_CALL > CLOSED
         - IN_PROGRESS, FINAL_CALL > SEEKING (if no investors)
         """
-        logger.info(f"Attempting to change status of project {self.project_id} from {self.status} to {status}")
+        logger.info("Attempting to change status of project %s from %s to %s", self.project_id, self.status, status)
         if status not in dict(self.ProjectStatus.choices).keys():
-            logger.error(f"Invalid status value: {status} for project {self.project_id}")
+            logger.error("Invalid status value: %s for project %s", status, self.project_id)
             raise ValidationError(f'''Invalid status value.
                 Valid options: {self.ProjectStatus.choices}''')
 
@@ -92,39 +99,39 @@ class Project(models.Model):
                 if not self.investors.all() and status in (
                             self.ProjectStatus.IN_PROGRESS,
                             self.ProjectStatus.FINAL_CALL):
-                    logger.error(f"Cannot change status to {status} for project {self.project_id} without investors")
+                    logger.error("Cannot change status to %s for project %s without investors", status, self.project_id)
                     raise ValidationError(
                         f'Project without investors cannot be set to {status}'
                     )
 
             case self.ProjectStatus.IN_PROGRESS | self.ProjectStatus.FINAL_CALL:
                 if self.investors.all() and status == self.ProjectStatus.SEEKING:
-                    logger.error(f"Cannot revert project {self.project_id} to SEEKING status with investors")
+                    logger.error("Cannot revert project %s to SEEKING status with investors", self.project_id)
                     raise ValidationError(
                         f'Project with investors cannot be set to {status}'
                     )
 
             case self.ProjectStatus.CLOSED:
-                logger.error(f"Attempt to change status of closed project {self.project_id}")
+                logger.error("Attempt to change status of closed project %s", self.project_id)
                 raise ValidationError(
                     'This project has already been closed.'
                 )
 
         self.status = status
-        logger.info(f"Status of project {self.project_id} successfully changed to {status}")
+        logger.info("Status of project %s successfully changed to %s", self.project_id, status)
         self.clean()
         self.save()
 
     def clean_duration(self):
         if self.duration is not None and self.duration <= timedelta(0):
-            logger.error(f"Invalid project duration for project {self.project_id}: {self.duration}")
+            logger.error("Invalid project duration for project %s: %s", self.project_id, self.duration)
             raise ValidationError('Duration must be a positive value')
 
     def clean(self):
-        logger.info(f"Cleaning project {self.project_id}")
+        logger.info("Cleaning project %s", self.project_id)
         self.clean_duration()
         result = super().clean()
-        logger.info(f"Project {self.project_id} passed validation")
+        logger.info("Project %s passed validation", self.project_id)
         return result
 
     def __str__(self):
@@ -147,25 +154,23 @@ class MediaFile(models.Model):
         
         - max video size (mp4): 1 GB
         - max image size (png, jpg, jpeg): 10 MB"""
-        valid_extensions_video = ('.mp4',)
-        valid_extensions_image = ('.png', '.jpg', '.jpeg')
-        logger.info(f"Validating media file {self.media_file.name} for project {self.project_id}")
+        logger.info("Validating media file %s for project %s", self.media_file.name, self.project_id)
         if self.media_file:
             if self.media_file.size == 0:
-                logger.error(f"Invalid or empty file uploaded: {self.media_file.name}")
+                logger.error("Invalid or empty file uploaded: %s", self.media_file.name)
                 raise ValidationError('Invalid or empty file.')
-            if self.media_file.name.endswith(valid_extensions_video):
-                if self.media_file.size > 1024 * 1024 * 1024:
-                    logger.error(f"Video file size exceeds limit: {self.media_file.name}")
+            if self.media_file.name.endswith(MEDIA_VIDEO_EXTENSIONS):
+                if self.media_file.size > MAX_MEDIA_VIDEO_SIZE:
+                    logger.error("Video file size exceeds limit: %s", self.media_file.name)
                     raise ValidationError('Video size exceeds 1GB limit.')
-            elif self.media_file.name.endswith(valid_extensions_image):
-                if self.media_file.size > 15 * 1024 * 1024:
-                    logger.error(f"Image file size exceeds limit: {self.media_file.name}")
+            elif self.media_file.name.endswith(MEDIA_IMAGE_EXTENSIONS):
+                if self.media_file.size > MAX_MEDIA_IMAGE_SIZE:
+                    logger.error("Image file size exceeds limit: %s", self.media_file.name)
                     raise ValidationError('Image size exceeds 15MB limit.')
             else:
-                logger.error(f"Invalid file extension: {self.media_file.name}")
+                logger.error("Invalid file extension: %s", self.media_file.name)
                 raise ValidationError(f'''Invalid file extension.
-                    Allowed formats: {valid_extensions_image}, {valid_extensions_video}''')
+                    Allowed formats: {MEDIA_IMAGE_EXTENSIONS}, {MEDIA_VIDEO_EXTENSIONS}''')
 
     def clean(self):
         self.clean_media_file()
@@ -175,6 +180,60 @@ class MediaFile(models.Model):
         return self.media_file.name
 
 
+class MediaUpload(models.Model):
+    """Resumable, chunked upload of a project media file
+
+    Every accepted chunk is stored as a separate object under
+    `media_uploads/<id>/` (written under `tmp/` first, and moved there once
+    the offset is committed); the chunks are assembled into a MediaFile
+    once `offset` reaches `length`.
+
+    Fields:
+    - id (UUIDField)
+    - project (ForeignKey): project the media file is uploaded for
+    - user (ForeignKey): uploading user
+    - filename (CharField): original file name
+    - length (BigIntegerField): total size in bytes
+    - offset (BigIntegerField): number of bytes received so far
+    - media_file (OneToOneField): assembled media file, once completed
+    - assembling_at (DateTimeField): when a task claimed the upload to assemble it
+    """
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
+    project = models.ForeignKey(
+        Project, related_name='media_uploads', on_delete=models.CASCADE)
+    user = models.ForeignKey(
+        User, related_name='media_uploads', on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    length = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    media_file = models.OneToOneField(
+        MediaFile, null=True, blank=True, on_delete=models.SET_NULL, related_name='upload')
+    assembling_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def is_complete(self):
+        return self.offset == self.length
+
+    def get_chunk_prefix(self):
+        return f'media_uploads/{self.id}/'
+
+    def get_chunk_name(self, offset):
+        """Chunk names sort in upload order, as the offset is zero-padded."""
+        return f'{self.get_chunk_prefix()}{offset:012d}.part'
+
+    def get_temp_chunk_prefix(self):
+        return f'{self.get_chunk_prefix()}tmp/'
+
+    def get_temp_chunk_name(self, offset):
+        """Unique name a chunk is written to before it is committed at `offset`."""
+        return f'{self.get_temp_chunk_prefix()}{offset:012d}.{uuid4().hex}.part'
+
+    def __str__(self):
+        return f"Upload {self.id} of {self.filename} ({self.offset}/{self.length})"
+
+
 class Subscription(models.Model):
     """Subscription model for assigning investors to projects
     
@@ -192,10 +251,11 @@ class Subscription(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def save(self, *args, **kwargs):
-        logger.info(
-            f"Creating subscription for investor {self.investor.id} on project {self.project.id} with share {self.share}")
+        logger.info("Creating subscription for investor %s on project %s with share %s",
+                    self.investor_id, self.project_id, self.share)
         super().save(*args, **kwargs)
-        logger.info(f"Subscription created successfully for investor {self.investor.id} on project {self.project.id}")
+        logger.info("Subscription created successfully for investor %s on project %s",
+                    self.investor_id, self.project_id)
 
     class Meta:
         unique_together = ('investor', 'project')
@@ -1,5 +1,8 @@
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Project
+
+from common.media import sign_url
+from .models import MediaFile, Project
 from datetime import timedelta
 
 class ProjectSerializerList(serializers.ModelSerializer):
@@ -33,6 +36,23 @@ class CreateProjectSerializer(BaseProjectSerializer):
                   'amount', 'status', 'duration']
 
 
+class BulkCreateProjectSerializer(CreateProjectSerializer):
+    """Serializer for creating Projects in bulk
+
+    Startups are resolved from the `startups` mapping (id -> StartUpProfile)
+    in the serializer context instead of one query per row. Only startups
+    the importing user is allowed to use are expected in the mapping.
+    """
+    startup = serializers.IntegerField()
+
+    def validate_startup(self, value):
+        startup = self.context.get('startups', {}).get(value)
+        if startup is None:
+            raise serializers.ValidationError(
+                "Startup not found or you do not have permission to create projects for it.")
+        return startup
+
+
 class UpdateProjectSerializer(BaseProjectSerializer):
     """Serializer for update new Project"""
 
@@ -42,3 +62,18 @@ class UpdateProjectSerializer(BaseProjectSerializer):
                   'amount', 'status', 'duration']
     
 
+
+
+class MediaFileSerializer(serializers.ModelSerializer):
+    """Serializer for project media files with pre-signed streaming URLs"""
+    name = serializers.CharField(source='media_file.name', read_only=True)
+    url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = MediaFile
+        fields = ['id', 'project', 'name', 'url']
+
+    def get_url(self, obj):
+        url, _ = sign_url(reverse('media-file-stream', args=[obj.pk]))
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,600 @@
+import io
+import os
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Q, Sum, Window
+from django.db.models.functions import Lag
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from simple_history.utils import bulk_create_with_history
+
+from common.streaming import IterStream, chunked
+from common.validators.image_validator import sniff_image_format
+from startups.models import StartUpProfile
+from forum.utils.logging_utils import get_logger
+from .models import (
+    MAX_MEDIA_IMAGE_SIZE,
+    MAX_MEDIA_VIDEO_SIZE,
+    MEDIA_IMAGE_EXTENSIONS,
+    MEDIA_VIDEO_EXTENSIONS,
+    MediaFile,
+    MediaUpload,
+    Project,
+    Subscription,
+)
+from .serializers import BulkCreateProjectSerializer
+
+logger = get_logger('django')
+
+
+class SubscriptionService:
+    """Service for assigning investors to projects.
+
+    The project row is locked with `select_for_update` for the duration of the
+    transaction, so concurrent subscriptions to the same project are serialized
+    and the total funded share can never exceed 1.0.
+    """
+
+    MAX_TOTAL_SHARE = 1.0
+
+    @staticmethod
+    def get_funded_share(project_id) -> float:
+        """Return the share of the project already funded by investors."""
+        total = Subscription.objects.filter(
+            project_id=project_id).aggregate(total=Sum('share'))['total']
+        return total or 0.0
+
+    @classmethod
+    def subscribe(cls, investor_id, project_id, share, contract_url) -> Subscription:
+        """Create a subscription for the investor on the project.
+
+        Raises:
+            ValidationError: If the share is invalid, the project is closed,
+                the investor is already subscribed or the remaining share
+                of the project is not enough.
+            Project.DoesNotExist: If the project is not found.
+        """
+        if share is None or not 0.0 < share <= cls.MAX_TOTAL_SHARE:
+            raise ValidationError('Share must be a value between 0.0 and 1.0.')
+
+        with transaction.atomic():
+            project = Project.objects.select_for_update().only(
+                'project_id', 'status').get(project_id=project_id)
+
+            if project.status == Project.ProjectStatus.CLOSED:
+                raise ValidationError('This project has already been closed.')
+
+            if Subscription.objects.filter(
+                    investor_id=investor_id, project_id=project_id).exists():
+                raise ValidationError('Investor is already subscribed to this project.')
+
+            remaining = cls.MAX_TOTAL_SHARE - cls.get_funded_share(project_id)
+            if round(share - remaining, 9) > 0:
+                logger.warning(
+                    "Subscription share %s exceeds remaining share %s of project %s", share, remaining, project_id)
+                raise ValidationError(
+                    f'Share exceeds the remaining share of the project ({remaining:.2f}).')
+
+            subscription = Subscription(
+                investor_id=investor_id,
+                project_id=project_id,
+                share=share,
+                contract_url=contract_url,
+            )
+            subscription.full_clean(exclude=['investor', 'project'], validate_unique=False)
+            subscription.save()
+
+        return subscription
+
+
+class ProjectImportService:
+    """Service for importing projects in bulk.
+
+    Rows are validated chunk by chunk with `BulkCreateProjectSerializer(many=True)`,
+    the startups referenced by a chunk are resolved with a single query and valid
+    rows are inserted with one `bulk_create` (plus one for history) per chunk.
+    """
+
+    DEFAULT_CHUNK_SIZE = 500
+
+    def __init__(self, user=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Args:
+            user: owner of the imported projects' startups. If None or staff,
+                projects can be imported for any startup (admin tooling).
+            chunk_size: number of rows validated and inserted at once.
+        """
+        self.user = user
+        self.chunk_size = chunk_size
+        self.startups = {}
+
+    def get_startups(self, startup_ids):
+        """Resolve the startups that are not cached yet, limited to the user's ones."""
+        missing = {startup_id for startup_id in startup_ids if startup_id not in self.startups}
+        if missing:
+            queryset = StartUpProfile.objects.filter(id__in=missing)
+            if self.user is not None and not self.user.is_staff:
+                queryset = queryset.filter(user_id=self.user.id)
+            self.startups.update({startup.id: startup for startup in queryset.only('id', 'user_id')})
+        return self.startups
+
+    @staticmethod
+    def get_startup_id(row):
+        try:
+            return int(row.get('startup'))
+        except (TypeError, ValueError):
+            return None
+
+    def validate_chunk(self, chunk):
+        """Validate a chunk of (row number, row) tuples.
+
+        Returns:
+            tuple: list of validated data, list of per-row errors
+        """
+        errors = []
+        rows = []
+        for number, row in chunk:
+            if row is None:
+                errors.append({'row': number, 'errors': {'non_field_errors': ['Invalid row format.']}})
+            else:
+                rows.append((number, row))
+
+        context = {'startups': self.get_startups(
+            startup_id for startup_id in map(self.get_startup_id, (row for _, row in rows))
+            if startup_id is not None
+        )}
+        serializer = BulkCreateProjectSerializer(data=[row for _, row in rows], many=True, context=context)
+        if serializer.is_valid():
+            return serializer.validated_data, errors
+
+        chunk_errors = serializer.errors
+        if isinstance(chunk_errors, dict):
+            # newer DRF versions report list errors as {index: errors}
+            chunk_errors = [chunk_errors.get(index) for index in range(len(rows))]
+
+        valid_rows = []
+        for (number, row), row_errors in zip(rows, chunk_errors):
+            if row_errors:
+                errors.append({'row': number, 'errors': row_errors})
+            else:
+                valid_rows.append(row)
+
+        serializer = BulkCreateProjectSerializer(data=valid_rows, many=True, context=context)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data, errors
+
+    def import_rows(self, rows):
+        """Import (row number, row) tuples.
+
+        Returns:
+            dict: number of created projects and the list of per-row errors
+        """
+        report = {'created': 0, 'errors': []}
+        for chunk in chunked(rows, self.chunk_size):
+            validated_data, errors = self.validate_chunk(chunk)
+            report['errors'].extend(errors)
+            if validated_data:
+                projects = bulk_create_with_history(
+                    [Project(**data) for data in validated_data],
+                    Project,
+                    batch_size=self.chunk_size,
+                )
+                report['created'] += len(projects)
+        logger.info("Imported %s projects, %s rows rejected", report['created'], len(report['errors']))
+        return report
+
+
+class ProjectHistoryService:
+    """Service for reading and pruning the history of projects.
+
+    Each historical row is annotated with the previous values of the tracked
+    fields with `LAG(...) OVER (PARTITION BY project_id ORDER BY history_date)`,
+    so the changes of a page of history are computed with a single query.
+    """
+
+    TRACKED_FIELDS = ('startup', 'title', 'risk', 'description', 'business_plan',
+                      'amount', 'status', 'duration')
+    RECORD_FIELDS = ('history_id', 'history_date', 'history_type', 'history_user_id')
+    CACHE_VERSION_KEY = 'project_changelog_version'
+
+    @classmethod
+    def with_previous_values(cls, queryset):
+        """Annotate historical rows with `previous_<field>` for every tracked field.
+
+        Filters narrowing the rows must keep the predecessors of the returned rows
+        (e.g. rows older than a cursor), since they are applied before the window.
+        """
+        window = {
+            'partition_by': [F('project_id')],
+            'order_by': [F('history_date').asc(), F('history_id').asc()],
+        }
+        return queryset.annotate(**{
+            f'previous_{field}': Window(Lag(field), **window) for field in cls.TRACKED_FIELDS
+        })
+
+    @classmethod
+    def get_changes(cls, record):
+        """Return {field: {'old': ..., 'new': ...}} for the fields changed by the record."""
+        if record['history_type'] == '-':
+            return {}
+        created = record['history_type'] == '+'
+        changes = {}
+        for field in cls.TRACKED_FIELDS:
+            old = None if created else record[f'previous_{field}']
+            new = record[field]
+            if created or old != new:
+                changes[field] = {'old': old, 'new': new}
+        return changes
+
+    @staticmethod
+    def encode_cursor(record):
+        value = f"{record['history_date'].isoformat()}|{record['history_id']}"
+        return urlsafe_b64encode(value.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Return (history_date, history_id) encoded in the cursor.
+
+        Raises:
+            ValidationError: If the cursor is invalid.
+        """
+        try:
+            history_date, history_id = urlsafe_b64decode(cursor.encode()).decode().split('|')
+            history_date = parse_datetime(history_date)
+            if history_date is None:
+                raise ValueError
+            return history_date, int(history_id)
+        except (ValueError, UnicodeDecodeError):
+            raise ValidationError('Invalid cursor.')
+
+    @classmethod
+    def get_cache_version(cls):
+        return cache.get_or_set(cls.CACHE_VERSION_KEY, 1, timeout=None)
+
+    @classmethod
+    def invalidate_cache(cls):
+        """Invalidate all cached changelog pages (e.g. after pruning history)."""
+        try:
+            cache.incr(cls.CACHE_VERSION_KEY)
+        except ValueError:
+            cache.set(cls.CACHE_VERSION_KEY, 1, timeout=None)
+
+    @classmethod
+    def get_changelog(cls, project_id, cursor=None, page_size=20):
+        """Return a page of changes of the project, newest first.
+
+        Pages are keyset-paginated on (history_date, history_id): `cursor` points
+        to the last record of the previous page.
+
+        Returns:
+            tuple: list of change records, cursor of the next page or None
+        """
+        queryset = Project.history.filter(project_id=project_id)
+        if cursor is not None:
+            history_date, history_id = cls.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(history_date__lt=history_date) |
+                Q(history_date=history_date, history_id__lt=history_id)
+            )
+
+        records = list(
+            cls.with_previous_values(queryset)
+            .order_by('-history_date', '-history_id')
+            .values(*cls.RECORD_FIELDS, *cls.TRACKED_FIELDS,
+                    *(f'previous_{field}' for field in cls.TRACKED_FIELDS))[:page_size + 1]
+        )
+        next_cursor = cls.encode_cursor(records[page_size - 1]) if len(records) > page_size else None
+
+        changelog = [
+            {
+                **{field: record[field] for field in cls.RECORD_FIELDS},
+                'changes': cls.get_changes(record),
+            }
+            for record in records[:page_size]
+        ]
+        return changelog, next_cursor
+
+    @classmethod
+    def iter_redundant_history_ids(cls, project_id=None, chunk_size=2000):
+        """Yield ids of update records which do not change any tracked field.
+
+        Such records are written on every save, e.g. when only `updated_at` changes.
+        """
+        queryset = Project.history.all()
+        if project_id is not None:
+            queryset = queryset.filter(project_id=project_id)
+
+        fields = ('history_id', 'history_type', *cls.TRACKED_FIELDS,
+                  *(f'previous_{field}' for field in cls.TRACKED_FIELDS))
+        records = (
+            cls.with_previous_values(queryset)
+            .order_by('project_id', 'history_date', 'history_id')
+            .values(*fields)
+            .iterator(chunk_size=chunk_size)
+        )
+        for record in records:
+            if record['history_type'] == '~' and not cls.get_changes(record):
+                yield record['history_id']
+
+    @classmethod
+    def prune_redundant_history(cls, project_id=None, batch_size=1000, dry_run=False):
+        """Delete redundant update records in batches.
+
+        Returns:
+            int: number of redundant records (deleted unless dry_run)
+        """
+        pruned = 0
+        for batch in chunked(cls.iter_redundant_history_ids(project_id), batch_size):
+            if not dry_run:
+                Project.history.filter(history_id__in=batch).delete()
+            pruned += len(batch)
+
+        if pruned and not dry_run:
+            cls.invalidate_cache()
+        logger.info("Pruned %s redundant project history records (dry run: %s)", pruned, dry_run)
+        return pruned
+
+
+class UploadOffsetConflict(Exception):
+    """Raised when a chunk does not start at the current offset of the upload."""
+
+
+class MediaUploadService:
+    """Service for resumable, chunked uploads of project media files.
+
+    Chunks are streamed from the request to storage in BLOCK_SIZE blocks, so
+    memory use does not depend on the chunk or file size. The magic bytes are
+    checked on the first chunk, before anything is stored.
+    """
+
+    BLOCK_SIZE = 64 * 1024
+    SIGNATURE_SIZE = 12
+    MAX_CHUNK_SIZE = getattr(settings, 'MEDIA_UPLOAD_MAX_CHUNK_SIZE', 32 * 1024 * 1024)
+    # Seconds after which the claim of a task which did not finish assembling expires
+    ASSEMBLE_TIMEOUT = getattr(settings, 'MEDIA_UPLOAD_ASSEMBLE_TIMEOUT', 60 * 60)
+
+    @staticmethod
+    def get_max_length(filename) -> int:
+        """Return the size limit for the file, based on its extension."""
+        filename = filename.lower()
+        if filename.endswith(MEDIA_VIDEO_EXTENSIONS):
+            return MAX_MEDIA_VIDEO_SIZE
+        if filename.endswith(MEDIA_IMAGE_EXTENSIONS):
+            return MAX_MEDIA_IMAGE_SIZE
+        raise ValidationError(
+            f'Invalid file extension. Allowed formats: {MEDIA_IMAGE_EXTENSIONS}, {MEDIA_VIDEO_EXTENSIONS}',
+            code='invalid_extension'
+        )
+
+    @classmethod
+    def create_upload(cls, project, user, filename, length) -> MediaUpload:
+        """Register a new upload of `length` bytes."""
+        filename = os.path.basename(filename or '')
+        max_length = cls.get_max_length(filename)
+        if length <= 0:
+            raise ValidationError('Invalid or empty file.', code='empty')
+        if length > max_length:
+            raise ValidationError(f'File size exceeds the {max_length} bytes limit.', code='too_large')
+
+        upload = MediaUpload.objects.create(
+            project=project, user=user, filename=filename, length=length)
+        logger.info("Media upload %s of %s (%s bytes) created for project %s",
+                    upload.id, filename, length, project.project_id)
+        return upload
+
+    @staticmethod
+    def check_signature(filename, header):
+        """Check that the first bytes of the file match its extension."""
+        filename = filename.lower()
+        if filename.endswith(MEDIA_VIDEO_EXTENSIONS):
+            valid = header[4:8] == b'ftyp'
+        else:
+            expected_format = 'png' if filename.endswith('.png') else 'jpeg'
+            valid = sniff_image_format(header) == expected_format
+        if not valid:
+            raise ValidationError('File content does not match its extension.', code='invalid_signature')
+
+    @classmethod
+    def iter_blocks(cls, stream, size, first_block=b''):
+        """Yield exactly `size` bytes read from the stream in blocks."""
+        received = len(first_block)
+        if first_block:
+            yield first_block
+        while received < size:
+            block = stream.read(min(cls.BLOCK_SIZE, size - received))
+            if not block:
+                raise ValidationError('Incomplete chunk.', code='incomplete')
+            received += len(block)
+            yield block
+
+    @classmethod
+    def append_chunk(cls, upload, offset, stream, size) -> MediaUpload:
+        """Store a chunk of `size` bytes read from the stream at `offset`.
+
+        Returns:
+            MediaUpload: the upload with the new offset
+
+        Raises:
+            UploadOffsetConflict: if `offset` is not the current offset
+            ValidationError: if the chunk is invalid or incomplete
+        """
+        if upload.is_complete or offset != upload.offset:
+            raise UploadOffsetConflict(f'Expected offset {upload.offset}.')
+        if size <= 0:
+            raise ValidationError('Empty chunk.', code='empty')
+        if size > cls.MAX_CHUNK_SIZE:
+            raise ValidationError(f'Chunk size exceeds the {cls.MAX_CHUNK_SIZE} bytes limit.', code='too_large')
+        if offset + size > upload.length:
+            raise ValidationError('Chunk exceeds the upload length.', code='too_large')
+
+        first_block = b''
+        if offset == 0:
+            first_block = stream.read(min(cls.SIGNATURE_SIZE, size))
+            cls.check_signature(upload.filename, first_block)
+
+        # Written under a unique name, so retried or concurrent requests at the
+        # same offset never touch a chunk another request has committed
+        temp_name = upload.get_temp_chunk_name(offset)
+        content = File(io.BufferedReader(IterStream(cls.iter_blocks(stream, size, first_block))))
+        try:
+            temp_name = default_storage.save(temp_name, content)
+        except Exception:
+            logger.warning("Chunk at offset %s of media upload %s was not stored completely", offset, upload.id)
+            if default_storage.exists(temp_name):
+                default_storage.delete(temp_name)
+            raise
+
+        try:
+            with transaction.atomic():
+                upload = MediaUpload.objects.select_for_update().get(pk=upload.pk)
+                if upload.offset != offset:
+                    raise UploadOffsetConflict(f'Expected offset {upload.offset}.')
+                cls.move_chunk(temp_name, upload.get_chunk_name(offset))
+                upload.offset = offset + size
+                upload.save(update_fields=['offset', 'updated_at'])
+        finally:
+            if default_storage.exists(temp_name):
+                default_storage.delete(temp_name)
+
+        logger.debug("Media upload %s: %s/%s bytes received", upload.id, upload.offset, upload.length)
+        return upload
+
+    @staticmethod
+    def move_chunk(temp_name, name):
+        """Move a chunk to its committed name, replacing one left there by a rolled back commit."""
+        try:
+            os.replace(default_storage.path(temp_name), default_storage.path(name))
+        except NotImplementedError:
+            # Storages without local paths: copy, then delete the temporary chunk
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            with default_storage.open(temp_name, 'rb') as chunk:
+                default_storage.save(name, chunk)
+            default_storage.delete(temp_name)
+
+    @staticmethod
+    def list_files(prefix):
+        try:
+            _, names = default_storage.listdir(prefix)
+        except FileNotFoundError:
+            return []
+        return [prefix + name for name in sorted(names)]
+
+    @classmethod
+    def get_chunk_names(cls, upload):
+        """Names of the committed chunks, in upload order."""
+        return cls.list_files(upload.get_chunk_prefix())
+
+    @staticmethod
+    def chunks_cover(upload, chunk_names):
+        """Check that the chunks are contiguous from offset 0 to the upload length."""
+        expected = 0
+        for chunk_name in chunk_names:
+            if int(os.path.basename(chunk_name).split('.')[0]) != expected:
+                return False
+            expected += default_storage.size(chunk_name)
+        return expected == upload.length
+
+    @classmethod
+    def assemble(cls, upload_id):
+        """Concatenate the stored chunks of a completed upload into a MediaFile.
+
+        The upload is claimed (`assembling_at`) under a short row lock and the
+        chunks are copied outside of any transaction, so requests on the upload
+        do not wait for the copy; the media file is set under the lock again.
+        Repeated tasks return the same media file. Returns None if the upload
+        is not complete, is being assembled by another task, or its chunks do
+        not cover it.
+        """
+        upload = cls.claim_assembly(upload_id)
+        if upload is None:
+            return None
+        if upload.media_file_id:
+            return upload.media_file
+
+        try:
+            chunk_names = cls.get_chunk_names(upload)
+            if not cls.chunks_cover(upload, chunk_names):
+                logger.error("Chunks of media upload %s do not cover its %s bytes", upload.id, upload.length)
+                cls.release_assembly(upload)
+                return None
+
+            def iter_chunks():
+                for chunk_name in chunk_names:
+                    with default_storage.open(chunk_name, 'rb') as chunk:
+                        while block := chunk.read(cls.BLOCK_SIZE):
+                            yield block
+
+            media_file = MediaFile(project=upload.project)
+            media_file.media_file.save(
+                upload.filename,
+                File(io.BufferedReader(IterStream(iter_chunks())), name=upload.filename),
+                save=False
+            )
+        except Exception:
+            cls.release_assembly(upload)
+            raise
+
+        with transaction.atomic():
+            upload = MediaUpload.objects.select_for_update(of=('self',)).select_related('media_file').get(pk=upload_id)
+            if upload.media_file_id:
+                # Assembled by a task which claimed the upload after our claim expired
+                media_file.media_file.delete(save=False)
+                return upload.media_file
+            media_file.save()
+            upload.media_file = media_file
+            upload.assembling_at = None
+            upload.save(update_fields=['media_file', 'assembling_at', 'updated_at'])
+        cls.delete_chunks(upload)
+
+        logger.info("Media upload %s assembled into %s", upload.id, media_file.media_file.name)
+        return media_file
+
+    @classmethod
+    def claim_assembly(cls, upload_id):
+        """Claim a completed upload for assembling it.
+
+        Returns:
+            MediaUpload: the claimed upload, or the upload if already
+            assembled; None if it is not complete or another task's claim
+            has not expired
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            upload = MediaUpload.objects.select_for_update(of=('self',)).select_related(
+                'project', 'media_file').get(pk=upload_id)
+            if upload.media_file_id:
+                return upload
+            if not upload.is_complete:
+                return None
+            if upload.assembling_at and upload.assembling_at > now - timedelta(seconds=cls.ASSEMBLE_TIMEOUT):
+                logger.info("Media upload %s is being assembled since %s", upload.id, upload.assembling_at)
+                return None
+            upload.assembling_at = now
+            upload.save(update_fields=['assembling_at', 'updated_at'])
+        return upload
+
+    @staticmethod
+    def release_assembly(upload):
+        """Drop the claim of an upload which was not assembled, so it can be assembled again."""
+        MediaUpload.objects.filter(pk=upload.pk, assembling_at=upload.assembling_at).update(assembling_at=None)
+
+    @classmethod
+    def delete_chunks(cls, upload):
+        """Delete the committed chunks and the temporary ones of interrupted requests."""
+        for chunk_name in cls.get_chunk_names(upload) + cls.list_files(upload.get_temp_chunk_prefix()):
+            default_storage.delete(chunk_name)
+
+    @classmethod
+    def delete_upload(cls, upload):
+        """Delete an upload together with its stored chunks."""
+        cls.delete_chunks(upload)
+        upload.delete()
+        logger.info("Media upload %s deleted", upload.id)
@@ -0,0 +1,20 @@
+from celery import shared_task
+
+from forum.utils.logging_utils import get_logger
+
+from .services import MediaUploadService
+
+
+logger = get_logger('django')
+
+
+@shared_task
+def assemble_media_upload(upload_id):
+    """Assemble the chunks of a completed media upload into a MediaFile
+
+    Parameters:
+    - upload_id
+    """
+    media_file = MediaUploadService.assemble(upload_id)
+    if media_file is None:
+        logger.warning("Media upload %s was not assembled", upload_id)
@@ -1,19 +1,34 @@
+import json
+import shutil
+import tempfile
+from base64 import b64encode
 from datetime import timedelta
+from io import BytesIO, StringIO
+from threading import Barrier, Lock, Thread
 from time import sleep
+from unittest.mock import patch
 
 from django.core.exceptions import ValidationError
 from rest_framework.test import APITestCase, APIClient
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
 
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 import uuid
 
 from investors.models import InvestorProfile
 from startups.models import StartUpProfile
-from .models import Project, Subscription, MediaFile
+from .models import MediaUpload, Project, Subscription, MediaFile
+from .services import (
+    MediaUploadService, ProjectHistoryService, ProjectImportService, SubscriptionService, UploadOffsetConflict,
+)
 
 
 User = get_user_model()
@@ -521,3 +536,606 @@ class ProjectsViewTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertIn('error', response.data)  
         self.assertEqual(response.data['error'], "This project doesn't exist")
+
+
+class SubscriptionServiceTest(TransactionTestCase):
+    """
+    Test suite for the SubscriptionService, including concurrent subscriptions to one project.
+    """
+
+    def setUp(self):
+        user_st = User.objects.create_user(
+            email="startup@gmail.com",
+            password="StrongPass123!",
+            first_name="Startup",
+            last_name="Owner",
+            user_phone="+1234567890"
+        )
+        user_st.add_role("Startup")
+        startup = StartUpProfile.objects.create(
+            user_id=user_st, name='Startup 1', description='Test dddd')
+        self.project = Project.objects.create(
+            startup=startup, title='Prj1', risk=0.5,
+            description='...', business_plan='https://google.com',
+            amount=10000, status=1)
+
+        self.investors = []
+        for i in range(10):
+            user = User.objects.create_user(
+                email=f"investor{i}@gmail.com",
+                password="StrongPass123!",
+                first_name="Investor",
+                last_name=str(i),
+                user_phone="+1234567890"
+            )
+            user.add_role("Investor")
+            self.investors.append(InvestorProfile.objects.create(user=user))
+
+    def subscribe(self, investor, share):
+        return SubscriptionService.subscribe(
+            investor_id=investor.id,
+            project_id=self.project.project_id,
+            share=share,
+            contract_url='https://google.com'
+        )
+
+    def test_subscribe(self):
+        """test subscribing an investor to the project"""
+        subscription = self.subscribe(self.investors[0], 0.4)
+        self.assertEqual(subscription.share, 0.4)
+        self.assertEqual(SubscriptionService.get_funded_share(self.project.project_id), 0.4)
+
+    def test_subscribe_share_overflow(self):
+        """test subscription exceeding the remaining share of the project"""
+        self.subscribe(self.investors[0], 0.7)
+        with self.assertRaises(ValidationError):
+            self.subscribe(self.investors[1], 0.4)
+        self.assertEqual(Subscription.objects.filter(project=self.project).count(), 1)
+
+    def test_subscribe_twice(self):
+        """test subscribing the same investor twice"""
+        self.subscribe(self.investors[0], 0.1)
+        with self.assertRaises(ValidationError):
+            self.subscribe(self.investors[0], 0.1)
+
+    def test_subscribe_invalid_share(self):
+        """test subscription with invalid share values"""
+        for share in (None, 0, -0.1, 1.5):
+            with self.assertRaises(ValidationError):
+                self.subscribe(self.investors[0], share)
+
+    def test_subscribe_closed_project(self):
+        """test subscription to a closed project"""
+        self.project.change_status(Project.ProjectStatus.CLOSED)
+        with self.assertRaises(ValidationError):
+            self.subscribe(self.investors[0], 0.1)
+
+    def test_concurrent_subscriptions(self):
+        """test that concurrent subscriptions never push the total share over 1.0"""
+        barrier = Barrier(len(self.investors))
+        lock = Lock()
+        results = {'created': 0, 'rejected': 0}
+        errors = []
+
+        def worker(investor):
+            try:
+                barrier.wait()
+                self.subscribe(investor, 0.3)
+                outcome = 'created'
+            except ValidationError:
+                outcome = 'rejected'
+            except Exception as e:
+                outcome = None
+                errors.append(e)
+            finally:
+                connection.close()
+            if outcome is not None:
+                with lock:
+                    results[outcome] += 1
+
+        threads = [Thread(target=worker, args=(investor,)) for investor in self.investors]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(results, {'created': 3, 'rejected': 7})
+        self.assertEqual(Subscription.objects.filter(project=self.project).count(), 3)
+        self.assertLessEqual(SubscriptionService.get_funded_share(self.project.project_id), 1.0)
+
+
+class ProjectBulkImportExportTest(APITestCase):
+    """
+    Test suite for bulk project import (NDJSON/CSV) and streaming export.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="lin@gmail.com",
+            password="StrongPass123!",
+            first_name="Lim",
+            last_name="Non",
+            user_phone="+1234567890"
+        )
+        cls.user.add_role("Startup")
+        other_user = User.objects.create_user(
+            email="john@gmail.com",
+            password="StrongPass123!",
+            first_name="John",
+            last_name="Doe",
+            user_phone="+1234567890"
+        )
+        other_user.add_role("Startup")
+
+        cls.startup = StartUpProfile.objects.create(
+            user_id=cls.user, name='Startup 1', description='Test dddd')
+        cls.other_startup = StartUpProfile.objects.create(
+            user_id=other_user, name='Startup 2', description='Test dddd2')
+
+        cls.url_import = reverse('projects-bulk-import')
+        cls.url_export = reverse('projects-export')
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def project_row(self, title, startup=None, **kwargs):
+        row = {
+            'startup': startup or self.startup.id,
+            'title': title,
+            'risk': 0.5,
+            'description': '...',
+            'amount': '10000.00',
+            'status': 1,
+        }
+        row.update(kwargs)
+        return row
+
+    def test_import_ndjson(self):
+        """test importing valid projects from NDJSON"""
+        body = '\n'.join(json.dumps(self.project_row(f'Prj{i}')) for i in range(5))
+        response = self.client.post(self.url_import, body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {'created': 5, 'errors': []})
+        self.assertEqual(Project.objects.filter(startup=self.startup).count(), 5)
+        self.assertEqual(Project.history.count(), 5)
+
+    def test_import_ndjson_row_errors(self):
+        """test that invalid rows are reported and valid rows are imported"""
+        body = '\n'.join([
+            json.dumps(self.project_row('Prj1')),
+            json.dumps(self.project_row('Prj2', risk=5)),
+            'not json',
+            json.dumps(self.project_row('Prj3', startup=self.other_startup.id)),
+            json.dumps(self.project_row('Prj4')),
+        ])
+        response = self.client.post(self.url_import, body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(sorted(error['row'] for error in response.data['errors']), [2, 3, 4])
+        self.assertFalse(Project.objects.filter(startup=self.other_startup).exists())
+
+    def test_import_csv(self):
+        """test importing projects from CSV with empty optional values"""
+        body = (
+            'startup,title,risk,description,business_plan,amount,status,duration\n'
+            f'{self.startup.id},Prj1,0.5,"multi\nline",,10000,1,\n'
+            f'{self.startup.id},Prj2,0.2,...,https://google.com,500,1,2 00:00:00\n'
+        )
+        response = self.client.post(self.url_import, body, content_type='text/csv')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(Project.objects.get(title='Prj1').description, 'multi\nline')
+        self.assertEqual(Project.objects.get(title='Prj2').duration, timedelta(days=2))
+
+    def test_import_unsupported_content_type(self):
+        """test import with unsupported content type"""
+        response = self.client.post(self.url_import, [self.project_row('Prj1')], format='json')
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    def test_import_query_count_does_not_grow_with_rows(self):
+        """test that a chunk is validated and inserted with a constant number of queries"""
+        rows = [(i, self.project_row(f'Prj{i}')) for i in range(1, 51)]
+        with self.assertNumQueries(3):
+            report = ProjectImportService(user=self.user).import_rows(rows)
+        self.assertEqual(report['created'], 50)
+
+    def test_export_ndjson(self):
+        """test streaming export of the user's projects as NDJSON"""
+        Project.objects.create(startup=self.startup, title='Prj1', risk=0.5, description='...', amount=100)
+        Project.objects.create(startup=self.other_startup, title='Prj2', risk=0.5, description='...', amount=100)
+
+        response = self.client.get(self.url_export)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['title'], 'Prj1')
+
+    def test_export_csv_roundtrip(self):
+        """test that exported CSV can be imported again"""
+        Project.objects.create(startup=self.startup, title='Prj1', risk=0.5, description='...',
+                               amount=100, duration=timedelta(days=3))
+
+        response = self.client.get(self.url_export, {'file_format': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.startswith('project_id,startup,title'))
+
+        response = self.client.post(self.url_import, body, content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Project.objects.filter(duration=timedelta(days=3)).count(), 2)
+
+    def test_export_invalid_format(self):
+        """test export with invalid file format"""
+        response = self.client.get(self.url_export, {'file_format': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_command(self):
+        """test the import_projects management command"""
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as file:
+            file.write(json.dumps(self.project_row('Prj1')) + '\n')
+            file.write(json.dumps(self.project_row('Prj2', status=9)) + '\n')
+
+        out, err = StringIO(), StringIO()
+        call_command('import_projects', file.name, stdout=out, stderr=err)
+
+        self.assertIn('Imported 1 projects, 1 rows rejected.', out.getvalue())
+        self.assertIn('Row 2', err.getvalue())
+
+
+class ProjectChangelogTest(APITestCase):
+    """
+    Test suite for the project changelog built on the project history.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="lin@gmail.com",
+            password="StrongPass123!",
+            first_name="Lim",
+            last_name="Non",
+            user_phone="+1234567890"
+        )
+        cls.user.add_role("Startup")
+        cls.startup = StartUpProfile.objects.create(
+            user_id=cls.user, name='Startup 1', description='Test dddd')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(
+            startup=self.startup, title='Prj1', risk=0.5,
+            description='...', amount=10000, status=1)
+        self.project.title = 'Prj1 renamed'
+        self.project.save()
+        self.project.save()
+        self.project.amount = 20000
+        self.project.risk = 0.3
+        self.project.save()
+        self.url = reverse('project-changelog', args=[self.project.project_id])
+
+    def test_changelog(self):
+        """test that the changelog lists field changes, newest first"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        results = response.data['results']
+        self.assertEqual([record['history_type'] for record in results], ['~', '~', '~', '+'])
+        self.assertEqual(set(results[0]['changes']), {'amount', 'risk'})
+        self.assertEqual(results[0]['changes']['risk'], {'old': 0.5, 'new': 0.3})
+        self.assertEqual(results[1]['changes'], {})
+        self.assertEqual(results[2]['changes'], {'title': {'old': 'Prj1', 'new': 'Prj1 renamed'}})
+        self.assertIsNone(results[3]['changes']['title']['old'])
+        self.assertIsNone(response.data['next'])
+
+    def test_changelog_keyset_pagination(self):
+        """test paging through the changelog with cursors"""
+        response = self.client.get(self.url, {'page_size': 3})
+        self.assertEqual(len(response.data['results']), 3)
+        next_cursor = response.data['next']
+        self.assertIsNotNone(next_cursor)
+
+        response = self.client.get(self.url, {'page_size': 3, 'cursor': next_cursor})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([record['history_type'] for record in response.data['results']], ['+'])
+        self.assertIsNone(response.data['next'])
+
+    def test_changelog_older_pages_cached(self):
+        """test that pages after the first one are served from the cache"""
+        next_cursor = self.client.get(self.url, {'page_size': 2}).data['next']
+        first = self.client.get(self.url, {'page_size': 2, 'cursor': next_cursor})
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url, {'page_size': 2, 'cursor': next_cursor})
+        self.assertEqual(first.data, second.data)
+
+    def test_changelog_invalid_cursor(self):
+        """test changelog with an invalid cursor"""
+        response = self.client.get(self.url, {'cursor': 'invalid'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_changelog_project_not_found(self):
+        """test changelog of a non-existent project"""
+        response = self.client.get(reverse('project-changelog', args=[uuid.uuid4()]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_prune_redundant_history(self):
+        """test that the prune command deletes records without changes only"""
+        out = StringIO()
+        call_command('prune_project_history', '--dry-run', stdout=out)
+        self.assertIn('Found 1 redundant', out.getvalue())
+        self.assertEqual(self.project.history.count(), 4)
+
+        call_command('prune_project_history', stdout=StringIO())
+        self.assertEqual(self.project.history.count(), 3)
+        self.assertEqual(ProjectHistoryService.prune_redundant_history(), 0)
+
+        results = self.client.get(self.url).data['results']
+        self.assertTrue(all(record['changes'] for record in results))
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MediaUploadTest(APITestCase):
+    """
+    Test suite for resumable, chunked media uploads.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="lin@gmail.com",
+            password="StrongPass123!",
+            first_name="Lim",
+            last_name="Non",
+            user_phone="+1234567890"
+        )
+        cls.user.add_role("Startup")
+        cls.other_user = User.objects.create_user(
+            email="john@gmail.com",
+            password="StrongPass123!",
+            first_name="John",
+            last_name="Doe",
+            user_phone="+1234567890"
+        )
+        startup = StartUpProfile.objects.create(
+            user_id=cls.user, name='Startup 1', description='Test dddd')
+        cls.project = Project.objects.create(
+            startup=startup, title='Prj1', risk=0.5,
+            description='...', amount=10000, status=1)
+        cls.content = b'\x00\x00\x00\x18ftypmp42' + bytes(range(256)) * 40
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def create_upload(self, filename='pitch.mp4', length=None):
+        return self.client.post(
+            reverse('media-upload-create', args=[self.project.project_id]),
+            HTTP_UPLOAD_LENGTH=str(len(self.content) if length is None else length),
+            HTTP_UPLOAD_METADATA=f'filename {b64encode(filename.encode()).decode()}',
+        )
+
+    def send_chunk(self, location, offset, chunk):
+        return self.client.generic(
+            'PATCH', location, chunk,
+            content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_chunked_upload(self):
+        """test uploading a video in chunks, resuming from the reported offset"""
+        response = self.create_upload()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        location = response['Location']
+
+        response = self.send_chunk(location, 0, self.content[:4000])
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response['Upload-Offset'], '4000')
+
+        response = self.send_chunk(location, 0, self.content[:4000])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        offset = int(self.client.head(location)['Upload-Offset'])
+        response = self.send_chunk(location, offset, self.content[offset:])
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        data = self.client.get(location).data
+        self.assertTrue(data['completed'])
+        media_file = MediaFile.objects.get(pk=data['media_file'])
+        self.assertEqual(media_file.project, self.project)
+        with media_file.media_file.open('rb') as f:
+            self.assertEqual(f.read(), self.content)
+        upload = MediaUpload.objects.get(pk=data['id'])
+        self.assertEqual(MediaUploadService.get_chunk_names(upload), [])
+
+    def test_stale_retry_keeps_committed_chunk(self):
+        """test that a chunk sent again at an offset already committed does not replace the stored chunk"""
+        location = self.create_upload()['Location']
+        upload = MediaUpload.objects.get()
+        self.send_chunk(location, 0, self.content[:4000])
+
+        # A retry which read the upload before the first request committed
+        with self.assertRaises(UploadOffsetConflict):
+            MediaUploadService.append_chunk(upload, 0, BytesIO(self.content[:100]), 100)
+
+        chunk_names = MediaUploadService.get_chunk_names(upload)
+        self.assertEqual(chunk_names, [upload.get_chunk_name(0)])
+        with default_storage.open(chunk_names[0], 'rb') as chunk:
+            self.assertEqual(chunk.read(), self.content[:4000])
+        self.assertEqual(MediaUploadService.list_files(upload.get_temp_chunk_prefix()), [])
+
+    def test_assemble_idempotent(self):
+        """test that assembling an upload again returns the same media file"""
+        location = self.create_upload()['Location']
+        self.send_chunk(location, 0, self.content)
+        upload = MediaUpload.objects.get()
+
+        self.assertEqual(MediaUploadService.assemble(upload.id), upload.media_file)
+        self.assertEqual(MediaFile.objects.count(), 1)
+
+    def test_assemble_claimed_upload_skipped(self):
+        """test that an upload claimed by another task is assembled only once the claim expires"""
+        location = self.create_upload()['Location']
+        with patch('projects.views.assemble_media_upload.delay') as delay:
+            self.send_chunk(location, 0, self.content)
+        delay.assert_called_once()
+        upload = MediaUpload.objects.get()
+        MediaUpload.objects.filter(pk=upload.pk).update(assembling_at=timezone.now())
+
+        self.assertIsNone(MediaUploadService.assemble(upload.id))
+        self.assertFalse(MediaFile.objects.exists())
+
+        MediaUpload.objects.filter(pk=upload.pk).update(
+            assembling_at=timezone.now() - timedelta(seconds=MediaUploadService.ASSEMBLE_TIMEOUT + 1))
+        media_file = MediaUploadService.assemble(upload.id)
+        upload.refresh_from_db()
+        self.assertEqual(upload.media_file, media_file)
+        self.assertIsNone(upload.assembling_at)
+        with media_file.media_file.open('rb') as f:
+            self.assertEqual(f.read(), self.content)
+
+    def test_failed_assembly_releases_claim(self):
+        """test that an assembly failing while copying the chunks can be retried"""
+        location = self.create_upload()['Location']
+        with patch('projects.views.assemble_media_upload.delay'):
+            self.send_chunk(location, 0, self.content)
+        upload = MediaUpload.objects.get()
+
+        with patch('projects.services.IterStream', side_effect=OSError('Storage unavailable')):
+            with self.assertRaises(OSError):
+                MediaUploadService.assemble(upload.id)
+        upload.refresh_from_db()
+        self.assertIsNone(upload.assembling_at)
+        self.assertIsNotNone(MediaUploadService.assemble(upload.id))
+
+    def test_invalid_signature_rejected(self):
+        """test that the first chunk is rejected if its magic bytes do not match the extension"""
+        location = self.create_upload()['Location']
+
+        response = self.send_chunk(location, 0, b'not a video at all' * 10)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.head(location)['Upload-Offset'], '0')
+
+    def test_create_upload_validation(self):
+        """test upload creation limits and permissions"""
+        response = self.create_upload(filename='pitch.exe')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.create_upload(length=1024 * 1024 * 1024 + 1)
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        self.client.force_authenticate(user=self.other_user)
+        response = self.create_upload()
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_upload_owner_only(self):
+        """test that other users cannot access an upload"""
+        location = self.create_upload()['Location']
+
+        self.client.force_authenticate(user=self.other_user)
+        self.assertEqual(self.client.head(location).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_clean_stale_uploads(self):
+        """test that stale, incomplete uploads are deleted with their chunks"""
+        location = self.create_upload()['Location']
+        self.send_chunk(location, 0, self.content[:4000])
+        upload = MediaUpload.objects.get()
+        MediaUpload.objects.update(updated_at=upload.updated_at - timedelta(days=2))
+
+        call_command('clean_media_uploads', stdout=StringIO())
+        self.assertFalse(MediaUpload.objects.exists())
+        self.assertEqual(MediaUploadService.get_chunk_names(upload), [])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MediaFileStreamTest(APITestCase):
+    """
+    Test suite for streaming project media files with byte ranges.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="lin@gmail.com",
+            password="StrongPass123!",
+            first_name="Lim",
+            last_name="Non",
+            user_phone="+1234567890"
+        )
+        cls.user.add_role("Startup")
+        startup = StartUpProfile.objects.create(
+            user_id=cls.user, name='Startup 1', description='Test dddd')
+        project = Project.objects.create(
+            startup=startup, title='Prj1', risk=0.5,
+            description='...', amount=10000, status=1)
+        cls.content = b'\x00\x00\x00\x18ftypmp42' + bytes(range(256)) * 4
+        cls.media_file = MediaFile(project=project)
+        cls.media_file.media_file.save('pitch.mp4', SimpleUploadedFile('pitch.mp4', cls.content))
+        cls.list_url = reverse('project-media-list', args=[project.project_id])
+        cls.url = reverse('media-file-stream', args=[cls.media_file.pk])
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def test_stream_whole_file(self):
+        """test streaming the whole file"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+    def test_stream_range(self):
+        """test partial content responses for byte ranges"""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.content)}')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-5:])
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+
+    def test_stream_if_range(self):
+        """test that a stale If-Range validator returns the whole file"""
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_presigned_url(self):
+        """test that pre-signed URLs work without credentials and are cacheable"""
+        url = self.client.get(self.list_url).data['results'][0]['url']
+        self.client.force_authenticate(user=None)
+
+        response = self.client.get(url, HTTP_RANGE='bytes=0-3')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertTrue(response['Cache-Control'].startswith('public, max-age='))
+
+        response = self.client.get(url.replace('signature=', 'signature=x'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -4,7 +4,14 @@ from .views import (
     CreateProjectsView,
     StartupsProjectView,
     UpdateProjectView,
-    ProjectViewById
+    ProjectViewById,
+    BulkImportProjectsView,
+    ExportProjectsView,
+    ProjectChangelogView,
+    MediaUploadCreateView,
+    MediaUploadDetailView,
+    ProjectMediaListView,
+    MediaFileStreamView,
 )
 
 urlpatterns = [
@@ -13,4 +20,11 @@ urlpatterns = [
     path('create', CreateProjectsView.as_view(), name="project-create"),
     path('project/<uuid:pk>/update/', UpdateProjectView.as_view(), name='update-project'),
     path('project-profile/<uuid:pk>/', ProjectViewById.as_view(), name='project-by-id'),
+    path('project/<uuid:pk>/changelog/', ProjectChangelogView.as_view(), name='project-changelog'),
+    path('project/<uuid:pk>/media-uploads/', MediaUploadCreateView.as_view(), name='media-upload-create'),
+    path('media-uploads/<uuid:pk>/', MediaUploadDetailView.as_view(), name='media-upload-detail'),
+    path('project/<uuid:pk>/media/', ProjectMediaListView.as_view(), name='project-media-list'),
+    path('media/<int:pk>/stream/', MediaFileStreamView.as_view(), name='media-file-stream'),
+    path('bulk-import/', BulkImportProjectsView.as_view(), name='projects-bulk-import'),
+    path('export/', ExportProjectsView.as_view(), name='projects-export'),
 ]
@@ -1,19 +1,45 @@
-import logging
-from django.http import Http404
-from django.core.exceptions import ValidationError
+import time
+from base64 import b64decode
+from binascii import Error as BinasciiError
+
+from django.core.cache import cache
+from django.http import Http404, StreamingHttpResponse
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import generics, status
 from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
-
-from .models import Project
+from django.urls import reverse
+
+from common.media import build_file_response, verify_signed_url
+from common.permissions import HasValidSignature
+from common.streaming import (
+    CSV_CONTENT_TYPE,
+    NDJSON_CONTENT_TYPE,
+    STREAM_FORMATS,
+    iter_csv_rows,
+    iter_ndjson_rows,
+    stream_csv,
+    stream_ndjson,
+)
+from .models import MediaFile, MediaUpload, Project
 from startups.models import StartUpProfile
+from forum.utils.logging_utils import get_logger
 from .serializers import (ProjectSerializerList,
                           UpdateProjectSerializer,
-                          CreateProjectSerializer)
+                          CreateProjectSerializer,
+                          MediaFileSerializer)
+from .services import (
+    MediaUploadService,
+    ProjectHistoryService,
+    ProjectImportService,
+    UploadOffsetConflict,
+)
+from .tasks import assemble_media_upload
 
-logger = logging.getLogger("django")
+logger = get_logger("django")
 
 
 class ProjectsListView(generics.ListAPIView):
@@ -34,10 +60,10 @@ class ProjectsListView(generics.ListAPIView):
         logger.info("Fetching list of projects")
         try:
             response = super().list(request, *args, **kwargs)
-            logger.info(f"Fetched {len(response.data)} projects successfully")
+            logger.info("Fetched %s projects successfully", len(response.data))
             return response
         except Exception as e:
-            logger.error(f"Error fetching project list: {str(e)}", exc_info=True)
+            logger.error("Error fetching project list: %s", str(e), exc_info=True)
             return Response(
                 {"error": "An error occurred while fetching projects."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -59,11 +85,11 @@ class StartupsProjectView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        logger.info(f"Fetching projects for startup {self.kwargs['startup_id']}")
+        logger.info("Fetching projects for startup %s", self.kwargs['startup_id'])
         startup = get_object_or_404(StartUpProfile, id=self.kwargs["startup_id"])
 
         project_list = Project.objects.filter(startup__id=startup.id)
-        logger.info(f"Fetched {len(project_list)} projects for startup {startup.name}")
+        logger.info("Fetched %s projects for startup %s", len(project_list), startup.name)
         return project_list
 
     def list(self, request, *args, **kwargs):
@@ -93,7 +119,7 @@ class CreateProjectsView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
 
     def create(self, request, *args, **kwargs):
-        logger.info(f"User {request.user.id} attempting to create a project")
+        logger.info("User %s attempting to create a project", request.user.id)
         startup_id = request.data.get("startup")
         startup = StartUpProfile.objects.filter(id=startup_id).first()
         
@@ -101,20 +127,21 @@ class CreateProjectsView(generics.CreateAPIView):
             return Response({"error": "Startup not found."}, status=status.HTTP_404_NOT_FOUND)
 
         if startup.user_id.id != request.user.id:
-            logger.warning(f"User {request.user.id} does not have permission to create a project for startup {startup.id}")
+            logger.warning("User %s does not have permission to create a project for startup %s",
+                           request.user.id, startup.id)
             return Response(
                 {"error": "You do not have permission to create a new project."},
                 status=status.HTTP_403_FORBIDDEN,
             )
         try:
             response = super().create(request, *args, **kwargs)
-            logger.info(f"Project created successfully for startup {startup.id}")
+            logger.info("Project created successfully for startup %s", startup.id)
             return Response(
                 {"message": "New project created successfully", "data": response.data},
                 status=status.HTTP_201_CREATED,
             )
         except ValidationError as e:
-            logger.error(f"Validation error while creating project: {e.detail}", exc_info=True)
+            logger.error("Validation error while creating project: %s", e.detail, exc_info=True)
             return Response(
                 {"error": "Invalid data", "details": e.detail},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -139,15 +166,15 @@ class UpdateProjectView(generics.UpdateAPIView):
     lookup_field = 'pk'
 
     def get_queryset(self):
-        logger.info(f"Fetching project {self.kwargs['pk']} for update")
+        logger.info("Fetching project %s for update", self.kwargs['pk'])
         return Project.objects.filter(project_id=self.kwargs["pk"])
 
     def update(self, request, *args, **kwargs):
-        logger.info(f"User {request.user.id} attempting to update project {self.kwargs['pk']}")
+        logger.info("User %s attempting to update project %s", request.user.id, self.kwargs['pk'])
         project = self.get_object()
 
         if project.startup.user_id != request.user:
-            logger.warning(f"User {request.user.id} does not have permission to update project {self.kwargs['pk']}")
+            logger.warning("User %s does not have permission to update project %s", request.user.id, self.kwargs['pk'])
             return Response(
                 {"error": "You do not have permission to update this project."},
                 status=status.HTTP_403_FORBIDDEN,
@@ -155,13 +182,13 @@ class UpdateProjectView(generics.UpdateAPIView):
 
         try:
             response = super().update(request, *args, **kwargs)
-            logger.info(f"Project {self.kwargs['pk']} updated successfully")
+            logger.info("Project %s updated successfully", self.kwargs['pk'])
             return Response(
                 {"message": "Project was updated successfully", "data": response.data},
                 status=status.HTTP_200_OK,
             )
         except ValidationError as e:
-            logger.error(f"Validation error while updating project {self.kwargs['pk']}: {e.detail}", exc_info=True)
+            logger.error("Validation error while updating project %s: %s", self.kwargs['pk'], e.detail, exc_info=True)
             return Response(
                 {"error": "Invalid data", "details": e.detail},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -183,18 +210,384 @@ class ProjectViewById(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        logger.info(f"Fetching project by ID {self.kwargs['pk']}")
+        logger.info("Fetching project by ID %s", self.kwargs['pk'])
         return Project.objects.filter(project_id=self.kwargs.get('pk'))
 
     def retrieve(self, request, *args, **kwargs):
-        logger.info(f"User {request.user.id} attempting to retrieve project {self.kwargs['pk']}")
+        logger.info("User %s attempting to retrieve project %s", request.user.id, self.kwargs['pk'])
         try:
             obj = self.get_object()
-            logger.info(f"Project {obj.project_id} retrieved successfully")
+            logger.info("Project %s retrieved successfully", obj.project_id)
             return Response(self.get_serializer(obj).data)
         except Http404:
-            logger.error(f"Project {self.kwargs['pk']} not found", exc_info=True)
+            logger.error("Project %s not found", self.kwargs['pk'], exc_info=True)
             return Response(
                 {"error": "This project doesn't exist"},
                 status=status.HTTP_404_NOT_FOUND,
             )
+
+
+class BulkImportProjectsView(APIView):
+    """
+    API view to create projects in bulk from an NDJSON or CSV request body.
+
+    The body is parsed as a stream, row by row, and valid rows are inserted in chunks.
+    Users can import projects only for their own startups (staff for any startup).
+
+    Methods:
+        - POST: Imports projects. Content-Type: application/x-ndjson or text/csv.
+
+    Returns:
+        - 201 Created: If all rows were imported.
+        - 207 Multi-Status: If some rows were rejected (see `errors`).
+        - 400 Bad Request: If no rows were imported.
+        - 415 Unsupported Media Type: If the content type is not supported.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = []
+
+    def post(self, request):
+        content_type = request.content_type.split(';')[0].strip()
+        logger.info("User %s attempting to import projects (%s)", request.user.id, content_type)
+
+        if content_type not in (NDJSON_CONTENT_TYPE, CSV_CONTENT_TYPE):
+            return Response(
+                {"error": f"Unsupported content type. Use {NDJSON_CONTENT_TYPE} or {CSV_CONTENT_TYPE}."},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+
+        stream = request.stream or ()
+        rows = iter_csv_rows(stream) if content_type == CSV_CONTENT_TYPE else iter_ndjson_rows(stream)
+        report = ProjectImportService(user=request.user).import_rows(rows)
+
+        if not report['errors']:
+            response_status = status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST
+        else:
+            response_status = status.HTTP_207_MULTI_STATUS if report['created'] else status.HTTP_400_BAD_REQUEST
+        return Response(report, status=response_status)
+
+
+class ExportProjectsView(APIView):
+    """
+    API view to export projects as a streamed NDJSON or CSV file.
+
+    Rows are read with a server-side cursor, so memory stays flat for any number of projects.
+    Users export projects of their own startups (staff all projects).
+
+    Query parameters:
+        - file_format: ndjson (default) or csv
+        - startup: optional startup id filter
+
+    Returns:
+        - 200 OK: The streamed file.
+        - 400 Bad Request: If a query parameter is invalid.
+    """
+    permission_classes = [IsAuthenticated]
+    export_fields = ('project_id', 'startup', 'title', 'risk', 'description', 'business_plan',
+                     'amount', 'status', 'duration', 'created_at', 'updated_at')
+    chunk_size = 2000
+
+    def get(self, request):
+        file_format = request.query_params.get('file_format', 'ndjson')
+        if file_format not in STREAM_FORMATS:
+            return Response(
+                {"error": f"Invalid file format. Valid options: {', '.join(STREAM_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        queryset = Project.objects.order_by('created_at')
+        if not request.user.is_staff:
+            queryset = queryset.filter(startup__user_id=request.user.id)
+
+        startup_id = request.query_params.get('startup')
+        if startup_id is not None:
+            if not startup_id.isdigit():
+                return Response({"error": "Invalid startup id."}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(startup_id=startup_id)
+
+        logger.info("User %s exporting projects as %s", request.user.id, file_format)
+        if file_format == 'csv':
+            content = stream_csv(
+                queryset.values_list(*self.export_fields).iterator(chunk_size=self.chunk_size),
+                self.export_fields,
+            )
+        else:
+            content = stream_ndjson(
+                queryset.values(*self.export_fields).iterator(chunk_size=self.chunk_size))
+
+        response = StreamingHttpResponse(content, content_type=STREAM_FORMATS[file_format])
+        response['Content-Disposition'] = f'attachment; filename="projects.{file_format}"'
+        return response
+
+
+class ProjectChangelogView(APIView):
+    """
+    API view to get the changelog of a project, newest changes first.
+
+    Field changes are computed from the project history in a single windowed query
+    and paged with keyset pagination. Pages after the first one never change,
+    so they are cached.
+
+    Query parameters:
+        - cursor: `next` cursor returned by the previous page
+        - page_size: number of records per page (default 20, max 100)
+
+    Returns:
+        - 200 OK: A page of changes and the `next` cursor.
+        - 400 Bad Request: If the cursor or page size is invalid.
+        - 404 Not Found: If the project is not found.
+    """
+    permission_classes = [IsAuthenticated]
+    default_page_size = 20
+    max_page_size = 100
+    cache_timeout = 60 * 60 * 24
+
+    def get_page_size(self):
+        page_size = self.request.query_params.get('page_size', self.default_page_size)
+        try:
+            page_size = int(page_size)
+        except (TypeError, ValueError):
+            raise ValidationError({"error": "Invalid page size."})
+        if page_size < 1:
+            raise ValidationError({"error": "Invalid page size."})
+        return min(page_size, self.max_page_size)
+
+    def get(self, request, pk):
+        cursor = request.query_params.get('cursor')
+        page_size = self.get_page_size()
+
+        cache_key = None
+        if cursor is not None:
+            cache_key = (f'project_changelog:{ProjectHistoryService.get_cache_version()}:'
+                         f'{pk}:{page_size}:{cursor}')
+            data = cache.get(cache_key)
+            if data is not None:
+                return Response(data, status=status.HTTP_200_OK)
+        elif not Project.objects.filter(project_id=pk).exists():
+            return Response(
+                {"error": "This project doesn't exist"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        try:
+            changelog, next_cursor = ProjectHistoryService.get_changelog(pk, cursor, page_size)
+        except DjangoValidationError as e:
+            return Response({"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = {'next': next_cursor, 'results': changelog}
+        if cache_key is not None:
+            cache.set(cache_key, data, self.cache_timeout)
+        return Response(data, status=status.HTTP_200_OK)
+
+
+TUS_VERSION = '1.0.0'
+UPLOAD_CONTENT_TYPE = 'application/offset+octet-stream'
+
+
+def parse_upload_metadata(value):
+    """Parse a tus `Upload-Metadata` header: comma-separated `key base64(value)` pairs."""
+    metadata = {}
+    for pair in filter(None, (item.strip() for item in value.split(','))):
+        key, _, encoded = pair.partition(' ')
+        try:
+            metadata[key] = b64decode(encoded, validate=True).decode() if encoded else ''
+        except (BinasciiError, UnicodeDecodeError):
+            raise DjangoValidationError('Invalid Upload-Metadata header.')
+    return metadata
+
+
+def upload_error_response(error):
+    """Map a service ValidationError to an error response."""
+    response_status = (
+        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE if error.code == 'too_large'
+        else status.HTTP_400_BAD_REQUEST
+    )
+    return Response({"error": error.messages[0]}, status=response_status,
+                    headers={'Tus-Resumable': TUS_VERSION})
+
+
+class MediaUploadCreateView(APIView):
+    """
+    API view to start a resumable (tus-like) upload of a project media file.
+
+    Headers:
+        - Upload-Length: total file size in bytes
+        - Upload-Metadata: `filename <base64 file name>`
+
+    Methods:
+        - POST: Creates the upload. Chunks are then sent with PATCH to the `Location` URL.
+
+    Returns:
+        - 201 Created: With `Location` and `Upload-Offset` headers.
+        - 400 Bad Request: If the headers or the file name are invalid.
+        - 403 Forbidden: If the user does not own the project.
+        - 404 Not Found: If the project is not found.
+        - 413 Request Entity Too Large: If the file exceeds the size limit.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = []
+
+    def post(self, request, pk):
+        project = get_object_or_404(Project.objects.select_related('startup'), project_id=pk)
+        if project.startup.user_id_id != request.user.id:
+            logger.warning("User %s does not have permission to upload media for project %s", request.user.id, pk)
+            return Response(
+                {"error": "You do not have permission to upload media for this project."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        try:
+            length = int(request.headers.get('Upload-Length', ''))
+            filename = parse_upload_metadata(request.headers.get('Upload-Metadata', '')).get('filename')
+            upload = MediaUploadService.create_upload(project, request.user, filename, length)
+        except ValueError:
+            return Response({"error": "Invalid Upload-Length header."}, status=status.HTTP_400_BAD_REQUEST)
+        except DjangoValidationError as e:
+            return upload_error_response(e)
+
+        return Response(
+            {'id': upload.id, 'offset': upload.offset, 'length': upload.length},
+            status=status.HTTP_201_CREATED,
+            headers={
+                'Location': reverse('media-upload-detail', args=[upload.id]),
+                'Upload-Offset': str(upload.offset),
+                'Tus-Resumable': TUS_VERSION,
+            },
+        )
+
+
+class MediaUploadDetailView(APIView):
+    """
+    API view to resume, continue or cancel a media upload.
+
+    Methods:
+        - HEAD: Returns the current `Upload-Offset`, to resume an interrupted upload.
+        - GET: Returns the upload state and the media file id once assembled.
+        - PATCH: Appends a chunk. Headers: `Upload-Offset`, `Content-Length`;
+          Content-Type: application/offset+octet-stream.
+        - DELETE: Cancels the upload.
+
+    Returns:
+        - 204 No Content: If the chunk was stored or the upload was cancelled.
+        - 400 Bad Request: If the chunk is invalid or incomplete.
+        - 404 Not Found: If the upload is not found.
+        - 409 Conflict: If `Upload-Offset` does not match the current offset.
+        - 413 Request Entity Too Large: If the chunk is too large.
+        - 415 Unsupported Media Type: If the content type is not supported.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = []
+
+    def get_upload(self, request, pk):
+        return get_object_or_404(MediaUpload, pk=pk, user=request.user)
+
+    def get_headers(self, upload):
+        return {
+            'Upload-Offset': str(upload.offset),
+            'Upload-Length': str(upload.length),
+            'Cache-Control': 'no-store',
+            'Tus-Resumable': TUS_VERSION,
+        }
+
+    def head(self, request, pk):
+        upload = self.get_upload(request, pk)
+        return Response(status=status.HTTP_200_OK, headers=self.get_headers(upload))
+
+    def get(self, request, pk):
+        upload = self.get_upload(request, pk)
+        return Response(
+            {
+                'id': upload.id,
+                'offset': upload.offset,
+                'length': upload.length,
+                'completed': upload.is_complete,
+                'media_file': upload.media_file_id,
+            },
+            headers=self.get_headers(upload),
+        )
+
+    def patch(self, request, pk):
+        upload = self.get_upload(request, pk)
+        if request.content_type.split(';')[0].strip() != UPLOAD_CONTENT_TYPE:
+            return Response(
+                {"error": f"Unsupported content type. Use {UPLOAD_CONTENT_TYPE}."},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            size = int(request.headers.get('Content-Length', ''))
+        except ValueError:
+            return Response({"error": "Invalid Upload-Offset or Content-Length header."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            upload = MediaUploadService.append_chunk(upload, offset, request.stream, size)
+        except UploadOffsetConflict as e:
+            upload.refresh_from_db()
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT,
+                            headers=self.get_headers(upload))
+        except DjangoValidationError as e:
+            logger.warning("Chunk at offset %s of media upload %s rejected: %s", offset, pk, e.messages[0])
+            return upload_error_response(e)
+
+        if upload.is_complete:
+            assemble_media_upload.delay(str(upload.id))
+        return Response(status=status.HTTP_204_NO_CONTENT, headers=self.get_headers(upload))
+
+    def delete(self, request, pk):
+        upload = self.get_upload(request, pk)
+        MediaUploadService.delete_upload(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT, headers={'Tus-Resumable': TUS_VERSION})
+
+
+class ProjectMediaListView(generics.ListAPIView):
+    """
+    API view to list the media files of a project.
+
+    Every media file comes with a pre-signed streaming URL, which can be used
+    without credentials (e.g. in a <video> tag) and cached until it expires.
+
+    Methods:
+        - GET: Retrieves the project's media files.
+
+    Returns:
+        - 200 OK: A list of media files.
+    """
+    serializer_class = MediaFileSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return MediaFile.objects.filter(project_id=self.kwargs['pk']).order_by('id')
+
+
+class MediaFileStreamView(APIView):
+    """
+    API view to stream a project media file.
+
+    Supports Range/If-Range (206 Partial Content) for seeking in videos and
+    conditional requests (304). Files are sent with the WSGI server's file
+    wrapper, i.e. sendfile where available.
+
+    Access with a valid pre-signed URL (see ProjectMediaListView) or as an
+    authenticated user.
+
+    Methods:
+        - GET/HEAD: Streams the file or the requested byte range.
+
+    Returns:
+        - 200 OK / 206 Partial Content: The file or the requested range.
+        - 304 Not Modified: If the cached copy is still valid.
+        - 404 Not Found: If the media file is not found.
+        - 416 Range Not Satisfiable: If the range is outside of the file.
+    """
+    permission_classes = [HasValidSignature | IsAuthenticated]
+
+    def get(self, request, pk):
+        media_file = get_object_or_404(MediaFile, pk=pk)
+        expires = request.query_params.get('expires')
+        if verify_signed_url(request.path, expires, request.query_params.get('signature')):
+            cache_control = f'public, max-age={int(expires) - int(time.time())}'
+        else:
+            cache_control = 'private, max-age=0'
+        logger.debug("Streaming media file %s, Range: %s", pk, request.headers.get('Range'))
+        return build_file_response(request, media_file.media_file, cache_control=cache_control)
@@ -1,9 +1,10 @@
 import logging
 import django_filters
 from startups.models import StartUpProfile
+from forum.utils.logging_utils import get_logger
 
 
-logger = logging.getLogger('django')
+logger = get_logger('django')
 
 
 class StartUpProfileFilter(django_filters.FilterSet):
@@ -22,11 +23,12 @@ class StartUpProfileFilter(django_filters.FilterSet):
         fields = ['name', 'description', 'created_at']
 
     def filter_created_at(self, queryset, name, value):
-        logger.info(f"Filtering by created_at range: {value}")
+        logger.info("Filtering by created_at range: %s", value)
         try:
             result = queryset.filter(created_at__range=value)
-            logger.info(f"Filtered {result.count()} records by created_at range: {value}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Filtered %s records by created_at range: %s", result.count(), value)
             return result
         except (ValueError, TypeError) as e:
-            logger.error(f"Error filtering by created_at range: {value}, error: {str(e)}")
+            logger.error("Error filtering by created_at range: %s, error: %s", value, e)
             raise django_filters.exceptions.ValidationError("Invalid date range format.")
@@ -1,12 +1,11 @@
-import logging
-
 from django.contrib.auth import get_user_model
 from django.db import models
 
 from common.validators.image_validator import ImageValidator
+from forum.utils.logging_utils import get_logger
 
 User = get_user_model()
-logger = logging.getLogger('django')
+logger = get_logger('django')
 
 
 class StartUpProfile(models.Model):
@@ -25,13 +24,13 @@ class StartUpProfile(models.Model):
 
     def save(self, *args, **kwargs):
         if self.pk:
-            logger.info(f"Updating StartupProfile: {self.name} (ID: {self.pk})")
+            logger.info("Updating StartupProfile: %s (ID: %s)", self.name, self.pk)
         else:
-            logger.info(f"Creating StartupProfile: {self.name}")
+            logger.info("Creating StartupProfile: %s", self.name)
         super().save(*args, **kwargs)
 
     def delete(self, *args, **kwargs):
-        logger.info(f"Deleting StartupProfile: {self.name} (ID: {self.pk})")
+        logger.info("Deleting StartupProfile: %s (ID: %s)", self.name, self.pk)
         super().delete(*args, **kwargs)
 
 
@@ -1,9 +1,9 @@
-from rest_framework import serializers
-
+from common.serializers import ImageModelSerializer, ThumbnailUrlsField
 from startups.models import StartUpProfile
 
 
-class StartUpProfileSerializer(serializers.ModelSerializer):
+class StartUpProfileSerializer(ImageModelSerializer):
+    startup_logo_thumbnails = ThumbnailUrlsField(source='startup_logo')
 
     class Meta:
         model = StartUpProfile
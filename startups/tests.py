@@ -1,9 +1,24 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from celery.exceptions import Retry
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 
+from common.tasks import process_uploaded_image
+from common.thumbnails import UndecodableImageError, get_thumbnail_name, get_thumbnail_names
+from common.validators.image_validator import ImageValidator
 from startups.models import StartUpProfile
+from startups.serializers import StartUpProfileSerializer
 
 
 class StartUpFilterSearchTests(APITestCase):
@@ -91,3 +106,134 @@ class StartUpFilterSearchTests(APITestCase):
 
         self.assertEqual(len(response.data['results']), 0)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class StartUpLogoPipelineTests(TestCase):
+    """Test suite for the logo validation and thumbnail pipeline"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(
+            email="lin@gmail.com",
+            password="123456pok",
+            first_name="Lim",
+            last_name="Non",
+            user_phone="+1234567890"
+        )
+        cls.user.add_role("Startup")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def make_image(self, image_format='JPEG', size=(600, 400)):
+        image = Image.new('RGB', size, 'red')
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera maker'
+        buffer = BytesIO()
+        image.save(buffer, image_format, exif=exif)
+        return buffer.getvalue()
+
+    def create_startup(self, content, name='logo.jpg'):
+        startup = StartUpProfile(user_id=self.user, name='Startup 1', description='Test dddd')
+        startup.startup_logo = SimpleUploadedFile(name, content)
+        with self.captureOnCommitCallbacks(execute=True):
+            startup.save()
+        startup.refresh_from_db()
+        return startup
+
+    def test_validator_reads_header_only(self):
+        """test that the validator accepts valid headers and rejects other files"""
+        validator = ImageValidator(max_size=5242880, max_width=1200, max_height=800)
+        validator(SimpleUploadedFile('logo.png', self.make_image('PNG')))
+
+        with self.assertRaises(ValidationError):
+            validator(SimpleUploadedFile('logo.png', b'GIF89a' + b'\x00' * 64))
+        with self.assertRaises(ValidationError):
+            validator(SimpleUploadedFile('logo.png', self.make_image('PNG', size=(1600, 400))))
+
+    def test_thumbnails_generated_without_metadata(self):
+        """test that thumbnails are generated in every size and format without EXIF"""
+        startup = self.create_startup(self.make_image())
+
+        storage = startup.startup_logo.storage
+        for name in get_thumbnail_names(startup.startup_logo.name):
+            self.assertTrue(storage.exists(name))
+        with storage.open(get_thumbnail_name(startup.startup_logo.name, 64, 'webp')) as thumbnail_file:
+            thumbnail = Image.open(thumbnail_file)
+            self.assertEqual(thumbnail.format, 'WEBP')
+            self.assertEqual(thumbnail.size, (64, 43))
+            self.assertEqual(len(thumbnail.getexif()), 0)
+
+    def test_original_stored_without_metadata(self):
+        """test that the stored image is re-encoded without EXIF"""
+        for image_format, name in [('JPEG', 'logo.jpg'), ('PNG', 'logo.png')]:
+            startup = self.create_startup(self.make_image(image_format), name=name)
+
+            with startup.startup_logo.open('rb') as logo_file:
+                logo = Image.open(logo_file)
+                self.assertEqual(logo.format, image_format)
+                self.assertEqual(logo.size, (600, 400))
+                self.assertEqual(len(logo.getexif()), 0)
+            startup.delete()
+
+    def test_undecodable_image_is_removed(self):
+        """test that an image with a valid header which cannot be decoded is cleared"""
+        content = self.make_image()
+        startup = self.create_startup(content[:len(content) // 2])
+
+        self.assertFalse(startup.startup_logo)
+
+    def test_undecodable_image_replaced_meanwhile_is_kept(self):
+        """test that an image uploaded while the previous one was processed is not cleared"""
+        startup = self.create_startup(self.make_image())
+        previous = startup.startup_logo.name
+
+        def replace_then_fail(field_file):
+            StartUpProfile.objects.filter(pk=startup.pk).update(startup_logo='startup_logos/new_logo.jpg')
+            raise UndecodableImageError('image file is truncated')
+
+        with mock.patch('common.tasks.decode_image', side_effect=replace_then_fail):
+            process_uploaded_image(startup._meta.label, startup.pk, 'startup_logo')
+
+        startup.refresh_from_db()
+        self.assertEqual(startup.startup_logo.name, 'startup_logos/new_logo.jpg')
+        self.assertTrue(startup.startup_logo.storage.exists(previous))
+
+    def test_storage_error_keeps_image(self):
+        """test that an error other than decoding is retried and does not remove the image"""
+        with mock.patch('common.tasks.generate_thumbnails', side_effect=OSError('Storage unavailable')):
+            with self.assertRaises(Retry):
+                self.create_startup(self.make_image())
+
+        startup = StartUpProfile.objects.get(name='Startup 1')
+        self.assertTrue(startup.startup_logo)
+        self.assertTrue(startup.startup_logo.storage.exists(startup.startup_logo.name))
+
+    def test_replaced_image_thumbnails_deleted(self):
+        """test that the thumbnails of a replaced image are deleted"""
+        startup = self.create_startup(self.make_image())
+        old_thumbnails = get_thumbnail_names(startup.startup_logo.name)
+
+        startup.startup_logo = SimpleUploadedFile('new_logo.jpg', self.make_image())
+        with self.captureOnCommitCallbacks(execute=True):
+            startup.save()
+        startup.refresh_from_db()
+
+        storage = startup.startup_logo.storage
+        self.assertFalse(any(storage.exists(name) for name in old_thumbnails))
+        self.assertTrue(all(storage.exists(name) for name in get_thumbnail_names(startup.startup_logo.name)))
+
+    def test_serializer_exposes_thumbnail_urls(self):
+        """test thumbnail URLs in the startup serializer"""
+        startup = self.create_startup(self.make_image())
+
+        data = StartUpProfileSerializer(startup).data
+        self.assertEqual(set(data['startup_logo_thumbnails']), {'64', '256'})
+        self.assertTrue(data['startup_logo_thumbnails']['256']['webp'].endswith('_256.webp'))
+
+        startup.startup_logo = None
+        self.assertIsNone(StartUpProfileSerializer(startup).data['startup_logo_thumbnails'])
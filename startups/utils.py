@@ -1,19 +1,19 @@
-import logging
 from rest_framework.response import Response
 from rest_framework import status
+from forum.utils.logging_utils import get_logger
 
 
-logger = logging.getLogger('django')
+logger = get_logger('django')
 
 def get_success_response(message, data=None, status_code=status.HTTP_200_OK):
     """Utility function to standardize success responses."""
     response = Response({'message': message, 'data': data}, status=status_code)
-    logger.info(f'Success response: {message}')
+    logger.info('Success response: %s', message)
     return response
 
 
 def handle_object_not_found(exception):
     """Utility function to handle not found responses."""
     response = Response({'message': 'Startup profile not found'}, status=status.HTTP_404_NOT_FOUND)
-    logger.error(f'Object not found: {exception}')
+    logger.error('Object not found: %s', exception)
     return response
@@ -1,4 +1,3 @@
-import logging
 from django.http import Http404
 from django.core.exceptions import ValidationError
 from rest_framework import generics, status
@@ -17,9 +16,10 @@ from startups.utils import (
     get_success_response,
     handle_object_not_found
 )
+from forum.utils.logging_utils import get_logger
 
 
-logger = logging.getLogger('django')
+logger = get_logger('django')
 
 
 class StartUpProfilesView(generics.ListAPIView):
@@ -41,7 +41,7 @@ class StartUpProfilesView(generics.ListAPIView):
     def list(self, request, *args, **kwargs):
         logger.info("Fetching startup profiles")
         response = super().list(request, *args, **kwargs)
-        logger.info(f"Fetched {len(response.data)} startup profiles")
+        logger.info("Fetched %s startup profiles", len(response.data))
         return response
 
 
@@ -56,7 +56,7 @@ class StartUpProfileCreate(generics.CreateAPIView):
         logger.info("Creating a new startup profile")
         try:
             response = super().create(request, *args, **kwargs)
-            logger.info(f"Startup profile created successfully: {response.data['id']}")
+            logger.info("Startup profile created successfully: %s", response.data['id'])
             return Response(
                 {
                     "message": "Startup profile created successfully",
@@ -102,7 +102,7 @@ class StartUpProfileUpdate(generics.UpdateAPIView):
             raise PermissionDenied("You do not have permission to update this profile.")
 
         response = super().update(request, *args, **kwargs)
-        logger.info(f"Startup profile updated successfully: {response.data['id']}")
+        logger.info("Startup profile updated successfully: %s", response.data['id'])
         return get_success_response(
             message='Startup profile updated successfully',
             data=response.data
@@ -121,10 +121,10 @@ class StartUpProfileViewById(generics.RetrieveAPIView):
         return StartUpProfile.objects.filter(id=self.kwargs.get('pk'))
 
     def retrieve(self, request, *args, **kwargs):
-        logger.info(f"Retrieving startup profile with ID: {self.kwargs['pk']}")
+        logger.info("Retrieving startup profile with ID: %s", self.kwargs['pk'])
         try:
             obj = self.get_object()
-            logger.info(f"Startup profile retrieved successfully: {obj.id}")
+            logger.info("Startup profile retrieved successfully: %s", obj.id)
         except Http404 as e:
             return handle_object_not_found(e)
 
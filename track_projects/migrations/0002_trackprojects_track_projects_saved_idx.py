@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investors', '0002_alter_investorprofile_investor_logo'),
+        ('projects', '0003_alter_historicalproject_status_alter_project_status'),
+        ('track_projects', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trackprojects',
+            index=models.Index(fields=['saved_at'], name='track_projects_saved_idx'),
+        ),
+    ]
@@ -26,6 +26,9 @@ class TrackProjects(models.Model):
         verbose_name = 'Track Project'
         verbose_name_plural = 'Track Project'
         ordering = ['-saved_at']
+        indexes = [
+            models.Index(fields=['saved_at'], name='track_projects_saved_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['investor', 'project'],
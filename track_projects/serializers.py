@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import TrackProjects
 
@@ -23,3 +24,14 @@ class TrackProjectSerializerGet(serializers.ModelSerializer):
     class Meta:
         model = TrackProjects
         fields = ['id', 'investor', 'project', 'project_name', 'saved_at']
+
+
+class BulkTrackProjectsSerializer(serializers.Serializer):
+    """
+    Serializer for the list of projects of a bulk track/untrack request.
+    """
+    project_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        allow_empty=False,
+        max_length=settings.BULK_FOLLOW_MAX_ITEMS
+    )
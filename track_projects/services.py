@@ -0,0 +1,24 @@
+from common.follows import BulkFollowService
+from dashboard.services import DashboardMetricsService
+from notifications.tasks import create_follow_notifications
+from projects.models import Project
+from .models import TrackProjects
+
+
+class ProjectFollowService(BulkFollowService):
+    """Service for tracking (following) and untracking projects in bulk."""
+    model = TrackProjects
+    target_model = Project
+    target_field = 'project'
+    startup_field = 'startup_id'
+
+    @classmethod
+    def mark_changed(cls, investor_id, target_ids):
+        DashboardMetricsService.mark_changed(project_ids=target_ids, investor_ids=[investor_id])
+
+    @classmethod
+    def notify(cls, investor_id, followed):
+        create_follow_notifications.delay(
+            investor_id=investor_id,
+            follows=[[startup_id, str(project_id)] for project_id, startup_id in followed.items()]
+        )
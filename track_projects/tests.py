@@ -3,12 +3,14 @@ from django.urls import reverse
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from .models import TrackProjects
+from notifications.models import Notification, NotificationType
 from projects.models import Project
 from investors.models import InvestorProfile
 from startups.models import StartUpProfile
 from django.test import TestCase
 from django.utils import timezone
 from unittest.mock import patch
+import json
 import uuid
 
 User = get_user_model()
@@ -171,6 +173,47 @@ class TrackProjectFollowViewTest(APITestCase):
         self.assertEqual(response.data['error'], 'Project not found')
 
 
+    def test_bulk_follow_projects(self):
+        """
+        Test following several projects at once, with per-project statuses and one batch of notifications.
+        """
+        other = Project.objects.create(
+            startup=self.startup, title='Prj2', risk=0.5,
+            description='...', business_plan='https://google.com',
+            amount=10000, status=1)
+        TrackProjects.objects.create(investor=self.investor, project=other)
+        missing = uuid.uuid4()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('project-track-bulk'), {
+                'project_ids': [str(self.project.project_id), str(other.project_id), str(missing)],
+            }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [
+            {'project_id': str(self.project.project_id), 'status': 'followed'},
+            {'project_id': str(other.project_id), 'status': 'already_following'},
+            {'project_id': str(missing), 'status': 'not_found'},
+        ])
+        self.assertEqual(response.data['updated'], 1)
+        self.assertTrue(TrackProjects.objects.filter(investor=self.investor, project=self.project).exists())
+        self.assertTrue(Notification.objects.filter(
+            investor=self.investor, project=self.project, notification_type=NotificationType.FOLLOW).exists())
+
+        response = self.client.post(reverse('project-untrack-bulk'), {
+            'project_ids': [str(self.project.project_id), str(missing)],
+        }, format='json')
+        self.assertEqual([row['status'] for row in response.data['results']], ['unfollowed', 'not_following'])
+        self.assertFalse(TrackProjects.objects.filter(investor=self.investor, project=self.project).exists())
+
+    def test_bulk_follow_invalid_ids(self):
+        """
+        Test bulk following with invalid project ids.
+        """
+        response = self.client.post(reverse('project-track-bulk'), {'project_ids': ['abc']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Invalid data')
+
 class InvestorsProjectsListViewTest(APITestCase):
     """
     Test suite for listing projects that the investor is following.
@@ -236,3 +279,35 @@ class InvestorsProjectsListViewTest(APITestCase):
         response = self.client.get(self.list_projects_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertGreater(len(response.data), 0)
+
+    def test_export_followed_projects(self):
+        """
+        Test streaming export of the projects the investor is following, with the since parameter.
+        """
+        tracked = TrackProjects.objects.get(investor=self.investor)
+        export_url = reverse('track-project-export')
+
+        response = self.client.get(export_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['project'], str(self.project.project_id))
+
+        response = self.client.get(export_url, {'since': tracked.saved_at.isoformat(), 'since_id': tracked.id})
+        self.assertEqual(b''.join(response.streaming_content), b'')
+
+        # Without since_id, rows at the since timestamp are exported again
+        response = self.client.get(export_url, {'since': tracked.saved_at.isoformat()})
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 1)
+
+        response = self.client.get(export_url, {'file_format': 'csv'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,investor,project,saved_at')
+        self.assertEqual(len(lines), 2)
+
+    def test_export_invalid_since(self):
+        """
+        Test that an invalid since parameter returns a 400 error.
+        """
+        response = self.client.get(reverse('track-project-export'), {'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,10 +1,16 @@
 from django.urls import path
 from .views import (
     TrackProjectFollowView,
-    InvestorsProjectsListView)
+    TrackProjectBulkFollowView,
+    TrackProjectBulkUnfollowView,
+    InvestorsProjectsListView,
+    TrackProjectsExportView)
 
 
 urlpatterns = [
     path('investor-track-projects/', InvestorsProjectsListView.as_view(), name='track-project-list'),
     path('track/<uuid:project_id>/project', TrackProjectFollowView.as_view(), name="project-track"),
+    path('track/bulk/', TrackProjectBulkFollowView.as_view(), name='project-track-bulk'),
+    path('untrack/bulk/', TrackProjectBulkUnfollowView.as_view(), name='project-untrack-bulk'),
+    path('export/', TrackProjectsExportView.as_view(), name='track-project-export'),
 ]
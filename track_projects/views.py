@@ -1,4 +1,3 @@
-import logging
 from django.shortcuts import render
 from django.http import Http404
 from rest_framework import generics, status
@@ -10,12 +9,17 @@ from django.shortcuts import get_object_or_404
 from django.db import IntegrityError
 import uuid
 
+from common.follow_graph import FollowGraph
+from common.views import StreamingExportView
 from .models import TrackProjects
 from projects.models import Project
 from investors.models import InvestorProfile
-from .serializers import TrackProjectSerializerCreate, TrackProjectSerializerGet
+from common.follows import FollowStatus
+from forum.utils.logging_utils import get_logger
+from .serializers import BulkTrackProjectsSerializer, TrackProjectSerializerCreate, TrackProjectSerializerGet
+from .services import ProjectFollowService
 
-logger = logging.getLogger("django")
+logger = get_logger("django")
 
 class TrackProjectFollowView(generics.CreateAPIView):
     """
@@ -38,26 +42,26 @@ class TrackProjectFollowView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
 
     def create(self, request, *args, **kwargs):
-        logger.info(f"Investor {request.user.id} is attempting to follow a project.")
+        logger.info("Investor %s is attempting to follow a project.", request.user.id)
 
         project = Project.objects.filter(project_id=self.kwargs["project_id"]).first()
         investor_profile = InvestorProfile.objects.filter(user=request.user).first()
         if not project:
-            logger.error(f"Project not found")
+            logger.error("Project not found")
             return Response(
                 {'error': 'Project not found'},
                 status = status.HTTP_404_NOT_FOUND
             )
         
         if not investor_profile:
-            logger.error(f"Investor not found")
+            logger.error("Investor not found")
             return Response(
                 {'error': 'Investor not found'},
                 status = status.HTTP_404_NOT_FOUND
             )
 
-        if TrackProjects.objects.filter(investor=investor_profile, project=project).exists():
-            logger.error(f"Investor {request.user.id} is already tracking project {project.project_id}.")
+        if FollowGraph.follows_project(investor_profile.id, project.project_id):
+            logger.error("Investor %s is already tracking project %s.", request.user.id, project.project_id)
             return Response(
                 {"error": "You are already tracking this project."},
                 status=status.HTTP_400_BAD_REQUEST
@@ -74,13 +78,13 @@ class TrackProjectFollowView(generics.CreateAPIView):
         try:
             serializer.is_valid(raise_exception=True)
             self.perform_create(serializer)
-            logger.info(f"Investor {investor_profile.id} successfully followed project {project.project_id}.")
+            logger.info("Investor %s successfully followed project %s.", investor_profile.id, project.project_id)
             return Response(
                 {'message': f'You successfully subscribed to project {project.title}'},
                 status=status.HTTP_201_CREATED
             )
         except ValidationError as e:
-            logger.error(f"ValidationError: {e.detail}")
+            logger.error("ValidationError: %s", e.detail)
             return Response(
                 {'error': 'Invalid data', 
                  'details': e.detail},
@@ -88,6 +92,74 @@ class TrackProjectFollowView(generics.CreateAPIView):
             )
 
 
+class TrackProjectBulkFollowView(generics.GenericAPIView):
+    """
+    API view for investors to follow many projects at once, e.g. when importing a watchlist.
+
+    Methods:
+        - POST: Follows the projects in 'project_ids' with a single insert.
+
+    Returns:
+        - 200 OK: With the status of each project (followed, already_following or not_found).
+        - 400 Bad Request: If 'project_ids' is invalid.
+        - 404 Not Found: If the investor profile is not found.
+    """
+
+    serializer_class = BulkTrackProjectsSerializer
+    permission_classes = [IsAuthenticated]
+    action = 'follow'
+
+    def apply(self, investor_id, project_ids):
+        return ProjectFollowService.follow(investor_id, project_ids)
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            logger.error("ValidationError: %s", serializer.errors)
+            return Response(
+                {'error': 'Invalid data',
+                 'details': serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        investor_id = InvestorProfile.objects.filter(user=request.user).values_list('id', flat=True).first()
+        if not investor_id:
+            logger.error("Investor not found")
+            return Response(
+                {'error': 'Investor not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        statuses = self.apply(investor_id, serializer.validated_data['project_ids'])
+        logger.info("Investor %s bulk %s of %s projects.", request.user.id, self.action, len(statuses))
+        return Response({
+            'results': [
+                {'project_id': str(project_id), 'status': status_} for project_id, status_ in statuses.items()
+            ],
+            'updated': sum(status_ in (FollowStatus.FOLLOWED, FollowStatus.UNFOLLOWED)
+                           for status_ in statuses.values()),
+        }, status=status.HTTP_200_OK)
+
+
+class TrackProjectBulkUnfollowView(TrackProjectBulkFollowView):
+    """
+    API view for investors to unfollow many projects at once.
+
+    Methods:
+        - POST: Unfollows the projects in 'project_ids'.
+
+    Returns:
+        - 200 OK: With the status of each project (unfollowed or not_following).
+        - 400 Bad Request: If 'project_ids' is invalid.
+        - 404 Not Found: If the investor profile is not found.
+    """
+
+    action = 'unfollow'
+
+    def apply(self, investor_id, project_ids):
+        return ProjectFollowService.unfollow(investor_id, project_ids)
+
+
 class InvestorsProjectsListView(generics.ListAPIView):
     """
     API view for listing the projects followed by an investor.
@@ -103,7 +175,29 @@ class InvestorsProjectsListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        logger.info(f"Fetching tracked projects for investor {self.request.user.id}.")
+        logger.info("Fetching tracked projects for investor %s.", self.request.user.id)
         tracked_list = TrackProjects.objects.filter(investor__user__id=self.request.user.id)
-        logger.info(f"Investor {self.request.user.id} is following {tracked_list.count()} projects.")
+        logger.info("Investor %s is following %s projects.", self.request.user.id, tracked_list.count())
         return tracked_list
+
+
+class TrackProjectsExportView(StreamingExportView):
+    """
+    API view to export tracked projects as a streamed NDJSON or CSV file.
+
+    Staff export all records, investors their own tracked projects.
+
+    Query parameters:
+        - file_format: ndjson (default) or csv
+        - since: ISO 8601 datetime, only records saved at or after it are exported
+        - since_id: id of the last record exported at `since`, to resume after it
+    """
+    export_fields = ('id', 'investor', 'project', 'saved_at')
+    since_field = 'saved_at'
+    filename = 'track_projects'
+
+    def get_queryset(self):
+        queryset = TrackProjects.objects.all()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(investor__user_id=self.request.user.id)
+        return queryset
@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+from forum.utils.logging_utils import get_logger
+
+
+logger = get_logger('users')
+
+
+class UsersConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'users'
+
+    def ready(self):
+        logger.info('Initializing Users app and importing signals.')
+        try:
+            import users.signals  # noqa
+        except Exception as e:
+            logger.error('Failed to import signals for Users app. Error: %s', e)
+            raise
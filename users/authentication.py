@@ -0,0 +1,155 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from forum.utils.logging_utils import get_logger
+
+from .models import Role, User
+from .revocation import revocation_store
+from .tokens import CLAIM_NAMES, get_user_claims, prefetch_roles
+
+
+logger = get_logger('users')
+
+USER_CACHE_KEY = 'jwt_user:{}'
+USER_CLAIMS_KEY = 'jwt_user_claims:{}'
+
+USER_CACHE_TTL = getattr(settings, 'JWT_USER_CACHE_TTL', 60)
+
+CLAIMS_USER_FIELDS = ('id', 'is_staff', 'is_active', 'active_role_id')
+
+
+def get_state_keys(payload):
+    """Cache keys read for every authenticated request, in a single round trip."""
+    return [
+        USER_CLAIMS_KEY.format(payload[api_settings.USER_ID_CLAIM]),
+        *revocation_store.get_state_keys(payload),
+    ]
+
+
+def build_claims_user(payload):
+    """
+    Build a User from token claims, without a database query.
+
+    Only the claimed fields are loaded; any other field is loaded from the
+    database on first access (all deferred fields together, see
+    `User.refresh_from_db`). Roles and the active role come prefetched.
+    """
+    values = {
+        'id': User._meta.pk.to_python(payload[api_settings.USER_ID_CLAIM]),
+        'is_staff': payload['is_staff'],
+        'is_active': payload['is_active'],
+        'active_role_id': payload['active_role'][0] if payload['active_role'] else None,
+    }
+    user = User.from_db(
+        DEFAULT_DB_ALIAS,
+        CLAIMS_USER_FIELDS,
+        [values[field.attname] for field in User._meta.concrete_fields if field.attname in values],
+    )
+    user.from_token_claims = True
+
+    if payload['active_role']:
+        user.active_role = Role.from_db(DEFAULT_DB_ALIAS, ('id', 'name'), payload['active_role'])
+
+    prefetch_roles(user, payload['roles'])
+    return user
+
+
+def get_claims_user(payload, state):
+    """
+    Return a User built from the token claims, or None if the claims are
+    missing, no longer match the user (roles or flags changed since the
+    token was issued) or the current claims of the user are not known.
+    """
+    if not getattr(settings, 'JWT_CLAIMS_USER', False):
+        return None
+    if any(claim not in payload for claim in CLAIM_NAMES):
+        return None
+
+    current_claims = state.get(USER_CLAIMS_KEY.format(payload[api_settings.USER_ID_CLAIM]))
+    if current_claims is None or any(payload[claim] != current_claims[claim] for claim in CLAIM_NAMES):
+        return None
+    return build_claims_user(payload)
+
+
+def load_user(user_id):
+    """
+    Return the full user with roles, cached for USER_CACHE_TTL seconds.
+
+    The current claims of a user loaded from the database are recorded
+    unless already known, so the next requests can use the token claims.
+    """
+    key = USER_CACHE_KEY.format(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = User.objects.select_related('active_role').prefetch_related('roles').filter(pk=user_id).first()
+        if user is not None:
+            cache.set(key, user, USER_CACHE_TTL)
+            cache.add(USER_CLAIMS_KEY.format(user_id), get_user_claims(user), None)
+    return user
+
+
+def invalidate_user(user, claims=True):
+    """
+    Drop the cached user and record its current claims, so tokens with
+    outdated claims fall back to a full user load.
+
+    Pass claims=False when only fields outside the token claims changed.
+    The tokens of inactive (deactivated or soft deleted) users are revoked.
+    """
+    cache.delete(USER_CACHE_KEY.format(user.pk))
+    if claims:
+        cache.set(USER_CLAIMS_KEY.format(user.pk), get_user_claims(user), None)
+        if not user.is_active:
+            revocation_store.revoke_users([user.pk])
+
+
+def invalidate_users(user_ids):
+    """
+    Bulk version of `invalidate_user` for users changed by set-based updates,
+    which send no signals.
+    """
+    users = User.objects.select_related('active_role').prefetch_related('roles').filter(
+        pk__in=user_ids).only('id', 'is_staff', 'is_active', 'active_role__id', 'active_role__name')
+    cache.delete_many([USER_CACHE_KEY.format(user_id) for user_id in user_ids])
+    cache.set_many({USER_CLAIMS_KEY.format(user.pk): get_user_claims(user) for user in users}, None)
+    revocation_store.revoke_users([user.pk for user in users if not user.is_active])
+
+
+def check_user(user):
+    if user is None:
+        raise AuthenticationFailed(_("User not found"), code="user_not_found")
+    if not user.is_active:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication without a per-request user query.
+
+    Revoked tokens (see `users.revocation`) are rejected.
+
+    The user is built from the token claims when they are current
+    (JWT_CLAIMS_USER), otherwise it is loaded through a short-lived cache.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        state = cache.get_many(get_state_keys(validated_token.payload))
+        if revocation_store.is_revoked(validated_token.payload, state):
+            raise InvalidToken(_("Token has been revoked"))
+
+        user = get_claims_user(validated_token.payload, state)
+        if user is None:
+            logger.debug("Loading user %s for token without current claims", user_id)
+            user = load_user(user_id)
+        return check_user(user)
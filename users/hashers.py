@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 hasher with the work factor taken from PASSWORD_HASH_ITERATIONS.
+
+    The algorithm name is unchanged, so existing hashes keep verifying;
+    hashes with a different iteration count are upgraded on the next login.
+    Use the `benchmark_password_hasher` command to pick the work factor.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', PBKDF2PasswordHasher.iterations)
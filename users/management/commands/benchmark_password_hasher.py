@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from users.hashers import ConfigurablePBKDF2PasswordHasher
+from forum.utils.logging_utils import get_logger
+
+
+logger = get_logger('users')
+
+
+class Command(BaseCommand):
+    help = 'Measure the password hashing time for PBKDF2 work factors.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, nargs='+',
+                            default=[260000, 600000, 870000, 1000000],
+                            help='Work factors to measure')
+        parser.add_argument('--rounds', type=int, default=5,
+                            help='Hashes computed per work factor')
+        parser.add_argument('--target-ms', type=float, default=250,
+                            help='Maximum acceptable time per login, in milliseconds')
+
+    def handle(self, *args, **options):
+        hasher = ConfigurablePBKDF2PasswordHasher()
+        salt = hasher.salt()
+        recommended = None
+
+        self.stdout.write(f'Current PASSWORD_HASH_ITERATIONS: {hasher.iterations}')
+        for iterations in sorted(options['iterations']):
+            with override_settings(PASSWORD_HASH_ITERATIONS=iterations):
+                start = time.perf_counter()
+                for _ in range(options['rounds']):
+                    hasher.encode('benchmark-password', salt)
+                elapsed_ms = (time.perf_counter() - start) * 1000 / options['rounds']
+
+            self.stdout.write(f'{iterations:>10} iterations: {elapsed_ms:8.1f} ms per hash')
+            if elapsed_ms <= options['target_ms']:
+                recommended = iterations
+
+        if recommended is None:
+            self.stdout.write(self.style.WARNING(
+                f"No work factor hashes within {options['target_ms']} ms."))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Largest work factor within {options['target_ms']} ms: {recommended}"))
+        logger.info("Password hasher benchmark finished, recommended iterations: %s", recommended)
@@ -0,0 +1,30 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from users.services import UserBulkService
+from .soft_delete_users import add_selection_arguments, get_selection, warn_local_cache
+
+
+logger = logging.getLogger('users')
+
+
+class Command(BaseCommand):
+    help = 'Reactivate soft deleted user accounts in bulk.'
+
+    def add_arguments(self, parser):
+        add_selection_arguments(parser)
+
+    def handle(self, *args, **options):
+        logger.debug('Starting bulk user reactivation')
+        warn_local_cache(self, options)
+        reactivated, skipped = UserBulkService.reactivate(
+            get_selection(options, soft_deleted=True),
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        action = 'Found' if options['dry_run'] else 'Reactivated'
+        self.stdout.write(self.style.SUCCESS(f'{action} {reactivated} users.'))
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {len(skipped)} users whose email is taken: {', '.join(map(str, skipped))}"))
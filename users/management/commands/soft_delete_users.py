@@ -0,0 +1,62 @@
+import logging
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+
+from users.models import User
+from users.services import UserBulkService
+
+
+logger = logging.getLogger('users')
+
+
+def add_selection_arguments(parser):
+    parser.add_argument('--ids', type=int, nargs='+', help='Process these user ids')
+    parser.add_argument('--email-domain', help='Process users with emails in this domain')
+    parser.add_argument('--role', choices=User.ALLOWED_ROLES, help='Process users with this role')
+    parser.add_argument('--batch-size', type=int, default=UserBulkService.DEFAULT_BATCH_SIZE,
+                        help='Number of users updated at once')
+    parser.add_argument('--dry-run', action='store_true', help='Only count the selected users')
+
+
+def get_selection(options, soft_deleted):
+    if not (options['ids'] or options['email_domain'] or options['role']):
+        raise CommandError('Select users with --ids, --email-domain or --role.')
+    return UserBulkService.get_queryset(
+        soft_deleted,
+        user_ids=options['ids'],
+        email_domain=options['email_domain'],
+        role=options['role'],
+    )
+
+
+def warn_local_cache(command, options):
+    """
+    Cached users and token claims are invalidated in the default cache. A
+    local memory cache is private to this process, so running servers keep
+    using what they cached. (`django.core.cache.cache` is a proxy, so the
+    backend is checked.)
+    """
+    if not options['dry_run'] and isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache):
+        command.stderr.write(command.style.WARNING(
+            'The cache is local to this process: running servers are not invalidated. '
+            'Set CACHE_REDIS_URL to share it.'))
+
+
+class Command(BaseCommand):
+    help = 'Soft delete user accounts in bulk.'
+
+    def add_arguments(self, parser):
+        add_selection_arguments(parser)
+
+    def handle(self, *args, **options):
+        logger.debug('Starting bulk user soft delete')
+        warn_local_cache(self, options)
+        deleted = UserBulkService.soft_delete(
+            get_selection(options, soft_deleted=False),
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        action = 'Found' if options['dry_run'] else 'Soft deleted'
+        self.stdout.write(self.style.SUCCESS(f'{action} {deleted} users.'))
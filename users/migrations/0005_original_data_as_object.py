@@ -0,0 +1,41 @@
+import json
+
+from django.db import migrations
+
+
+BATCH_SIZE = 1000
+
+
+def original_data_to_object(apps, schema_editor):
+    """
+    Convert the personal data of older soft deletes, stored as a JSON
+    encoded string, to a JSON object so it can be queried by key
+    (e.g. `original_data__email`).
+    """
+    User = apps.get_model('users', 'User')
+    users = (
+        User.objects.filter(is_soft_deleted=True, original_data__isnull=False)
+        .only('pk', 'original_data')
+        .order_by('pk')
+    )
+    converted = []
+    for user in users.iterator(chunk_size=BATCH_SIZE):
+        if isinstance(user.original_data, str):
+            user.original_data = json.loads(user.original_data)
+            converted.append(user)
+        if len(converted) >= BATCH_SIZE:
+            User.objects.bulk_update(converted, ['original_data'])
+            converted = []
+    if converted:
+        User.objects.bulk_update(converted, ['original_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_user_active_role'),
+    ]
+
+    operations = [
+        migrations.RunPython(original_data_to_object, migrations.RunPython.noop),
+    ]
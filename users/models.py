@@ -1,5 +1,4 @@
 import json
-import logging
 
 from django.contrib.auth.models import (
     AbstractBaseUser,
@@ -14,9 +13,11 @@ from django.core.validators import RegexValidator
 from django.db import models
 from django.utils import timezone
 
+from common.thumbnails import delete_thumbnails
 from common.validators.image_validator import ImageValidator
+from forum.utils.logging_utils import get_logger
 
-logger = logging.getLogger('users')
+logger = get_logger('users')
 
 
 class CustomUserManager(BaseUserManager):
@@ -37,7 +38,7 @@ class CustomUserManager(BaseUserManager):
         Raises:
             ValueError: If email is not provided or password is invalid.
         """
-        logger.debug(f"Attempting to create user with email: {email}")
+        logger.debug("Attempting to create user with email: %s", email)
         if not email:
             logger.error("Attempt to create user without email")
             raise ValueError('The Email field must be set')
@@ -49,17 +50,17 @@ class CustomUserManager(BaseUserManager):
                 validate_password(password)
                 user.set_password(password)
             except ValidationError as e:
-                logger.exception(f"Invalid password for user {email}")
+                logger.exception("Invalid password for user %s", email)
                 raise ValueError(f"Invalid password: {', '.join(e.messages)}")
         else:
-            logger.error(f"Attempt to create user {email} without password")
+            logger.error("Attempt to create user %s without password", email)
             raise ValueError('Password must be provided')
 
         try:
             user.save(using=self._db)
             logger.info("New user created", extra={'email': email, 'roles': extra_fields.get('roles', [])})
         except Exception as e:
-            logger.exception(f"Failed to save user {email}: {e}")
+            logger.exception("Failed to save user %s: %s", email, e)
             raise
 
         return user
@@ -79,7 +80,7 @@ class CustomUserManager(BaseUserManager):
         Raises:
             ValueError: If the password is not provided.
         """
-        logger.debug(f"Attempting to create superuser with email: {email}")
+        logger.debug("Attempting to create superuser with email: %s", email)
 
         if not password:
             logger.error("Password must be provided for superuser creation.")
@@ -94,7 +95,7 @@ class CustomUserManager(BaseUserManager):
             logger.info("New superuser created", extra={'email': email})
             return user
         except Exception as e:
-            logger.error(f"Failed to create superuser: {e}")
+            logger.error("Failed to create superuser: %s", e)
             raise
 
 class Role(models.Model):
@@ -117,6 +118,9 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     ALLOWED_ROLES = ['Investor', 'Startup', 'Admin']
 
+    # Personal data kept in `original_data` while the account is soft deleted
+    ORIGINAL_DATA_FIELDS = ('email', 'first_name', 'last_name', 'user_phone', 'about_me')
+
     email = models.EmailField('email address', max_length=255, unique=True, db_index=True)
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
@@ -176,27 +180,22 @@ class User(AbstractBaseUser, PermissionsMixin):
         Raises:
             ValidationError: If the role is invalid or already assigned.
         """
-        logger.debug(f"Attempting to add role '{role_name}' to user {self.email}")
+        logger.debug("Attempting to add role '%s' to user %s", role_name, self.email)
         if role_name not in self.ALLOWED_ROLES:
-            logger.warning(f"Attempt to add invalid role '{role_name}' to user {self.email}")
+            logger.warning("Attempt to add invalid role '%s' to user %s", role_name, self.email)
             raise ValidationError(f"Cannot add role: {role_name}")
         if not self.is_active or self.is_soft_deleted:
-            logger.warning(f"Attempt to add role to inactive or deleted user {self.email}")
+            logger.warning("Attempt to add role to inactive or deleted user %s", self.email)
             raise ValidationError("This account is not active or is deleted.")
 
         role, created = Role.objects.get_or_create(name=role_name)
         if not self.roles.filter(pk=role.pk).exists():
             self.roles.add(role)
-            try:
-                self.save()
-                logger.info(f"Role '{role_name}' added to user {self.email}")
-            except Exception as e:
-                logger.exception(f"Failed to save user {self.email} after adding role '{role_name}': {e}")
-                raise
+            logger.info("Role '%s' added to user %s", role_name, self.email)
             if hasattr(self, '_cached_roles'):
                 del self._cached_roles
         else:
-            logger.warning(f"User {self.email} already has the role: {role_name}")
+            logger.warning("User %s already has the role: %s", self.email, role_name)
 
     def remove_role(self, role_name):
         """
@@ -208,26 +207,21 @@ class User(AbstractBaseUser, PermissionsMixin):
         Raises:
             ValidationError: If the role is invalid or not assigned.
         """
-        logger.debug(f"Attempting to remove role '{role_name}' from user {self.email}")
+        logger.debug("Attempting to remove role '%s' from user %s", role_name, self.email)
         if role_name not in self.ALLOWED_ROLES:
-            logger.warning(f"Attempt to remove invalid role '{role_name}' from user {self.email}")
+            logger.warning("Attempt to remove invalid role '%s' from user %s", role_name, self.email)
             raise ValidationError(f"Cannot remove role: {role_name}")
         if not self.is_active or self.is_soft_deleted:
-            logger.warning(f"Attempt to remove role from inactive or deleted user {self.email}")
+            logger.warning("Attempt to remove role from inactive or deleted user %s", self.email)
             raise ValidationError("This account is not active or is deleted.")
         role = self.roles.filter(name=role_name).first()
         if role:
             self.roles.remove(role)
-            try:
-                self.save()
-                logger.info(f"Role '{role_name}' removed from user {self.email}")
-            except Exception as e:
-                logger.exception(f"Failed to save user {self.email} after removing role '{role_name}': {e}")
-                raise
+            logger.info("Role '%s' removed from user %s", role_name, self.email)
             if hasattr(self, '_cached_roles'):
                 del self._cached_roles
         else:
-            logger.warning(f"User {self.email} does not have the role: {role_name}")
+            logger.warning("User %s does not have the role: %s", self.email, role_name)
 
     def set_active_role(self, role_name):
         """
@@ -239,24 +233,24 @@ class User(AbstractBaseUser, PermissionsMixin):
         Raises:
             ValidationError: If the role is not assigned to the user or does not exist.
         """
-        logger.debug(f"Attempting to set active role for user {self.email}. Requested role: '{role_name}'.")
+        logger.debug("Attempting to set active role for user %s. Requested role: '%s'.", self.email, role_name)
 
         role = self.roles.filter(name=role_name).first()
         if not role:
-            logger.error(f"Role '{role_name}' not found for user {self.email}.")
+            logger.error("Role '%s' not found for user %s.", role_name, self.email)
             raise ValidationError(f"Role '{role_name}' is not assigned to the user.")
 
         if self.active_role != role:
-            logger.warning(f"User  {self.email} is attempting to set an active role that is not their current role.")
+            logger.warning("User  %s is attempting to set an active role that is not their current role.", self.email)
 
         self.active_role = role
-        self.save()
-        logger.info(f"Active role for user {self.email} set to '{role_name}'.")
+        self.save(update_fields=['active_role', 'updated_at'])
+        logger.info("Active role for user %s set to '%s'.", self.email, role_name)
 
     def get_active_role_display(self):
         """Returns a string representation of the user's active role."""
         active_role_display = self.active_role.name if self.active_role else 'No active role'
-        logger.debug(f"User  {self.email} active role display: '{active_role_display}'.")
+        logger.debug("User  %s active role display: '%s'.", self.email, active_role_display)
         return active_role_display
 
     def has_role(self, role_name):
@@ -270,7 +264,7 @@ class User(AbstractBaseUser, PermissionsMixin):
             bool: True if the user has the role, False otherwise.
         """
         if role_name not in self.ALLOWED_ROLES:
-            logger.warning(f"Attempt to check for invalid role '{role_name}' for user {self.email}")
+            logger.warning("Attempt to check for invalid role '%s' for user %s", role_name, self.email)
             raise ValidationError(f"Role '{role_name}' is not allowed.")
         return self.roles.filter(name=role_name).exists()
 
@@ -293,23 +287,17 @@ class User(AbstractBaseUser, PermissionsMixin):
             ValidationError: If the account is already inactive or deleted.
         """
         if not self.is_active or self.is_soft_deleted:
-            logger.warning(f"Attempt to soft delete an already inactive or deleted user {self.email}")
+            logger.warning("Attempt to soft delete an already inactive or deleted user %s", self.email)
             raise ValidationError("This account is already inactive or deleted.")
 
-        original_data = {
-            'email': self.email,
-            'first_name': self.first_name,
-            'last_name': self.last_name,
-            'user_phone': self.user_phone,
-            'about_me': self.about_me,
-        }
-        self.original_data = json.dumps(original_data)
+        self.original_data = {field: getattr(self, field) for field in self.ORIGINAL_DATA_FIELDS}
 
         self.email = f"deleted_{self.id}@example.com"
         self.first_name = "Deleted"
         self.last_name = "User"
         self.user_phone = ""
         self.about_me = ""
+        delete_thumbnails(self.profile_picture)
         self.profile_picture.delete(save=False)
         self.is_active = False
         self.is_soft_deleted = True
@@ -317,11 +305,21 @@ class User(AbstractBaseUser, PermissionsMixin):
 
         try:
             self.save()
-            logger.info(f"User {self.id} soft deleted")
+            logger.info("User %s soft deleted", self.id)
         except Exception as e:
-            logger.exception(f"Failed to save soft deleted user {self.email}: {e}")
+            logger.exception("Failed to save soft deleted user %s: %s", self.email, e)
             raise
 
+    def get_original_data(self):
+        """
+        Return the personal data saved on soft delete as a dict, or None.
+
+        Older soft deletes stored it as a JSON encoded string.
+        """
+        if isinstance(self.original_data, str):
+            return json.loads(self.original_data)
+        return self.original_data
+
     def reactivate(self):
         """
         Reactivate a soft-deleted user account.
@@ -332,16 +330,13 @@ class User(AbstractBaseUser, PermissionsMixin):
             ValidationError: If the account is already active or not soft deleted.
         """
         if self.is_active or not self.is_soft_deleted:
-            logger.warning(f"Attempt to reactivate an already active user {self.email}")
+            logger.warning("Attempt to reactivate an already active user %s", self.email)
             raise ValidationError("This account is already active or not soft deleted.")
 
-        if self.original_data:
-            original_data = json.loads(self.original_data)
-            self.email = original_data['email']
-            self.first_name = original_data['first_name']
-            self.last_name = original_data['last_name']
-            self.user_phone = original_data['user_phone']
-            self.about_me = original_data['about_me']
+        original_data = self.get_original_data()
+        if original_data:
+            for field in self.ORIGINAL_DATA_FIELDS:
+                setattr(self, field, original_data[field])
             self.original_data = None
 
         self.is_active = True
@@ -350,29 +345,67 @@ class User(AbstractBaseUser, PermissionsMixin):
 
         try:
             self.save()
-            logger.info(f"User {self.id} reactivated")
+            logger.info("User %s reactivated", self.id)
         except Exception as e:
-            logger.exception(f"Failed to save reactivated user {self.email}: {e}")
+            logger.exception("Failed to save reactivated user %s: %s", self.email, e)
             raise
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded email to detect changes on save."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_email = instance.__dict__.get('email')
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        """
+        Reload fields from the database.
+
+        Users built from token claims load all their deferred fields at once,
+        on first access to any of them, instead of one query per field.
+        """
+        if fields is not None and getattr(self, 'from_token_claims', False):
+            fields = set(fields) | self.get_deferred_fields()
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None or 'email' in fields:
+            self._loaded_email = self.email
+
+    def email_changed(self):
+        """
+        Check whether the email differs from the one loaded from the database.
+
+        New users always count as changed; a deferred email is unchanged.
+        """
+        if self._state.adding:
+            return True
+        if 'email' not in self.__dict__:
+            return False
+        return self.email != getattr(self, '_loaded_email', None)
+
     def save(self, *args, **kwargs):
         """
         Save the user instance to the database.
 
         This method overrides the default save method to ensure
-        the email is always normalized before saving.
+        the email is always normalized before saving. The duplicate
+        email query only runs when the email changed; the unique
+        constraint on the column covers concurrent changes.
 
         Args:
             *args: Variable length argument list.
             **kwargs: Arbitrary keyword arguments.
         """
-        self.email = self.email.lower().strip()
+        update_fields = kwargs.get('update_fields')
+        if (update_fields is None or 'email' in update_fields) and self.email_changed():
+            self.email = self.email.lower().strip()
 
-        if User.objects.filter(email=self.email).exclude(pk=self.pk).exists():
-            logger.warning(f"Attempt to save user with duplicate email {self.email}")
-            raise ValidationError("Email already exists.")
+            if User.objects.filter(email=self.email).exclude(pk=self.pk).exists():
+                logger.warning("Attempt to save user with duplicate email %s", self.email)
+                raise ValidationError("Email already exists.")
 
         super().save(*args, **kwargs)
+        if 'email' in self.__dict__:
+            self._loaded_email = self.email
 
     class Meta:
         unique_together = [('email', 'is_active')]
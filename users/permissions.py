@@ -4,7 +4,7 @@ import logging
 from rest_framework import permissions
 from django.utils import timezone
 from django.conf import settings
-from investment_tracking.models import InvestmentTracking
+from common.follow_graph import FollowGraph
 
 logger = logging.getLogger('users')
 
@@ -133,10 +133,9 @@ class InvestmentPermission(DetailedPermissionLogging):
         base_log_data = self.get_base_log_data(request, view)
 
         try:
-            investment_exists = InvestmentTracking.objects.filter(
-                investor=investor_profile,
-                startup_id=view.kwargs.get('startup_id')
-            ).exists()
+            investment_exists = FollowGraph.follows_startup(
+                investor_profile.id, view.kwargs.get('startup_id')
+            )
 
             if investment_exists:
                 self.log_event('info', 'Investment found', {
@@ -0,0 +1,192 @@
+import hashlib
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.settings import api_settings
+from forum.utils.logging_utils import get_logger
+
+
+logger = get_logger('users')
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter of strings (no false negatives)."""
+
+    def __init__(self, size, hashes):
+        self.size = size
+        self.hashes = hashes
+        self.bits = bytearray((size + 7) // 8)
+
+    def get_positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=4 * self.hashes).digest()
+        for i in range(self.hashes):
+            yield int.from_bytes(digest[4 * i:4 * i + 4], 'big') % self.size
+
+    def add(self, value):
+        for position in self.get_positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.get_positions(value))
+
+
+class RevocationStore:
+    """
+    Store of revoked token JTIs.
+
+    Every revoked JTI is kept in the shared cache until the token expires
+    (`revoked_jti:<jti>`), which is the authoritative check. Tokens are
+    grouped in buckets by expiry; each bucket has an append-only log of
+    revoked JTIs (an atomic counter plus one entry per revocation) that
+    every process replays into a local Bloom filter.
+
+    The counter is read together with the other per-request cache keys (see
+    `get_state_keys`), so a token that is not revoked is checked against
+    the local filter only, without an extra cache round trip.
+
+    Soft deleted and deactivated users have every token issued to them
+    until then revoked (`revoked_user:<id>`, the time of revocation, kept
+    for the refresh token lifetime), read in the same round trip.
+    """
+
+    JTI_KEY = 'revoked_jti:{}'
+    USER_KEY = 'revoked_user:{}'
+    COUNT_KEY = 'revoked_count:{}'
+    ENTRY_KEY = 'revoked_entry:{}:{}'
+    SYNC_BATCH_SIZE = 1000
+
+    def __init__(self, bucket_seconds, bloom_size, bloom_hashes):
+        self.bucket_seconds = bucket_seconds
+        self.bloom_size = bloom_size
+        self.bloom_hashes = bloom_hashes
+        self.filters = {}
+        self.lock = threading.Lock()
+
+    def get_bucket(self, payload):
+        return int(payload['exp']) // self.bucket_seconds
+
+    def get_bucket_timeout(self, bucket):
+        """Bucket logs are kept until every token of the bucket has expired."""
+        return max(int((bucket + 1) * self.bucket_seconds - time.time()), 1)
+
+    def get_state_keys(self, payload):
+        return [
+            self.COUNT_KEY.format(self.get_bucket(payload)),
+            self.USER_KEY.format(payload.get(api_settings.USER_ID_CLAIM)),
+        ]
+
+    def get_filter(self, bucket):
+        """Return the [filter, replayed entries] pair of the bucket, dropping expired buckets."""
+        if bucket not in self.filters:
+            current = int(time.time()) // self.bucket_seconds
+            for expired in [b for b in self.filters if b < current]:
+                del self.filters[expired]
+            self.filters[bucket] = [BloomFilter(self.bloom_size, self.bloom_hashes), 0]
+        return self.filters[bucket]
+
+    def revoke(self, payload):
+        """
+        Revoke the token until it expires. The JTI is added atomically
+        (SET NX), so of concurrent revocations of a token only one succeeds;
+        refresh rotation relies on it.
+
+        Returns:
+            bool: False if the token has no JTI, is already expired or
+            was already revoked
+        """
+        jti = payload.get(api_settings.JTI_CLAIM)
+        ttl = int(payload.get('exp', 0) - time.time())
+        if not jti or ttl <= 0:
+            return False
+
+        if not cache.add(self.JTI_KEY.format(jti), True, ttl):
+            return False
+
+        bucket = self.get_bucket(payload)
+        count_key = self.COUNT_KEY.format(bucket)
+        timeout = self.get_bucket_timeout(bucket)
+        cache.add(count_key, 0, timeout)
+        try:
+            count = cache.incr(count_key)
+        except ValueError:
+            cache.add(count_key, 0, timeout)
+            count = cache.incr(count_key)
+        cache.set(self.ENTRY_KEY.format(bucket, count), jti, timeout)
+
+        with self.lock:
+            self.get_filter(bucket)[0].add(jti)
+        logger.info("Token %s revoked for %s seconds", jti, ttl)
+        return True
+
+    def revoke_users(self, user_ids):
+        """Revoke all the tokens issued to the users so far, until the last of them expires."""
+        revoked_at = int(time.time())
+        cache.set_many({self.USER_KEY.format(user_id): revoked_at for user_id in user_ids}, self.bucket_seconds)
+
+    def is_user_revoked(self, payload, state):
+        revoked_at = state.get(self.USER_KEY.format(payload.get(api_settings.USER_ID_CLAIM)))
+        return revoked_at is not None and payload.get('iat', 0) <= revoked_at
+
+    def replay(self, bucket, shared_count):
+        """Add log entries of the bucket not yet seen by this process to its filter."""
+        with self.lock:
+            bloom, replayed = self.get_filter(bucket)
+            while replayed < shared_count:
+                end = min(shared_count, replayed + self.SYNC_BATCH_SIZE)
+                keys = [self.ENTRY_KEY.format(bucket, i) for i in range(replayed + 1, end + 1)]
+                entries = cache.get_many(keys)
+                for key in keys:
+                    if key not in entries:
+                        # Not written yet (or evicted); retry on the next check.
+                        logger.debug("Revocation log entry %s missing", key)
+                        self.filters[bucket][1] = replayed
+                        return
+                    bloom.add(entries[key])
+                    replayed += 1
+            self.filters[bucket][1] = replayed
+
+    def is_clearly_valid(self, payload, state):
+        """
+        Return True if the token is known not to be revoked without any I/O:
+        the local filter is up to date and does not contain the JTI.
+        """
+        bucket = self.get_bucket(payload)
+        shared_count = state.get(self.COUNT_KEY.format(bucket)) or 0
+        bloom, replayed = self.filters.get(bucket, (None, 0))
+        if shared_count == 0:
+            return True
+        return bloom is not None and replayed >= shared_count and payload[api_settings.JTI_CLAIM] not in bloom
+
+    def is_revoked(self, payload, state):
+        """Check whether the token is revoked; `state` holds the values of `get_state_keys`."""
+        if self.is_user_revoked(payload, state):
+            return True
+        if api_settings.JTI_CLAIM not in payload or self.is_clearly_valid(payload, state):
+            return False
+
+        bucket = self.get_bucket(payload)
+        shared_count = state.get(self.COUNT_KEY.format(bucket)) or 0
+        self.replay(bucket, shared_count)
+
+        jti = payload[api_settings.JTI_CLAIM]
+        bloom, replayed = self.filters[bucket]
+        if replayed >= shared_count and jti not in bloom:
+            return False
+        return cache.get(self.JTI_KEY.format(jti)) is not None
+
+    async def ais_revoked(self, payload, state):
+        if self.is_user_revoked(payload, state):
+            return True
+        if api_settings.JTI_CLAIM not in payload or self.is_clearly_valid(payload, state):
+            return False
+        return await sync_to_async(self.is_revoked)(payload, state)
+
+
+revocation_store = RevocationStore(
+    bucket_seconds=int(settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds()),
+    bloom_size=getattr(settings, 'JWT_REVOCATION_BLOOM_SIZE', 2 ** 20),
+    bloom_hashes=getattr(settings, 'JWT_REVOCATION_BLOOM_HASHES', 7),
+)
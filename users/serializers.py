@@ -1,18 +1,26 @@
-import logging
 from django.contrib.auth import get_user_model, authenticate
+from django.core.cache import cache
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 
+from common.serializers import ImageModelSerializer, SniffedImageField, ThumbnailUrlsField
 from .models import Role, User
+from .revocation import revocation_store
+from .tokens import ClaimsRefreshToken
 from django.db import transaction
+from forum.utils.logging_utils import get_logger
 
-logger = logging.getLogger('users')
+logger = get_logger('users')
 
 User = get_user_model()
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     username_field = 'email'
+    token_class = ClaimsRefreshToken
 
     def validate(self, attrs):
         email = attrs.get('email')
@@ -50,6 +58,23 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         }
 
 
+class RevocationAwareTokenRefreshSerializer(TokenRefreshSerializer):
+    """Token refresh which rejects revoked refresh tokens and revokes rotated ones."""
+
+    def validate(self, attrs):
+        payload = RefreshToken(attrs['refresh']).payload
+        state = cache.get_many(revocation_store.get_state_keys(payload))
+        if revocation_store.is_revoked(payload, state):
+            raise InvalidToken('Token has been revoked')
+
+        data = super().validate(attrs)
+        # Only the request which revokes the rotated token gets the new ones,
+        # so concurrent refreshes of the same token cannot both succeed
+        if api_settings.ROTATE_REFRESH_TOKENS and not revocation_store.revoke(payload):
+            raise InvalidToken('Token has been revoked')
+        return data
+
+
 class RoleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Role
@@ -63,8 +88,9 @@ class CustomUserCreateSerializer(serializers.ModelSerializer):
     roles = serializers.PrimaryKeyRelatedField(
         queryset=Role.objects.all(), many=True, required=False
     )
-    profile_picture = serializers.ImageField(
-        required=False, allow_null=True
+    profile_picture = SniffedImageField(
+        required=False, allow_null=True,
+        validators=User._meta.get_field('profile_picture').validators
     )
 
 
@@ -81,12 +107,12 @@ class CustomUserCreateSerializer(serializers.ModelSerializer):
 
     def set_roles_and_password(self, instance, validated_data):
         """Set the user's password and roles if provided."""
-        logger.debug(f"Setting roles and password for user: {instance.email}")
+        logger.debug("Setting roles and password for user: %s", instance.email)
 
         try:
             if 'password' in validated_data:
                 instance.set_password(validated_data['password'])
-                logger.debug(f"Password updated for user: {instance.email}")
+                logger.debug("Password updated for user: %s", instance.email)
 
             if 'roles' in validated_data:
                 instance.roles.set(validated_data['roles'])
@@ -111,7 +137,7 @@ class CustomUserCreateSerializer(serializers.ModelSerializer):
     @transaction.atomic
     def create(self, validated_data):
         """Create a new user instance with validated data."""
-        logger.debug(f"Attempting to create user with email: {validated_data.get('email')}")
+        logger.debug("Attempting to create user with email: %s", validated_data.get('email'))
 
         try:
             user = User.objects.create(**validated_data)
@@ -140,7 +166,7 @@ class CustomUserCreateSerializer(serializers.ModelSerializer):
     @transaction.atomic
     def update(self, instance, validated_data):
         """Update an existing user instance."""
-        logger.debug(f"Attempting to update user: {instance.email}")
+        logger.debug("Attempting to update user: %s", instance.email)
 
         try:
             if not instance.is_active:
@@ -179,14 +205,15 @@ class CustomUserCreateSerializer(serializers.ModelSerializer):
             raise
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(ImageModelSerializer):
     roles = serializers.StringRelatedField(many=True)
+    profile_picture_thumbnails = ThumbnailUrlsField(source='profile_picture')
 
     class Meta:
         model = User
         fields = (
             'id', 'email', 'first_name', 'last_name',
-            'roles', 'about_me', 'profile_picture', 'is_active',
+            'roles', 'about_me', 'profile_picture', 'profile_picture_thumbnails', 'is_active',
             'last_login', 'created_at', 'updated_at', 'is_soft_deleted'
         )
         read_only_fields = ('is_active',)
@@ -194,7 +221,7 @@ class UserSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         """Control the visibility of fields depending on the user's role"""
-        logger.debug(f"Serializing user data for: {instance.email}")
+        logger.debug("Serializing user data for: %s", instance.email)
 
         try:
             data = super().to_representation(instance)
@@ -229,3 +256,17 @@ class UserSerializer(serializers.ModelSerializer):
             raise
 
 
+
+
+class BulkUserActionSerializer(serializers.Serializer):
+    """Selects users for bulk soft delete or reactivation by ids and/or filters."""
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=10000)
+    email_domain = serializers.CharField(required=False, max_length=255)
+    role = serializers.ChoiceField(choices=User.ALLOWED_ROLES, required=False)
+    dry_run = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, attrs):
+        if not any(attrs.get(field) for field in ('user_ids', 'email_domain', 'role')):
+            raise serializers.ValidationError('Provide "user_ids", "email_domain" or "role".')
+        return attrs
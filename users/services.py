@@ -0,0 +1,170 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import CharField, F, Value
+from django.db.models.functions import Cast, Concat, JSONObject
+from django.utils import timezone
+
+from common.streaming import chunked
+from common.tasks import delete_stored_images
+from forum.utils.logging_utils import get_logger
+from .authentication import invalidate_users
+from .models import User
+
+logger = get_logger('users')
+
+
+class UserBulkService:
+    """Soft deletion and reactivation of many users at once.
+
+    Users are processed in batches of ids. Each batch is changed with
+    set-based UPDATEs in one transaction, without per-user saves or email
+    checks. Once the transaction is committed, profile pictures are deleted
+    in the background and the cached users and token claims of the batch
+    are invalidated together.
+    """
+
+    DEFAULT_BATCH_SIZE = 1000
+
+    @staticmethod
+    def get_queryset(soft_deleted, user_ids=None, email_domain=None, role=None):
+        """Return the users to process.
+
+        Parameters:
+        - soft_deleted: select soft deleted users (to reactivate) instead of active ones
+        - user_ids: restrict to these ids
+        - email_domain: restrict to this email domain; the email saved on
+          soft delete is matched for soft deleted users
+        - role: restrict to users with this role
+        """
+        queryset = User.objects.filter(is_active=not soft_deleted, is_soft_deleted=soft_deleted)
+        if user_ids is not None:
+            queryset = queryset.filter(pk__in=user_ids)
+        if email_domain:
+            email_field = 'original_data__email' if soft_deleted else 'email'
+            queryset = queryset.filter(**{f'{email_field}__iendswith': f"@{email_domain.lstrip('@')}"})
+        if role:
+            queryset = queryset.filter(roles__name=role)
+        return queryset
+
+    @staticmethod
+    def get_ids(queryset):
+        return list(queryset.order_by('pk').values_list('pk', flat=True).distinct())
+
+    @classmethod
+    def soft_delete(cls, queryset, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+        """Soft delete the active users of the queryset.
+
+        The personal data is copied to `original_data` and anonymized in
+        the same UPDATE, as in `User.soft_delete`.
+
+        Returns:
+            int: number of users soft deleted (to be, for dry runs)
+        """
+        user_ids = cls.get_ids(queryset)
+        if dry_run:
+            return len(user_ids)
+
+        deleted = 0
+        for batch in chunked(user_ids, batch_size):
+            deleted += cls.soft_delete_batch(batch)
+        logger.info("Bulk soft deleted %s users", deleted)
+        return deleted
+
+    @staticmethod
+    def soft_delete_batch(user_ids):
+        now = timezone.now()
+        with transaction.atomic():
+            rows = list(
+                User.objects.select_for_update()
+                .filter(pk__in=user_ids, is_active=True, is_soft_deleted=False)
+                .values_list('pk', 'profile_picture')
+            )
+            locked_ids = [pk for pk, _ in rows]
+            pictures = [picture for _, picture in rows if picture]
+
+            User.objects.filter(pk__in=locked_ids).update(
+                original_data=JSONObject(**{field: F(field) for field in User.ORIGINAL_DATA_FIELDS}),
+                email=Concat(Value('deleted_'), Cast('pk', CharField()), Value('@example.com')),
+                first_name='Deleted',
+                last_name='User',
+                user_phone='',
+                about_me='',
+                profile_picture='',
+                is_active=False,
+                is_soft_deleted=True,
+                deleted_at=now,
+                updated_at=now,
+            )
+            if pictures:
+                transaction.on_commit(partial(delete_stored_images.delay, pictures))
+            transaction.on_commit(partial(invalidate_users, locked_ids))
+        return len(locked_ids)
+
+    @classmethod
+    def reactivate(cls, queryset, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+        """Reactivate the soft deleted users of the queryset.
+
+        Users whose original email has been taken in the meantime stay
+        soft deleted and are reported.
+
+        Returns:
+            tuple: number of users reactivated (to be, for dry runs) and
+            the ids of the skipped users
+        """
+        user_ids = cls.get_ids(queryset)
+        if dry_run:
+            return len(user_ids), []
+
+        reactivated = 0
+        skipped = []
+        for batch in chunked(user_ids, batch_size):
+            batch_reactivated, batch_skipped = cls.reactivate_batch(batch)
+            reactivated += batch_reactivated
+            skipped.extend(batch_skipped)
+        logger.info("Bulk reactivated %s users, skipped %s", reactivated, len(skipped))
+        return reactivated, skipped
+
+    @staticmethod
+    def reactivate_batch(user_ids):
+        now = timezone.now()
+        with transaction.atomic():
+            users = list(
+                User.objects.select_for_update()
+                .filter(pk__in=user_ids, is_active=False, is_soft_deleted=True)
+                .only('pk', 'original_data', *User.ORIGINAL_DATA_FIELDS)
+            )
+            original_data = {user.pk: user.get_original_data() for user in users}
+            emails = [data['email'] for data in original_data.values() if data]
+            taken = set(
+                User.objects.filter(email__in=emails)
+                .exclude(pk__in=user_ids)
+                .values_list('email', flat=True)
+            )
+
+            restored = []
+            skipped = []
+            for user in users:
+                data = original_data[user.pk]
+                if data:
+                    if data['email'] in taken:
+                        logger.warning("Cannot reactivate user %s: email %s is taken", user.pk, data['email'])
+                        skipped.append(user.pk)
+                        continue
+                    taken.add(data['email'])
+                    for field in User.ORIGINAL_DATA_FIELDS:
+                        setattr(user, field, data[field])
+                user.original_data = None
+                user.is_active = True
+                user.is_soft_deleted = False
+                user.deleted_at = None
+                user.updated_at = now
+                restored.append(user)
+
+            User.objects.bulk_update(
+                restored,
+                [*User.ORIGINAL_DATA_FIELDS, 'original_data', 'is_active',
+                 'is_soft_deleted', 'deleted_at', 'updated_at'],
+            )
+            transaction.on_commit(partial(invalidate_users, [user.pk for user in restored]))
+        return len(restored), skipped
@@ -0,0 +1,31 @@
+import logging
+
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_user
+from .models import User
+
+
+logger = logging.getLogger('users')
+
+CLAIM_FIELDS = frozenset({'is_staff', 'is_active', 'active_role', 'active_role_id'})
+
+
+@receiver(post_save, sender=User)
+def invalidate_token_user_on_save(sender, instance, created, update_fields=None, **kwargs):
+    """Invalidate the cached user and its token claims when the user changes."""
+    if not created:
+        invalidate_user(instance, claims=update_fields is None or bool(CLAIM_FIELDS & update_fields))
+
+
+@receiver(m2m_changed, sender=User.roles.through)
+def invalidate_token_user_on_roles_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Invalidate the token claims of users whose roles changed."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidate_user(instance)
+    elif pk_set:
+        for user in User.objects.filter(pk__in=pk_set):
+            invalidate_user(user)
@@ -1,12 +1,32 @@
+import json
+import uuid
+from importlib import import_module
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from django.apps import apps
 from django.contrib.auth.password_validation import validate_password
-from django.test import TestCase
+from django.core.cache import cache, caches
+from django.contrib.auth.hashers import identify_hasher
+from django.contrib.auth.models import update_last_login
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.exceptions import ValidationError
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from communications.middlewares import JWTAuthMiddleware
 
 from forum import settings
+from .authentication import USER_CLAIMS_KEY
 from .models import User, Role
+from .revocation import BloomFilter, RevocationStore, revocation_store
+from .services import UserBulkService
 
 PASSWORD_VALIDATORS = []
 
@@ -152,6 +172,52 @@ class UserTests(TestCase):
         self.assertIn('all_roles', response.data)
 
 
+class UserSaveQueriesTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='save@test.com',
+            password='StrongPass123!',
+            first_name='Save',
+            last_name='Queries',
+            user_phone='+11234567890'
+        )
+        self.other_user = User.objects.create_user(email='other@test.com', password='StrongPass123!')
+
+    def test_save_without_email_change_skips_duplicate_check(self):
+        """test that saves not touching the email run only the update"""
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Changed'
+        with CaptureQueriesContext(connection) as queries:
+            user.save()
+        self.assertFalse(any('"email" =' in query['sql'] and query['sql'].startswith('SELECT')
+                             for query in queries.captured_queries))
+        with self.assertNumQueries(1):
+            update_last_login(None, user)
+
+    def test_email_change_checks_duplicates(self):
+        """test that changing the email still rejects duplicates"""
+        user = User.objects.get(pk=self.user.pk)
+        user.email = ' Other@Test.com '
+        with self.assertRaises(DjangoValidationError):
+            user.save()
+
+        user.email = 'New@Test.com'
+        with CaptureQueriesContext(connection) as queries:
+            user.save()
+        self.assertTrue(any('"email" =' in query['sql'] and query['sql'].startswith('SELECT')
+                            for query in queries.captured_queries))
+        self.assertEqual(User.objects.get(pk=user.pk).email, 'new@test.com')
+
+    def test_role_changes_query_count(self):
+        """test that adding a role does not save the user and switching roles updates one row"""
+        self.user.add_role('Investor')
+        self.user.add_role('Startup')
+        with self.assertNumQueries(3):
+            self.user.set_active_role('Startup')
+        self.assertEqual(User.objects.get(pk=self.user.pk).active_role.name, 'Startup')
+
+
 class CustomTokenObtainPairViewTest(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -277,3 +343,409 @@ class CustomTokenObtainPairViewTest(TestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
+    def test_login_single_query(self):
+        """test that login loads the user and roles in one query"""
+        self.active_user.add_role('Investor')
+        self.active_user.set_active_role('Investor')
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                self.url,
+                {'email': 'active@test.com', 'password': self.valid_password},
+                format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        token = AccessToken(response.data['access'])
+        self.assertEqual(token['roles'], [[self.active_user.active_role.id, 'Investor']])
+
+    @override_settings(LOGIN_RATE_LIMIT='2/5m')
+    def test_failed_logins_rate_limited(self):
+        """test that repeated failed logins are blocked before the password is checked"""
+        ratelimit_cache = caches[settings.RATELIMIT_USE_CACHE]
+        ratelimit_cache.clear()
+        for _ in range(2):
+            response = self.client.post(
+                self.url, {'email': 'active@test.com', 'password': 'wrongpassword'}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # the attempts are counted in the rate limit cache, not the default one
+        cache.clear()
+        with self.assertNumQueries(0):
+            response = self.client.post(
+                self.url, {'email': 'active@test.com', 'password': self.valid_password}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+        response = self.client.post(
+            self.url, {'email': 'soft_deleted@test.com', 'password': self.valid_password}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ratelimit_cache.clear()
+
+    @override_settings(LOGIN_RATE_LIMIT='2/5m')
+    def test_failed_logins_limited_per_account_from_any_address(self):
+        """test that the account limit ignores the address and no address limit applies by default"""
+        ratelimit_cache = caches[settings.RATELIMIT_USE_CACHE]
+        ratelimit_cache.clear()
+        for address in ['10.0.0.1', '10.0.0.2']:
+            self.client.post(self.url, {'email': 'Active@test.com ', 'password': 'wrongpassword'},
+                             format='json', REMOTE_ADDR=address)
+
+        response = self.client.post(
+            self.url, {'email': 'active@test.com', 'password': self.valid_password},
+            format='json', REMOTE_ADDR='10.0.0.3')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        response = self.client.post(
+            self.url, {'email': 'soft_deleted@test.com', 'password': self.valid_password},
+            format='json', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ratelimit_cache.clear()
+
+    @override_settings(LOGIN_IP_RATE_LIMIT='2/5m', TRUSTED_PROXY_COUNT=1)
+    def test_failed_logins_limited_per_forwarded_client_address(self):
+        """test that the address limit counts the client address added by the proxy"""
+        ratelimit_cache = caches[settings.RATELIMIT_USE_CACHE]
+        ratelimit_cache.clear()
+        proxy = {'REMOTE_ADDR': '10.0.0.1'}
+        for spoofed in ['1.1.1.1', '2.2.2.2']:
+            self.client.post(self.url, {'email': f'{spoofed}@test.com', 'password': 'wrongpassword'},
+                             format='json', HTTP_X_FORWARDED_FOR=f'{spoofed}, 203.0.113.1', **proxy)
+
+        response = self.client.post(
+            self.url, {'email': 'active@test.com', 'password': self.valid_password},
+            format='json', HTTP_X_FORWARDED_FOR='203.0.113.1', **proxy)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        response = self.client.post(
+            self.url, {'email': 'active@test.com', 'password': self.valid_password},
+            format='json', HTTP_X_FORWARDED_FOR='203.0.113.2', **proxy)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ratelimit_cache.clear()
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=1000)
+    def test_password_hash_iterations_setting(self):
+        """test that the hasher work factor follows the setting and old hashes are upgraded"""
+        user = User.objects.create_user(email='hasher@test.com', password=self.valid_password)
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+
+        with override_settings(PASSWORD_HASH_ITERATIONS=2000):
+            response = self.client.post(
+                self.url, {'email': 'hasher@test.com', 'password': self.valid_password}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            user.refresh_from_db()
+            self.assertTrue(user.password.startswith('pbkdf2_sha256$2000$'))
+            self.assertEqual(identify_hasher(user.password).algorithm, 'pbkdf2_sha256')
+
+
+
+class TokenClaimsAuthenticationTest(TestCase):
+    """Test suite for authentication from token claims"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='claims@test.com',
+            password='StrongPass123!',
+            first_name='John',
+            last_name='Doe',
+            user_phone='+11234567890'
+        )
+        self.user.add_role('Investor')
+        self.user.set_active_role('Investor')
+
+    def login(self):
+        response = self.client.post(
+            reverse('token-create'),
+            {'email': 'claims@test.com', 'password': 'StrongPass123!'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return response.data['access']
+
+    def test_token_contains_claims(self):
+        """test that issued tokens carry the user claims"""
+        payload = AccessToken(self.login()).payload
+        self.assertEqual(payload['roles'], [[self.user.active_role.id, 'Investor']])
+        self.assertEqual(payload['active_role'], [self.user.active_role.id, 'Investor'])
+        self.assertFalse(payload['is_staff'])
+
+    def test_claims_user_without_queries(self):
+        """test that requests are authenticated without loading the user"""
+        self.login()
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('get-roles'))
+        self.assertEqual(response.data['roles'], 'Investor')
+
+    def test_claims_user_loads_deferred_fields_once(self):
+        """test that other user fields are loaded lazily, in a single query"""
+        self.login()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('get-active-role'))
+        self.assertEqual(response.data['active_role'], 'Investor')
+
+    def test_role_change_invalidates_claims(self):
+        """test that tokens with outdated roles fall back to a full user load"""
+        self.login()
+        self.client.post(reverse('add-role'), {'role_name': 'Startup'}, format='json')
+
+        response = self.client.get(reverse('get-roles'))
+        self.assertIn('Startup', response.data['roles'])
+
+    def test_soft_deleted_user_rejected(self):
+        """test that tokens of soft deleted users are no longer accepted"""
+        self.login()
+        self.client.post(reverse('soft-delete'))
+
+        response = self.client.get(reverse('get-roles'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_unknown_claims_load_user(self):
+        """test that the token claims are not trusted when the current claims of the user are unknown"""
+        self.login()
+        cache.delete(USER_CLAIMS_KEY.format(self.user.pk))
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        response = self.client.get(reverse('get-roles'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_bulk_soft_deleted_user_tokens_revoked(self):
+        """test that bulk soft delete revokes the tokens issued to the users"""
+        response = self.client.post(
+            reverse('token-create'),
+            {'email': 'claims@test.com', 'password': 'StrongPass123!'},
+            format='json'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            UserBulkService.soft_delete(User.objects.filter(pk=self.user.pk))
+
+        refresh = RefreshToken(response.data['refresh'])
+        self.assertTrue(revocation_store.is_revoked(
+            refresh.payload, cache.get_many(revocation_store.get_state_keys(refresh.payload))))
+        response = self.client.post(reverse('token-refresh'), {'refresh': response.data['refresh']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cached_user_for_tokens_without_claims(self):
+        """test that tokens without claims use the cached user"""
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        self.client.get(reverse('get-roles'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('get-roles'))
+        self.assertEqual(response.data['roles'], 'Investor')
+
+    def test_websocket_middleware(self):
+        """test that the channels middleware authenticates from token claims"""
+        scopes = []
+
+        async def app(scope, receive, send):
+            scopes.append(scope)
+
+        middleware = JWTAuthMiddleware(app)
+        token = self.login()
+        async_to_sync(middleware)({'query_string': f'token={token}'.encode()}, None, None)
+        async_to_sync(middleware)({'query_string': b'token=invalid'}, None, None)
+
+        self.assertEqual(scopes[0]['user'].pk, self.user.pk)
+        self.assertEqual(scopes[0]['user'].get_active_role_display(), 'Investor')
+        self.assertFalse(scopes[1]['user'].is_authenticated)
+
+
+class TokenRevocationTest(TestCase):
+    """Test suite for logout and the revoked tokens store"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        User.objects.create_user(
+            email='revoke@test.com',
+            password='StrongPass123!',
+            first_name='John',
+            last_name='Doe',
+            user_phone='+11234567890'
+        )
+
+    def login(self):
+        response = self.client.post(
+            reverse('token-create'),
+            {'email': 'revoke@test.com', 'password': 'StrongPass123!'},
+            format='json'
+        )
+        return response.data['access'], response.data['refresh']
+
+    def test_logout_revokes_tokens(self):
+        """test that logout revokes both the access and the refresh token"""
+        access, refresh = self.login()
+        other_access, _ = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+        response = self.client.post(reverse('logout-user'), {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(reverse('get-roles'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post(reverse('token-refresh'), {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {other_access}')
+        response = self.client.get(reverse('get-roles'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_rotated_refresh_token_revoked(self):
+        """test that a refresh token cannot be reused after rotation"""
+        _, refresh = self.login()
+
+        response = self.client.post(reverse('token-refresh'), {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post(reverse('token-refresh'), {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_concurrent_revocations_claim_once(self):
+        """test that only one of the revocations of a token succeeds, as refresh rotation requires"""
+        refresh = RefreshToken(self.login()[1])
+
+        self.assertTrue(revocation_store.revoke(refresh.payload))
+        self.assertFalse(revocation_store.revoke(refresh.payload))
+
+    def test_revocations_replayed_by_other_processes(self):
+        """test that a store with an empty local filter picks up revocations from the cache"""
+        access = AccessToken(self.login()[0])
+        other_store = RevocationStore(bucket_seconds=86400, bloom_size=1024, bloom_hashes=3)
+        revocation_store.revoke(access.payload)
+
+        state = cache.get_many(other_store.get_state_keys(access.payload))
+        self.assertFalse(other_store.is_clearly_valid(access.payload, state))
+        self.assertTrue(other_store.is_revoked(access.payload, state))
+
+        valid = AccessToken(self.login()[0])
+        state = cache.get_many(other_store.get_state_keys(valid.payload))
+        self.assertFalse(other_store.is_revoked(valid.payload, state))
+        self.assertTrue(other_store.is_clearly_valid(valid.payload, state))
+
+    def test_bloom_filter(self):
+        """test that the Bloom filter has no false negatives"""
+        bloom = BloomFilter(size=2 ** 16, hashes=7)
+        values = [str(uuid.uuid4()) for _ in range(1000)]
+        for value in values:
+            bloom.add(value)
+
+        self.assertTrue(all(value in bloom for value in values))
+        false_positives = sum(str(uuid.uuid4()) in bloom for _ in range(1000))
+        self.assertLess(false_positives, 50)
+
+
+class UserBulkOperationsTest(TestCase):
+    """Test suite for bulk soft delete and reactivation"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            email='admin@partner.com', password='StrongPass123!', is_staff=True)
+        self.partner_users = [
+            User.objects.create_user(
+                email=f'user{i}@partner.com', password='StrongPass123!',
+                first_name='Partner', last_name=f'User{i}', user_phone='+11234567890')
+            for i in range(3)
+        ]
+        self.other_user = User.objects.create_user(email='user@other.com', password='StrongPass123!')
+        self.client.force_authenticate(user=self.admin)
+
+    def test_bulk_soft_delete_by_domain(self):
+        """test that users of a domain are anonymized in bulk and their tokens rejected"""
+        token = str(AccessToken.for_user(self.partner_users[0]))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('bulk-soft-delete'), {'email_domain': 'partner.com'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['deleted'], 3)
+
+        user = User.objects.get(pk=self.partner_users[0].pk)
+        self.assertTrue(user.is_soft_deleted)
+        self.assertFalse(user.is_active)
+        self.assertEqual(user.email, f'deleted_{user.pk}@example.com')
+        self.assertEqual(user.get_original_data()['email'], 'user0@partner.com')
+        self.assertTrue(User.objects.get(pk=self.admin.pk).is_active)
+        self.assertTrue(User.objects.get(pk=self.other_user.pk).is_active)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(client.get(reverse('get-roles')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_bulk_reactivate_skips_taken_emails(self):
+        """test that bulk reactivation restores data and skips users whose email was taken"""
+        self.partner_users[1].soft_delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            UserBulkService.soft_delete(UserBulkService.get_queryset(
+                False, user_ids=[self.partner_users[0].pk, self.partner_users[2].pk]))
+        User.objects.create_user(email='user2@partner.com', password='StrongPass123!')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('bulk-reactivate'), {'email_domain': 'partner.com'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['reactivated'], 2)
+        self.assertEqual(response.data['skipped'], [self.partner_users[2].pk])
+
+        for i, partner_user in enumerate(self.partner_users[:2]):
+            user = User.objects.get(pk=partner_user.pk)
+            self.assertTrue(user.is_active)
+            self.assertEqual(user.email, f'user{i}@partner.com')
+            self.assertIsNone(user.original_data)
+        self.assertTrue(User.objects.get(pk=self.partner_users[2].pk).is_soft_deleted)
+
+    def test_string_original_data_migrated(self):
+        """test that personal data stored as a JSON string by older soft deletes is selectable by email domain"""
+        user = self.partner_users[0]
+        User.objects.filter(pk=user.pk).update(
+            is_active=False, is_soft_deleted=True,
+            original_data=json.dumps({field: getattr(user, field) for field in User.ORIGINAL_DATA_FIELDS}))
+        self.assertFalse(UserBulkService.get_queryset(True, email_domain='partner.com').exists())
+
+        migration = import_module('users.migrations.0005_original_data_as_object')
+        migration.original_data_to_object(apps, None)
+
+        user.refresh_from_db()
+        self.assertEqual(user.original_data['email'], 'user0@partner.com')
+        self.assertEqual(
+            list(UserBulkService.get_queryset(True, email_domain='partner.com').values_list('pk', flat=True)),
+            [user.pk])
+
+    def test_bulk_soft_delete_requires_admin(self):
+        """test that only admins can use the bulk endpoints"""
+        self.client.force_authenticate(user=self.other_user)
+        response = self.client.post(reverse('bulk-soft-delete'), {'role': 'Investor'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(reverse('bulk-soft-delete'), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_soft_delete_command(self):
+        """test the soft delete and reactivate management commands"""
+        ids = [str(user.pk) for user in self.partner_users[:2]]
+        out = StringIO()
+        call_command('soft_delete_users', '--ids', *ids, '--dry-run', stdout=out)
+        self.assertIn('Found 2 users', out.getvalue())
+        self.assertFalse(User.objects.filter(is_soft_deleted=True).exists())
+
+        call_command('soft_delete_users', '--ids', *ids, '--batch-size', '1', stdout=out)
+        self.assertEqual(User.objects.filter(is_soft_deleted=True).count(), 2)
+
+        call_command('reactivate_users', '--ids', *ids, stdout=out)
+        self.assertFalse(User.objects.filter(is_soft_deleted=True).exists())
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_soft_delete_command_warns_of_local_cache(self):
+        """test that the commands warn that a local memory cache is not invalidated in running servers"""
+        ids = [str(user.pk) for user in self.partner_users[:2]]
+        err = StringIO()
+        call_command('soft_delete_users', '--ids', *ids, '--dry-run', stdout=StringIO(), stderr=err)
+        self.assertEqual(err.getvalue(), '')
+
+        call_command('soft_delete_users', '--ids', *ids, stdout=StringIO(), stderr=err)
+        self.assertIn('The cache is local to this process', err.getvalue())
+        err = StringIO()
+        call_command('reactivate_users', '--ids', *ids, stdout=StringIO(), stderr=err)
+        self.assertIn('The cache is local to this process', err.getvalue())
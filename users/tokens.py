@@ -0,0 +1,45 @@
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+CLAIM_NAMES = ('is_staff', 'is_active', 'active_role', 'roles')
+
+
+def prefetch_roles(user, role_pairs):
+    """
+    Fill the roles prefetch cache of the user from (id, name) pairs, so
+    `user.roles.all()` does not query the database.
+    """
+    from .models import Role
+
+    roles = user.roles.all()
+    roles._result_cache = [Role.from_db(DEFAULT_DB_ALIAS, ('id', 'name'), pair) for pair in role_pairs]
+    roles._prefetch_done = True
+    user._prefetched_objects_cache = {'roles': roles}
+
+
+def get_user_claims(user):
+    """
+    Return the user claims embedded in tokens.
+
+    Roles are (id, name) pairs, so a user can be rebuilt from the claims
+    without a database query (see `users.authentication`).
+    """
+    active_role = user.active_role
+    return {
+        'is_staff': user.is_staff,
+        'is_active': user.is_active,
+        'active_role': [active_role.id, active_role.name] if active_role else None,
+        'roles': sorted([role.id, role.name] for role in user.roles.all()),
+    }
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token carrying the user claims; access tokens inherit them."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim, value in get_user_claims(user).items():
+            token[claim] = value
+        return token
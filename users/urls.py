@@ -1,4 +1,5 @@
 from django.urls import path
+from rest_framework.permissions import IsAdminUser
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView, TokenVerifyView
 from .views import (
@@ -24,4 +25,6 @@ urlpatterns = [
     path('auth/users/remove_role/', CustomUserViewSet.as_view({'post': 'remove_role'}), name='remove-role'),
     path('auth/users/soft_delete/', CustomUserViewSet.as_view({'post': 'soft_delete'}), name='soft-delete'),
     path('auth/users/reactivate/', CustomUserViewSet.as_view({'post': 'reactivate'}), name='reactivate'),
+    path('auth/users/bulk_soft_delete/', CustomUserViewSet.as_view({'post': 'bulk_soft_delete'}, permission_classes=[IsAdminUser]), name='bulk-soft-delete'),
+    path('auth/users/bulk_reactivate/', CustomUserViewSet.as_view({'post': 'bulk_reactivate'}, permission_classes=[IsAdminUser]), name='bulk-reactivate'),
 ] + router.urls
@@ -1,26 +1,105 @@
-import logging
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db.models import Q
+from django_ratelimit.core import get_usage
 from djoser.views import UserViewSet
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.throttling import UserRateThrottle
 from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework.response import Response
 from rest_framework import status
 from .models import User
-from .serializers import UserSerializer
-from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
+from .serializers import BulkUserActionSerializer, UserSerializer
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
+from forum.utils.logging_utils import get_logger
 from .serializers import CustomTokenObtainPairSerializer
-from datetime import timedelta
+from .revocation import revocation_store
+from .services import UserBulkService
+from .tokens import ClaimsRefreshToken, prefetch_roles
 
-logger = logging.getLogger('users')
+logger = get_logger('users')
+
+LOGIN_RATELIMIT_GROUP = 'users.login'
+
+
+def login_attempt_key(group, request):
+    """Rate limit key for failed logins of one account, from any address."""
+    return str(request.data.get('email') or '').strip().lower()
+
+
+def client_ip(request):
+    """
+    Address of the client: behind TRUSTED_PROXY_COUNT proxies, the address
+    the outermost of them added to X-Forwarded-For (entries left of it are
+    sent by the client), otherwise REMOTE_ADDR.
+    """
+    proxies = settings.TRUSTED_PROXY_COUNT
+    if proxies:
+        hops = [hop.strip() for hop in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if hop.strip()]
+        if len(hops) >= proxies:
+            return hops[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
+    """
+    Issues JWT token pairs for email and password credentials.
+
+    The user, the active role and all roles are loaded in one query, and
+    failed attempts are counted in the shared cache per account
+    (LOGIN_RATE_LIMIT) and, when set, per client address (LOGIN_IP_RATE_LIMIT).
+    """
     serializer_class = CustomTokenObtainPairSerializer
 
+    def get_login_limits(self):
+        limits = [(login_attempt_key, settings.LOGIN_RATE_LIMIT)]
+        if settings.LOGIN_IP_RATE_LIMIT:
+            limits.append(('ip', settings.LOGIN_IP_RATE_LIMIT))
+        return limits
+
+    def get_login_block(self, request):
+        """
+        Return the seconds until the next allowed attempt if a failed login
+        limit has been reached, otherwise None.
+        """
+        for key, rate in self.get_login_limits():
+            usage = get_usage(request, group=LOGIN_RATELIMIT_GROUP, key=key, rate=rate,
+                              method='POST', increment=False)
+            if usage and usage['count'] >= usage['limit']:
+                return usage['time_left']
+        return None
+
+    def record_failed_login(self, request):
+        for key, rate in self.get_login_limits():
+            get_usage(request, group=LOGIN_RATELIMIT_GROUP, key=key, rate=rate,
+                      method='POST', increment=True)
+
+    def get_login_user(self, email):
+        """
+        Load the user with only the fields needed for login and tokens.
+
+        The active role is joined and the roles are aggregated into the same
+        row, so issuing the token claims needs no further queries.
+        """
+        user = User.objects.select_related('active_role').only(
+            'id', 'email', 'password', 'is_active', 'is_staff', 'is_soft_deleted',
+            'active_role__id', 'active_role__name',
+        ).annotate(
+            role_ids=ArrayAgg('roles__id', filter=Q(roles__isnull=False), default=[]),
+            role_names=ArrayAgg('roles__name', filter=Q(roles__isnull=False), default=[]),
+        ).filter(email=email).first()
+
+        if user is not None:
+            prefetch_roles(user, zip(user.role_ids, user.role_names))
+        return user
+
     def authenticate_user(self, email, password):
         """
         Authenticate a user by email and password.
@@ -35,24 +114,30 @@ class CustomTokenObtainPairView(TokenObtainPairView):
         Raises:
             ValidationError: If authentication fails
         """
-        logger.debug(f"Attempting to authenticate user: {email}")
+        logger.debug("Attempting to authenticate user: %s", email)
 
         try:
-            user = User.objects.get(email=email)
+            if not email or not password:
+                raise User.DoesNotExist
+            user = self.get_login_user(email.lower().strip())
+            if user is None:
+                # Hash anyway so unknown emails take as long as wrong passwords
+                make_password(password)
+                raise User.DoesNotExist
 
             if not user.check_password(password):
-                logger.warning(f"Invalid password attempt for user: {email}")
+                logger.warning("Invalid password attempt for user: %s", email)
                 raise ValidationError("Invalid credentials")
 
             if not user.is_active and not user.is_soft_deleted:
-                logger.info(f"Disabled account access attempt: {email}")
+                logger.info("Disabled account access attempt: %s", email)
                 raise ValidationError("Account is disabled")
 
-            logger.info(f"Successfully authenticated user: {email}")
+            logger.info("Successfully authenticated user: %s", email)
             return user
 
         except User.DoesNotExist:
-            logger.warning(f"Authentication attempt for non-existent user: {email}")
+            logger.warning("Authentication attempt for non-existent user: %s", email)
             raise ValidationError("Invalid credentials")
 
     def generate_tokens(self, user):
@@ -65,10 +150,10 @@ class CustomTokenObtainPairView(TokenObtainPairView):
         Returns:
             dict: Token pair and user information
         """
-        logger.debug(f"Generating tokens for user: {user.email}")
+        logger.debug("Generating tokens for user: %s", user.email)
 
         try:
-            refresh = RefreshToken.for_user(user)
+            refresh = ClaimsRefreshToken.for_user(user)
             tokens = {
                 'refresh': str(refresh),
                 'access': str(refresh.access_token),
@@ -76,11 +161,11 @@ class CustomTokenObtainPairView(TokenObtainPairView):
                 'email': user.email,
                 'is_soft_deleted': user.is_soft_deleted
             }
-            logger.info(f"Successfully generated tokens for user: {user.email}")
+            logger.info("Successfully generated tokens for user: %s", user.email)
             return tokens
 
         except Exception as e:
-            logger.error(f"Token generation failed for user {user.email}: {str(e)}")
+            logger.error("Token generation failed for user %s: %s", user.email, str(e))
             raise
 
     def post(self, request, *args, **kwargs):
@@ -96,7 +181,16 @@ class CustomTokenObtainPairView(TokenObtainPairView):
         email = request.data.get('email')
         password = request.data.get('password')
 
-        logger.debug(f"Token request received for email: {email}")
+        logger.debug("Token request received for email: %s", email)
+
+        retry_after = self.get_login_block(request)
+        if retry_after is not None:
+            logger.warning("Login rate limit reached for email: %s", email)
+            return Response(
+                {"error": "Too many failed login attempts. Try again later."},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={'Retry-After': str(retry_after)}
+            )
 
         try:
             user = self.authenticate_user(email, password)
@@ -114,6 +208,7 @@ class CustomTokenObtainPairView(TokenObtainPairView):
             return Response(tokens, status=status.HTTP_200_OK)
 
         except ValidationError as e:
+            self.record_failed_login(request)
             logger.warning(
                 "Authentication failed",
                 extra={
@@ -158,7 +253,7 @@ class UserProfileView(APIView):
         :return: A response containing the user's profile information.
         """
         user = request.user
-        logger.debug(f"Profile request for user: {user.email}")
+        logger.debug("Profile request for user: %s", user.email)
 
         try:
             serializer = UserSerializer(request.user, context={'request': request})
@@ -236,11 +331,11 @@ class CustomUserViewSet(UserViewSet):
         """Add a role to the user."""
         role_name = request.data.get('role_name')
         user = request.user
-        logger.debug(f"Attempting to add role '{role_name}' to user {user.email}")
+        logger.debug("Attempting to add role '%s' to user %s", role_name, user.email)
 
         if role_name == 'Admin' and not user.is_staff:
             logger.warning(
-                f"Unauthorized attempt to add Admin role by user {user.email}"
+                "Unauthorized attempt to add Admin role by user %s", user.email
             )
             return Response(
                 {"error": "Only administrators can add Admin role"},
@@ -287,10 +382,10 @@ class CustomUserViewSet(UserViewSet):
         """Remove a role from the user."""
         role_name = request.data.get('role_name')
         user = request.user
-        logger.debug(f"Attempting to remove role '{role_name}' from user {user.email}")
+        logger.debug("Attempting to remove role '%s' from user %s", role_name, user.email)
 
         if role_name not in user.get_roles_display():
-            logger.warning(f"User  {user.email} does not have the role: {role_name}")
+            logger.warning("User  %s does not have the role: %s", user.email, role_name)
             raise ValidationError(f"User  {user.email} does not have the role: {role_name}")
 
         try:
@@ -320,7 +415,7 @@ class CustomUserViewSet(UserViewSet):
     def soft_delete(self, request):
         """Soft delete user account."""
         user = request.user
-        logger.debug(f"Attempting to soft delete user account: {user.email}")
+        logger.debug("Attempting to soft delete user account: %s", user.email)
 
         try:
             user.soft_delete()
@@ -347,7 +442,7 @@ class CustomUserViewSet(UserViewSet):
     def reactivate(self, request):
         """Reactivate soft-deleted account."""
         user = request.user
-        logger.debug(f"Attempting to reactivate user account: {user.email}")
+        logger.debug("Attempting to reactivate user account: %s", user.email)
 
         try:
             user.reactivate()
@@ -370,36 +465,89 @@ class CustomUserViewSet(UserViewSet):
             )
             return Response({"error": str(e)}, status=400)
 
+    def get_bulk_queryset(self, request, soft_deleted):
+        serializer = BulkUserActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        queryset = UserBulkService.get_queryset(
+            soft_deleted,
+            user_ids=data.get('user_ids'),
+            email_domain=data.get('email_domain'),
+            role=data.get('role'),
+        )
+        return queryset, data['dry_run']
+
+    @action(["post"], detail=False, permission_classes=[IsAdminUser])
+    def bulk_soft_delete(self, request):
+        """
+        Soft delete many user accounts (admin only).
+
+        Body: "user_ids", "email_domain" and/or "role" select the users;
+        "dry_run" only counts them. The requesting admin is never included.
+
+        Returns:
+            Response: number of soft deleted users
+        """
+        queryset, dry_run = self.get_bulk_queryset(request, soft_deleted=False)
+        deleted = UserBulkService.soft_delete(queryset.exclude(pk=request.user.pk), dry_run=dry_run)
+        logger.info("Admin %s bulk soft deleted %s users (dry run: %s)", request.user.pk, deleted, dry_run)
+        return Response({"deleted": deleted, "dry_run": dry_run}, status=status.HTTP_200_OK)
+
+    @action(["post"], detail=False, permission_classes=[IsAdminUser])
+    def bulk_reactivate(self, request):
+        """
+        Reactivate many soft deleted user accounts (admin only).
+
+        Body: as for bulk_soft_delete.
+
+        Returns:
+            Response: number of reactivated users and the ids of users
+            skipped because their email has been taken
+        """
+        queryset, dry_run = self.get_bulk_queryset(request, soft_deleted=True)
+        reactivated, skipped = UserBulkService.reactivate(queryset, dry_run=dry_run)
+        logger.info("Admin %s bulk reactivated %s users (dry run: %s)", request.user.pk, reactivated, dry_run)
+        return Response(
+            {"reactivated": reactivated, "skipped": skipped, "dry_run": dry_run},
+            status=status.HTTP_200_OK
+        )
+
 
 class LogoutView(APIView):
     permission_classes = [IsAuthenticated]
 
     """
     Class for successfull user log out
+
+    Revokes the refresh token and the access token of the request until
+    they expire (see `users.revocation`).
     """
     def post(self, request):
         refresh_token = request.data.get("refresh")
         user = request.user
-        logger.debug(f"Logout attempt for user: {user.email}")
+        logger.debug("Logout attempt for user: %s", user.pk)
 
-        if refresh_token:
-            token = RefreshToken(refresh_token)
-            token.set_exp(lifetime=timedelta(seconds=0))
-        else:
+        if not refresh_token:
             logger.error(
                 "Logout failed: refresh token not provided",
-                extra={'user_id': user.id, 'email': user.email}
+                extra={'user_id': user.pk}
             )
             return Response({"error": "The refresh token hadn't been provided"}, status=status.HTTP_400_BAD_REQUEST)
 
-        access_token = request.auth.token
-        ac_token = AccessToken(access_token)
-        ac_token.set_exp(lifetime=timedelta(seconds=0))
+        try:
+            token = RefreshToken(refresh_token)
+        except TokenError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if str(token.payload.get(api_settings.USER_ID_CLAIM)) != str(user.pk):
+            return Response({"error": "The refresh token does not belong to the user"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        revocation_store.revoke(token.payload)
+        revocation_store.revoke(request.auth.payload)
 
         logger.info(
             "User successfully logged out",
-            extra={'user_id': user.id, 'email': user.email}
+            extra={'user_id': user.pk}
         )
 
         return Response({"message": "User logged out successfully"}, status=status.HTTP_200_OK)
-